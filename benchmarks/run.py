@@ -0,0 +1,554 @@
+"""Benchmark suite for the storage, API and update pipeline hot paths.
+
+Seeds synthetic data at several scales, times each hot path, saves the results
+as JSON and compares them against a stored baseline:
+
+    uv run python benchmarks/run.py                    # compare against baseline
+    uv run python benchmarks/run.py --update-baseline  # accept the current numbers
+    uv run python benchmarks/run.py --only leaderboard --scales 1000
+
+Exits with status 1 if any benchmark's median time per operation regressed by
+more than --threshold relative to the baseline. Baselines are machine specific,
+so refresh the stored one when benchmarking on different hardware.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+from app.api.main import app
+from app.core.external_api import extract_daily_scores
+from app.handlers.update_handler import process_users
+from app.storage.coalescing import CoalescingLeaderboardStorage
+from app.storage.factory import get_leaderboard_storage
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetGroupLeaderboardQuery,
+    GetScoreHistogramQuery,
+)
+from app.storage.leaderboard.sqlite import SqliteLeaderboardStorage
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.memory_snapshot import SnapshotReader, dump_snapshot, load_snapshot
+from app.storage.models import DailyScoreItem
+from app.storage.sqlite_context import SqliteStorageContext
+from app.storage.users.interface import UserStorage
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import (
+    GetHeadToHeadQuery,
+    SaveBatchQuery,
+    SaveDailyScoreQuery,
+)
+from app.storage.users.sqlite import SqliteUserStorage
+from app.testing.fake_nyt_api import (
+    FakeNytApi,
+    FakeNytApiConfig,
+    generate_stats_payload,
+)
+from app.testing.seed import seed_storage, synthetic_dates, synthetic_scores
+
+# --- Configuration ---
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_BASELINE_PATH = BENCHMARK_DIR / "baseline.json"
+DEFAULT_OUTPUT_PATH = BENCHMARK_DIR / "results.json"
+DEFAULT_SCALES = [1_000, 10_000, 100_000]
+# Days of scores seeded for leaderboard benchmarks, so reads must skip other dates
+SEEDED_DAYS = 7
+# Timed calls per benchmark; the median is compared against the baseline
+REPEAT = 5
+# Threads reading concurrently in the threaded leaderboard benchmarks
+READER_THREADS = 4
+# Members of the group in the group leaderboard benchmarks
+GROUP_SIZE = 50
+# Days of history of the two users compared by the head-to-head benchmarks
+HEAD_TO_HEAD_SCALES = [365, 3_650]
+# Relative slowdown of the median that counts as a regression
+DEFAULT_THRESHOLD = 0.25
+# --- End Configuration ---
+
+# A benchmark turns a scale into (operation to time, operations per call)
+type Benchmark = Callable[[int], Tuple[Callable[[], None], int]]
+
+# Registered benchmarks and the scales they run at by default
+BENCHMARKS: Dict[str, Tuple[Benchmark, List[int]]] = {}
+
+
+def benchmark(
+    name: str, scales: List[int] = DEFAULT_SCALES
+) -> Callable[[Benchmark], Benchmark]:
+    """Register a benchmark under name, run at the given scales by default."""
+
+    def register(func: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = (func, scales)
+        return func
+
+    return register
+
+
+@lru_cache(maxsize=1)
+def seeded_context(user_count: int) -> InMemoryStorageContext:
+    """An in-memory context holding SEEDED_DAYS days of scores for user_count users."""
+    context = InMemoryStorageContext()
+    seed_storage(InMemoryUserStorage(context), user_count, SEEDED_DAYS)
+    return context
+
+
+# Holds the SQLite databases and snapshots created by the benchmarks until the process exits
+TEMP_DIR = tempfile.TemporaryDirectory(prefix="nytxwordboard-benchmarks-")
+TEMP_FILE_IDS = itertools.count()
+
+
+def new_sqlite_context() -> SqliteStorageContext:
+    """A SQLite context on a new, empty database file."""
+    return SqliteStorageContext(str(Path(TEMP_DIR.name) / f"{next(TEMP_FILE_IDS)}.db"))
+
+
+@lru_cache(maxsize=1)
+def seeded_sqlite_context(user_count: int) -> SqliteStorageContext:
+    """A SQLite context holding SEEDED_DAYS days of scores for user_count users."""
+    context = new_sqlite_context()
+    seed_storage(SqliteUserStorage(context), user_count, SEEDED_DAYS)
+    return context
+
+
+def bench_saves(
+    new_storage: Callable[[], UserStorage], scale: int, batched: bool
+) -> Tuple[Callable[[], None], int]:
+    """Saving `scale` scores into empty storage, one by one or as one batch."""
+    items = list(synthetic_scores(scale, days=1))
+    queries = [SaveDailyScoreQuery(item=item) for item in items]
+    batch = SaveBatchQuery(daily_score_items=items)
+
+    def op() -> None:
+        storage = new_storage()
+        if batched:
+            storage.save_batch(batch)
+        else:
+            for query in queries:
+                storage.save_daily_score(query)
+
+    return op, len(items)
+
+
+@benchmark("leaderboard.get_daily_leaderboard")
+def bench_get_daily_leaderboard(scale: int) -> Tuple[Callable[[], None], int]:
+    """One top-100 leaderboard read with `scale` users per day."""
+    storage = InMemoryLeaderboardStorage(seeded_context(scale))
+    query = GetDailyLeaderboardQuery(date=synthetic_dates(SEEDED_DAYS)[-1], limit=100)
+
+    def op() -> None:
+        storage.get_daily_leaderboard(query)
+
+    return op, 1
+
+
+def group_leaderboard_query(scale: int) -> GetGroupLeaderboardQuery:
+    """A query for the latest board of GROUP_SIZE users spread over `scale` users."""
+    return GetGroupLeaderboardQuery(
+        date=synthetic_dates(SEEDED_DAYS)[-1],
+        user_ids=frozenset(
+            str(user_id) for user_id in range(1, scale + 1, scale // GROUP_SIZE)
+        ),
+    )
+
+
+@benchmark("leaderboard.get_group_leaderboard")
+def bench_get_group_leaderboard(scale: int) -> Tuple[Callable[[], None], int]:
+    """One GROUP_SIZE-member group leaderboard read with `scale` users per day."""
+    storage = InMemoryLeaderboardStorage(seeded_context(scale))
+    query = group_leaderboard_query(scale)
+
+    def op() -> None:
+        storage.get_group_leaderboard(query)
+
+    return op, 1
+
+
+@benchmark("leaderboard.get_score_histogram")
+def bench_get_score_histogram(scale: int) -> Tuple[Callable[[], None], int]:
+    """One log-scale score histogram read with `scale` users per day."""
+    storage = InMemoryLeaderboardStorage(seeded_context(scale))
+    query = GetScoreHistogramQuery(date=synthetic_dates(SEEDED_DAYS)[-1], scale="log")
+
+    def op() -> None:
+        storage.get_score_histogram(query)
+
+    return op, 1
+
+
+def bench_threaded_reads(
+    scale: int, writes: bool, coalesce: bool = False
+) -> Tuple[Callable[[], None], int]:
+    """READER_THREADS threads reading a top-100 leaderboard of `scale` users.
+
+    With writes, another thread keeps overwriting scores of the same date for
+    as long as the readers run. With coalesce, concurrent reads share one
+    backend read through CoalescingLeaderboardStorage.
+    """
+    context = InMemoryStorageContext()
+    seed_storage(InMemoryUserStorage(context), scale, days=1)
+    date = synthetic_dates(1)[-1]
+    storage: LeaderboardStorage = InMemoryLeaderboardStorage(context)
+    if coalesce:
+        storage = CoalescingLeaderboardStorage(storage)
+    writer_storage = InMemoryUserStorage(context)
+    query = GetDailyLeaderboardQuery(date=date, limit=100)
+    reads_per_thread = 200
+
+    def read() -> None:
+        for _ in range(reads_per_thread):
+            storage.get_daily_leaderboard(query)
+
+    def write(stop: threading.Event) -> None:
+        for i in itertools.count():
+            if stop.is_set():
+                return
+            item = DailyScoreItem(
+                user_id=str(i % scale + 1), date=date, score=300 + i % 1_000
+            )
+            writer_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+
+    def op() -> None:
+        stop = threading.Event()
+        writer = threading.Thread(target=write, args=(stop,))
+        if writes:
+            writer.start()
+        readers = [threading.Thread(target=read) for _ in range(READER_THREADS)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        stop.set()
+        if writes:
+            writer.join()
+
+    return op, READER_THREADS * reads_per_thread
+
+
+@benchmark("memory.threaded_reads")
+def bench_threaded_reads_idle(scale: int) -> Tuple[Callable[[], None], int]:
+    """Concurrent leaderboard reads without writers, per read."""
+    return bench_threaded_reads(scale, writes=False)
+
+
+@benchmark("memory.threaded_reads_with_writes")
+def bench_threaded_reads_contended(scale: int) -> Tuple[Callable[[], None], int]:
+    """Concurrent leaderboard reads while a writer saves to the same date."""
+    return bench_threaded_reads(scale, writes=True)
+
+
+@benchmark("memory.threaded_reads_coalesced")
+def bench_threaded_reads_coalesced(scale: int) -> Tuple[Callable[[], None], int]:
+    """Concurrent identical leaderboard reads sharing in-flight backend reads."""
+    return bench_threaded_reads(scale, writes=False, coalesce=True)
+
+
+@benchmark("users.save_daily_score")
+def bench_save_daily_score(scale: int) -> Tuple[Callable[[], None], int]:
+    """Saving `scale` scores one by one into empty in-memory storage."""
+    return bench_saves(
+        lambda: InMemoryUserStorage(InMemoryStorageContext()), scale, batched=False
+    )
+
+
+@benchmark("users.save_batch")
+def bench_save_batch(scale: int) -> Tuple[Callable[[], None], int]:
+    """Saving `scale` scores as one batch into empty in-memory storage."""
+    return bench_saves(
+        lambda: InMemoryUserStorage(InMemoryStorageContext()), scale, batched=True
+    )
+
+
+def bench_head_to_head(
+    storage: UserStorage, days: int
+) -> Tuple[Callable[[], None], int]:
+    """One comparison of users 1 and 2 after seeding `days` days of their scores."""
+    seed_storage(storage, 2, days)
+    query = GetHeadToHeadQuery(user_id="1", opponent_id="2")
+
+    def op() -> None:
+        storage.get_head_to_head(query)
+
+    return op, 1
+
+
+@benchmark("users.get_head_to_head", scales=HEAD_TO_HEAD_SCALES)
+def bench_get_head_to_head(scale: int) -> Tuple[Callable[[], None], int]:
+    """Comparing two in-memory users with `scale` days of history each."""
+    return bench_head_to_head(InMemoryUserStorage(InMemoryStorageContext()), scale)
+
+
+@benchmark("sqlite.leaderboard.get_daily_leaderboard")
+def bench_sqlite_get_daily_leaderboard(scale: int) -> Tuple[Callable[[], None], int]:
+    """One top-100 leaderboard read from SQLite with `scale` users per day."""
+    storage = SqliteLeaderboardStorage(seeded_sqlite_context(scale))
+    query = GetDailyLeaderboardQuery(date=synthetic_dates(SEEDED_DAYS)[-1], limit=100)
+
+    def op() -> None:
+        storage.get_daily_leaderboard(query)
+
+    return op, 1
+
+
+@benchmark("sqlite.leaderboard.get_group_leaderboard")
+def bench_sqlite_get_group_leaderboard(scale: int) -> Tuple[Callable[[], None], int]:
+    """One GROUP_SIZE-member group leaderboard read from SQLite."""
+    storage = SqliteLeaderboardStorage(seeded_sqlite_context(scale))
+    query = group_leaderboard_query(scale)
+
+    def op() -> None:
+        storage.get_group_leaderboard(query)
+
+    return op, 1
+
+
+@benchmark("sqlite.leaderboard.get_score_histogram")
+def bench_sqlite_get_score_histogram(scale: int) -> Tuple[Callable[[], None], int]:
+    """One log-scale score histogram read from SQLite with `scale` users per day."""
+    storage = SqliteLeaderboardStorage(seeded_sqlite_context(scale))
+    query = GetScoreHistogramQuery(date=synthetic_dates(SEEDED_DAYS)[-1], scale="log")
+
+    def op() -> None:
+        storage.get_score_histogram(query)
+
+    return op, 1
+
+
+@benchmark("sqlite.users.save_daily_score", scales=[1_000, 10_000])
+def bench_sqlite_save_daily_score(scale: int) -> Tuple[Callable[[], None], int]:
+    """Saving `scale` scores one by one, a transaction each, into empty SQLite."""
+    return bench_saves(
+        lambda: SqliteUserStorage(new_sqlite_context()), scale, batched=False
+    )
+
+
+@benchmark("sqlite.users.get_head_to_head", scales=HEAD_TO_HEAD_SCALES)
+def bench_sqlite_get_head_to_head(scale: int) -> Tuple[Callable[[], None], int]:
+    """Comparing two SQLite users with `scale` days of history each."""
+    return bench_head_to_head(SqliteUserStorage(new_sqlite_context()), scale)
+
+
+@benchmark("sqlite.users.save_batch")
+def bench_sqlite_save_batch(scale: int) -> Tuple[Callable[[], None], int]:
+    """Saving `scale` scores as one executemany batch into empty SQLite."""
+    return bench_saves(
+        lambda: SqliteUserStorage(new_sqlite_context()), scale, batched=True
+    )
+
+
+@benchmark("memory.load_snapshot", scales=[1_000, 10_000])
+def bench_load_snapshot(scale: int) -> Tuple[Callable[[], None], int]:
+    """Restoring a context of `scale` users from a snapshot, per score."""
+    context = seeded_context(scale)
+    path = Path(TEMP_DIR.name) / f"{next(TEMP_FILE_IDS)}.snap"
+    dump_snapshot(context, path)
+
+    def op() -> None:
+        load_snapshot(path)
+
+    return op, len(context.scores)
+
+
+@benchmark("memory.snapshot_ranked_scores")
+def bench_snapshot_ranked_scores(scale: int) -> Tuple[Callable[[], None], int]:
+    """Opening a snapshot of `scale` users and reading a date's top 100 in place."""
+    path = Path(TEMP_DIR.name) / f"{next(TEMP_FILE_IDS)}.snap"
+    dump_snapshot(seeded_context(scale), path)
+    date = synthetic_dates(SEEDED_DAYS)[-1]
+
+    def op() -> None:
+        reader = SnapshotReader(path)
+        list(reader.ranked_scores(date, limit=100))
+        reader.close()
+
+    return op, 1
+
+
+@benchmark("models.DailyScoreItem")
+def bench_model_construction(scale: int) -> Tuple[Callable[[], None], int]:
+    """Validating `scale` daily score models."""
+    rows = [
+        {"user_id": str(user_id), "date": "2025-01-01", "score": 600 + user_id % 900}
+        for user_id in range(1, scale + 1)
+    ]
+
+    def op() -> None:
+        for row in rows:
+            DailyScoreItem.model_validate(row)
+
+    return op, len(rows)
+
+
+@benchmark("external_api.extract_daily_scores")
+def bench_extract_daily_scores(scale: int) -> Tuple[Callable[[], None], int]:
+    """Extracting scores from `scale` stats payloads."""
+    config = FakeNytApiConfig()
+    payloads = [generate_stats_payload(config, user_id) for user_id in range(1, 101)]
+
+    def op() -> None:
+        for i in range(scale):
+            extract_daily_scores(payloads[i % len(payloads)], str(i % 100 + 1))
+
+    return op, scale
+
+
+@benchmark("api.get_leaderboard")
+def bench_api_get_leaderboard(scale: int) -> Tuple[Callable[[], None], int]:
+    """20 requests to /api/leaderboard/{date} with `scale` users per day."""
+    storage = InMemoryLeaderboardStorage(seeded_context(scale))
+    app.dependency_overrides[get_leaderboard_storage] = lambda: storage
+    url = f"/api/leaderboard/{synthetic_dates(SEEDED_DAYS)[-1]}?limit=100"
+    loop = asyncio.new_event_loop()
+    requests = 20
+
+    async def send_requests() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            for _ in range(requests):
+                response = await client.get(url)
+                response.raise_for_status()
+
+    def op() -> None:
+        loop.run_until_complete(send_requests())
+
+    return op, requests
+
+
+@benchmark("update.process_users", scales=[100, 1_000, 10_000])
+def bench_process_users(scale: int) -> Tuple[Callable[[], None], int]:
+    """A sweep of `scale` users against the fake NYT API without latency."""
+    api = FakeNytApi(FakeNytApiConfig())
+    user_ids = [str(user_id) for user_id in range(1, scale + 1)]
+    loop = asyncio.new_event_loop()
+
+    async def sweep() -> None:
+        storage = InMemoryUserStorage(InMemoryStorageContext())
+        async with httpx.AsyncClient(transport=api.mock_transport()) as client:
+            await process_users(user_ids, storage, client)
+
+    def op() -> None:
+        loop.run_until_complete(sweep())
+
+    return op, scale
+
+
+def measure(op: Callable[[], None], ops: int, repeat: int) -> Dict[str, Any]:
+    """Time op `repeat` times and summarize the time per operation."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        op()
+        timings.append((time.perf_counter_ns() - start) / ops / 1000)
+    return {
+        "ops": ops,
+        "repeat": repeat,
+        "median_us": statistics.median(timings),
+        "min_us": min(timings),
+        "max_us": max(timings),
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Print results next to the baseline and return the regressed benchmarks."""
+    regressions = []
+    print(f"{'benchmark':<48} {'median us/op':>14} {'baseline':>12} {'change':>8}")
+    for key, result in results.items():
+        base = baseline.get(key)
+        line = f"{key:<48} {result['median_us']:>14.3f}"
+        if base is None:
+            print(f"{line} {'-':>12} {'new':>8}")
+            continue
+        change = result["median_us"] / base["median_us"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{line} {base['median_us']:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    """Run the selected benchmarks, save the results and check for regressions."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scales", type=int, nargs="+", help="Override every benchmark's scales"
+    )
+    parser.add_argument(
+        "--only", nargs="+", default=[], help="Run benchmarks whose name contains any"
+    )
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the results to the baseline instead of comparing",
+    )
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    for name, (bench, scales) in BENCHMARKS.items():
+        if args.only and not any(pattern in name for pattern in args.only):
+            continue
+        for scale in args.scales or scales:
+            key = f"{name}[{scale}]"
+            print(f"Running {key}...", file=sys.stderr)
+            op, ops = bench(scale)
+            op()  # Warm up caches and lazy initialization
+            results[key] = measure(op, ops, args.repeat)
+
+    report = {
+        "metadata": {
+            "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.update_baseline:
+        baseline_report = (
+            json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        )
+        baseline_report["metadata"] = report["metadata"]
+        baseline_report.setdefault("results", {}).update(results)
+        args.baseline.write_text(json.dumps(baseline_report, indent=2) + "\n")
+        print(f"Updated baseline {args.baseline} with {len(results)} results.")
+        return
+
+    baseline = (
+        json.loads(args.baseline.read_text())["results"]
+        if args.baseline.exists()
+        else {}
+    )
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(
+            f"\n{len(regressions)} benchmarks regressed by more than "
+            f"{args.threshold:.0%}: {', '.join(regressions)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""Load test the API and report throughput and latency percentiles per route.
+
+Seeds a storage backend with synthetic users and scores, then drives the
+FastAPI app with a weighted mix of read requests, either in-process through
+httpx's ASGI transport or over HTTP through a local uvicorn server. The app
+builds its storage through the factory as in production, so the configured
+cache and coalescing wrappers are part of what is measured.
+
+Load is either closed, with a fixed number of clients each sending its next
+request as soon as the previous one returns:
+
+    uv run python scripts/api_load.py --users 10000 --days 90 --concurrency 32
+
+or open, with requests arriving at a fixed rate whether or not earlier ones
+have returned, so latency includes queueing once the app falls behind:
+
+    uv run python scripts/api_load.py --rate 500 --arrivals poisson --server uvicorn
+
+The load generator runs in the same process as the app, so with uvicorn the
+two compete for the GIL; measured capacity is a lower bound for one worker.
+Pass --output to save the report as JSON, e.g. as a capacity baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import Callable
+
+import httpx
+import uvicorn
+
+from app.api.main import app
+from app.core.config import get_settings
+from app.storage.factory import (
+    get_group_storage,
+    get_leaderboard_storage,
+    get_user_storage,
+)
+from app.storage.groups.models import GroupItem, SaveGroupQuery
+from app.storage.leaderboard.models import RefreshDailyLeaderboardQuery
+from app.testing.seed import seed_storage, synthetic_dates
+
+# --- Configuration ---
+END_DATE = date(2025, 1, 1)
+GROUP_COUNT = 20
+GROUP_SIZE = 50
+# Share of leaderboard reads for the latest date, as when a puzzle drops
+LATEST_DATE_SHARE = 0.5
+# Relative weights of the routes in the request mix
+ROUTE_WEIGHTS = {
+    "GET /api/leaderboard/{date}": 50,
+    "GET /api/leaderboard/{date}/histogram": 15,
+    "GET /api/groups/{group_id}/leaderboard/{date}": 15,
+    "GET /api/users/{user_id}/streaks": 10,
+    "GET /api/users/{user_id}/versus/{opponent_id}": 10,
+}
+# --- End Configuration ---
+
+
+class Dataset:
+    """What was seeded, for building requests that hit existing data."""
+
+    def __init__(self, user_count: int, days: int) -> None:
+        self.user_count = user_count
+        self.dates = synthetic_dates(days, END_DATE)
+        self.group_ids = [f"load-{index}" for index in range(GROUP_COUNT)]
+
+    def date(self, rng: random.Random) -> str:
+        """A date with scores, skewed towards the latest."""
+        if rng.random() < LATEST_DATE_SHARE:
+            return self.dates[-1]
+        return rng.choice(self.dates)
+
+    def user_id(self, rng: random.Random) -> str:
+        """A seeded user's ID."""
+        return str(rng.randint(1, self.user_count))
+
+
+def build_request(dataset: Dataset, rng: random.Random) -> tuple[str, str]:
+    """Draw a request from the route mix, as (route, URL path)."""
+    route = rng.choices(list(ROUTE_WEIGHTS), weights=list(ROUTE_WEIGHTS.values()))[0]
+    paths: dict[str, Callable[[], str]] = {
+        "GET /api/leaderboard/{date}": lambda: (
+            f"/api/leaderboard/{dataset.date(rng)}?limit=100"
+        ),
+        "GET /api/leaderboard/{date}/histogram": lambda: (
+            f"/api/leaderboard/{dataset.date(rng)}/histogram"
+        ),
+        "GET /api/groups/{group_id}/leaderboard/{date}": lambda: (
+            f"/api/groups/{rng.choice(dataset.group_ids)}"
+            f"/leaderboard/{dataset.date(rng)}"
+        ),
+        "GET /api/users/{user_id}/streaks": lambda: (
+            f"/api/users/{dataset.user_id(rng)}/streaks?as_of={dataset.dates[-1]}"
+        ),
+        "GET /api/users/{user_id}/versus/{opponent_id}": lambda: (
+            f"/api/users/{dataset.user_id(rng)}/versus/{dataset.user_id(rng)}"
+        ),
+    }
+    return route, paths[route]()
+
+
+def configure_backend(backend: str, cache_entries: int) -> None:
+    """Select the storage the app's dependencies build, before any is built."""
+    settings = get_settings()
+    settings.STORAGE_BACKEND = backend
+    settings.STORAGE_CACHE_MAX_ENTRIES = cache_entries
+    if backend == "sqlite":
+        directory = tempfile.mkdtemp(prefix="api-load-")
+        settings.SQLITE_PATH = os.path.join(directory, "leaderboard.db")
+
+
+def seed(dataset: Dataset, days: int, seed_value: int) -> None:
+    """Seed users, scores and groups, and refresh the boards of every date."""
+    start = time.perf_counter()
+    scores = seed_storage(
+        get_user_storage(), dataset.user_count, days, END_DATE, seed=seed_value
+    )
+    leaderboard_storage = get_leaderboard_storage()
+    for iso_date in dataset.dates:
+        leaderboard_storage.refresh_daily_leaderboard(
+            RefreshDailyLeaderboardQuery(date=iso_date)
+        )
+    rng = random.Random(seed_value)
+    group_storage = get_group_storage()
+    for group_id in dataset.group_ids:
+        members = rng.sample(
+            range(1, dataset.user_count + 1), min(GROUP_SIZE, dataset.user_count)
+        )
+        group_storage.save_group(
+            SaveGroupQuery(
+                item=GroupItem(
+                    group_id=group_id,
+                    user_ids=frozenset(str(member) for member in members),
+                )
+            )
+        )
+    print(
+        f"Seeded {dataset.user_count} users, {scores} scores and "
+        f"{len(dataset.group_ids)} groups in {time.perf_counter() - start:.1f}s"
+    )
+
+
+class Recorder:
+    """Latencies and failures of the requests sent after the warmup."""
+
+    def __init__(self, record_after: float) -> None:
+        self.record_after = record_after
+        self.latencies: dict[str, list[float]] = {route: [] for route in ROUTE_WEIGHTS}
+        self.errors: dict[str, int] = {route: 0 for route in ROUTE_WEIGHTS}
+
+    async def send(
+        self, client: httpx.AsyncClient, route: str, path: str, start: float
+    ) -> None:
+        """Send a request and record its latency, measured from start."""
+        try:
+            response = await client.get(path)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if start < self.record_after:
+            return
+        self.latencies[route].append(time.perf_counter() - start)
+        if failed:
+            self.errors[route] += 1
+
+
+async def closed_loop(
+    client: httpx.AsyncClient,
+    dataset: Dataset,
+    recorder: Recorder,
+    concurrency: int,
+    deadline: float,
+    seed_value: int,
+) -> None:
+    """Run concurrency clients sending requests back to back until the deadline."""
+
+    async def worker(index: int) -> None:
+        rng = random.Random(seed_value * 1_000_003 + index)
+        while time.perf_counter() < deadline:
+            route, path = build_request(dataset, rng)
+            await recorder.send(client, route, path, time.perf_counter())
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+
+
+async def open_loop(
+    client: httpx.AsyncClient,
+    dataset: Dataset,
+    recorder: Recorder,
+    rate: float,
+    poisson: bool,
+    deadline: float,
+    seed_value: int,
+) -> None:
+    """Start requests at rate per second until the deadline.
+
+    Latency is measured from each request's scheduled arrival, so time spent
+    waiting behind earlier requests counts, as it would for real clients.
+    """
+    rng = random.Random(seed_value)
+    tasks: set[asyncio.Task[None]] = set()
+    arrival = time.perf_counter()
+    while arrival < deadline:
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        route, path = build_request(dataset, rng)
+        task = asyncio.create_task(recorder.send(client, route, path, arrival))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        arrival += rng.expovariate(rate) if poisson else 1 / rate
+    await asyncio.gather(*tasks)
+
+
+def start_uvicorn(port: int) -> tuple[uvicorn.Server, threading.Thread]:
+    """Serve the app with uvicorn from a background thread."""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit(f"Error: uvicorn failed to start on port {port}.")
+        time.sleep(0.05)
+    return server, thread
+
+
+async def run_load(args: argparse.Namespace, dataset: Dataset) -> Recorder:
+    """Drive the app with the requested load and return what was recorded."""
+    if args.server == "asgi":
+        transport: httpx.AsyncBaseTransport = httpx.ASGITransport(app=app)
+        base_url = "http://api.local"
+    else:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=args.concurrency)
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    start = time.perf_counter()
+    recorder = Recorder(record_after=start + args.warmup)
+    deadline = start + args.warmup + args.duration
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=30.0
+    ) as client:
+        if args.rate is None:
+            await closed_loop(
+                client, dataset, recorder, args.concurrency, deadline, args.seed
+            )
+        else:
+            await open_loop(
+                client,
+                dataset,
+                recorder,
+                args.rate,
+                args.arrivals == "poisson",
+                deadline,
+                args.seed,
+            )
+    return recorder
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], errors: int, duration: float) -> dict[str, float]:
+    """Throughput and latency percentiles of one route's requests."""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "requests_per_second": len(ordered) / duration,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p90_ms": percentile(ordered, 90) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+    }
+
+
+def report(recorder: Recorder, duration: float) -> dict[str, dict[str, float]]:
+    """Summarize every route and all of them together."""
+    summaries = {
+        route: summarize(recorder.latencies[route], recorder.errors[route], duration)
+        for route in ROUTE_WEIGHTS
+    }
+    summaries["total"] = summarize(
+        [latency for values in recorder.latencies.values() for latency in values],
+        sum(recorder.errors.values()),
+        duration,
+    )
+    return summaries
+
+
+def main() -> None:
+    """Seed, run the load and print a per-route summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument(
+        "--cache-entries",
+        type=int,
+        default=1024,
+        help="Storage cache size, as on the API function; 0 disables it",
+    )
+    parser.add_argument("--server", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Clients of a closed-loop run, and the connection limit over HTTP",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Requests per second of an open-loop run, instead of fixed clients",
+    )
+    parser.add_argument("--arrivals", choices=["fixed", "poisson"], default="fixed")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--warmup", type=float, default=1.0, help="Seconds of unrecorded load first"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    configure_backend(args.backend, args.cache_entries)
+    dataset = Dataset(args.users, args.days)
+    seed(dataset, args.days, args.seed)
+
+    server = None
+    if args.server == "uvicorn":
+        server, thread = start_uvicorn(args.port)
+    try:
+        recorder = asyncio.run(run_load(args, dataset))
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+
+    summaries = report(recorder, args.duration)
+    header = (
+        f"{'route':<46} {'requests':>9} {'errors':>7} {'req/s':>9} "
+        f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for route, stats in summaries.items():
+        print(
+            f"{route:<46} {stats['requests']:>9} {stats['errors']:>7} "
+            f"{stats['requests_per_second']:>9.0f} {stats['p50_ms']:>8.1f} "
+            f"{stats['p90_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"parameters": vars(args), "routes": summaries}, file, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Discover every valid user ID in a range and register it in storage.
+
+Probes each integer in [START, END) with the search script's probe, scanning
+chunks of the range concurrently. Probed ranges and discovered-but-unregistered
+IDs are checkpointed to a local file, so rerunning the same command after a crash
+resumes where the previous run stopped. Discovered users are registered in
+batches through the storage layer without overwriting users that already exist.
+
+Users are registered through the application's storage layer, so run this from
+the repository root inside the project environment:
+
+    uv run python scripts/discover.py 1 1000000 --workers 32
+"""
+
+import argparse
+import bisect
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterator
+
+import httpx
+from returns.result import Failure
+from search import get_value_from_url
+
+from app.storage.factory import get_user_storage
+from app.storage.models import UserMetadataItem
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import CreateUsersIfNotExistQuery
+
+# --- Configuration ---
+# How many consecutive integers one worker probes per task
+DEFAULT_CHUNK_SIZE = 1000
+# How many chunks are probed concurrently
+DEFAULT_WORKERS = 16
+# How many discovered users are registered per storage call
+DEFAULT_BATCH_SIZE = 100
+# Where progress is recorded between runs
+DEFAULT_CHECKPOINT_PATH = "discover-checkpoint.json"
+# --- End Configuration ---
+
+
+class Checkpoint:
+    """Progress of a discovery run over [start, end), persisted between runs."""
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+        # Sorted, non-overlapping half-open [lo, hi) ranges that were fully probed
+        self.probed_ranges: list[list[int]] = []
+        # Discovered user IDs that haven't been registered yet
+        self.pending_user_ids: list[int] = []
+        # IDs already found in chunks that had errors, keyed by the chunk's lo,
+        # so retrying a chunk only records the IDs it newly confirms
+        self.found_in_failed_chunks: dict[str, list[int]] = {}
+        self.registered_count = 0
+
+    @classmethod
+    def load(cls, path: str, start: int, end: int) -> "Checkpoint":
+        """Load the checkpoint at path, or start a fresh one if there is none."""
+        checkpoint = cls(start, end)
+        if not os.path.exists(path):
+            return checkpoint
+
+        with open(path) as f:
+            data = json.load(f)
+        if (data["start"], data["end"]) != (start, end):
+            raise SystemExit(
+                f"Checkpoint {path} is for range [{data['start']}, {data['end']}), "
+                f"not [{start}, {end}). Remove it or pass another --checkpoint."
+            )
+        checkpoint.probed_ranges = data["probed_ranges"]
+        checkpoint.pending_user_ids = data["pending_user_ids"]
+        checkpoint.found_in_failed_chunks = data.get("found_in_failed_chunks", {})
+        checkpoint.registered_count = data["registered_count"]
+        return checkpoint
+
+    def save(self, path: str) -> None:
+        """Atomically write the checkpoint to path."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "start": self.start,
+                    "end": self.end,
+                    "probed_ranges": self.probed_ranges,
+                    "pending_user_ids": self.pending_user_ids,
+                    "found_in_failed_chunks": self.found_in_failed_chunks,
+                    "registered_count": self.registered_count,
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    def is_probed(self, lo: int, hi: int) -> bool:
+        """Whether [lo, hi) lies entirely within one probed range."""
+        i = bisect.bisect_right(self.probed_ranges, [lo, sys.maxsize]) - 1
+        return i >= 0 and self.probed_ranges[i][1] >= hi
+
+    def mark_probed(self, lo: int, hi: int) -> None:
+        """Record [lo, hi) as probed, merging it with adjacent ranges."""
+        bisect.insort(self.probed_ranges, [lo, hi])
+        merged: list[list[int]] = []
+        for range_lo, range_hi in self.probed_ranges:
+            if merged and range_lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_hi)
+            else:
+                merged.append([range_lo, range_hi])
+        self.probed_ranges = merged
+
+    def record_found(self, lo: int, found: list[int], failed: bool) -> list[int]:
+        """
+        Queue the IDs a probe of the chunk at lo confirmed for registration.
+
+        IDs an earlier, failed probe of the same chunk already queued aren't
+        queued again. If this probe failed too, its IDs are remembered for
+        the next retry.
+
+        Returns the newly queued IDs.
+        """
+        already_found = set(self.found_in_failed_chunks.pop(str(lo), []))
+        new_ids = [user_id for user_id in found if user_id not in already_found]
+        self.pending_user_ids.extend(new_ids)
+        if failed:
+            self.found_in_failed_chunks[str(lo)] = sorted(already_found | set(found))
+        return new_ids
+
+    def unprobed_chunks(self, chunk_size: int) -> Iterator[tuple[int, int]]:
+        """Yield the [lo, hi) chunks of the range that still need probing."""
+        for lo in range(self.start, self.end, chunk_size):
+            hi = min(lo + chunk_size, self.end)
+            if not self.is_probed(lo, hi):
+                yield lo, hi
+
+
+def probe_chunk(lo: int, hi: int, client: httpx.Client) -> tuple[list[int], int]:
+    """
+    Probes every integer in [lo, hi).
+
+    Returns the integers with a non-zero value and the number of probes that
+    failed with a network/HTTP error.
+    """
+    found = []
+    errors = 0
+    for i in range(lo, hi):
+        value = get_value_from_url(i, client)
+        if value is None:
+            errors += 1
+        elif value != 0:
+            found.append(i)
+    return found, errors
+
+
+def register_pending(
+    storage: UserStorage,
+    checkpoint: Checkpoint,
+    checkpoint_path: str,
+    batch_size: int,
+    final: bool,
+) -> None:
+    """
+    Registers pending users in full batches, or everything pending if final.
+
+    The checkpoint is saved after every batch so a registered batch is never
+    replayed, and a failed batch stays pending for the next run.
+    """
+    while len(checkpoint.pending_user_ids) >= batch_size or (
+        final and checkpoint.pending_user_ids
+    ):
+        batch = checkpoint.pending_user_ids[:batch_size]
+        query = CreateUsersIfNotExistQuery(
+            items=[
+                # Placeholder metadata; the daily sweep fills in real stats
+                UserMetadataItem(
+                    user_id=str(user_id),
+                    last_fetched_timestamp=0,
+                    puzzles_attempted=0,
+                    puzzles_solved=0,
+                    current_streak=0,
+                )
+                for user_id in batch
+            ]
+        )
+        result = storage.create_users_if_not_exist(query)
+        if isinstance(result, Failure):
+            error = result.failure()
+            raise SystemExit(
+                f"Error: Failed to register {len(batch)} users: {error.message} "
+                f"({error.details}). Progress is checkpointed; rerun to resume."
+            )
+
+        reply = result.unwrap()
+        del checkpoint.pending_user_ids[: len(batch)]
+        checkpoint.registered_count += len(reply.created_user_ids)
+        checkpoint.save(checkpoint_path)
+        print(
+            f"Registered batch of {len(batch)}: {len(reply.created_user_ids)} new, "
+            f"{len(reply.existing_user_ids)} already existed."
+        )
+
+
+def main() -> None:
+    """Probe the requested range and register every discovered user."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("start", type=int, help="First user ID to probe (inclusive)")
+    parser.add_argument("end", type=int, help="Last user ID to probe (exclusive)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH)
+    args = parser.parse_args()
+
+    if args.start < 1 or args.end <= args.start:
+        raise SystemExit("Error: expected 1 <= START < END")
+
+    checkpoint = Checkpoint.load(args.checkpoint, args.start, args.end)
+    storage = get_user_storage()
+    failed_chunks = 0
+
+    # Registers anything left pending by a previous run before probing further
+    register_pending(storage, checkpoint, args.checkpoint, args.batch_size, final=True)
+
+    with (
+        httpx.Client(limits=httpx.Limits(max_connections=args.workers)) as client,
+        ThreadPoolExecutor(max_workers=args.workers) as executor,
+    ):
+        chunks = checkpoint.unprobed_chunks(args.chunk_size)
+        in_flight: dict[Future[tuple[list[int], int]], tuple[int, int]] = {}
+        while True:
+            # Keep a bounded number of chunks queued so huge ranges stay cheap
+            while len(in_flight) < args.workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                in_flight[executor.submit(probe_chunk, *chunk, client)] = chunk
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                lo, hi = in_flight.pop(future)
+                found, errors = future.result()
+                new_ids = checkpoint.record_found(lo, found, failed=errors > 0)
+                if errors:
+                    # Leave the chunk unprobed so the next run retries it
+                    failed_chunks += 1
+                    print(
+                        f"Warning: {errors} probes failed in [{lo}, {hi}); "
+                        "it will be retried on the next run.",
+                        file=sys.stderr,
+                    )
+                else:
+                    checkpoint.mark_probed(lo, hi)
+                print(
+                    f"Probed [{lo}, {hi}): found {len(found)} users, "
+                    f"{len(new_ids)} not found before."
+                )
+
+            checkpoint.save(args.checkpoint)
+            register_pending(
+                storage, checkpoint, args.checkpoint, args.batch_size, final=False
+            )
+
+    register_pending(storage, checkpoint, args.checkpoint, args.batch_size, final=True)
+
+    print("\n--- Discovery Finished ---")
+    print(f"Registered {checkpoint.registered_count} new users in total.")
+    if failed_chunks:
+        print(
+            f"{failed_chunks} chunks had errors; rerun the same command to retry them."
+        )
+
+
+if __name__ == "__main__":
+    main()
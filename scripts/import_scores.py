@@ -0,0 +1,319 @@
+"""Import historical scores and user metadata into storage from NDJSON or CSV.
+
+Reads the input as a stream, validates records in batches and writes each batch
+with one save_batch call, keeping several batches in flight on a thread pool.
+Records with a score field are daily scores (user_id, date, score), as written
+by GET /api/export/scores; the rest are user metadata with the fields of
+UserMetadataItem. Files ending in .gz are decompressed on the fly, and the
+format is taken from the extension (.ndjson/.jsonl or .csv) unless --format is
+given.
+
+The number of records written is checkpointed to a local file, so rerunning the
+same command after a crash skips what was already imported. Batches are saved
+with upsert semantics, so records in flight when a run stopped are simply
+written again. Once everything is written, the leaderboard of every imported
+date is refreshed.
+
+Records are written through the application's storage layer, so run this from
+the repository root inside the project environment:
+
+    uv run python scripts/import_scores.py scores-2024.ndjson.gz --workers 8
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Iterator, TextIO
+
+from pydantic import TypeAdapter, ValidationError
+from returns.result import Failure
+
+from app.storage.factory import get_leaderboard_storage, get_user_storage
+from app.storage.leaderboard.models import RefreshDailyLeaderboardQuery
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import CreateUsersIfNotExistQuery, SaveBatchQuery
+
+# --- Configuration ---
+# How many records are validated and written per save_batch call
+DEFAULT_BATCH_SIZE = 1000
+# How many batches are written concurrently
+DEFAULT_WORKERS = 4
+# Where progress is recorded between runs
+DEFAULT_CHECKPOINT_PATH = "import-checkpoint.json"
+# Seconds between progress reports
+PROGRESS_INTERVAL_SECONDS = 5.0
+# --- End Configuration ---
+
+SCORES_ADAPTER = TypeAdapter(list[DailyScoreItem])
+METADATA_ADAPTER = TypeAdapter(list[UserMetadataItem])
+
+
+class Checkpoint:
+    """Progress of an import of one input file, persisted between runs."""
+
+    def __init__(self, input_path: str) -> None:
+        self.input_path = input_path
+        # Records at the start of the input that were all written
+        self.records_done = 0
+        # Dates with imported scores whose leaderboards weren't refreshed yet
+        self.dates_to_refresh: set[str] = set()
+
+    @classmethod
+    def load(cls, path: str, input_path: str) -> "Checkpoint":
+        """Load the checkpoint at path, or start a fresh one if there is none."""
+        checkpoint = cls(input_path)
+        if not os.path.exists(path):
+            return checkpoint
+
+        with open(path) as f:
+            data = json.load(f)
+        if data["input_path"] != input_path:
+            raise SystemExit(
+                f"Checkpoint {path} is for {data['input_path']}, not {input_path}. "
+                "Remove it or pass another --checkpoint."
+            )
+        checkpoint.records_done = data["records_done"]
+        checkpoint.dates_to_refresh = set(data["dates_to_refresh"])
+        return checkpoint
+
+    def save(self, path: str) -> None:
+        """Atomically write the checkpoint to path."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "input_path": self.input_path,
+                    "records_done": self.records_done,
+                    "dates_to_refresh": sorted(self.dates_to_refresh),
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+
+def open_text(path: str) -> TextIO:
+    """Open path for reading as text, decompressing it if it ends in .gz."""
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def detect_format(path: str) -> str:
+    """Guess the input format from the file extension."""
+    name = path.removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    raise SystemExit(f"Error: can't tell the format of {path}; pass --format.")
+
+
+def read_records(file: TextIO, input_format: str) -> Iterator[dict[str, Any]]:
+    """Yield the input's records as dicts, one per NDJSON line or CSV row."""
+    if input_format == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise SystemExit(f"Error: line {line_number} isn't valid JSON: {e}")
+
+
+def validate_batch(
+    records: list[dict[str, Any]], first_record: int
+) -> tuple[list[DailyScoreItem], list[UserMetadataItem], int]:
+    """
+    Validates a batch of records into daily scores and user metadata.
+
+    The batch is validated in two calls, one per model. Only if one fails are
+    its records validated one by one, to report and skip the invalid ones.
+
+    Returns the valid scores and metadata, and the number of rejected records.
+    """
+    score_records = [(i, r) for i, r in enumerate(records) if "score" in r]
+    metadata_records = [(i, r) for i, r in enumerate(records) if "score" not in r]
+    rejected = 0
+
+    def validate(
+        adapter: TypeAdapter[Any], indexed: list[tuple[int, Any]]
+    ) -> list[Any]:
+        nonlocal rejected
+        try:
+            return list(adapter.validate_python([record for _, record in indexed]))
+        except ValidationError:
+            pass
+        valid = []
+        for index, record in indexed:
+            try:
+                valid.extend(adapter.validate_python([record]))
+            except ValidationError as e:
+                rejected += 1
+                print(
+                    f"Warning: skipping record {first_record + index}: "
+                    f"{e.errors()[0]['msg']} ({record})",
+                    file=sys.stderr,
+                )
+        return valid
+
+    scores = validate(SCORES_ADAPTER, score_records)
+    metadata = validate(METADATA_ADAPTER, metadata_records)
+    return scores, metadata, rejected
+
+
+def write_batch(
+    storage: UserStorage,
+    scores: list[DailyScoreItem],
+    metadata: list[UserMetadataItem],
+    register_users: bool,
+) -> None:
+    """Writes one validated batch, exiting if storage reports an error."""
+    if register_users and scores:
+        user_ids = sorted({score.user_id for score in scores})
+        register_result = storage.create_users_if_not_exist(
+            CreateUsersIfNotExistQuery(
+                items=[
+                    # Placeholder metadata; the daily sweep fills in real stats
+                    UserMetadataItem(
+                        user_id=user_id,
+                        last_fetched_timestamp=0,
+                        puzzles_attempted=0,
+                        puzzles_solved=0,
+                        current_streak=0,
+                    )
+                    for user_id in user_ids
+                ]
+            )
+        )
+        if isinstance(register_result, Failure):
+            error = register_result.failure()
+            raise SystemExit(
+                f"Error: Failed to register users: {error.message} "
+                f"({error.details}). Progress is checkpointed; rerun to resume."
+            )
+
+    result = storage.save_batch(
+        SaveBatchQuery(user_metadata_items=metadata, daily_score_items=scores)
+    )
+    if isinstance(result, Failure):
+        error = result.failure()
+        raise SystemExit(
+            f"Error: Failed to save a batch: {error.message} "
+            f"({error.details}). Progress is checkpointed; rerun to resume."
+        )
+
+
+def refresh_leaderboards(checkpoint: Checkpoint, checkpoint_path: str) -> None:
+    """Refreshes the leaderboard of every date with imported scores."""
+    storage = get_leaderboard_storage()
+    for date in sorted(checkpoint.dates_to_refresh):
+        result = storage.refresh_daily_leaderboard(
+            RefreshDailyLeaderboardQuery(date=date)
+        )
+        if isinstance(result, Failure):
+            error = result.failure()
+            raise SystemExit(
+                f"Error: Failed to refresh the leaderboard of {date}: "
+                f"{error.message} ({error.details}). Rerun to retry."
+            )
+        checkpoint.dates_to_refresh.discard(date)
+        checkpoint.save(checkpoint_path)
+
+
+def main() -> None:
+    """Import the input file and refresh the affected leaderboards."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="NDJSON or CSV file, optionally gzipped")
+    parser.add_argument("--format", choices=["ndjson", "csv"])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH)
+    parser.add_argument(
+        "--register-users",
+        action="store_true",
+        help="Create placeholder metadata for users of imported scores",
+    )
+    args = parser.parse_args()
+
+    input_path = os.path.abspath(args.input)
+    input_format = args.format or detect_format(input_path)
+    checkpoint = Checkpoint.load(args.checkpoint, input_path)
+    storage = get_user_storage()
+    if checkpoint.records_done:
+        print(f"Resuming after {checkpoint.records_done} records.")
+
+    start_time = time.perf_counter()
+    last_report = start_time
+    imported = 0
+    rejected_count = 0
+    with open_text(input_path) as file, ThreadPoolExecutor(args.workers) as executor:
+        records = islice(
+            read_records(file, input_format), checkpoint.records_done, None
+        )
+        next_record = checkpoint.records_done
+        # Map from each batch in flight to its [first, end) record numbers
+        in_flight: dict[Future[None], tuple[int, int]] = {}
+        # End record number of each finished batch, by first record number
+        finished: dict[int, int] = {}
+        exhausted = False
+        while True:
+            # Keep a bounded number of batches queued so memory stays flat
+            while not exhausted and len(in_flight) < args.workers * 2:
+                batch = list(islice(records, args.batch_size))
+                if not batch:
+                    exhausted = True
+                    break
+                scores, metadata, rejected = validate_batch(batch, next_record)
+                rejected_count += rejected
+                checkpoint.dates_to_refresh.update(score.date for score in scores)
+                future = executor.submit(
+                    write_batch, storage, scores, metadata, args.register_users
+                )
+                in_flight[future] = (next_record, next_record + len(batch))
+                next_record += len(batch)
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                first, end = in_flight.pop(future)
+                future.result()
+                finished[first] = end
+                imported += end - first
+            # Only a prefix of finished batches can be skipped on resume
+            while checkpoint.records_done in finished:
+                checkpoint.records_done = finished.pop(checkpoint.records_done)
+            checkpoint.save(args.checkpoint)
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                last_report = now
+                print(
+                    f"Imported {checkpoint.records_done} records "
+                    f"({imported / (now - start_time):.0f} records/s)."
+                )
+
+    elapsed = time.perf_counter() - start_time
+    print("\n--- Import Finished ---")
+    print(
+        f"Imported {imported} records in {elapsed:.1f}s "
+        f"({imported / elapsed if elapsed else 0:.0f} records/s), "
+        f"{rejected_count} rejected."
+    )
+    print(f"Refreshing {len(checkpoint.dates_to_refresh)} leaderboards...")
+    refresh_leaderboards(checkpoint, args.checkpoint)
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
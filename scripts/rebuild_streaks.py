@@ -0,0 +1,37 @@
+"""Rebuild every user's solved-day bitmap from their stored scores.
+
+The bitmaps streaks are computed from are updated as scores are saved, so this
+is only needed for scores saved before they existed, or written around the
+storage layer. Every stored score is read once.
+
+Run this from the repository root inside the project environment:
+
+    uv run python scripts/rebuild_streaks.py
+"""
+
+import time
+
+from returns.result import Failure
+
+from app.storage.factory import get_user_storage
+from app.storage.users.models import RebuildStreaksQuery
+
+
+def main() -> None:
+    """Rebuild the bitmaps and report how many users have one."""
+    start_time = time.perf_counter()
+    result = get_user_storage().rebuild_streaks(RebuildStreaksQuery())
+    if isinstance(result, Failure):
+        error = result.failure()
+        raise SystemExit(
+            f"Error: Failed to rebuild streaks: {error.message} ({error.details})."
+        )
+    elapsed = time.perf_counter() - start_time
+    print(
+        f"Rebuilt the solved days of {result.unwrap().user_count} users "
+        f"in {elapsed:.1f}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -140,85 +140,91 @@ def check_integer_window(
 
 
 # --- Main Binary Search Logic ---
-low = 0
-high = MAX_INTEGER
-best_found_integer = -1  # Initialize with a value indicating not found
-
-# Use a context manager for the httpx client for efficient connection handling
-with httpx.Client() as client:
-    while low <= high:
-        mid = low + (high - low) // 2  # Avoid potential overflow for very large numbers
-        print("\n--- Iteration ---")
-        print(f"Low: {low}, High: {high}, Mid: {mid}")
-
-        # Perform the check on the window around 'mid'
-        window_has_nonzero = check_integer_window(mid, client, N_CHECK_WINDOW)
-
-        if window_has_nonzero:
-            # If we found *something* non-zero in the window [mid-N+1, mid],
-            # it means 'mid' is a potential candidate for being near the largest.
-            # The actual largest could be 'mid' or higher.
-            # Record this 'mid' as the best we've found *so far* that passed the check,
-            # and try searching higher.
-            best_found_integer = mid
-            low = mid + 1
+def main() -> None:
+    """Binary search for the largest integer with a non-zero value."""
+    low = 0
+    high = MAX_INTEGER
+    best_found_integer = -1  # Initialize with a value indicating not found
+
+    # Use a context manager for the httpx client for efficient connection handling
+    with httpx.Client() as client:
+        while low <= high:
+            # Avoid potential overflow for very large numbers
+            mid = low + (high - low) // 2
+            print("\n--- Iteration ---")
+            print(f"Low: {low}, High: {high}, Mid: {mid}")
+
+            # Perform the check on the window around 'mid'
+            window_has_nonzero = check_integer_window(mid, client, N_CHECK_WINDOW)
+
+            if window_has_nonzero:
+                # If we found *something* non-zero in the window [mid-N+1, mid],
+                # it means 'mid' is a potential candidate for being near the largest.
+                # The actual largest could be 'mid' or higher.
+                # Record this 'mid' as the best we've found *so far* that passed the check,
+                # and try searching higher.
+                best_found_integer = mid
+                low = mid + 1
+                print(
+                    f"Window check passed for {mid}. Possible max is >= {max(0, mid - N_CHECK_WINDOW + 1)}. Updating best_found={best_found_integer}, searching higher (low={low})."
+                )
+            else:
+                # If the entire window [mid-N+1, mid] had zeros (or errors treated as zero),
+                # it's likely the true largest integer is smaller than mid - N + 1.
+                # So, we search in the lower half.
+                high = mid - 1
+                print(
+                    f"Window check failed for {mid}. True max is likely < {max(0, mid - N_CHECK_WINDOW + 1)}. Searching lower (high={high})."
+                )
+
+        # --- Output Result ---
+        print("\n--- Search Finished ---")
+        if best_found_integer != -1:
+            # Note: best_found_integer is the highest 'mid' for which the window check passed.
+            # The *actual* largest integer with a non-zero value might be slightly lower
+            # within the last successful window, but this 'mid' is our result from the search.
+            # A final scan down from best_found_integer (up to N times) could pinpoint the exact one if needed.
+            print("Binary search concluded.")
             print(
-                f"Window check passed for {mid}. Possible max is >= {max(0, mid - N_CHECK_WINDOW + 1)}. Updating best_found={best_found_integer}, searching higher (low={low})."
+                f"The largest integer 'mid' for which the window check passed was: {best_found_integer}"
             )
-        else:
-            # If the entire window [mid-N+1, mid] had zeros (or errors treated as zero),
-            # it's likely the true largest integer is smaller than mid - N + 1.
-            # So, we search in the lower half.
-            high = mid - 1
             print(
-                f"Window check failed for {mid}. True max is likely < {max(0, mid - N_CHECK_WINDOW + 1)}. Searching lower (high={high})."
+                f"(The actual largest non-zero value is likely between [{max(0, best_found_integer - N_CHECK_WINDOW + 1)}, {best_found_integer}])"
             )
 
-# --- Output Result ---
-print("\n--- Search Finished ---")
-if best_found_integer != -1:
-    # Note: best_found_integer is the highest 'mid' for which the window check passed.
-    # The *actual* largest integer with a non-zero value might be slightly lower
-    # within the last successful window, but this 'mid' is our result from the search.
-    # A final scan down from best_found_integer (up to N times) could pinpoint the exact one if needed.
-    print("Binary search concluded.")
-    print(
-        f"The largest integer 'mid' for which the window check passed was: {best_found_integer}"
-    )
-    print(
-        f"(The actual largest non-zero value is likely between [{max(0, best_found_integer - N_CHECK_WINDOW + 1)}, {best_found_integer}])"
-    )
-
-    # Optional: Final check to find the exact highest in the last successful window
-    print(
-        f"\nPerforming final scan down from {best_found_integer} to pinpoint exact value..."
-    )
-    exact_highest = -1
-    for i in range(
-        best_found_integer, max(0, best_found_integer - N_CHECK_WINDOW) - 1, -1
-    ):
-        value = get_value_from_url(i, client)
-        if value is not None and value != 0:
-            exact_highest = i
+            # Optional: Final check to find the exact highest in the last successful window
             print(
-                f"Found exact highest non-zero value at {exact_highest} (value: {value})"
+                f"\nPerforming final scan down from {best_found_integer} to pinpoint exact value..."
             )
-            break
-        # Add delay if needed
-        # time.sleep(0.1)
+            exact_highest = -1
+            for i in range(
+                best_found_integer, max(0, best_found_integer - N_CHECK_WINDOW) - 1, -1
+            ):
+                value = get_value_from_url(i, client)
+                if value is not None and value != 0:
+                    exact_highest = i
+                    print(
+                        f"Found exact highest non-zero value at {exact_highest} (value: {value})"
+                    )
+                    break
+                # Add delay if needed
+                # time.sleep(0.1)
+
+            if exact_highest != -1:
+                print(
+                    f"\nFinal Result: The estimated largest integer with a non-zero value is {exact_highest}"
+                )
+            else:
+                print(
+                    f"\nFinal Result: Could not confirm exact highest in the final window scan down from {best_found_integer}."
+                )
+                print(f"Initial estimate based on search: {best_found_integer}")
 
-    if exact_highest != -1:
-        print(
-            f"\nFinal Result: The estimated largest integer with a non-zero value is {exact_highest}"
-        )
-    else:
-        print(
-            f"\nFinal Result: Could not confirm exact highest in the final window scan down from {best_found_integer}."
-        )
-        print(f"Initial estimate based on search: {best_found_integer}")
+        else:
+            print(
+                "Binary search concluded. No integer found for which the window check passed."
+            )
 
 
-else:
-    print(
-        "Binary search concluded. No integer found for which the window check passed."
-    )
+if __name__ == "__main__":
+    main()
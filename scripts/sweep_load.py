@@ -0,0 +1,144 @@
+"""Load test the update sweep against the fake NYT API.
+
+Runs process_users over synthetic users at one or more scales and reports sweep
+throughput and upstream request latency percentiles. By default the fake API is
+served in-process through an httpx mock transport and scores go to in-memory
+storage, so nothing leaves the machine:
+
+    uv run python scripts/sweep_load.py --users 1000 10000 100000 \\
+        --latency-ms 80 --latency-distribution lognormal --rate-limit-rate 0.01
+
+Pass --external to send requests to NYT_API_URL_TEMPLATE instead, e.g. a fake
+served with uvicorn (see app.testing.fake_nyt_api).
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.handlers.update_handler import REQUEST_TIMEOUT, process_users
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.users.memory import InMemoryUserStorage
+from app.testing.fake_nyt_api import FakeNytApi, FakeNytApiConfig
+
+# --- Configuration ---
+DEFAULT_SCALES = [1_000, 10_000, 100_000]
+# --- End Configuration ---
+
+
+class TimingTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper recording the latency of every request."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport) -> None:
+        self.inner = inner
+        self.latencies: list[float] = []
+        self.status_counts: dict[int, int] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        self.latencies.append(time.perf_counter() - start)
+        self.status_counts[response.status_code] = (
+            self.status_counts.get(response.status_code, 0) + 1
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+async def run_sweep(
+    user_count: int, config: FakeNytApiConfig, external: bool
+) -> dict[str, float]:
+    """Run one sweep over users 1..user_count and measure it."""
+    inner: httpx.AsyncBaseTransport = (
+        httpx.AsyncHTTPTransport() if external else FakeNytApi(config).mock_transport()
+    )
+    transport = TimingTransport(inner)
+    storage = InMemoryUserStorage(InMemoryStorageContext())
+    user_ids = [str(user_id) for user_id in range(1, user_count + 1)]
+
+    async with httpx.AsyncClient(
+        transport=transport, timeout=REQUEST_TIMEOUT
+    ) as client:
+        start = time.perf_counter()
+        results = await process_users(user_ids, storage, client)
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(transport.latencies)
+    errors = sum(n for status, n in transport.status_counts.items() if status >= 400)
+    return {
+        "users": user_count,
+        "seconds": elapsed,
+        "users_per_second": user_count / elapsed,
+        "successful_users": results["successful_users"],
+        "error_responses": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "mean_ms": (statistics.fmean(latencies) if latencies else 0.0) * 1000,
+    }
+
+
+def main() -> None:
+    """Run the sweep at every requested scale and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument(
+        "--latency-distribution",
+        choices=["constant", "uniform", "lognormal"],
+        default="lognormal",
+    )
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--solved-days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--external",
+        action="store_true",
+        help="Send requests to NYT_API_URL_TEMPLATE instead of the in-process fake",
+    )
+    args = parser.parse_args()
+
+    config = FakeNytApiConfig(
+        latency_distribution=args.latency_distribution,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        solved_days=args.solved_days,
+        seed=args.seed,
+    )
+
+    header = (
+        f"{'users':>8} {'seconds':>8} {'users/s':>9} {'ok':>8} {'errors':>7} "
+        f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for user_count in args.users:
+        stats = asyncio.run(run_sweep(user_count, config, args.external))
+        print(
+            f"{stats['users']:>8} {stats['seconds']:>8.2f} "
+            f"{stats['users_per_second']:>9.0f} {stats['successful_users']:>8} "
+            f"{stats['error_responses']:>7} {stats['p50_ms']:>8.1f} "
+            f"{stats['p90_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
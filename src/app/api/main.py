@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
-from app.api.routes import leaderboard
+from app.api.routes import export, groups, leaderboard, users
+from app.api.tracing import TracingMiddleware
 
 # Create FastAPI application
 app = FastAPI(
@@ -19,8 +21,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses, including streamed exports, for clients accepting gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+# Run each request in a span, outermost so it times the other middleware too
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(leaderboard.router, prefix="/api", tags=["leaderboard"])
+app.include_router(groups.router, prefix="/api", tags=["groups"])
+app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(users.router, prefix="/api", tags=["users"])
 
 
 # Add health check endpoint
@@ -0,0 +1,151 @@
+import datetime
+import logging
+from typing import Iterator, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from returns.result import Failure
+
+from app.core.error import StorageError, UnavailableStorageError
+from app.storage.factory import get_user_storage
+from app.storage.models import DailyScoreItem
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    ListDailyScoresQuery,
+    ListDailyScoresReply,
+)
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Date format validation regex
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_HEADER = "user_id,date,score\n"
+
+
+def format_scores(items: List[DailyScoreItem], export_format: str) -> str:
+    """Format a page of scores as NDJSON or CSV lines."""
+    if export_format == "csv":
+        return "".join(f"{item.user_id},{item.date},{item.score}\n" for item in items)
+    return "".join(item.model_dump_json() + "\n" for item in items)
+
+
+def storage_http_error(error: StorageError) -> HTTPException:
+    """Build the HTTP error reported for a failed storage read."""
+    return HTTPException(
+        status_code=503 if isinstance(error, UnavailableStorageError) else 500,
+        detail="An error occurred while exporting scores.",
+    )
+
+
+def stream_scores(
+    storage: UserStorage,
+    query: ListDailyScoresQuery,
+    first_page: ListDailyScoresReply,
+    export_format: str,
+) -> Iterator[str]:
+    """Yield the formatted scores page by page, holding one page at a time."""
+    if export_format == "csv":
+        yield CSV_HEADER
+    page = first_page
+    while True:
+        yield format_scores(page.items, export_format)
+        if page.cursor is None:
+            return
+        result = storage.list_daily_scores(
+            query.model_copy(update={"cursor": page.cursor})
+        )
+        if isinstance(result, Failure):
+            error = result.failure()
+            logger.error(
+                "Error exporting scores after cursor %s: %s %s",
+                page.cursor,
+                error.message,
+                error.details,
+            )
+            # The status was already sent, so abort the response instead: the
+            # client sees a truncated transfer rather than a silently short export
+            raise RuntimeError("Score export interrupted by a storage error")
+        page = result.unwrap()
+
+
+@router.get(
+    "/export/scores",
+    summary="Export daily scores in bulk",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "One score per line, in date order",
+        }
+    },
+)
+def export_scores(
+    start_date: str = Query(
+        ...,
+        description="First date to export, in YYYY-MM-DD format",
+        pattern=DATE_PATTERN,
+    ),
+    end_date: str = Query(
+        ...,
+        description="Last date to export, in YYYY-MM-DD format",
+        pattern=DATE_PATTERN,
+    ),
+    user_id: Optional[str] = Query(
+        None,
+        description="Only export this user's scores",
+        pattern=r"^[1-9]\d*$",
+        max_length=12,
+    ),
+    export_format: Literal["ndjson", "csv"] = Query(
+        "ndjson",
+        alias="format",
+        description="Output format: NDJSON objects or CSV rows",
+    ),
+    storage: UserStorage = Depends(get_user_storage),
+) -> StreamingResponse:
+    """
+    Stream every daily score between two dates, inclusive.
+
+    - **start_date**, **end_date**: The date range in YYYY-MM-DD format
+    - **user_id**: Only export this user's scores (optional)
+    - **format**: `ndjson` (default) or `csv` with a header row
+
+    Scores are read from storage a page at a time while the response is
+    streamed, so exports of any size run in bounded memory. Send
+    `Accept-Encoding: gzip` for a compressed transfer.
+    """
+    for date in (start_date, end_date):
+        try:
+            datetime.date.fromisoformat(date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {date}.")
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=400, detail="start_date must not be after end_date."
+        )
+    query = ListDailyScoresQuery(
+        start_date=start_date, end_date=end_date, user_id=user_id
+    )
+    # Read the first page up front, so storage errors still get an error status
+    result = storage.list_daily_scores(query)
+    if isinstance(result, Failure):
+        error = result.failure()
+        logger.error(
+            "Error exporting scores from %s to %s: %s %s",
+            start_date,
+            end_date,
+            error.message,
+            error.details,
+        )
+        raise storage_http_error(error)
+
+    return StreamingResponse(
+        stream_scores(storage, query, result.unwrap(), export_format),
+        media_type=MEDIA_TYPES[export_format],
+    )
@@ -0,0 +1,131 @@
+import logging
+from typing import FrozenSet
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Path
+from returns.result import Failure
+
+from app.core.error import (
+    NotFoundStorageError,
+    StorageError,
+    UnavailableStorageError,
+)
+from app.storage.factory import get_group_storage, get_leaderboard_storage
+from app.storage.groups.interface import GroupStorage
+from app.storage.groups.models import GetGroupQuery, GroupItem, SaveGroupQuery
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import (
+    MAX_GROUP_SIZE,
+    GetDailyLeaderboardReply,
+    GetGroupLeaderboardQuery,
+)
+from app.storage.models import UserMetadataKey
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Date format validation regex
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+# Group ID validation regex
+GROUP_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
+
+def storage_http_error(error: StorageError, action: str) -> HTTPException:
+    """Build the HTTP error reported for a failed storage call."""
+    if isinstance(error, NotFoundStorageError):
+        return HTTPException(status_code=404, detail="Group not found.")
+    return HTTPException(
+        status_code=503 if isinstance(error, UnavailableStorageError) else 500,
+        detail=f"An error occurred while {action}.",
+    )
+
+
+@router.put(
+    "/groups/{group_id}",
+    response_model=GroupItem,
+    summary="Create or replace a group",
+)
+def save_group(
+    group_id: str = Path(..., description="Group identifier", pattern=GROUP_ID_PATTERN),
+    user_ids: FrozenSet[UserMetadataKey] = Body(
+        ...,
+        embed=True,
+        min_length=1,
+        max_length=MAX_GROUP_SIZE,
+        description="IDs of the group's members",
+    ),
+    storage: GroupStorage = Depends(get_group_storage),
+) -> GroupItem:
+    """
+    Create a group, or replace the members of an existing one.
+
+    - **group_id**: Letters, digits, underscores and hyphens, up to 64 characters
+    - **user_ids**: IDs of the members (1-100)
+    """
+    group = GroupItem(group_id=group_id, user_ids=user_ids)
+    result = storage.save_group(SaveGroupQuery(item=group))
+    if isinstance(result, Failure):
+        error = result.failure()
+        logger.error(
+            "Error saving group %s: %s %s", group_id, error.message, error.details
+        )
+        raise storage_http_error(error, "saving the group")
+    return group
+
+
+@router.get(
+    "/groups/{group_id}/leaderboard/{date}",
+    response_model=GetDailyLeaderboardReply,
+    summary="Get a group's leaderboard for a specific date",
+)
+def get_group_leaderboard_for_date(
+    group_id: str = Path(..., description="Group identifier", pattern=GROUP_ID_PATTERN),
+    date: str = Path(
+        ..., description="Date in YYYY-MM-DD format", pattern=DATE_PATTERN
+    ),
+    group_storage: GroupStorage = Depends(get_group_storage),
+    leaderboard_storage: LeaderboardStorage = Depends(get_leaderboard_storage),
+) -> GetDailyLeaderboardReply:
+    """
+    Retrieve the leaderboard of a group's members for a specific date.
+
+    - **group_id**: ID of a group created with `PUT /api/groups/{group_id}`
+    - **date**: The date in YYYY-MM-DD format
+
+    Returns the members with a score for the date, ranked by score (lowest
+    first). Only the members' scores are read, so the cost depends on the size
+    of the group rather than on the number of solvers.
+    """
+    group_result = group_storage.get_group(GetGroupQuery(group_id=group_id))
+    if isinstance(group_result, Failure):
+        error = group_result.failure()
+        if not isinstance(error, NotFoundStorageError):
+            logger.error(
+                "Error retrieving group %s: %s %s",
+                group_id,
+                error.message,
+                error.details,
+            )
+        raise storage_http_error(error, "retrieving the group")
+
+    result = leaderboard_storage.get_group_leaderboard(
+        GetGroupLeaderboardQuery(
+            date=date,
+            user_ids=group_result.unwrap().item.user_ids,
+            group_id=group_id,
+        )
+    )
+    if isinstance(result, Failure):
+        error = result.failure()
+        logger.error(
+            "Error retrieving leaderboard of group %s for %s: %s %s",
+            group_id,
+            date,
+            error.message,
+            error.details,
+        )
+        raise storage_http_error(error, "retrieving the leaderboard")
+
+    return result.unwrap()
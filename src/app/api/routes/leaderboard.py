@@ -1,9 +1,21 @@
 import logging
 
-from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from returns.result import Failure
 
-from app.core import database
-from app.core.models import DailyLeaderboardResponse
+from app.core.error import NotFoundStorageError, UnavailableStorageError
+from app.storage.factory import get_leaderboard_storage
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardReply,
+    GetScoreHistogramQuery,
+    GetScoreHistogramReply,
+    HistogramScale,
+)
+
+# Initialize logger
+logger = logging.getLogger(__name__)
 
 # Create router
 router = APIRouter()
@@ -14,15 +26,18 @@ DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
 
 @router.get(
     "/leaderboard/{date}",
-    response_model=DailyLeaderboardResponse,
+    response_model=GetDailyLeaderboardReply,
     summary="Get leaderboard for a specific date",
 )
-async def get_leaderboard_for_date(
-    date: str = Path(..., description="Date in YYYY-MM-DD format", regex=DATE_PATTERN),
+def get_leaderboard_for_date(
+    date: str = Path(
+        ..., description="Date in YYYY-MM-DD format", pattern=DATE_PATTERN
+    ),
     limit: int = Query(
         100, ge=1, le=500, description="Maximum number of results to return"
     ),
-):
+    storage: LeaderboardStorage = Depends(get_leaderboard_storage),
+) -> GetDailyLeaderboardReply:
     """
     Retrieve the leaderboard for a specific date.
 
@@ -31,21 +46,67 @@ async def get_leaderboard_for_date(
 
     Returns a sorted list of users ranked by their score (lowest first) for the given date.
     """
-    try:
-        # Query the database
-        entries = await database.get_daily_leaderboard(date, limit)
-
-        # Return the response
-        return DailyLeaderboardResponse(
-            date=date, entries=entries, total_count=len(entries)
+    # Storage calls block, so this route is sync and runs in the threadpool
+    result = storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date=date, limit=limit)
+    )
+    if isinstance(result, Failure):
+        error = result.failure()
+        logger.error(
+            "Error retrieving leaderboard for %s: %s %s",
+            date,
+            error.message,
+            error.details,
+        )
+        raise HTTPException(
+            status_code=503 if isinstance(error, UnavailableStorageError) else 500,
+            detail="An error occurred while retrieving the leaderboard.",
         )
 
-    except Exception as e:
-        # Log the exception
-        logging.error(f"Error retrieving leaderboard for {date}: {e}")
+    return result.unwrap()
+
+
+@router.get(
+    "/leaderboard/{date}/histogram",
+    response_model=GetScoreHistogramReply,
+    summary="Get the score distribution for a specific date",
+)
+def get_score_histogram_for_date(
+    date: str = Path(
+        ..., description="Date in YYYY-MM-DD format", pattern=DATE_PATTERN
+    ),
+    scale: HistogramScale = Query(
+        "linear", description="Bucket scale: one-minute buckets or log buckets"
+    ),
+    storage: LeaderboardStorage = Depends(get_leaderboard_storage),
+) -> GetScoreHistogramReply:
+    """
+    Retrieve how the scores of a specific date are distributed.
+
+    - **date**: The date in YYYY-MM-DD format
+    - **scale**: `linear` for one-minute buckets up to an hour, or `log` for
+      buckets from 10 seconds whose width doubles every 4 buckets
 
-        # Return a 500 error
+    Returns every bucket of the scale with its bounds in seconds and the number
+    of scores in it. The last bucket has no upper bound. Returns 404 if the
+    storage has no counts for the date.
+    """
+    result = storage.get_score_histogram(GetScoreHistogramQuery(date=date, scale=scale))
+    if isinstance(result, Failure):
+        error = result.failure()
+        if isinstance(error, NotFoundStorageError):
+            raise HTTPException(
+                status_code=404, detail="No score histogram for this date yet."
+            )
+        logger.error(
+            "Error retrieving score histogram for %s: %s %s",
+            date,
+            error.message,
+            error.details,
+        )
         raise HTTPException(
-            status_code=500,
-            detail="An error occurred while retrieving the leaderboard.",
+            status_code=503 if isinstance(error, UnavailableStorageError) else 500,
+            detail="An error occurred while retrieving the score histogram.",
         )
+
+    return result.unwrap()
@@ -0,0 +1,326 @@
+import datetime
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import AsyncGenerator, Iterator, List, Optional, Set
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from pydantic import BaseModel, ConfigDict, Field
+from returns.result import Failure
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import Settings, get_settings
+from app.core.error import NotFoundStorageError, UnavailableStorageError
+from app.handlers.update_handler import REQUEST_TIMEOUT, process_user
+from app.storage.factory import get_leaderboard_storage, get_user_storage
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import RefreshDailyLeaderboardQuery
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    FIRST_COMPARED_DATE,
+    LAST_COMPARED_DATE,
+    ClaimUserRefreshQuery,
+    GetHeadToHeadQuery,
+    GetHeadToHeadReply,
+    GetUserStreaksQuery,
+    GetUserStreaksReply,
+)
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# User ID validation regex
+USER_ID_PATTERN = r"^[1-9]\d*$"
+# Date format validation regex
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+
+@router.get(
+    "/users/{user_id}/streaks",
+    response_model=GetUserStreaksReply,
+    summary="Get a user's solve streaks",
+)
+def get_user_streaks(
+    user_id: str = Path(
+        ..., description="User identifier", pattern=USER_ID_PATTERN, max_length=12
+    ),
+    as_of: Optional[datetime.date] = Query(
+        None, description="Day to compute the streaks as of (default: today, UTC)"
+    ),
+    storage: UserStorage = Depends(get_user_storage),
+) -> GetUserStreaksReply:
+    """
+    Compute a user's streaks from their stored scores.
+
+    - **user_id**: The user's ID
+    - **as_of**: Day in YYYY-MM-DD format; later scores are ignored (optional)
+
+    Returns the current streak, the longest streak and the number of days
+    solved up to `as_of`. A streak is still current on a day that isn't
+    solved yet if it reaches the day before.
+    """
+    if as_of is None:
+        as_of = datetime.datetime.now(datetime.timezone.utc).date()
+    result = storage.get_user_streaks(
+        GetUserStreaksQuery(user_id=user_id, as_of=as_of.isoformat())
+    )
+    if isinstance(result, Failure):
+        error = result.failure()
+        logger.error(
+            "Error computing streaks of user %s: %s %s",
+            user_id,
+            error.message,
+            error.details,
+        )
+        raise HTTPException(
+            status_code=503 if isinstance(error, UnavailableStorageError) else 500,
+            detail="An error occurred while computing the streaks.",
+        )
+
+    return result.unwrap()
+
+
+@router.get(
+    "/users/{user_id}/versus/{opponent_id}",
+    response_model=GetHeadToHeadReply,
+    summary="Compare two users head to head",
+)
+def get_head_to_head(
+    user_id: str = Path(
+        ..., description="User identifier", pattern=USER_ID_PATTERN, max_length=12
+    ),
+    opponent_id: str = Path(
+        ...,
+        description="Identifier of the user to compare to",
+        pattern=USER_ID_PATTERN,
+        max_length=12,
+    ),
+    start_date: str = Query(
+        FIRST_COMPARED_DATE,
+        description="First date to compare, in YYYY-MM-DD format",
+        pattern=DATE_PATTERN,
+    ),
+    end_date: str = Query(
+        LAST_COMPARED_DATE,
+        description="Last date to compare, in YYYY-MM-DD format",
+        pattern=DATE_PATTERN,
+    ),
+    storage: UserStorage = Depends(get_user_storage),
+) -> GetHeadToHeadReply:
+    """
+    Compare two users on the days both of them solved.
+
+    - **user_id**: The user's ID
+    - **opponent_id**: The ID of the user to compare to
+    - **start_date**, **end_date**: Inclusive date window (optional)
+
+    Lower scores win. Deltas are the user's score minus the opponent's, so a
+    negative average delta means the user was faster on average. Both
+    histories are read in date order and merged in one pass, so the cost is
+    proportional to the users' days in the window.
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=400, detail="start_date must not be after end_date."
+        )
+    result = storage.get_head_to_head(
+        GetHeadToHeadQuery(
+            user_id=user_id,
+            opponent_id=opponent_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+    )
+    if isinstance(result, Failure):
+        error = result.failure()
+        logger.error(
+            "Error comparing user %s to %s: %s %s",
+            user_id,
+            opponent_id,
+            error.message,
+            error.details,
+        )
+        raise HTTPException(
+            status_code=503 if isinstance(error, UnavailableStorageError) else 500,
+            detail="An error occurred while comparing the users.",
+        )
+
+    return result.unwrap()
+
+
+class RefreshUserReply(BaseModel):
+    """Outcome of refreshing one user's stats."""
+
+    user_id: str = Field(description="ID of the refreshed user")
+    scores_updated: int = Field(description="Number of daily scores saved")
+    dates_updated: List[str] = Field(
+        description="Dates whose scores changed and leaderboards were rebuilt"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class RefreshLimiter:
+    """Caps the refreshes running at once in this process, one per user.
+
+    Refreshes are debounced across processes by claims in storage; this only
+    bounds the work one process takes on.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        """Initialize a limiter with no refreshes running.
+
+        Args:
+            max_concurrency: Refreshes allowed to run at once
+        """
+        self.max_concurrency = max_concurrency
+        self.running: Set[str] = set()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, user_id: str) -> Iterator[None]:
+        """Hold a refresh slot for a user while the block runs.
+
+        Raises:
+            HTTPException: 429 if the user is already being refreshed, or 503
+                if every slot is taken
+        """
+        with self.lock:
+            if user_id in self.running:
+                raise HTTPException(
+                    status_code=429,
+                    detail="The user is already being refreshed.",
+                    headers={"Retry-After": "1"},
+                )
+            if len(self.running) >= self.max_concurrency:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many refreshes are running.",
+                    headers={"Retry-After": "1"},
+                )
+            self.running.add(user_id)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.running.discard(user_id)
+
+
+@lru_cache
+def get_refresh_limiter() -> RefreshLimiter:
+    """Returns the process-wide refresh limiter."""
+    settings = get_settings()
+    return RefreshLimiter(settings.REFRESH_MAX_CONCURRENCY)
+
+
+async def get_nyt_client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """Yields an HTTP client for the NYT API."""
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+        yield client
+
+
+@router.post(
+    "/users/{user_id}/refresh",
+    response_model=RefreshUserReply,
+    summary="Refresh a user's stats from the NYT API",
+)
+async def refresh_user(
+    user_id: str = Path(
+        ..., description="User identifier", pattern=USER_ID_PATTERN, max_length=12
+    ),
+    storage: UserStorage = Depends(get_user_storage),
+    leaderboard_storage: LeaderboardStorage = Depends(get_leaderboard_storage),
+    client: httpx.AsyncClient = Depends(get_nyt_client),
+    limiter: RefreshLimiter = Depends(get_refresh_limiter),
+    settings: Settings = Depends(get_settings),
+) -> RefreshUserReply:
+    """
+    Fetch a stored user's stats now instead of waiting for the next sweep.
+
+    - **user_id**: The user's ID
+
+    Saves the user's metadata and latest daily scores like the update sweep
+    does, in a worker thread, then rebuilds the leaderboards of the dates
+    whose scores were created or changed. Each attempt first claims the user
+    with a conditional write in storage, so a user fetched or attempted less
+    than REFRESH_DEBOUNCE_SECONDS ago by any process, or already being
+    refreshed, gets a 429 with a Retry-After header; when
+    REFRESH_MAX_CONCURRENCY refreshes are already running, a 503.
+    """
+    with limiter.slot(user_id):
+        now = time.time()
+        claim_result = await run_in_threadpool(
+            storage.claim_user_refresh,
+            ClaimUserRefreshQuery(
+                user_id=user_id,
+                now=now,
+                debounce_seconds=settings.REFRESH_DEBOUNCE_SECONDS,
+            ),
+        )
+        if isinstance(claim_result, Failure):
+            error = claim_result.failure()
+            if isinstance(error, NotFoundStorageError):
+                raise HTTPException(status_code=404, detail="User not found.")
+            logger.error(
+                "Error claiming refresh of user %s: %s %s",
+                user_id,
+                error.message,
+                error.details,
+            )
+            raise HTTPException(
+                status_code=503 if isinstance(error, UnavailableStorageError) else 500,
+                detail="An error occurred while refreshing the user.",
+            )
+
+        claim = claim_result.unwrap()
+        if not claim.claimed:
+            attempted_ago = now - claim.last_attempt_timestamp
+            retry_after = max(
+                1, math.ceil(settings.REFRESH_DEBOUNCE_SECONDS - attempted_ago)
+            )
+            raise HTTPException(
+                status_code=429,
+                detail="The user was refreshed recently.",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        result = await process_user(user_id, storage, client, save_in_thread=True)
+        if result["error"] is not None:
+            logger.error("Error refreshing user %s: %s", user_id, result["error"])
+            raise HTTPException(
+                status_code=502, detail="The user's stats couldn't be fetched."
+            )
+        if not result["success"]:
+            logger.error("Error saving stats of user %s", user_id)
+            raise HTTPException(
+                status_code=500,
+                detail="An error occurred while saving the user's stats.",
+            )
+
+        dates_updated = sorted(result["dates_updated"])
+        for date in dates_updated:
+            refresh_result = await run_in_threadpool(
+                leaderboard_storage.refresh_daily_leaderboard,
+                RefreshDailyLeaderboardQuery(date=date),
+            )
+            if isinstance(refresh_result, Failure):
+                error = refresh_result.failure()
+                logger.error(
+                    "Error refreshing leaderboard for %s: %s %s",
+                    date,
+                    error.message,
+                    error.details,
+                )
+
+    return RefreshUserReply(
+        user_id=user_id,
+        scores_updated=result["scores_updated"],
+        dates_updated=dates_updated,
+    )
@@ -0,0 +1,87 @@
+"""ASGI middleware running each HTTP request in a span."""
+
+import re
+from typing import Any, Awaitable, Callable, MutableMapping, Optional
+
+from app.core.tracing import get_tracer, parse_traceparent
+
+type Scope = MutableMapping[str, Any]
+type Message = MutableMapping[str, Any]
+type Receive = Callable[[], Awaitable[Message]]
+type Send = Callable[[Message], Awaitable[None]]
+type ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+# A path parameter of a route template, e.g. {date} or {path:path}
+PATH_PARAM_PATTERN = re.compile(r"\{(\w+)(?::\w+)?\}")
+
+
+def route_template(scope: Scope) -> Optional[str]:
+    """Get the template of the route that handled a request, e.g. /api/users/{id}.
+
+    The matched route's path omits the prefixes of the routers it was included
+    with, so the prefix is recovered from the part of the request path that
+    precedes the route's path filled in with the request's path parameters.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if not isinstance(path, str):
+        return None
+    params = scope.get("path_params", {})
+    try:
+        filled = PATH_PARAM_PATTERN.sub(lambda m: str(params[m.group(1)]), path)
+    except KeyError:
+        return path
+    request_path: str = scope["path"]
+    if not request_path.endswith(filled):
+        return path
+    return request_path[: len(request_path) - len(filled)] + path
+
+
+class TracingMiddleware:
+    """Runs each HTTP request in a span named after its method and route.
+
+    The span starts as "GET /api/leaderboard/2025-01-01" and is renamed after
+    the route template, e.g. "GET /api/leaderboard/{date}", once routing has
+    matched one. A caller's W3C traceparent header makes the request part of
+    the caller's trace. Storage and NYT API spans started while handling the
+    request become its children, including those of sync routes FastAPI runs
+    in its threadpool.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize the middleware around an ASGI app."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, in a span if tracing is enabled."""
+        tracer = get_tracer()
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = parse_traceparent(value.decode("latin-1"))
+        method = scope["method"]
+        with tracer.start_span(
+            f"{method} {scope['path']}",
+            {"http.method": method, "http.target": scope["path"]},
+            remote_parent=traceparent,
+        ) as span:
+
+            async def send_traced(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.status_code", status)
+                    if status >= 500:
+                        span.set_error(f"HTTP {status}")
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_traced)
+            finally:
+                template = route_template(scope)
+                if template is not None:
+                    span.name = f"{method} {template}"
+                    span.set_attribute("http.route", template)
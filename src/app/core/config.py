@@ -11,17 +11,103 @@ class Settings:
     )
     DYNAMODB_GSI_NAME: str = os.environ.get("DYNAMODB_GSI_NAME", "DateLeaderboardIndex")
 
+    # Storage settings
+    STORAGE_BACKEND: str = os.environ.get("STORAGE_BACKEND", "dynamodb")
+    # Database file of the sqlite storage backend
+    SQLITE_PATH: str = os.environ.get("SQLITE_PATH", "leaderboard.db")
+    # Snapshot published by the writer of the shared_memory storage backend
+    SHARED_MEMORY_PATH: str = os.environ.get(
+        "SHARED_MEMORY_PATH", "/dev/shm/nytxwordboard.snap"
+    )
+    # Whether this is the one process that writes and publishes the snapshot;
+    # every other process serves reads from the published snapshot
+    SHARED_MEMORY_WRITER: bool = os.environ.get("SHARED_MEMORY_WRITER", "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # Snapshot the memory storage backend starts from, if set and present
+    MEMORY_SNAPSHOT_PATH: str = os.environ.get("MEMORY_SNAPSHOT_PATH", "")
+    # Read-through cache in front of the storage backend; 0 disables it
+    STORAGE_CACHE_MAX_ENTRIES: int = int(
+        os.environ.get("STORAGE_CACHE_MAX_ENTRIES", "0")
+    )
+    STORAGE_CACHE_LEADERBOARD_TTL_SECONDS: float = float(
+        os.environ.get("STORAGE_CACHE_LEADERBOARD_TTL_SECONDS", "60")
+    )
+    STORAGE_CACHE_USER_METADATA_TTL_SECONDS: float = float(
+        os.environ.get("STORAGE_CACHE_USER_METADATA_TTL_SECONDS", "300")
+    )
+    # Update sweep writes are buffered and flushed in batches of this size, or
+    # once the oldest buffered write reaches the maximum age
+    WRITE_BEHIND_MAX_PENDING: int = int(
+        os.environ.get("WRITE_BEHIND_MAX_PENDING", "500")
+    )
+    WRITE_BEHIND_MAX_AGE_SECONDS: float = float(
+        os.environ.get("WRITE_BEHIND_MAX_AGE_SECONDS", "5")
+    )
+    # Users the update sweep processes at once
+    SWEEP_CONCURRENCY: int = int(os.environ.get("SWEEP_CONCURRENCY", "100"))
+    # The sweep stops dispatching users and abandons running fetches this long
+    # before the Lambda deadline, leaving time for the flush, the leaderboard
+    # refresh and saving the cursor
+    SWEEP_DEADLINE_MARGIN_SECONDS: float = float(
+        os.environ.get("SWEEP_DEADLINE_MARGIN_SECONDS", "10")
+    )
+
     # NYT API settings
     NYT_API_URL_TEMPLATE: str = os.environ.get(
         "NYT_API_URL_TEMPLATE",
         "https://www.nytimes.com/svc/crosswords/v3/{}/stats-and-streaks.json",
     )
+    NYT_API_MAX_RETRIES: int = int(os.environ.get("NYT_API_MAX_RETRIES", "0"))
 
     # Application settings
     DEFAULT_LEADERBOARD_LIMIT: int = int(
         os.environ.get("DEFAULT_LEADERBOARD_LIMIT", "100")
     )
     APP_ENVIRONMENT: str = os.environ.get("APP_ENVIRONMENT", "development")
+    # A user fetched this recently isn't refreshed again on request
+    REFRESH_DEBOUNCE_SECONDS: float = float(
+        os.environ.get("REFRESH_DEBOUNCE_SECONDS", "300")
+    )
+    # Single-user refreshes running at once per process
+    REFRESH_MAX_CONCURRENCY: int = int(os.environ.get("REFRESH_MAX_CONCURRENCY", "4"))
+
+    # Logging settings
+    LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "INFO")
+    # Per-module overrides, e.g. "app.core.external_api=DEBUG,botocore=WARNING"
+    LOG_LEVELS: str = os.environ.get("LOG_LEVELS", "")
+    # Per-item records below WARNING: keep the first LOG_SAMPLE_BURST of each
+    # message, then one in LOG_SAMPLE_RATE
+    LOG_SAMPLE_RATE: int = int(os.environ.get("LOG_SAMPLE_RATE", "100"))
+    LOG_SAMPLE_BURST: int = int(os.environ.get("LOG_SAMPLE_BURST", "10"))
+
+    # Tracing settings
+    # Where finished spans go: "file", "otlp" or "" to disable tracing
+    TRACE_EXPORTER: str = os.environ.get("TRACE_EXPORTER", "")
+    TRACE_FILE_PATH: str = os.environ.get("TRACE_FILE_PATH", "traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.environ.get(
+        "TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces"
+    )
+    TRACE_SERVICE_NAME: str = os.environ.get("TRACE_SERVICE_NAME", "nytxwordboard")
+
+    # Profiling settings
+    # CPU profiler of profiled invocations: "deterministic", "sampling" or ""
+    PROFILE_CPU: str = os.environ.get("PROFILE_CPU", "")
+    # Trace allocations of profiled invocations with tracemalloc
+    PROFILE_MEMORY: bool = os.environ.get("PROFILE_MEMORY", "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    # Profile one in this many invocations
+    PROFILE_SAMPLE_RATE: int = int(os.environ.get("PROFILE_SAMPLE_RATE", "1"))
+    PROFILE_SAMPLING_INTERVAL_MS: float = float(
+        os.environ.get("PROFILE_SAMPLING_INTERVAL_MS", "5")
+    )
+    # Lambda can only write to /tmp
+    PROFILE_OUTPUT_DIR: str = os.environ.get("PROFILE_OUTPUT_DIR", "/tmp/profiles")
 
 
 @lru_cache()
@@ -1,12 +1,18 @@
+import asyncio
 import json
 import logging
+import time
 from datetime import datetime
 from typing import Any, Dict, Optional, Tuple
 
 import httpx
 
+from app.core.logging_config import SAMPLED
+from app.core.metrics import SweepMetrics
+from app.core.tracing import start_span
+from app.storage.models import DailyScoreItem, UserMetadataItem
+
 from .config import get_settings
-from .models import DailyScoreItem, UserMetadataItem
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -14,52 +20,109 @@ logger = logging.getLogger(__name__)
 # Initialize settings
 settings = get_settings()
 
+# Delay before the first retry in seconds, doubled for each further retry
+RETRY_BACKOFF_SECONDS = 0.5
+
 
-async def fetch_user_stats(user_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+async def fetch_user_stats(
+    user_id: str,
+    client: httpx.AsyncClient,
+    metrics: Optional[SweepMetrics] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[bool, Optional[Dict[str, Any]]]:
     """
     Fetches a user's statistics from the NYT Crossword API.
 
+    Rate limited (429) and server error (5xx) responses are retried up to
+    NYT_API_MAX_RETRIES times with exponential backoff. The request, with
+    its retries, runs in a "nyt.fetch_user_stats" span, and is abandoned at
+    the deadline.
+
     Args:
         user_id: The user ID to fetch statistics for
+        client: HTTP client to issue the request with, shared across a sweep
+        metrics: Sweep metrics to record fetch latency, size, parse time,
+            retries and errors in
+        deadline: time.monotonic() value at which the fetch is abandoned
 
     Returns:
         Tuple of (success, data) where success is a boolean and data is the parsed JSON or None
     """
+    if metrics is None:
+        metrics = SweepMetrics()
     url = settings.NYT_API_URL_TEMPLATE.format(user_id)
-    logger.info(f"Fetching stats for user {user_id} from {url}")
-
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
+    logger.debug("Fetching stats for user %s from %s", user_id, url, extra=SAMPLED)
+
+    with start_span("nyt.fetch_user_stats", {"nyt.user_id": user_id}) as span:
+        try:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            async with asyncio.timeout(remaining):
+                for attempt in range(settings.NYT_API_MAX_RETRIES + 1):
+                    with metrics.timer("FetchLatency"):
+                        response = await client.get(url)
+                    if (
+                        not is_retryable(response)
+                        or attempt == settings.NYT_API_MAX_RETRIES
+                    ):
+                        break
+                    metrics.increment("FetchRetries")
+                    await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+            span.set_attribute("http.status_code", response.status_code)
+            span.set_attribute("nyt.attempts", attempt + 1)
             response.raise_for_status()
+            metrics.observe("ResponseBytes", len(response.content), unit="Bytes")
 
-            data = response.json()
+            with metrics.timer("ParseTime"):
+                data = response.json()
             if data.get("status") != "OK":
+                metrics.increment("Errors.NonOkStatus")
+                span.set_error(f"Non-OK status: {data.get('status')}")
                 logger.warning(
-                    f"API returned non-OK status for user {user_id}: {data.get('status')}"
+                    "API returned non-OK status for user %s: %s",
+                    user_id,
+                    data.get("status"),
                 )
                 return False, None
 
             return True, data
 
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
-            logger.warning(f"User {user_id} not found (404)")
-        else:
-            logger.error(f"HTTP error fetching stats for user {user_id}: {e}")
-        return False, None
-
-    except httpx.RequestError as e:
-        logger.error(f"Request error fetching stats for user {user_id}: {e}")
-        return False, None
-
-    except json.JSONDecodeError:
-        logger.error(f"Failed to parse JSON response for user {user_id}")
-        return False, None
-
-    except Exception as e:
-        logger.error(f"Unexpected error fetching stats for user {user_id}: {e}")
-        return False, None
+        except httpx.HTTPStatusError as e:
+            metrics.increment(f"Errors.HTTP{e.response.status_code}")
+            span.set_error(f"HTTP {e.response.status_code}")
+            if e.response.status_code == 404:
+                logger.warning("User %s not found (404)", user_id)
+            else:
+                logger.error("HTTP error fetching stats for user %s: %s", user_id, e)
+            return False, None
+
+        except httpx.RequestError as e:
+            metrics.increment(f"Errors.{type(e).__name__}")
+            span.set_error(f"{type(e).__name__}: {e}")
+            logger.error("Request error fetching stats for user %s: %s", user_id, e)
+            return False, None
+
+        except TimeoutError:
+            metrics.increment("Errors.DeadlineExceeded")
+            span.set_error("Deadline exceeded")
+            logger.warning("Deadline reached fetching stats for user %s", user_id)
+            return False, None
+
+        except json.JSONDecodeError:
+            metrics.increment("Errors.JSONDecodeError")
+            span.set_error("Invalid JSON response")
+            logger.error("Failed to parse JSON response for user %s", user_id)
+            return False, None
+
+        except Exception as e:
+            metrics.increment("Errors.Unexpected")
+            span.set_error(f"{type(e).__name__}: {e}")
+            logger.error("Unexpected error fetching stats for user %s: %s", user_id, e)
+            return False, None
+
+
+def is_retryable(response: httpx.Response) -> bool:
+    """Whether a response is a transient failure worth retrying."""
+    return response.status_code == 429 or response.status_code >= 500
 
 
 def extract_daily_scores(
@@ -75,7 +138,7 @@ def extract_daily_scores(
     Returns:
         List of DailyScoreItem objects
     """
-    score_items = []
+    score_items: list[DailyScoreItem] = []
 
     try:
         # Navigate through the nested JSON structure
@@ -94,11 +157,11 @@ def extract_daily_scores(
 
             if date and score and score > 0:
                 score_items.append(
-                    DailyScoreItem(userId=user_id, date=date, score=score)
+                    DailyScoreItem(user_id=user_id, date=date, score=score)
                 )
 
     except Exception as e:
-        logger.error(f"Error extracting daily scores: {e}")
+        logger.error("Error extracting daily scores for %s: %s", user_id, e)
 
     return score_items
 
@@ -121,16 +184,15 @@ def extract_user_metadata(
         streaks = stats_data.get("results", {}).get("streaks", {})
 
         metadata = UserMetadataItem(
-            userId=user_id,
+            user_id=user_id,
             last_fetched_timestamp=int(datetime.now().timestamp()),
             puzzles_attempted=stats.get("puzzles_attempted", 0),
             puzzles_solved=stats.get("puzzles_solved", 0),
-            solve_rate=stats.get("solve_rate", 0.0),
             current_streak=streaks.get("current_streak", 0),
         )
 
         return metadata
 
     except Exception as e:
-        logger.error(f"Error extracting user metadata for {user_id}: {e}")
+        logger.error("Error extracting user metadata for %s: %s", user_id, e)
         return None
@@ -0,0 +1,166 @@
+"""Structured, non-blocking logging for the Lambda handlers and scripts.
+
+`configure_logging` routes every record through a QueueHandler, so callers only
+pay for an enqueue, while a background QueueListener formats records as JSON
+lines and writes them out. Hot paths log with %-style arguments, which are only
+formatted once a record survives level checks and sampling.
+
+Per-item records below WARNING opt in to sampling with `extra=SAMPLED`, and
+are sampled per message template: the first LOG_SAMPLE_BURST records of a
+template in an invocation pass, then one in LOG_SAMPLE_RATE. Warnings, errors
+and records that don't opt in always pass, so sweeps log in proportion to
+their problems rather than to the number of users, and once-per-run records
+are never lost.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+from .config import Settings, get_settings
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+STANDARD_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "taskName", "sample"}
+
+# `extra` of per-item records, e.g. one per user of a sweep, that may be sampled
+SAMPLED: Dict[str, Any] = {"sample": True}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects, including `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Render the record as JSON."""
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in STANDARD_RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Passes the first `burst` records of each message template, then 1 in `rate`.
+
+    Only records logged with `extra=SAMPLED` are sampled; others, and records
+    at or above WARNING, always pass. Templates are keyed by logger name and
+    unformatted message, so records must use %-style arguments rather than
+    f-strings to be sampled together.
+    """
+
+    def __init__(self, rate: int, burst: int) -> None:
+        """Initialize the filter.
+
+        Args:
+            rate: Keep one in this many records of a template after the burst
+            burst: Number of records of each template that always pass
+        """
+        super().__init__()
+        self.rate = max(1, rate)
+        self.burst = burst
+        self.seen: Counter[Tuple[str, Any]] = Counter()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Whether the record should be logged."""
+        if record.levelno >= logging.WARNING or not getattr(record, "sample", False):
+            return True
+        key = (record.name, record.msg)
+        self.seen[key] += 1
+        seen = self.seen[key]
+        if seen <= self.burst or (seen - self.burst) % self.rate == 0:
+            return True
+        self.suppressed += 1
+        return False
+
+    def reset(self) -> None:
+        """Start a new burst for every template and zero the suppressed count."""
+        self.seen.clear()
+        self.suppressed = 0
+
+
+# Listener draining the log queue and the root sampling filter, set once
+# logging is configured
+_listener: Optional[QueueListener] = None
+_sampling_filter: Optional[SamplingFilter] = None
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """Parse a "module=LEVEL,module=LEVEL" string into a dictionary."""
+    levels = {}
+    for part in spec.split(","):
+        if "=" in part:
+            module, level = part.split("=", 1)
+            levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(settings: Optional[Settings] = None) -> None:
+    """Install queue-based JSON logging on the root logger.
+
+    Handlers call this at the start of every Lambda invocation. Only the
+    first call configures; later calls reset sampling, so each warm invocation
+    gets its own burst of every template.
+
+    Args:
+        settings: Application settings; the cached settings if omitted
+    """
+    global _listener, _sampling_filter
+    if _listener is not None:
+        if _sampling_filter is not None:
+            _sampling_filter.reset()
+        return
+    settings = settings or get_settings()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # Filter before enqueuing so sampled out records are never formatted
+    _sampling_filter = SamplingFilter(
+        settings.LOG_SAMPLE_RATE, settings.LOG_SAMPLE_BURST
+    )
+    queue_handler.addFilter(_sampling_filter)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for module, level in parse_module_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(module).setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def flush_logging() -> None:
+    """Block until every queued record has been written.
+
+    Lambda freezes the process between invocations, so handlers call this
+    before returning to avoid losing or delaying their last records.
+    """
+    if _listener is not None:
+        # Stopping drains the queue and joins the thread; restart for later use
+        _listener.stop()
+        _listener.start()
+
+
+def suppressed_record_count() -> int:
+    """Number of records dropped by sampling since the invocation started."""
+    return _sampling_filter.suppressed if _sampling_filter is not None else 0
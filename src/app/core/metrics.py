@@ -0,0 +1,148 @@
+"""Per-run metrics for the update sweep in CloudWatch Embedded Metric Format.
+
+A SweepMetrics instance aggregates stage timings and sizes into histograms and
+keeps event counters while a sweep runs. `to_emf` renders everything as a
+single Embedded Metric Format record; printed to stdout by a Lambda, CloudWatch
+extracts the metrics from it, and locally it is just a JSON line to parse.
+"""
+
+import json
+import math
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Histogram values are rounded to buckets that are this factor apart, which
+# bounds the error to ~10% and keeps 100 buckets (the EMF limit per metric)
+# enough for eight orders of magnitude
+BUCKET_GROWTH = 1.2
+
+# Bucket shared by zero and negative values, below every positive bucket
+ZERO_BUCKET = -(2**31)
+
+# CloudWatch namespace the sweep metrics are published under
+DEFAULT_NAMESPACE = "NytCrosswordLeaderboard/Update"
+
+
+class Histogram:
+    """Log-bucketed histogram keeping exact min, max, sum and count."""
+
+    def __init__(self, unit: str) -> None:
+        """Initialize an empty histogram.
+
+        Args:
+            unit: CloudWatch unit of the observed values, e.g. Milliseconds
+        """
+        self.unit = unit
+        self.buckets: Counter[int] = Counter()
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        """Record a single value."""
+        bucket = (
+            math.floor(math.log(value, BUCKET_GROWTH)) if value > 0 else ZERO_BUCKET
+        )
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def to_emf(self) -> Dict[str, Any]:
+        """The histogram as an EMF value with Values/Counts and statistics."""
+        values: List[float] = []
+        counts: List[int] = []
+        for bucket, count in sorted(self.buckets.items()):
+            # Represent each bucket by its midpoint, clamped to the exact range
+            value = 0.0 if bucket == ZERO_BUCKET else BUCKET_GROWTH ** (bucket + 0.5)
+            values.append(round(min(max(value, self.min), self.max), 3))
+            counts.append(count)
+        return {
+            "Values": values,
+            "Counts": counts,
+            "Min": self.min,
+            "Max": self.max,
+            "Sum": self.sum,
+            "Count": self.count,
+        }
+
+
+class SweepMetrics:
+    """Histograms and counters aggregated over one update sweep."""
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Counter[str] = Counter()
+
+    def observe(self, name: str, value: float, unit: str = "Milliseconds") -> None:
+        """Add a value to the histogram called name."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(unit)
+        histogram.observe(value)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Add amount to the counter called name."""
+        self.counters[name] += amount
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Observe the wall time of the block in milliseconds under name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def to_emf(
+        self,
+        namespace: str = DEFAULT_NAMESPACE,
+        dimensions: Optional[Dict[str, str]] = None,
+        timestamp_ms: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Render the metrics as a single Embedded Metric Format record.
+
+        Args:
+            namespace: CloudWatch namespace to publish under
+            dimensions: Dimension names and values shared by every metric
+            timestamp_ms: Record timestamp in epoch milliseconds, now if omitted
+
+        Returns:
+            The EMF record, ready to be serialized as one JSON log line
+        """
+        dimensions = dimensions or {}
+        definitions = [
+            {"Name": name, "Unit": histogram.unit}
+            for name, histogram in self.histograms.items()
+        ] + [{"Name": name, "Unit": "Count"} for name in self.counters]
+
+        record: Dict[str, Any] = {
+            "_aws": {
+                "Timestamp": (
+                    timestamp_ms
+                    if timestamp_ms is not None
+                    else int(time.time() * 1000)
+                ),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": namespace,
+                        "Dimensions": [list(dimensions)],
+                        "Metrics": definitions,
+                    }
+                ],
+            },
+            **dimensions,
+        }
+        for name, histogram in self.histograms.items():
+            record[name] = histogram.to_emf()
+        record.update(self.counters)
+        return record
+
+    def emit(self, **kwargs: Any) -> None:
+        """Print the EMF record as one JSON line, where CloudWatch picks it up."""
+        print(json.dumps(self.to_emf(**kwargs)), flush=True)
@@ -0,0 +1,204 @@
+"""On-demand profiling of Lambda handler invocations.
+
+PROFILE_CPU selects a CPU profiler for an invocation:
+
+- "deterministic": cProfile records every call of the handler's thread and
+  writes <request ID>.prof, readable with pstats or snakeviz.
+- "sampling": a background thread records the stack of every other thread
+  each PROFILE_SAMPLING_INTERVAL_MS and writes <request ID>.folded, one
+  "frame;frame;frame count" line per distinct stack, the input of
+  flamegraph.pl and speedscope. Its overhead doesn't grow with the number of
+  calls, and it sees the threadpool FastAPI runs sync routes in.
+
+PROFILE_MEMORY additionally traces allocations with tracemalloc and writes
+<request ID>.tracemalloc, a snapshot readable with tracemalloc.Snapshot.load,
+and <request ID>.alloc.txt, the lines that allocated the most.
+
+Only one in PROFILE_SAMPLE_RATE invocations is profiled, so profiling can be
+left on in production. Artifacts go to PROFILE_OUTPUT_DIR, named after the
+Lambda request ID. Profiling never fails an invocation: errors writing
+artifacts are logged.
+"""
+
+import cProfile
+import functools
+import logging
+import os
+import random
+import sys
+import threading
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+type Handler = Callable[[Dict[str, Any], Any], Dict[str, Any]]
+
+# Frames of each allocation traceback kept by tracemalloc
+TRACEMALLOC_FRAMES = 16
+
+# Allocating lines listed in the allocation report
+TOP_ALLOCATIONS = 50
+
+
+class SamplingProfiler:
+    """Samples the stacks of all other threads at a fixed interval."""
+
+    def __init__(self, interval_seconds: float) -> None:
+        """Initialize a profiler that hasn't started.
+
+        Args:
+            interval_seconds: Time between samples
+        """
+        self.interval_seconds = interval_seconds
+        # Occurrences of each stack, as "thread;outermost;...;innermost"
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._sample_loop, name="sampling-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start sampling."""
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the last sample."""
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path: str) -> None:
+        """Write the samples in folded stack format."""
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def _sample_loop(self) -> None:
+        """Take samples until stopped."""
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = folded_stack(frame)
+                self.stacks[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+            self.samples += 1
+
+
+def folded_stack(frame: Optional[FrameType]) -> str:
+    """Render a stack, outermost frame first, as "module:function;..."."""
+    frames: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", code.co_filename)
+        frames.append(f"{module}:{code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+def request_id(context: Any) -> str:
+    """Get the Lambda request ID of an invocation, or a random one."""
+    return str(getattr(context, "aws_request_id", None) or uuid.uuid4())
+
+
+def should_profile(settings: Settings) -> bool:
+    """Whether to profile an invocation, once in PROFILE_SAMPLE_RATE."""
+    if not settings.PROFILE_CPU and not settings.PROFILE_MEMORY:
+        return False
+    return random.randrange(max(settings.PROFILE_SAMPLE_RATE, 1)) == 0
+
+
+@contextmanager
+def profile_invocation(
+    name: str, settings: Optional[Settings] = None
+) -> Iterator[None]:
+    """Profile the block as selected by the PROFILE_* settings.
+
+    Args:
+        name: Base name of the artifacts, e.g. the Lambda request ID
+        settings: Application settings; the cached settings if omitted
+
+    Raises:
+        ValueError: If PROFILE_CPU names an unknown profiler
+    """
+    settings = settings or get_settings()
+    if not should_profile(settings):
+        yield
+        return
+
+    cpu_profile: Optional[cProfile.Profile] = None
+    sampler: Optional[SamplingProfiler] = None
+    if settings.PROFILE_CPU == "deterministic":
+        cpu_profile = cProfile.Profile()
+    elif settings.PROFILE_CPU == "sampling":
+        sampler = SamplingProfiler(settings.PROFILE_SAMPLING_INTERVAL_MS / 1000)
+    elif settings.PROFILE_CPU:
+        raise ValueError(f"Unknown CPU profiler: {settings.PROFILE_CPU}")
+    # tracemalloc may already be tracing, e.g. under python -X tracemalloc
+    trace_memory = settings.PROFILE_MEMORY and not tracemalloc.is_tracing()
+
+    if trace_memory:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    if sampler is not None:
+        sampler.start()
+    if cpu_profile is not None:
+        cpu_profile.enable()
+    try:
+        yield
+    finally:
+        if cpu_profile is not None:
+            cpu_profile.disable()
+        if sampler is not None:
+            sampler.stop()
+        snapshot = tracemalloc.take_snapshot() if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+        write_artifacts(
+            os.path.join(settings.PROFILE_OUTPUT_DIR, name),
+            cpu_profile,
+            sampler,
+            snapshot,
+        )
+
+
+def write_artifacts(
+    base_path: str,
+    cpu_profile: Optional[cProfile.Profile],
+    sampler: Optional[SamplingProfiler],
+    snapshot: Optional[tracemalloc.Snapshot],
+) -> None:
+    """Write the artifacts of a profiled invocation, logging any failure."""
+    try:
+        os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+        if cpu_profile is not None:
+            cpu_profile.dump_stats(f"{base_path}.prof")
+        if sampler is not None:
+            sampler.write(f"{base_path}.folded")
+        if snapshot is not None:
+            snapshot.dump(f"{base_path}.tracemalloc")
+            with open(f"{base_path}.alloc.txt", "w") as file:
+                for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                    file.write(f"{stat}\n")
+    except OSError as e:
+        logger.warning("Failed to write profile %s: %s", base_path, e)
+        return
+    logger.info("Wrote profile %s", base_path)
+
+
+def profiled(handler: Handler) -> Handler:
+    """Profile invocations of a Lambda handler as the PROFILE_* settings select."""
+
+    @functools.wraps(handler)
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        with profile_invocation(request_id(context)):
+            return handler(event, context)
+
+    return wrapper
@@ -0,0 +1,496 @@
+"""Lightweight tracing of API requests, storage calls and NYT API fetches.
+
+A span records the name, duration and attributes of one operation, and the
+span current when it starts becomes its parent. The current span is kept in a
+ContextVar, so it follows the code across awaits, into the asyncio tasks a
+sweep gathers (each task starts with a copy of its creator's context) and into
+the threadpool FastAPI runs sync routes in.
+
+Finished spans are put on a queue and exported in batches by a background
+thread, so instrumented code only pays for an enqueue. Exporters write
+OTLP/JSON trace requests, either as lines of a local file or posted to the
+HTTP endpoint of an OpenTelemetry collector. Tracing is disabled unless
+TRACE_EXPORTER is set, and then start_span returns a shared no-op span without
+touching the ContextVar or the clock.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar, Token
+from types import TracebackType
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+import httpx
+
+from .config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+type AttributeValue = Union[str, int, float, bool]
+
+# Most spans exported in one request, and the longest a finished span waits
+MAX_EXPORT_BATCH = 512
+MAX_EXPORT_DELAY_SECONDS = 1.0
+
+# Seconds flush waits for the export thread to catch up
+FLUSH_TIMEOUT_SECONDS = 5.0
+
+# W3C trace context header continuing a caller's trace: version-trace-parent-flags
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# OTLP span status codes
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+
+class Span:
+    """One traced operation, exported once it ends."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: Optional[Mapping[str, AttributeValue]] = None,
+    ) -> None:
+        """Start a span now.
+
+        Args:
+            name: Name of the operation
+            trace_id: 32 hex digit ID shared by every span of the trace
+            parent_id: 16 hex digit ID of the parent span, None for a root span
+            attributes: Initial attributes of the span
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, AttributeValue] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        """Set an attribute of the span."""
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        """Mark the operation as failed."""
+        self.error = message
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form."""
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": (
+                {"code": STATUS_CODE_ERROR, "message": self.error}
+                if self.error is not None
+                else {"code": STATUS_CODE_OK}
+            ),
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class NoopSpan(Span):
+    """Span handed out while tracing is disabled, ignoring every update."""
+
+    def __init__(self) -> None:
+        """Initialize the shared no-op span."""
+        super().__init__("noop", "0" * 32, None)
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        """Ignore the attribute."""
+
+    def set_error(self, message: str) -> None:
+        """Ignore the error."""
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def otlp_value(value: AttributeValue) -> Dict[str, Any]:
+    """Wrap an attribute value in its OTLP/JSON AnyValue form."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value}
+
+
+def otlp_request(spans: Sequence[Span], service_name: str) -> Dict[str, Any]:
+    """Build the OTLP/JSON ExportTraceServiceRequest carrying spans."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": otlp_value(service_name)}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Get the (trace ID, parent span ID) of a W3C traceparent header, if valid."""
+    if header is None:
+        return None
+    match = TRACEPARENT_PATTERN.match(header.strip().lower())
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+# Span of the operation the running code is part of
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Get the span of the operation the running code is part of, if any."""
+    return _current_span.get()
+
+
+class SpanExporter(Protocol):
+    """Destination of finished spans."""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """Send a batch of finished spans.
+
+        Raises:
+            Exception: If the spans couldn't be sent; the batch is dropped
+        """
+        ...
+
+
+class FileSpanExporter:
+    """Appends each batch to a file as one OTLP/JSON line."""
+
+    def __init__(self, path: str, service_name: str) -> None:
+        """Initialize the exporter.
+
+        Args:
+            path: File to append to, created if missing
+            service_name: Name of the service the spans come from
+        """
+        self.path = path
+        self.service_name = service_name
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """Append the spans to the file."""
+        line = json.dumps(otlp_request(spans, self.service_name))
+        with open(self.path, "a") as file:
+            file.write(line + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """Posts each batch to an OTLP/HTTP collector endpoint as JSON."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str,
+        client: Optional[httpx.Client] = None,
+    ) -> None:
+        """Initialize the exporter.
+
+        Args:
+            endpoint: URL of the collector's traces endpoint, e.g.
+                http://127.0.0.1:4318/v1/traces
+            service_name: Name of the service the spans come from
+            client: HTTP client to post with; one is created if omitted
+        """
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.client = client or httpx.Client(timeout=5.0)
+
+    def export(self, spans: Sequence[Span]) -> None:
+        """Post the spans to the collector."""
+        response = self.client.post(
+            self.endpoint, json=otlp_request(spans, self.service_name)
+        )
+        response.raise_for_status()
+
+
+class ActiveSpan:
+    """Context manager making a span current for the duration of a block."""
+
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: "Tracer", span: Span) -> None:
+        """Initialize the scope of a started span."""
+        self.tracer = tracer
+        self.span = span
+        self.token: Optional[Token[Optional[Span]]] = None
+
+    def __enter__(self) -> Span:
+        """Make the span current."""
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """End the span, recording an exception escaping the block as its error."""
+        if self.token is not None:
+            _current_span.reset(self.token)
+        if exc_type is not None:
+            self.span.set_error(f"{exc_type.__name__}: {exc}")
+        self.tracer.finish(self.span)
+
+
+class NoopScope:
+    """Context manager handing out the no-op span."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> Span:
+        """Return the no-op span."""
+        return NOOP_SPAN
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Do nothing."""
+
+
+NOOP_SCOPE = NoopScope()
+
+
+class Tracer:
+    """Starts spans and exports them in batches from a background thread."""
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        max_batch: int = MAX_EXPORT_BATCH,
+        max_delay_seconds: float = MAX_EXPORT_DELAY_SECONDS,
+    ) -> None:
+        """Initialize the tracer.
+
+        Args:
+            exporter: Destination of finished spans; tracing is disabled if None
+            max_batch: Most spans exported at once
+            max_delay_seconds: Longest a finished span waits to be exported
+        """
+        self.exporter = exporter
+        self.enabled = exporter is not None
+        self.max_batch = max_batch
+        self.max_delay_seconds = max_delay_seconds
+        # Finished spans, flush requests (Events) and the stop sentinel (None)
+        self.queue: queue.SimpleQueue[Optional[Union[Span, threading.Event]]] = (
+            queue.SimpleQueue()
+        )
+        self.thread: Optional[threading.Thread] = None
+        if self.enabled:
+            self.thread = threading.Thread(
+                target=self._export_loop, name="span-exporter", daemon=True
+            )
+            self.thread.start()
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Mapping[str, AttributeValue]] = None,
+        remote_parent: Optional[Tuple[str, str]] = None,
+    ) -> ContextManager[Span]:
+        """Start a span, ended when the returned context manager exits.
+
+        Args:
+            name: Name of the operation
+            attributes: Initial attributes of the span
+            remote_parent: (trace ID, span ID) of a parent in another
+                process, used if no span is current
+
+        Returns:
+            Context manager making the span current while it is open
+        """
+        if not self.enabled:
+            return NOOP_SCOPE
+        parent = _current_span.get()
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, attributes)
+        elif remote_parent is not None:
+            span = Span(name, remote_parent[0], remote_parent[1], attributes)
+        else:
+            span = Span(name, f"{random.getrandbits(128):032x}", None, attributes)
+        return ActiveSpan(self, span)
+
+    def finish(self, span: Span) -> None:
+        """End a span and queue it for export."""
+        span.end_ns = time.time_ns()
+        self.queue.put(span)
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT_SECONDS) -> None:
+        """Block until every span finished so far has been exported."""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def shutdown(self) -> None:
+        """Export the remaining spans and stop the export thread."""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join(FLUSH_TIMEOUT_SECONDS)
+
+    def _export_loop(self) -> None:
+        """Batch finished spans and export them until stopped."""
+        batch: List[Span] = []
+        while True:
+            try:
+                item = self.queue.get(timeout=self.max_delay_seconds if batch else None)
+            except queue.Empty:
+                self._export(batch)
+                batch = []
+                continue
+            if isinstance(item, Span):
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    self._export(batch)
+                    batch = []
+                continue
+            self._export(batch)
+            batch = []
+            if item is None:
+                return
+            item.set()
+
+    def _export(self, batch: List[Span]) -> None:
+        """Export a batch, logging rather than raising if the exporter fails."""
+        if not batch or self.exporter is None:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning("Dropped %d spans that failed to export: %s", len(batch), e)
+
+
+# Tracer used by start_span, replaced by configure_tracing
+_tracer = Tracer()
+
+
+def create_exporter(settings: Settings) -> Optional[SpanExporter]:
+    """Create the span exporter selected by the TRACE_EXPORTER setting.
+
+    Raises:
+        ValueError: If the configured exporter is unknown
+    """
+    if not settings.TRACE_EXPORTER:
+        return None
+    if settings.TRACE_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACE_FILE_PATH, settings.TRACE_SERVICE_NAME)
+    if settings.TRACE_EXPORTER == "otlp":
+        return OtlpHttpSpanExporter(
+            settings.TRACE_OTLP_ENDPOINT, settings.TRACE_SERVICE_NAME
+        )
+    raise ValueError(f"Unknown trace exporter: {settings.TRACE_EXPORTER}")
+
+
+def configure_tracing(settings: Optional[Settings] = None) -> Tracer:
+    """Enable tracing if TRACE_EXPORTER is set.
+
+    Safe to call on every Lambda invocation; only the first call that enables
+    tracing configures it.
+
+    Args:
+        settings: Application settings; the cached settings if omitted
+
+    Returns:
+        The tracer in use
+    """
+    global _tracer
+    if _tracer.enabled:
+        return _tracer
+    exporter = create_exporter(settings or get_settings())
+    if exporter is not None:
+        _tracer = Tracer(exporter)
+        atexit.register(_tracer.shutdown)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    """Returns the tracer in use."""
+    return _tracer
+
+
+def set_tracer(tracer: Tracer) -> Tracer:
+    """Replace the tracer in use, e.g. in tests, returning the previous one."""
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+
+def start_span(
+    name: str,
+    attributes: Optional[Mapping[str, AttributeValue]] = None,
+    remote_parent: Optional[Tuple[str, str]] = None,
+) -> ContextManager[Span]:
+    """Start a span with the tracer in use; see Tracer.start_span."""
+    return _tracer.start_span(name, attributes, remote_parent)
+
+
+def flush_tracing() -> None:
+    """Block until every finished span has been exported.
+
+    Lambda freezes the process between invocations, so handlers call this
+    before returning, as they do flush_logging.
+    """
+    _tracer.flush()
@@ -1,3 +1,6 @@
 from app.api.main import app
+from app.core.tracing import configure_tracing
+
+configure_tracing()
 
 __all__ = ["app"]
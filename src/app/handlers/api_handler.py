@@ -1,7 +1,27 @@
+from typing import Any, Dict
+
 from mangum import Mangum
 
 from app.api.main import app
+from app.core.logging_config import configure_logging, flush_logging
+from app.core.profiling import profiled
+from app.core.tracing import configure_tracing, flush_tracing
+
+configure_logging()
+configure_tracing()
 
 # Create Mangum handler for AWS Lambda API Gateway integration
 # This handles API Gateway event normalization and response formatting
-handler = Mangum(app, lifespan="off")
+mangum_handler = Mangum(app, lifespan="off")
+
+
+@profiled
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Lambda entry point serving the API, flushing logs and spans before returning."""
+    # Starts a new sampling window for the invocation
+    configure_logging()
+    try:
+        return mangum_handler(event, context)
+    finally:
+        flush_tracing()
+        flush_logging()
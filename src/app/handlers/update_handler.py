@@ -1,119 +1,340 @@
 import asyncio
 import json
 import logging
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional
 
-from app.core import database, external_api
+import httpx
+from returns.result import Failure, Result, Success
 
-# Configure logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+from app.core import external_api
+from app.core.config import get_settings
+from app.core.error import StorageError
+from app.core.logging_config import (
+    SAMPLED,
+    configure_logging,
+    flush_logging,
+    suppressed_record_count,
+)
+from app.core.metrics import SweepMetrics
+from app.core.profiling import profiled
+from app.core.tracing import configure_tracing, flush_tracing, start_span
+from app.storage.factory import get_leaderboard_storage, get_user_storage
+from app.storage.leaderboard.models import RefreshDailyLeaderboardQuery
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    GetAllUserIdsQuery,
+    GetSweepCursorQuery,
+    SaveDailyScoreQuery,
+    SaveSweepCursorQuery,
+    SaveUserMetadataQuery,
+)
+from app.storage.users.write_behind import WriteBehindUserStorage
 
+# Initialize logger
+logger = logging.getLogger(__name__)
 
-async def process_user(user_id: str) -> Dict[str, Any]:
+# Timeout for requests to the NYT API in seconds
+REQUEST_TIMEOUT = 30.0
+
+
+async def process_user(
+    user_id: str,
+    storage: UserStorage,
+    client: httpx.AsyncClient,
+    metrics: Optional[SweepMetrics] = None,
+    deadline: Optional[float] = None,
+    save_in_thread: bool = False,
+) -> Dict[str, Any]:
     """
     Process a single user: fetch their data and update database.
 
+    Only dates whose score was created or changed are in "dates_updated".
+
     Args:
         user_id: User ID to process
+        storage: Storage to save the user's metadata and scores to
+        client: HTTP client for the NYT API
+        metrics: Sweep metrics to record stage timings and errors in
+        deadline: time.monotonic() value at which the fetch is abandoned
+        save_in_thread: Save in a worker thread, so blocking storage calls
+            don't hold up the event loop
 
     Returns:
         Dictionary with processing results
     """
-    logger.info(f"Processing user {user_id}")
-    result = {
+    if metrics is None:
+        metrics = SweepMetrics()
+    logger.info("Processing user %s", user_id, extra=SAMPLED)
+    result: Dict[str, Any] = {
         "userId": user_id,
         "success": False,
         "scores_updated": 0,
         "metadata_updated": False,
+        "dates_updated": [],
         "error": None,
+        "deadline_exceeded": False,
     }
 
     try:
         # Fetch user data from NYT API
-        success, stats_data = await external_api.fetch_user_stats(user_id)
+        success, stats_data = await external_api.fetch_user_stats(
+            user_id, client, metrics, deadline
+        )
 
         if not success or not stats_data:
             result["error"] = "Failed to fetch user data from API"
+            result["deadline_exceeded"] = (
+                deadline is not None and time.monotonic() >= deadline
+            )
             return result
 
-        # Extract user metadata
-        metadata = external_api.extract_user_metadata(stats_data, user_id)
+        with metrics.timer("ExtractTime"):
+            # Extract user metadata
+            metadata = external_api.extract_user_metadata(stats_data, user_id)
+            # Extract daily scores
+            score_items = external_api.extract_daily_scores(stats_data, user_id)
         if not metadata:
+            metrics.increment("Errors.Extraction")
             result["error"] = "Failed to extract user metadata"
             return result
 
-        # Extract daily scores
-        score_items = external_api.extract_daily_scores(stats_data, user_id)
         if not score_items:
-            logger.warning(f"No scores found for user {user_id}")
-
-        # Update metadata in database
-        metadata_success = await database.update_user_metadata(metadata)
-        result["metadata_updated"] = metadata_success
+            logger.warning("No scores found for user %s", user_id)
 
-        # Update scores in database
-        scores_updated = 0
-        for score_item in score_items:
-            if await database.save_daily_score(score_item):
-                scores_updated += 1
-
-        result["scores_updated"] = scores_updated
-        result["success"] = metadata_success and scores_updated == len(score_items)
+        if save_in_thread:
+            await asyncio.to_thread(
+                save_user_stats, metadata, score_items, storage, metrics, result
+            )
+        else:
+            save_user_stats(metadata, score_items, storage, metrics, result)
 
         return result
 
     except Exception as e:
-        logger.error(f"Error processing user {user_id}: {e}")
+        metrics.increment("Errors.Unexpected")
+        logger.exception("Error processing user %s: %s", user_id, e)
         result["error"] = str(e)
         return result
 
 
-async def process_users(user_ids: List[str]) -> Dict[str, Any]:
+def save_user_stats(
+    metadata: UserMetadataItem,
+    score_items: List[DailyScoreItem],
+    storage: UserStorage,
+    metrics: SweepMetrics,
+    result: Dict[str, Any],
+) -> None:
+    """
+    Save a user's fetched metadata and scores, recording the outcome in result.
+
+    Args:
+        metadata: User metadata extracted from the stats
+        score_items: Daily scores extracted from the stats
+        storage: Storage to save the metadata and scores to
+        metrics: Sweep metrics to record write timings and errors in
+        result: Processing result of the user, updated in place
+    """
+    # Update metadata in database
+    with metrics.timer("WriteLatency"):
+        metadata_result = storage.save_user_metadata(
+            SaveUserMetadataQuery(item=metadata)
+        )
+    count_storage_error(metadata_result, metrics)
+    metadata_success = isinstance(metadata_result, Success)
+    result["metadata_updated"] = metadata_success
+
+    # Update scores in database
+    scores_updated = 0
+    for score_item in score_items:
+        with metrics.timer("WriteLatency"):
+            score_result = storage.save_daily_score(
+                SaveDailyScoreQuery(item=score_item)
+            )
+        if isinstance(score_result, Success):
+            scores_updated += 1
+            if score_result.unwrap().changed:
+                result["dates_updated"].append(score_item.date)
+        count_storage_error(score_result, metrics)
+
+    metrics.increment("ScoresWritten", scores_updated)
+    result["scores_updated"] = scores_updated
+    result["success"] = metadata_success and scores_updated == len(score_items)
+
+
+def count_storage_error(
+    result: Result[Any, StorageError], metrics: SweepMetrics
+) -> None:
+    """Count a failed storage write under its error class."""
+    if isinstance(result, Failure):
+        metrics.increment(f"Errors.{type(result.failure()).__name__}")
+
+
+async def process_users(
+    user_ids: List[str],
+    storage: UserStorage,
+    client: Optional[httpx.AsyncClient] = None,
+    metrics: Optional[SweepMetrics] = None,
+    concurrency: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
     """
-    Process multiple users concurrently.
+    Process multiple users concurrently, in order.
+
+    Users are dispatched in list order until the deadline passes, and fetches
+    still running at the deadline are abandoned. The users processed before
+    the first abandoned one are a prefix of the list, whose last user is
+    returned as "last_user_id"; "complete" is whether that's every user.
 
     Args:
         user_ids: List of user IDs to process
+        storage: Storage to save user metadata and scores to
+        client: HTTP client for the NYT API; a pooled client is created if omitted
+        metrics: Sweep metrics to aggregate per-user stage timings into
+        concurrency: Users processed at once; all of them if omitted
+        deadline: time.monotonic() value after which no user is dispatched and
+            fetches are abandoned
 
     Returns:
         Dictionary with processing results
     """
-    logger.info(f"Processing {len(user_ids)} users")
+    if client is None:
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+            return await process_users(
+                user_ids, storage, client, metrics, concurrency, deadline
+            )
+    if metrics is None:
+        metrics = SweepMetrics()
 
-    # Process users concurrently
-    tasks = [process_user(user_id) for user_id in user_ids]
-    results = await asyncio.gather(*tasks)
+    logger.info("Processing %d users", len(user_ids))
+
+    dispatched = 0
+    results: List[Dict[str, Any]] = [{} for _ in user_ids]
+
+    async def worker() -> None:
+        """Process the next undispatched user until none are left or time's up."""
+        nonlocal dispatched
+        while dispatched < len(user_ids):
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            index = dispatched
+            dispatched += 1
+            results[index] = await process_user(
+                user_ids[index], storage, client, metrics, deadline
+            )
+
+    # Workers run as tasks, so each inherits the span as its parent
+    with start_span(
+        "update.process_users", {"update.user_count": len(user_ids)}
+    ) as span:
+        workers = min(concurrency or len(user_ids), len(user_ids))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        span.set_attribute("update.dispatched_count", dispatched)
+    results = results[:dispatched]
+    processed = next(
+        (i for i, r in enumerate(results) if r["deadline_exceeded"]), dispatched
+    )
+    complete = processed == len(user_ids)
+    if not complete:
+        logger.warning(
+            "Deadline reached after processing %d of %d users",
+            processed,
+            len(user_ids),
+        )
 
     # Summarize results
     success_count = sum(1 for r in results if r["success"])
+    metrics.increment("UsersSucceeded", success_count)
+    metrics.increment("UsersFailed", len(results) - success_count)
     scores_updated = sum(r["scores_updated"] for r in results)
+    dates_updated = sorted({date for r in results for date in r["dates_updated"]})
 
     return {
-        "total_users": len(user_ids),
+        "total_users": len(results),
         "successful_users": success_count,
-        "failed_users": len(user_ids) - success_count,
+        "failed_users": len(results) - success_count,
         "total_scores_updated": scores_updated,
+        "dates_updated": dates_updated,
+        "complete": complete,
+        "last_user_id": user_ids[processed - 1] if processed else None,
         "user_results": results,
     }
 
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+def sweep_order(user_ids: List[str], after_user_id: Optional[str]) -> List[str]:
     """
-    Lambda handler function for processing user data updates.
+    Order users for a sweep resuming after the cursor.
+
+    Users are swept in ID order, so a cursor is the last user an earlier run
+    processed. If no user sorts after it, the sweep starts over.
 
     Args:
-        event: AWS Lambda event
-        context: AWS Lambda context
+        user_ids: IDs of every stored user
+        after_user_id: Cursor saved by the previous run, if it stopped early
 
     Returns:
-        Result dictionary
+        IDs of the users to sweep, in order
+    """
+    ordered = sorted(user_ids)
+    if after_user_id is None:
+        return ordered
+    return [u for u in ordered if u > after_user_id] or ordered
+
+
+def sweep_deadline(context: Any, margin_seconds: float) -> Optional[float]:
     """
-    logger.info(f"Received event: {json.dumps(event)}")
+    Compute when a sweep must stop dispatching users and fetching stats.
+
+    Args:
+        context: AWS Lambda context; without get_remaining_time_in_millis there
+            is no deadline
+        margin_seconds: Time to leave before the Lambda deadline
+
+    Returns:
+        time.monotonic() value of the deadline, or None
+    """
+    get_remaining_time = getattr(context, "get_remaining_time_in_millis", None)
+    if get_remaining_time is None:
+        return None
+    remaining_ms = float(get_remaining_time())
+    return time.monotonic() + remaining_ms / 1000 - margin_seconds
+
+
+def run_sweep(deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Fetch every stored user's stats, save them and refresh changed leaderboards.
+
+    A run that reaches the deadline saves the last user it processed as the
+    sweep cursor, and the next run resumes after it.
+
+    Args:
+        deadline: time.monotonic() value after which no user is dispatched
+
+    Returns:
+        Result dictionary in the Lambda response format
+    """
+    settings = get_settings()
+    # Buffer the sweep's many small writes into a few batch writes
+    storage = WriteBehindUserStorage(
+        get_user_storage(),
+        max_pending=settings.WRITE_BEHIND_MAX_PENDING,
+        max_age_seconds=settings.WRITE_BEHIND_MAX_AGE_SECONDS,
+    )
 
     # Always fetch all users from the database
     logger.info("Fetching all users from database")
-    user_ids = asyncio.run(database.get_all_user_ids())
+    match storage.get_all_user_ids(GetAllUserIdsQuery()):
+        case Success(reply):
+            user_ids = reply.user_ids
+        case Failure(error):
+            logger.error(
+                "Error retrieving user IDs: %s %s", error.message, error.details
+            )
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"message": "Failed to retrieve users"}),
+            }
 
     if not user_ids:
         logger.warning("No users found in database")
@@ -124,8 +345,112 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             ),
         }
 
+    match storage.get_sweep_cursor(GetSweepCursorQuery()):
+        case Success(cursor_reply):
+            after_user_id = cursor_reply.after_user_id
+        case Failure(error):
+            # Sweeping from the start only repeats work, so don't fail the run
+            logger.error(
+                "Error retrieving sweep cursor: %s %s", error.message, error.details
+            )
+            after_user_id = None
+    user_ids = sweep_order(user_ids, after_user_id)
+    if after_user_id is not None:
+        logger.info("Resuming sweep after user %s", after_user_id)
+
     # Run the async processing
-    results = asyncio.run(process_users(user_ids))
+    metrics = SweepMetrics()
+    with metrics.timer("SweepDuration"):
+        results = asyncio.run(
+            process_users(
+                user_ids,
+                storage,
+                metrics=metrics,
+                concurrency=settings.SWEEP_CONCURRENCY,
+                deadline=deadline,
+            )
+        )
+        with metrics.timer("WriteLatency"):
+            flush_result = storage.flush()
+    if isinstance(flush_result, Failure):
+        error = flush_result.failure()
+        metrics.increment(f"Errors.{type(error).__name__}")
+        metrics.emit(dimensions={"Environment": settings.APP_ENVIRONMENT})
+        logger.error(
+            "Error flushing buffered writes: %s %s", error.message, error.details
+        )
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"message": "Failed to save user data"}),
+        }
+
+    # Rebuild the materialized leaderboards of every date the run changed;
+    # buffered saves report every score as changed, but flushes don't
+    results["dates_updated"] = sorted(storage.changed_dates)
+    leaderboard_storage = get_leaderboard_storage()
+    for date in results["dates_updated"]:
+        with metrics.timer("RefreshLatency"):
+            refresh_result = leaderboard_storage.refresh_daily_leaderboard(
+                RefreshDailyLeaderboardQuery(date=date)
+            )
+        if isinstance(refresh_result, Failure):
+            error = refresh_result.failure()
+            metrics.increment(f"Errors.{type(error).__name__}")
+            logger.error(
+                "Error refreshing leaderboard for %s: %s %s",
+                date,
+                error.message,
+                error.details,
+            )
 
-    logger.info(f"Completed processing {len(user_ids)} users")
+    # Resume after the last processed user, or start over once all were
+    if results["complete"]:
+        next_cursor = None
+    else:
+        next_cursor = results["last_user_id"] or after_user_id
+    results["resume_after"] = next_cursor
+    cursor_result = storage.save_sweep_cursor(
+        SaveSweepCursorQuery(after_user_id=next_cursor)
+    )
+    if isinstance(cursor_result, Failure):
+        error = cursor_result.failure()
+        metrics.increment(f"Errors.{type(error).__name__}")
+        logger.error("Error saving sweep cursor: %s %s", error.message, error.details)
+
+    logger.info(
+        "Completed processing %d users: %d succeeded, %d failed",
+        results["total_users"],
+        results["successful_users"],
+        results["failed_users"],
+        extra={"suppressed_log_records": suppressed_record_count()},
+    )
+    metrics.emit(dimensions={"Environment": settings.APP_ENVIRONMENT})
     return {"statusCode": 200, "body": json.dumps(results)}
+
+
+@profiled
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler function for processing user data updates.
+
+    Args:
+        event: AWS Lambda event
+        context: AWS Lambda context
+
+    Returns:
+        Result dictionary
+    """
+    configure_logging()
+    configure_tracing()
+    try:
+        logger.info("Received event", extra={"event": event})
+        with start_span("update.sweep") as span:
+            response = run_sweep(
+                sweep_deadline(context, get_settings().SWEEP_DEADLINE_MARGIN_SECONDS)
+            )
+            span.set_attribute("http.status_code", response["statusCode"])
+            return response
+    finally:
+        # Lambda freezes the process on return, so write out queued records first
+        flush_tracing()
+        flush_logging()
@@ -0,0 +1,481 @@
+"""Read-through caching wrappers for the storage protocols.
+
+A StorageCache is a bounded LRU whose entries expire after a per-operation
+TTL. The wrappers cache successful replies of pure reads keyed by their
+(frozen, hashable) query models, and writes made through a wrapper invalidate
+the cached reads they affect. Wrappers around different protocols can share
+one cache, so a score saved through CachingUserStorage evicts the leaderboard
+of its date cached by CachingLeaderboardStorage, and a group saved through
+CachingGroupStorage evicts the group's cached boards.
+
+A read-through captures the generation of its tags before loading from the
+backend, and its reply is only cached if no write invalidated them meanwhile,
+so a slow read can't re-cache what a concurrent write just replaced.
+
+Only writes that go through a wrapper invalidate: writes by other processes
+are picked up once the affected entries expire.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field
+from returns.result import Success
+
+from app.storage.groups.interface import GroupStorage
+from app.storage.groups.models import (
+    GetGroupQuery,
+    GetGroupReply,
+    GetGroupResult,
+    SaveGroupQuery,
+    SaveGroupResult,
+)
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardReply,
+    GetDailyLeaderboardResult,
+    GetGroupLeaderboardQuery,
+    GetGroupLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramReply,
+    GetScoreHistogramResult,
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardResult,
+)
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesResult,
+    ClaimUserRefreshQuery,
+    ClaimUserRefreshResult,
+    CreateUsersIfNotExistQuery,
+    CreateUsersIfNotExistResult,
+    GetAllUserIdsQuery,
+    GetAllUserIdsResult,
+    GetHeadToHeadQuery,
+    GetHeadToHeadResult,
+    GetSweepCursorQuery,
+    GetSweepCursorResult,
+    GetUserMetadataQuery,
+    GetUserMetadataReply,
+    GetUserMetadataResult,
+    GetUserStreaksQuery,
+    GetUserStreaksResult,
+    ListDailyScoresQuery,
+    ListDailyScoresResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    RebuildStreaksQuery,
+    RebuildStreaksResult,
+    SaveBatchQuery,
+    SaveBatchResult,
+    SaveDailyScoreQuery,
+    SaveDailyScoreResult,
+    SaveSweepCursorQuery,
+    SaveSweepCursorResult,
+    SaveUserMetadataQuery,
+    SaveUserMetadataResult,
+)
+
+# Number of generation counters tags are hashed into; a collision only makes a
+# read-through skip caching its reply
+GENERATION_SLOTS = 4096
+
+
+class CacheStats(BaseModel):
+    """Counters describing how a cache has performed."""
+
+    hits: int = Field(default=0, description="Lookups answered from the cache")
+    misses: int = Field(default=0, description="Lookups of absent or expired keys")
+    evictions: int = Field(
+        default=0, description="Entries dropped to stay within max_entries"
+    )
+    expirations: int = Field(default=0, description="Entries dropped after their TTL")
+    invalidations: int = Field(default=0, description="Entries dropped by writes")
+    size: int = Field(default=0, description="Entries currently cached")
+
+    model_config = ConfigDict(frozen=True)
+
+
+class StorageCache:
+    """Thread-safe LRU cache with per-entry TTLs and tag-based invalidation.
+
+    Each entry is stored under tags naming the data it was read from, e.g.
+    the leaderboard of a date and the group whose board it is, so writes can
+    invalidate every entry derived from the data they change without scanning
+    the cache. Invalidating a tag also advances its generation, which lets a
+    put made after a load detect that the loaded value may be stale.
+    """
+
+    def __init__(
+        self, max_entries: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of entries before the least recently
+                used one is evicted
+            clock: Monotonic clock in seconds, replaceable in tests
+        """
+        self.max_entries = max_entries
+        self.clock = clock
+        # Map from key to (expiry time, tags, value), least recently used first
+        self.entries: OrderedDict[
+            Hashable, Tuple[float, Tuple[Hashable, ...], object]
+        ] = OrderedDict()
+        self.keys_by_tag: Dict[Hashable, Set[Hashable]] = {}
+        # Invalidation count of the tags hashed to each slot
+        self.generations: List[int] = [0] * GENERATION_SLOTS
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """Return the cached value for key, or None if absent or expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, tags, value = entry
+            if self.clock() >= expires_at:
+                self._remove(key, tags)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, *tags: Hashable) -> Tuple[int, ...]:
+        """Return the current generation of tags, to pass to put after a load."""
+        with self.lock:
+            return self._generation(tags)
+
+    def put(
+        self,
+        key: Hashable,
+        value: object,
+        ttl: float,
+        tag: Hashable,
+        *other_tags: Hashable,
+        generation: Optional[Tuple[int, ...]] = None,
+    ) -> None:
+        """Cache value under key for ttl seconds, evicting the LRU entry if full.
+
+        The entry is stored under tag and any other tags given. If generation
+        is given and any of the tags was invalidated since it was captured,
+        the value is dropped instead.
+        """
+        tags = (tag, *other_tags)
+        with self.lock:
+            if generation is not None and self._generation(tags) != generation:
+                return
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self._untag(key, old[1])
+            self.entries[key] = (self.clock() + ttl, tags, value)
+            for tag in tags:
+                self.keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                evicted_key, (_, evicted_tags, _) = self.entries.popitem(last=False)
+                self._untag(evicted_key, evicted_tags)
+                self.evictions += 1
+
+    def invalidate(self, tag: Hashable) -> None:
+        """Drop every entry stored under tag and advance its generation."""
+        with self.lock:
+            self.generations[hash(tag) % GENERATION_SLOTS] += 1
+            for key in list(self.keys_by_tag.get(tag, ())):
+                self._remove(key, self.entries[key][1])
+                self.invalidations += 1
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters."""
+        with self.lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                expirations=self.expirations,
+                invalidations=self.invalidations,
+                size=len(self.entries),
+            )
+
+    def _generation(self, tags: Tuple[Hashable, ...]) -> Tuple[int, ...]:
+        """Get the generation of tags; the lock must be held."""
+        return tuple(self.generations[hash(tag) % GENERATION_SLOTS] for tag in tags)
+
+    def _remove(self, key: Hashable, tags: Tuple[Hashable, ...]) -> None:
+        """Remove an entry and its tag references; the lock must be held."""
+        del self.entries[key]
+        self._untag(key, tags)
+
+    def _untag(self, key: Hashable, tags: Tuple[Hashable, ...]) -> None:
+        """Forget that key is stored under tags; the lock must be held."""
+        for tag in tags:
+            keys = self.keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_tag[tag]
+
+
+def user_tag(user_id: str) -> Tuple[str, str]:
+    """Tag of cache entries read from a user's metadata."""
+    return ("user", user_id)
+
+
+def leaderboard_tag(date: str) -> Tuple[str, str]:
+    """Tag of cache entries read from the scores of a date."""
+    return ("leaderboard", date)
+
+
+def group_tag(group_id: str) -> Tuple[str, str]:
+    """Tag of cache entries read from a group's members."""
+    return ("group", group_id)
+
+
+class CachingUserStorage(UserStorage):
+    """User storage that caches metadata reads and invalidates them on writes."""
+
+    def __init__(
+        self, backend: UserStorage, cache: StorageCache, metadata_ttl: float
+    ) -> None:
+        """Initialize the caching user storage.
+
+        Args:
+            backend: Storage to read through to and write to
+            cache: Cache to hold replies in, possibly shared with other wrappers
+            metadata_ttl: Seconds a get_user_metadata reply stays cached
+        """
+        self.backend = backend
+        self.cache = cache
+        self.metadata_ttl = metadata_ttl
+
+    def get_user_metadata(self, query: GetUserMetadataQuery) -> GetUserMetadataResult:
+        """Get user metadata from the cache, reading through on a miss."""
+        key = ("get_user_metadata", query)
+        cached = self.cache.get(key)
+        if isinstance(cached, GetUserMetadataReply):
+            return Success(cached)
+        tag = user_tag(query.user_id)
+        generation = self.cache.generation(tag)
+        result = self.backend.get_user_metadata(query)
+        if isinstance(result, Success):
+            self.cache.put(
+                key, result.unwrap(), self.metadata_ttl, tag, generation=generation
+            )
+        return result
+
+    def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
+        """Save a daily score and invalidate the leaderboards of its date."""
+        result = self.backend.save_daily_score(query)
+        self.cache.invalidate(leaderboard_tag(query.item.date))
+        return result
+
+    def save_user_metadata(
+        self, query: SaveUserMetadataQuery
+    ) -> SaveUserMetadataResult:
+        """Save user metadata and invalidate the cached metadata of the user."""
+        result = self.backend.save_user_metadata(query)
+        self.cache.invalidate(user_tag(query.item.user_id))
+        return result
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Save a batch and invalidate every user and date it touches."""
+        result = self.backend.save_batch(query)
+        for user_id in {item.user_id for item in query.user_metadata_items}:
+            self.cache.invalidate(user_tag(user_id))
+        for date in {item.date for item in query.daily_score_items}:
+            self.cache.invalidate(leaderboard_tag(date))
+        return result
+
+    def get_all_user_ids(self, query: GetAllUserIdsQuery) -> GetAllUserIdsResult:
+        """Get all user IDs from the backend; full scans aren't cached."""
+        return self.backend.get_all_user_ids(query)
+
+    def list_daily_scores(self, query: ListDailyScoresQuery) -> ListDailyScoresResult:
+        """List daily scores from the backend; bulk listings aren't cached."""
+        return self.backend.list_daily_scores(query)
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Create users in the backend and invalidate the cached metadata of each."""
+        result = self.backend.create_users_if_not_exist(query)
+        for item in query.items:
+            self.cache.invalidate(user_tag(item.user_id))
+        return result
+
+    def get_head_to_head(self, query: GetHeadToHeadQuery) -> GetHeadToHeadResult:
+        """Compare users in the backend; each pair and window is rarely repeated."""
+        return self.backend.get_head_to_head(query)
+
+    def get_user_streaks(self, query: GetUserStreaksQuery) -> GetUserStreaksResult:
+        """Get a user's streaks from the backend; they're a few bit operations."""
+        return self.backend.get_user_streaks(query)
+
+    def rebuild_streaks(self, query: RebuildStreaksQuery) -> RebuildStreaksResult:
+        """Rebuild streaks in the backend; nothing cached depends on them."""
+        return self.backend.rebuild_streaks(query)
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        """Read the backend's change feed; it grows with every write."""
+        return self.backend.list_score_changes(query)
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        """Abandon sequences in the backend's change feed."""
+        return self.backend.abandon_score_changes(query)
+
+    def get_sweep_cursor(self, query: GetSweepCursorQuery) -> GetSweepCursorResult:
+        """Get the sweep cursor from the backend; it's read once per sweep."""
+        return self.backend.get_sweep_cursor(query)
+
+    def save_sweep_cursor(self, query: SaveSweepCursorQuery) -> SaveSweepCursorResult:
+        """Save the sweep cursor to the backend."""
+        return self.backend.save_sweep_cursor(query)
+
+    def claim_user_refresh(
+        self, query: ClaimUserRefreshQuery
+    ) -> ClaimUserRefreshResult:
+        """Claim a user's refresh in the backend, reading its metadata uncached."""
+        return self.backend.claim_user_refresh(query)
+
+
+class CachingLeaderboardStorage(LeaderboardStorage):
+    """Leaderboard storage caching boards and histograms for a TTL."""
+
+    def __init__(
+        self, backend: LeaderboardStorage, cache: StorageCache, leaderboard_ttl: float
+    ) -> None:
+        """Initialize the caching leaderboard storage.
+
+        Args:
+            backend: Storage to read through to
+            cache: Cache to hold replies in, possibly shared with other wrappers
+            leaderboard_ttl: Seconds a get_daily_leaderboard, get_group_leaderboard
+                or get_score_histogram reply stays cached
+        """
+        self.backend = backend
+        self.cache = cache
+        self.leaderboard_ttl = leaderboard_ttl
+
+    def get_daily_leaderboard(
+        self, query: GetDailyLeaderboardQuery
+    ) -> GetDailyLeaderboardResult:
+        """Get a daily leaderboard from the cache, reading through on a miss."""
+        key = ("get_daily_leaderboard", query)
+        cached = self.cache.get(key)
+        if isinstance(cached, GetDailyLeaderboardReply):
+            return Success(cached)
+        tag = leaderboard_tag(query.date)
+        generation = self.cache.generation(tag)
+        result = self.backend.get_daily_leaderboard(query)
+        if isinstance(result, Success):
+            self.cache.put(
+                key, result.unwrap(), self.leaderboard_ttl, tag, generation=generation
+            )
+        return result
+
+    def get_group_leaderboard(
+        self, query: GetGroupLeaderboardQuery
+    ) -> GetGroupLeaderboardResult:
+        """Get a group leaderboard from the cache, reading through on a miss.
+
+        Boards of a stored group are also tagged with the group, so saving
+        the group through CachingGroupStorage evicts them.
+        """
+        key = ("get_group_leaderboard", query)
+        cached = self.cache.get(key)
+        if isinstance(cached, GetDailyLeaderboardReply):
+            return Success(cached)
+        tags = [leaderboard_tag(query.date)]
+        if query.group_id is not None:
+            tags.append(group_tag(query.group_id))
+        generation = self.cache.generation(*tags)
+        result = self.backend.get_group_leaderboard(query)
+        if isinstance(result, Success):
+            self.cache.put(
+                key,
+                result.unwrap(),
+                self.leaderboard_ttl,
+                *tags,
+                generation=generation,
+            )
+        return result
+
+    def get_score_histogram(
+        self, query: GetScoreHistogramQuery
+    ) -> GetScoreHistogramResult:
+        """Get a score histogram from the cache, reading through on a miss."""
+        key = ("get_score_histogram", query)
+        cached = self.cache.get(key)
+        if isinstance(cached, GetScoreHistogramReply):
+            return Success(cached)
+        tag = leaderboard_tag(query.date)
+        generation = self.cache.generation(tag)
+        result = self.backend.get_score_histogram(query)
+        if isinstance(result, Success):
+            self.cache.put(
+                key, result.unwrap(), self.leaderboard_ttl, tag, generation=generation
+            )
+        return result
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        """Refresh the backend's board and invalidate the cached boards of the date."""
+        result = self.backend.refresh_daily_leaderboard(query)
+        self.cache.invalidate(leaderboard_tag(query.date))
+        return result
+
+
+class CachingGroupStorage(GroupStorage):
+    """Group storage that caches groups and invalidates them on saves."""
+
+    def __init__(
+        self, backend: GroupStorage, cache: StorageCache, group_ttl: float
+    ) -> None:
+        """Initialize the caching group storage.
+
+        Args:
+            backend: Storage to read through to and write to
+            cache: Cache to hold replies in, shared with CachingLeaderboardStorage
+                so saves evict the group's boards
+            group_ttl: Seconds a get_group reply stays cached
+        """
+        self.backend = backend
+        self.cache = cache
+        self.group_ttl = group_ttl
+
+    def get_group(self, query: GetGroupQuery) -> GetGroupResult:
+        """Get a group from the cache, reading through on a miss."""
+        key = ("get_group", query)
+        cached = self.cache.get(key)
+        if isinstance(cached, GetGroupReply):
+            return Success(cached)
+        tag = group_tag(query.group_id)
+        generation = self.cache.generation(tag)
+        result = self.backend.get_group(query)
+        if isinstance(result, Success):
+            self.cache.put(
+                key, result.unwrap(), self.group_ttl, tag, generation=generation
+            )
+        return result
+
+    def save_group(self, query: SaveGroupQuery) -> SaveGroupResult:
+        """Save a group and invalidate it and its cached boards."""
+        result = self.backend.save_group(query)
+        self.cache.invalidate(group_tag(query.item.group_id))
+        return result
@@ -0,0 +1,192 @@
+"""Reading the change feed of daily scores incrementally.
+
+Every storage implementation records each write that creates or changes a
+daily score as a ScoreChange with the next sequence number. A structure
+derived from the scores, e.g. a cache, rollup or materialized board, is kept
+current by a ScoreChangeConsumer: it remembers the sequence of the last
+change it applied, its checkpoint, and each poll applies only the changes
+recorded since.
+
+A change can become visible after one with a later sequence, e.g. on DynamoDB
+while writers run concurrently, so the consumer only applies changes up to
+the first missing sequence. A sequence still missing after a grace period is
+abandoned through the storage, which succeeds only if no change has it yet,
+and then skipped; a write still in flight then records its change with a new
+sequence, so no change is ever skipped. A gap longer than MAX_ABANDONED_GAP
+is history that expired from the feed, and is skipped as it is.
+"""
+
+import logging
+import time
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from returns.result import Failure, Result, Success
+
+from app.core.error import StorageError
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    MAX_LIST_SCORE_CHANGES_LIMIT,
+    AbandonScoreChangesQuery,
+    ListScoreChangesQuery,
+    ListScoreChangesReply,
+    ScoreChange,
+)
+
+logger = logging.getLogger(__name__)
+
+# Time a missing sequence is waited for before the consumer abandons it
+GAP_GRACE_SECONDS = 60.0
+# Longest gap the consumer abandons; no write holds more sequences in flight,
+# so a longer one is history that expired from the feed
+MAX_ABANDONED_GAP = MAX_LIST_SCORE_CHANGES_LIMIT
+
+
+def changes_reply(
+    after_sequence: int,
+    rows: Iterable[Tuple[int, str, str, Optional[int], int]],
+    abandoned_sequences: Iterable[int] = (),
+) -> ListScoreChangesReply:
+    """Build a page of the feed from (sequence, user ID, date, old, new) rows.
+
+    Rows are read from storage, so they aren't validated again.
+    """
+    changes = [
+        ScoreChange.model_construct(
+            sequence=sequence,
+            user_id=user_id,
+            date=date,
+            old_score=old_score,
+            new_score=new_score,
+        )
+        for sequence, user_id, date, old_score, new_score in rows
+    ]
+    abandoned = sorted(abandoned_sequences)
+    checkpoint = max(
+        changes[-1].sequence if changes else after_sequence,
+        abandoned[-1] if abandoned else after_sequence,
+    )
+    return ListScoreChangesReply(
+        changes=changes, abandoned_sequences=abandoned, checkpoint=checkpoint
+    )
+
+
+class ScoreChangeConsumer:
+    """Applies the changes of the feed after a checkpoint, a page at a time."""
+
+    def __init__(
+        self,
+        storage: UserStorage,
+        apply: Callable[[Sequence[ScoreChange]], None],
+        checkpoint: int = 0,
+        page_size: int = MAX_LIST_SCORE_CHANGES_LIMIT,
+        gap_grace_seconds: float = GAP_GRACE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the consumer.
+
+        Args:
+            storage: Storage whose feed to read
+            apply: Function updating the derived structure with a page of
+                changes, in sequence order
+            checkpoint: Sequence of the last change already applied, e.g. as
+                saved by a previous run, or 0 to apply the whole feed
+            page_size: Maximum number of changes read per call to storage
+            gap_grace_seconds: Time a missing sequence is waited for before
+                the changes after it are applied without it
+            clock: Monotonic clock timing missing sequences, for tests
+        """
+        self.storage = storage
+        self.apply = apply
+        self.checkpoint = checkpoint
+        self.page_size = page_size
+        self.gap_grace_seconds = gap_grace_seconds
+        self.clock = clock
+        # First missing sequence waited for, and when it was first seen missing
+        self.gap: Optional[Tuple[int, float]] = None
+
+    def poll(self) -> Result[int, StorageError]:
+        """Apply every change recorded since the checkpoint.
+
+        The checkpoint advances after each page is applied, so after a failed
+        read it still marks the last change applied, and the next poll resumes
+        from there without applying any change twice. Changes after a missing
+        sequence aren't applied until it appears, or its grace period ends and
+        it's abandoned.
+
+        Returns:
+            Result with the number of changes applied, or the StorageError of
+            the read or abandon that failed
+        """
+        applied = 0
+        while True:
+            result = self.storage.list_score_changes(
+                ListScoreChangesQuery(
+                    after_sequence=self.checkpoint, limit=self.page_size
+                )
+            )
+            if isinstance(result, Failure):
+                return Failure(result.failure())
+            reply = result.unwrap()
+            contiguous = self._contiguous(reply)
+            if isinstance(contiguous, Failure):
+                return Failure(contiguous.failure())
+            ready, checkpoint = contiguous.unwrap()
+            if ready:
+                self.apply(ready)
+                applied += len(ready)
+            self.checkpoint = checkpoint
+            listed = len(reply.changes) + len(reply.abandoned_sequences)
+            if checkpoint < reply.checkpoint or listed < self.page_size:
+                return Success(applied)
+
+    def _contiguous(
+        self, reply: ListScoreChangesReply
+    ) -> Result[Tuple[List[ScoreChange], int], StorageError]:
+        """Get the changes of a page that follow the checkpoint without a gap.
+
+        Returns:
+            Result with the changes and the sequence they reach, past any
+            abandoned sequences, or the StorageError of a failed abandon
+        """
+        entries: List[Tuple[int, Optional[ScoreChange]]] = sorted(
+            [
+                *((change.sequence, change) for change in reply.changes),
+                *((sequence, None) for sequence in reply.abandoned_sequences),
+            ],
+            key=lambda entry: entry[0],
+        )
+        ready: List[ScoreChange] = []
+        checkpoint = self.checkpoint
+        for sequence, change in entries:
+            if sequence != checkpoint + 1:
+                if not self._gap_expired(checkpoint + 1):
+                    break
+                missing = list(range(checkpoint + 1, sequence))
+                if len(missing) <= MAX_ABANDONED_GAP:
+                    result = self.storage.abandon_score_changes(
+                        AbandonScoreChangesQuery(sequences=missing)
+                    )
+                    if isinstance(result, Failure):
+                        return Failure(result.failure())
+                    if result.unwrap().abandoned_sequences != missing:
+                        # Some writes landed after all; read their changes
+                        break
+                logger.warning(
+                    "Skipping missing score change sequences %d to %d",
+                    missing[0],
+                    missing[-1],
+                )
+            if change is not None:
+                ready.append(change)
+            checkpoint = sequence
+        return Success((ready, checkpoint))
+
+    def _gap_expired(self, sequence: int) -> bool:
+        """Whether a missing sequence has been waited for long enough."""
+        now = self.clock()
+        if self.gap is None or self.gap[0] != sequence:
+            self.gap = (sequence, now)
+        if now - self.gap[1] < self.gap_grace_seconds:
+            return False
+        self.gap = None
+        return True
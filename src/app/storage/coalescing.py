@@ -0,0 +1,141 @@
+"""Single-flight coalescing of concurrent identical storage reads.
+
+When a new puzzle drops, many clients ask for the same leaderboard at once,
+and a cache can't help until the first read has filled it. A SingleFlight
+lets the first caller of a key run the read while callers arriving before it
+finishes wait for its result instead of issuing their own, so a burst of
+identical requests costs one backend read however large it is.
+
+Nothing is remembered once a read completes: keeping replies around for a
+while is the job of the caching wrappers, which this one is placed in front
+of so that concurrent cache misses are coalesced too.
+"""
+
+import threading
+from typing import Callable, Dict, Hashable, Optional
+
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardResult,
+    GetGroupLeaderboardQuery,
+    GetGroupLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramResult,
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardResult,
+)
+
+
+class Flight[T]:
+    """A read in progress, and its outcome once it completes."""
+
+    def __init__(self) -> None:
+        """Initialize a flight that hasn't completed."""
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight[T]:
+    """Runs at most one call per key at a time, sharing its outcome.
+
+    Storage calls block, so FastAPI runs them in its threadpool; callers are
+    threads, and waiting ones block on an Event until the flight lands.
+    """
+
+    def __init__(self) -> None:
+        """Initialize without calls in flight."""
+        self.flights: Dict[Hashable, Flight[T]] = {}
+        self.lock = threading.Lock()
+        # Calls answered by joining another caller's flight
+        self.shared = 0
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> T:
+        """Run call, or wait for the call in flight under key and share its result.
+
+        Args:
+            key: Key identifying the call, e.g. its frozen query model
+            call: Function to run if no call is in flight under key
+
+        Returns:
+            The result of the call that ran, whichever caller started it
+
+        Raises:
+            BaseException: Whatever the call that ran raised, in every caller
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is None:
+                flight = self.flights[key] = Flight()
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+        else:
+            try:
+                flight.result = call()
+            except BaseException as error:
+                flight.error = error
+            finally:
+                # Later callers start a new flight and see newer data
+                with self.lock:
+                    del self.flights[key]
+                flight.done.set()
+
+        if flight.error is not None:
+            raise flight.error
+        # result is only None if T admits None
+        return flight.result  # type: ignore[return-value]
+
+
+class CoalescingLeaderboardStorage(LeaderboardStorage):
+    """Leaderboard storage sharing one backend read between identical queries."""
+
+    def __init__(self, backend: LeaderboardStorage) -> None:
+        """Initialize the coalescing leaderboard storage.
+
+        Args:
+            backend: Storage to read from, typically a caching wrapper
+        """
+        self.backend = backend
+        self.daily_leaderboards: SingleFlight[GetDailyLeaderboardResult] = (
+            SingleFlight()
+        )
+        self.group_leaderboards: SingleFlight[GetGroupLeaderboardResult] = (
+            SingleFlight()
+        )
+        self.score_histograms: SingleFlight[GetScoreHistogramResult] = SingleFlight()
+
+    def get_daily_leaderboard(
+        self, query: GetDailyLeaderboardQuery
+    ) -> GetDailyLeaderboardResult:
+        """Get a daily leaderboard, joining an identical read in flight."""
+        return self.daily_leaderboards.do(
+            query, lambda: self.backend.get_daily_leaderboard(query)
+        )
+
+    def get_group_leaderboard(
+        self, query: GetGroupLeaderboardQuery
+    ) -> GetGroupLeaderboardResult:
+        """Get a group leaderboard, joining an identical read in flight."""
+        return self.group_leaderboards.do(
+            query, lambda: self.backend.get_group_leaderboard(query)
+        )
+
+    def get_score_histogram(
+        self, query: GetScoreHistogramQuery
+    ) -> GetScoreHistogramResult:
+        """Get a score histogram, joining an identical read in flight."""
+        return self.score_histograms.do(
+            query, lambda: self.backend.get_score_histogram(query)
+        )
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        """Refresh the backend's board; writes are never shared between callers."""
+        return self.backend.refresh_daily_leaderboard(query)
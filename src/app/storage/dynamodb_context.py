@@ -0,0 +1,81 @@
+"""DynamoDB storage context shared by the DynamoDB storage implementations."""
+
+from typing import Any, Dict
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import BotoCoreError, ClientError
+
+from app.core.error import (
+    InternalStorageError,
+    StorageError,
+    StorageOperationDetails,
+    UnavailableStorageError,
+)
+
+# Error codes that indicate a transient condition worth retrying later
+UNAVAILABLE_ERROR_CODES = frozenset(
+    {
+        "InternalServerError",
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "ServiceUnavailable",
+        "ThrottlingException",
+    }
+)
+
+
+class DynamoDbStorageContext:
+    """DynamoDB storage context for the single-table design.
+
+    This context holds the low-level client and table configuration shared by the
+    DynamoDB storage implementations, mirroring how the in-memory context shares
+    state between the in-memory implementations.
+    """
+
+    def __init__(self, client: Any, table_name: str, gsi_name: str) -> None:
+        """Initialize the DynamoDB storage context.
+
+        Args:
+            client: Low-level boto3 DynamoDB client
+            table_name: Name of the single table holding all items
+            gsi_name: Name of the date leaderboard Global Secondary Index
+        """
+        self.client = client
+        self.table_name = table_name
+        self.gsi_name = gsi_name
+        self.serializer = TypeSerializer()
+        self.deserializer = TypeDeserializer()
+
+    def serialize(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a Python dictionary to a DynamoDB item."""
+        return {k: self.serializer.serialize(v) for k, v in item.items()}
+
+    def deserialize(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a DynamoDB item to a Python dictionary."""
+        return {k: self.deserializer.deserialize(v) for k, v in item.items()}
+
+
+def storage_error_from_exception(
+    error: Exception, operation: str, resource_type: str, service_name: str
+) -> StorageError:
+    """Map a boto3 exception to the matching storage error.
+
+    Args:
+        error: Exception raised by the DynamoDB client
+        operation: Storage operation that failed
+        resource_type: Type of resource being operated on
+        service_name: Name of the storage implementation reporting the error
+
+    Returns:
+        UnavailableStorageError for throttling and connectivity problems,
+        InternalStorageError for anything else
+    """
+    details = StorageOperationDetails(
+        operation=operation, resource_type=resource_type, raw_error=str(error)
+    )
+    if isinstance(error, BotoCoreError) or (
+        isinstance(error, ClientError)
+        and error.response.get("Error", {}).get("Code") in UNAVAILABLE_ERROR_CODES
+    ):
+        return UnavailableStorageError(details=details, service_name=service_name)
+    return InternalStorageError(details=details, service_name=service_name)
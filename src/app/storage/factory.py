@@ -0,0 +1,227 @@
+"""Construction of the configured storage implementations."""
+
+import os
+from functools import lru_cache
+
+import boto3
+
+from app.core.config import Settings, get_settings
+from app.core.tracing import get_tracer
+from app.storage.caching import (
+    CachingGroupStorage,
+    CachingLeaderboardStorage,
+    CachingUserStorage,
+    StorageCache,
+)
+from app.storage.coalescing import CoalescingLeaderboardStorage
+from app.storage.dynamodb_context import DynamoDbStorageContext
+from app.storage.groups.dynamodb import DynamoDbGroupStorage
+from app.storage.groups.interface import GroupStorage
+from app.storage.groups.memory import InMemoryGroupStorage
+from app.storage.groups.shared_memory import SharedMemoryGroupStorage
+from app.storage.groups.sqlite import SqliteGroupStorage
+from app.storage.leaderboard.dynamodb import DynamoDbLeaderboardStorage
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
+from app.storage.leaderboard.shared_memory import SharedMemoryLeaderboardStorage
+from app.storage.leaderboard.sqlite import SqliteLeaderboardStorage
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.memory_snapshot import load_snapshot
+from app.storage.shared_memory_context import SharedMemoryStorageContext
+from app.storage.sqlite_context import SqliteStorageContext
+from app.storage.tracing import (
+    TracingGroupStorage,
+    TracingLeaderboardStorage,
+    TracingUserStorage,
+)
+from app.storage.users.dynamodb import DynamoDbUserStorage
+from app.storage.users.interface import UserStorage
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.shared_memory import (
+    ReadOnlySharedMemoryUserStorage,
+    SharedMemoryUserStorage,
+)
+from app.storage.users.sqlite import SqliteUserStorage
+
+
+@lru_cache
+def get_memory_context() -> InMemoryStorageContext:
+    """Returns the process-wide in-memory storage context.
+
+    The context is warm-started from MEMORY_SNAPSHOT_PATH if that file exists.
+    """
+    snapshot_path = get_settings().MEMORY_SNAPSHOT_PATH
+    if snapshot_path and os.path.exists(snapshot_path):
+        return load_snapshot(snapshot_path)
+    return InMemoryStorageContext()
+
+
+@lru_cache
+def get_dynamodb_context() -> DynamoDbStorageContext:
+    """Returns the process-wide DynamoDB storage context."""
+    settings = get_settings()
+    return DynamoDbStorageContext(
+        client=boto3.client("dynamodb"),
+        table_name=settings.DYNAMODB_TABLE_NAME,
+        gsi_name=settings.DYNAMODB_GSI_NAME,
+    )
+
+
+@lru_cache
+def get_storage_cache() -> StorageCache:
+    """Returns the process-wide cache shared by the caching storage wrappers."""
+    return StorageCache(max_entries=get_settings().STORAGE_CACHE_MAX_ENTRIES)
+
+
+@lru_cache
+def get_sqlite_context() -> SqliteStorageContext:
+    """Returns the process-wide SQLite storage context."""
+    return SqliteStorageContext(get_settings().SQLITE_PATH)
+
+
+@lru_cache
+def get_shared_memory_context() -> SharedMemoryStorageContext:
+    """Returns the process-wide shared-memory storage context.
+
+    Only the SHARED_MEMORY_WRITER process loads a working copy of the data.
+    """
+    settings = get_settings()
+    return SharedMemoryStorageContext(
+        settings.SHARED_MEMORY_PATH, writer=settings.SHARED_MEMORY_WRITER
+    )
+
+
+def create_user_storage(settings: Settings) -> UserStorage:
+    """Create the user storage selected by the STORAGE_BACKEND setting.
+
+    The storage is wrapped in a read-through cache if STORAGE_CACHE_MAX_ENTRIES
+    is positive, and its calls are traced if tracing is enabled.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        The configured user storage implementation
+
+    Raises:
+        ValueError: If the configured backend is unknown
+    """
+    storage: UserStorage
+    if settings.STORAGE_BACKEND == "dynamodb":
+        storage = DynamoDbUserStorage(get_dynamodb_context())
+    elif settings.STORAGE_BACKEND == "memory":
+        storage = InMemoryUserStorage(get_memory_context())
+    elif settings.STORAGE_BACKEND == "sqlite":
+        storage = SqliteUserStorage(get_sqlite_context())
+    elif settings.STORAGE_BACKEND == "shared_memory":
+        storage = (
+            SharedMemoryUserStorage(get_shared_memory_context())
+            if settings.SHARED_MEMORY_WRITER
+            else ReadOnlySharedMemoryUserStorage(get_shared_memory_context())
+        )
+    else:
+        raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    if settings.STORAGE_CACHE_MAX_ENTRIES > 0:
+        storage = CachingUserStorage(
+            storage,
+            get_storage_cache(),
+            metadata_ttl=settings.STORAGE_CACHE_USER_METADATA_TTL_SECONDS,
+        )
+    if get_tracer().enabled:
+        storage = TracingUserStorage(storage, settings.STORAGE_BACKEND)
+    return storage
+
+
+@lru_cache
+def get_user_storage() -> UserStorage:
+    """Returns cached user storage instance."""
+    return create_user_storage(get_settings())
+
+
+def create_leaderboard_storage(settings: Settings) -> LeaderboardStorage:
+    """Create the leaderboard storage selected by the STORAGE_BACKEND setting.
+
+    The storage is wrapped in a read-through cache if STORAGE_CACHE_MAX_ENTRIES
+    is positive, concurrent identical reads always share one backend read,
+    and its calls are traced if tracing is enabled.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        The configured leaderboard storage implementation
+
+    Raises:
+        ValueError: If the configured backend is unknown
+    """
+    storage: LeaderboardStorage
+    if settings.STORAGE_BACKEND == "dynamodb":
+        storage = DynamoDbLeaderboardStorage(get_dynamodb_context())
+    elif settings.STORAGE_BACKEND == "memory":
+        storage = InMemoryLeaderboardStorage(get_memory_context())
+    elif settings.STORAGE_BACKEND == "sqlite":
+        storage = SqliteLeaderboardStorage(get_sqlite_context())
+    elif settings.STORAGE_BACKEND == "shared_memory":
+        storage = SharedMemoryLeaderboardStorage(get_shared_memory_context())
+    else:
+        raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    if settings.STORAGE_CACHE_MAX_ENTRIES > 0:
+        storage = CachingLeaderboardStorage(
+            storage,
+            get_storage_cache(),
+            leaderboard_ttl=settings.STORAGE_CACHE_LEADERBOARD_TTL_SECONDS,
+        )
+    storage = CoalescingLeaderboardStorage(storage)
+    if get_tracer().enabled:
+        storage = TracingLeaderboardStorage(storage, settings.STORAGE_BACKEND)
+    return storage
+
+
+@lru_cache
+def get_leaderboard_storage() -> LeaderboardStorage:
+    """Returns cached leaderboard storage instance."""
+    return create_leaderboard_storage(get_settings())
+
+
+def create_group_storage(settings: Settings) -> GroupStorage:
+    """Create the group storage selected by the STORAGE_BACKEND setting.
+
+    The storage is wrapped in a read-through cache if STORAGE_CACHE_MAX_ENTRIES
+    is positive, sharing the leaderboard storage's cache so saving a group
+    evicts its boards, and its calls are traced if tracing is enabled.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        The configured group storage implementation
+
+    Raises:
+        ValueError: If the configured backend is unknown
+    """
+    storage: GroupStorage
+    if settings.STORAGE_BACKEND == "dynamodb":
+        storage = DynamoDbGroupStorage(get_dynamodb_context())
+    elif settings.STORAGE_BACKEND == "memory":
+        storage = InMemoryGroupStorage(get_memory_context())
+    elif settings.STORAGE_BACKEND == "sqlite":
+        storage = SqliteGroupStorage(get_sqlite_context())
+    elif settings.STORAGE_BACKEND == "shared_memory":
+        storage = SharedMemoryGroupStorage(get_shared_memory_context())
+    else:
+        raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    if settings.STORAGE_CACHE_MAX_ENTRIES > 0:
+        storage = CachingGroupStorage(
+            storage,
+            get_storage_cache(),
+            group_ttl=settings.STORAGE_CACHE_LEADERBOARD_TTL_SECONDS,
+        )
+    if get_tracer().enabled:
+        storage = TracingGroupStorage(storage, settings.STORAGE_BACKEND)
+    return storage
+
+
+@lru_cache
+def get_group_storage() -> GroupStorage:
+    """Returns cached group storage instance."""
+    return create_group_storage(get_settings())
@@ -0,0 +1,104 @@
+"""DynamoDB implementation of group storage."""
+
+from typing import Any, Dict
+
+from botocore.exceptions import BotoCoreError, ClientError
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundDetails, NotFoundStorageError
+from app.storage.dynamodb_context import (
+    DynamoDbStorageContext,
+    storage_error_from_exception,
+)
+from app.storage.groups.interface import GroupStorage
+from app.storage.groups.models import (
+    GetGroupQuery,
+    GetGroupReply,
+    GetGroupResult,
+    GroupItem,
+    SaveGroupQuery,
+    SaveGroupReply,
+    SaveGroupResult,
+)
+
+
+def group_key(group_id: str) -> Dict[str, str]:
+    """Build the primary key of a group's item."""
+    return {"PK": f"GROUP#{group_id}", "SK": "MEMBERS"}
+
+
+def group_to_item(group: GroupItem) -> Dict[str, Any]:
+    """Convert a group to its table item, holding the members as a string set."""
+    return {
+        **group_key(group.group_id),
+        "type": "GROUP",
+        "groupId": group.group_id,
+        "userIds": set(group.user_ids),
+    }
+
+
+class DynamoDbGroupStorage(GroupStorage):
+    """DynamoDB implementation of group storage.
+
+    Each group is one item in the shared table, so groups of up to
+    MAX_GROUP_SIZE members are read and replaced with a single request.
+    """
+
+    def __init__(self, context: DynamoDbStorageContext) -> None:
+        """Initialize the DynamoDB group storage.
+
+        Args:
+            context: Shared DynamoDB storage context
+        """
+        self.context = context
+
+    def get_group(self, query: GetGroupQuery) -> GetGroupResult:
+        """Get a group from DynamoDB."""
+        try:
+            response = self.context.client.get_item(
+                TableName=self.context.table_name,
+                Key=self.context.serialize(group_key(query.group_id)),
+            )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_group",
+                    resource_type=GroupItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        if "Item" not in response:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=GroupItem.__name__,
+                        resource_id=query.group_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        item = self.context.deserialize(response["Item"])
+        group = GroupItem(
+            group_id=str(item["groupId"]), user_ids=frozenset(item["userIds"])
+        )
+        return Success(GetGroupReply(item=group))
+
+    def save_group(self, query: SaveGroupQuery) -> SaveGroupResult:
+        """Save a group to DynamoDB, replacing its previous members."""
+        try:
+            self.context.client.put_item(
+                TableName=self.context.table_name,
+                Item=self.context.serialize(group_to_item(query.item)),
+            )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_group",
+                    resource_type=GroupItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(SaveGroupReply())
@@ -0,0 +1,41 @@
+"""Group storage interface definition."""
+
+from typing import Protocol
+
+from app.storage.groups.models import (
+    GetGroupQuery,
+    GetGroupResult,
+    SaveGroupQuery,
+    SaveGroupResult,
+)
+
+
+class GroupStorage(Protocol):
+    """Interface for group data storage operations."""
+
+    def get_group(self, query: GetGroupQuery) -> GetGroupResult:
+        """Get a group and its members.
+
+        Args:
+            query: Parameters for the query
+
+        Returns:
+            Result containing the group if successful, or one of these errors:
+                - NotFoundStorageError: If the group ID isn't found
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def save_group(self, query: SaveGroupQuery) -> SaveGroupResult:
+        """Create a group or replace its members.
+
+        Args:
+            query: Group to save
+
+        Returns:
+            Result indicating success, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
@@ -0,0 +1,49 @@
+"""In-memory implementation of group storage."""
+
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundDetails, NotFoundStorageError
+from app.storage.groups.interface import GroupStorage
+from app.storage.groups.models import (
+    GetGroupQuery,
+    GetGroupReply,
+    GetGroupResult,
+    GroupItem,
+    SaveGroupQuery,
+    SaveGroupReply,
+    SaveGroupResult,
+)
+from app.storage.memory_context import InMemoryStorageContext
+
+
+class InMemoryGroupStorage(GroupStorage):
+    """In-memory implementation of group storage for testing purposes."""
+
+    def __init__(self, context: InMemoryStorageContext) -> None:
+        """Initialize the in-memory group storage.
+
+        Args:
+            context: Shared in-memory storage context
+        """
+        self.context = context
+
+    def get_group(self, query: GetGroupQuery) -> GetGroupResult:
+        """Get a group from in-memory storage."""
+        group = self.context.groups.get(query.group_id)
+        if group is None:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=GroupItem.__name__,
+                        resource_id=query.group_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(GetGroupReply(item=group))
+
+    def save_group(self, query: SaveGroupQuery) -> SaveGroupResult:
+        """Save a group to in-memory storage."""
+        with self.context.lock:
+            self.context.groups[query.item.key] = query.item
+        return Success(SaveGroupReply())
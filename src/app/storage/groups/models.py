@@ -0,0 +1,79 @@
+"""Models for group storage operations."""
+
+from typing import Annotated, FrozenSet
+
+from pydantic import BaseModel, ConfigDict, Field
+from returns.result import Result
+
+from app.core.error import StorageError
+from app.storage.leaderboard.models import MAX_GROUP_SIZE
+from app.storage.models import UserMetadataKey
+
+type GroupKey = Annotated[
+    str,
+    Field(
+        description="Group identifier of letters, digits, underscores and hyphens",
+        pattern=r"^[A-Za-z0-9_-]+$",
+        min_length=1,
+        max_length=64,
+    ),
+]
+
+
+class GroupItem(BaseModel):
+    """A named set of users sharing a leaderboard."""
+
+    group_id: GroupKey = Field(..., description="Group identifier")
+    user_ids: FrozenSet[UserMetadataKey] = Field(
+        ...,
+        description="IDs of the group's members",
+        min_length=1,
+        max_length=MAX_GROUP_SIZE,
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+    @property
+    def key(self) -> GroupKey:
+        """Get the storage key for this item.
+
+        Returns:
+            The group ID which serves as the storage key
+        """
+        return self.group_id
+
+
+class GetGroupQuery(BaseModel):
+    """Query parameters for getting a group."""
+
+    group_id: GroupKey = Field(description="ID of the group to retrieve")
+
+    model_config = ConfigDict(frozen=True)
+
+
+class GetGroupReply(BaseModel):
+    """Response data for get_group operation."""
+
+    item: GroupItem = Field(description="The group and its members")
+
+    model_config = ConfigDict(frozen=True)
+
+
+type GetGroupResult = Result[GetGroupReply, StorageError]
+
+
+class SaveGroupQuery(BaseModel):
+    """Query parameters for saving a group."""
+
+    item: GroupItem = Field(description="Group to create or replace")
+
+    model_config = ConfigDict(frozen=True)
+
+
+class SaveGroupReply(BaseModel):
+    """Response data for save_group operation."""
+
+    pass
+
+
+type SaveGroupResult = Result[SaveGroupReply, StorageError]
@@ -0,0 +1,90 @@
+"""Shared-memory implementation of group storage."""
+
+import json
+import os
+from pathlib import Path
+
+from returns.result import Failure, Success
+
+from app.core.error import (
+    InternalStorageError,
+    NotFoundDetails,
+    NotFoundStorageError,
+    StorageOperationDetails,
+)
+from app.storage.groups.interface import GroupStorage
+from app.storage.groups.models import (
+    GetGroupQuery,
+    GetGroupReply,
+    GetGroupResult,
+    GroupItem,
+    SaveGroupQuery,
+    SaveGroupReply,
+    SaveGroupResult,
+)
+from app.storage.shared_memory_context import SharedMemoryStorageContext
+
+
+class SharedMemoryGroupStorage(GroupStorage):
+    """Group storage shared by every process using a shared-memory segment.
+
+    Groups are written by any process, not only the one owning the snapshot,
+    so rather than being published with it each group is a small JSON file in
+    a directory next to the snapshot, replaced atomically on save.
+    """
+
+    def __init__(self, context: SharedMemoryStorageContext) -> None:
+        """Initialize the shared-memory group storage.
+
+        Args:
+            context: Shared-memory storage context
+        """
+        self.directory = Path(f"{context.path}.groups")
+
+    def get_group(self, query: GetGroupQuery) -> GetGroupResult:
+        """Get a group from its file."""
+        try:
+            data = json.loads((self.directory / f"{query.group_id}.json").read_text())
+        except FileNotFoundError:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=GroupItem.__name__,
+                        resource_id=query.group_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        except (OSError, ValueError) as e:
+            return Failure(self._error("get_group", e))
+        return Success(GetGroupReply(item=GroupItem.model_validate(data)))
+
+    def save_group(self, query: SaveGroupQuery) -> SaveGroupResult:
+        """Atomically write a group's file."""
+        path = self.directory / f"{query.item.group_id}.json"
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            self.directory.mkdir(exist_ok=True)
+            temp_path.write_text(
+                json.dumps(
+                    {
+                        "group_id": query.item.group_id,
+                        "user_ids": sorted(query.item.user_ids),
+                    }
+                )
+            )
+            os.replace(temp_path, path)
+        except OSError as e:
+            return Failure(self._error("save_group", e))
+        return Success(SaveGroupReply())
+
+    def _error(self, operation: str, error: Exception) -> InternalStorageError:
+        """Build the error reported when a group file can't be read or written."""
+        return InternalStorageError(
+            details=StorageOperationDetails(
+                operation=operation,
+                resource_type=GroupItem.__name__,
+                raw_error=str(error),
+            ),
+            service_name=self.__class__.__name__,
+        )
@@ -0,0 +1,100 @@
+"""SQLite implementation of group storage."""
+
+import sqlite3
+
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundDetails, NotFoundStorageError
+from app.storage.groups.interface import GroupStorage
+from app.storage.groups.models import (
+    GetGroupQuery,
+    GetGroupReply,
+    GetGroupResult,
+    GroupItem,
+    SaveGroupQuery,
+    SaveGroupReply,
+    SaveGroupResult,
+)
+from app.storage.sqlite_context import (
+    SqliteStorageContext,
+    storage_error_from_exception,
+)
+
+
+class SqliteGroupStorage(GroupStorage):
+    """SQLite implementation of group storage.
+
+    Groups are stored as one group_members row per member, so a group exists
+    as long as it has members, which GroupItem requires.
+    """
+
+    def __init__(self, context: SqliteStorageContext) -> None:
+        """Initialize the SQLite group storage.
+
+        Args:
+            context: Shared SQLite storage context
+        """
+        self.context = context
+
+    def get_group(self, query: GetGroupQuery) -> GetGroupResult:
+        """Get a group from SQLite."""
+        try:
+            rows = (
+                self.context.connection()
+                .execute(
+                    "SELECT user_id FROM group_members WHERE group_id = ?",
+                    (query.group_id,),
+                )
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_group",
+                    resource_type=GroupItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        if not rows:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=GroupItem.__name__,
+                        resource_id=query.group_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        group = GroupItem(
+            group_id=query.group_id, user_ids=frozenset(row[0] for row in rows)
+        )
+        return Success(GetGroupReply(item=group))
+
+    def save_group(self, query: SaveGroupQuery) -> SaveGroupResult:
+        """Replace a group's members in SQLite in one transaction."""
+        connection = self.context.connection()
+        try:
+            with connection:
+                connection.execute(
+                    "DELETE FROM group_members WHERE group_id = ?",
+                    (query.item.group_id,),
+                )
+                connection.executemany(
+                    "INSERT INTO group_members (group_id, user_id) VALUES (?, ?)",
+                    [
+                        (query.item.group_id, user_id)
+                        for user_id in sorted(query.item.user_ids)
+                    ],
+                )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_group",
+                    resource_type=GroupItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(SaveGroupReply())
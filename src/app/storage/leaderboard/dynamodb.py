@@ -0,0 +1,539 @@
+"""DynamoDB implementation of leaderboard storage."""
+
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+from returns.result import Failure, Success
+
+from app.core.error import (
+    NotFoundDetails,
+    NotFoundStorageError,
+    StorageOperationDetails,
+    UnavailableStorageError,
+)
+from app.storage.dynamodb_context import (
+    DynamoDbStorageContext,
+    storage_error_from_exception,
+)
+from app.storage.leaderboard.histogram import (
+    LOWER_BOUNDS,
+    bucket_index,
+    empty_counts,
+    histogram_buckets,
+)
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import (
+    MAX_LEADERBOARD_LIMIT,
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardReply,
+    GetDailyLeaderboardResult,
+    GetGroupLeaderboardQuery,
+    GetGroupLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramReply,
+    GetScoreHistogramResult,
+    HistogramScale,
+    LeaderboardEntry,
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardReply,
+    RefreshDailyLeaderboardResult,
+)
+
+# Materialized boards pack each entry as a little-endian (user ID, score) pair;
+# user IDs are at most 12 digits, so they fit in an unsigned 64-bit integer
+ENTRY_FORMAT = struct.Struct("<QI")
+# Bumped whenever ENTRY_FORMAT changes, so old items are treated as stale
+ENTRY_FORMAT_VERSION = 1
+
+# Attempts at reading the keys DynamoDB returns as unprocessed
+BATCH_GET_ATTEMPTS = 5
+# Delay before retrying unprocessed keys in seconds, doubled per attempt
+BATCH_GET_BACKOFF_SECONDS = 0.05
+# Attempts at refreshing a board whose scores are written during the refresh
+REFRESH_ATTEMPTS = 3
+
+
+def materialized_leaderboard_key(date: str) -> Dict[str, Dict[str, str]]:
+    """Build the primary key of a date's materialized leaderboard item."""
+    return {"PK": {"S": f"LEADERBOARD#{date}"}, "SK": {"S": "TOP"}}
+
+
+def stored_revision(item: Dict[str, Any], name: str) -> int:
+    """Get a revision counter of a materialized leaderboard item, 0 if unset."""
+    return int(item.get(name, {"N": "0"})["N"])
+
+
+def bucket_attribute(scale: HistogramScale, index: int) -> str:
+    """Name the materialized leaderboard item's count of one histogram bucket."""
+    return f"count_{scale}_{index}"
+
+
+def board_write_update(
+    date: str, changes: Iterable[Tuple[int, Optional[int]]]
+) -> Dict[str, Any]:
+    """Build the update recording score writes on a date's leaderboard item.
+
+    The item's revision is incremented, marking its board stale, and each
+    change moves one count from its old score's buckets to its new score's
+    with ADD, so concurrent writers never overwrite each other's counts.
+
+    Args:
+        date: Date of the scores
+        changes: Each new score with the score it replaced, if any
+
+    Returns:
+        UpdateItem parameters other than the table name
+    """
+    deltas: Dict[str, int] = {}
+    for new_score, old_score in changes:
+        for scale in LOWER_BOUNDS:
+            added = bucket_attribute(scale, bucket_index(scale, new_score))
+            deltas[added] = deltas.get(added, 0) + 1
+            if old_score is not None:
+                removed = bucket_attribute(scale, bucket_index(scale, old_score))
+                deltas[removed] = deltas.get(removed, 0) - 1
+    counts = [(name, delta) for name, delta in deltas.items() if delta]
+    values = {":one": {"N": "1"}}
+    values.update(
+        {f":c{index}": {"N": str(delta)} for index, (_, delta) in enumerate(counts)}
+    )
+    return {
+        "Key": materialized_leaderboard_key(date),
+        "UpdateExpression": "ADD revision :one"
+        + "".join(f", {name} :c{index}" for index, (name, _) in enumerate(counts)),
+        "ExpressionAttributeValues": values,
+    }
+
+
+def encode_entries(entries: List[Tuple[str, int]]) -> bytes:
+    """Pack ranked (user ID, score) pairs into a materialized board.
+
+    Raises:
+        ValueError: If a user ID isn't numeric
+        struct.error: If a user ID or score doesn't fit ENTRY_FORMAT
+    """
+    return b"".join(
+        ENTRY_FORMAT.pack(int(user_id), score) for user_id, score in entries
+    )
+
+
+def count_buckets(scores: Iterable[int]) -> Dict[HistogramScale, List[int]]:
+    """Count scores into the buckets of every histogram scale."""
+    histograms = {scale: empty_counts(scale) for scale in LOWER_BOUNDS}
+    for score in scores:
+        for scale, counts in histograms.items():
+            counts[bucket_index(scale, score)] += 1
+    return histograms
+
+
+def decode_entries(data: bytes, limit: int) -> List[LeaderboardEntry]:
+    """Unpack the first `limit` entries of a materialized board."""
+    end = min(len(data), limit * ENTRY_FORMAT.size)
+    return [
+        # The entries were validated before they were materialized
+        LeaderboardEntry.model_construct(rank=rank, user_id=str(user_id), score=score)
+        for rank, (user_id, score) in enumerate(
+            ENTRY_FORMAT.iter_unpack(data[:end]), start=1
+        )
+    ]
+
+
+class DynamoDbLeaderboardStorage(LeaderboardStorage):
+    """DynamoDB implementation of leaderboard storage.
+
+    Boards are served from one materialized item per date holding the packed
+    top MAX_LEADERBOARD_LIMIT entries, which writers rebuild with
+    refresh_daily_leaderboard. Dates without a usable item fall back to
+    querying the date GSI.
+
+    Every score write adds to the `revision` of its date's item, and a refresh
+    records the revision it was built from, so a board is only served while
+    no score of its date was written since. Scores written outside the update
+    sweep, e.g. by imports, are ranked from the GSI until the date is
+    refreshed.
+
+    The same item holds the date's histogram bucket counts, kept up to date
+    in the transactions that write scores, so histogram reads cost a single
+    GetItem. Items materialized before counts were kept are counted once by
+    their next refresh, which marks them histogram_counted.
+    """
+
+    def __init__(self, context: DynamoDbStorageContext) -> None:
+        """Initialize the DynamoDB leaderboard storage.
+
+        Args:
+            context: Shared DynamoDB storage context
+        """
+        self.context = context
+
+    def get_daily_leaderboard(
+        self, query: GetDailyLeaderboardQuery
+    ) -> GetDailyLeaderboardResult:
+        """Get daily leaderboard from its materialized item or the date GSI."""
+        try:
+            response = self.context.client.get_item(
+                TableName=self.context.table_name,
+                Key=materialized_leaderboard_key(query.date),
+            )
+            item = response.get("Item")
+            if (
+                item is not None
+                and "version" in item
+                and int(item["version"]["N"]) == ENTRY_FORMAT_VERSION
+                and stored_revision(item, "built_revision")
+                == stored_revision(item, "revision")
+            ):
+                data = item["entries"]["B"]
+                total_count = int(item["total_count"]["N"])
+                stored = len(data) // ENTRY_FORMAT.size
+                # A board cut short can't answer limits beyond its length
+                if stored >= query.limit or stored == total_count:
+                    return Success(
+                        GetDailyLeaderboardReply(
+                            date=query.date,
+                            entries=decode_entries(data, query.limit),
+                            total_count=total_count,
+                        )
+                    )
+
+            ranked, total_count = self._query_leaderboard(query.date, query.limit)
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_daily_leaderboard",
+                    resource_type=LeaderboardEntry.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        entries = [
+            LeaderboardEntry(rank=rank, user_id=user_id, score=score)
+            for rank, (user_id, score) in enumerate(ranked, start=1)
+        ]
+        return Success(
+            GetDailyLeaderboardReply(
+                date=query.date, entries=entries, total_count=total_count
+            )
+        )
+
+    def get_score_histogram(
+        self, query: GetScoreHistogramQuery
+    ) -> GetScoreHistogramResult:
+        """Get a score histogram from the materialized leaderboard item.
+
+        Reads never scan the date's partition, so dates without scores, and
+        dates materialized before counts were kept until their next refresh,
+        fail with a NotFoundStorageError.
+        """
+        names = [
+            bucket_attribute(query.scale, index)
+            for index in range(len(LOWER_BOUNDS[query.scale]))
+        ]
+        try:
+            response = self.context.client.get_item(
+                TableName=self.context.table_name,
+                Key=materialized_leaderboard_key(query.date),
+                ProjectionExpression=", ".join(
+                    ["version", "histogram_counted", *names]
+                ),
+            )
+            item = response.get("Item", {})
+            counts = [int(item.get(name, {"N": "0"})["N"]) for name in names]
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_score_histogram",
+                    resource_type=LeaderboardEntry.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        if not item or ("version" in item and "histogram_counted" not in item):
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=GetScoreHistogramReply.__name__,
+                        resource_id=query.date,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        return Success(
+            GetScoreHistogramReply(
+                date=query.date,
+                scale=query.scale,
+                buckets=histogram_buckets(query.scale, counts),
+                total_count=sum(counts),
+            )
+        )
+
+    def get_group_leaderboard(
+        self, query: GetGroupLeaderboardQuery
+    ) -> GetGroupLeaderboardResult:
+        """Rank a set of users from their score items, read with BatchGetItem.
+
+        Groups are at most MAX_GROUP_SIZE users, so one BatchGetItem holds
+        every key. Unprocessed keys are retried with exponential backoff.
+        """
+        pending: List[Dict[str, Any]] = [
+            {"PK": {"S": f"USER#{user_id}"}, "SK": {"S": f"SCORE#{query.date}"}}
+            for user_id in sorted(query.user_ids)
+        ]
+        scores: List[Tuple[int, str]] = []
+        for attempt in range(BATCH_GET_ATTEMPTS):
+            if attempt:
+                time.sleep(BATCH_GET_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            try:
+                response = self.context.client.batch_get_item(
+                    RequestItems={
+                        self.context.table_name: {
+                            "Keys": pending,
+                            "ProjectionExpression": "userId, #score",
+                            "ExpressionAttributeNames": {"#score": "score"},
+                        }
+                    }
+                )
+            except (BotoCoreError, ClientError) as e:
+                return Failure(
+                    storage_error_from_exception(
+                        e,
+                        operation="get_group_leaderboard",
+                        resource_type=LeaderboardEntry.__name__,
+                        service_name=self.__class__.__name__,
+                    )
+                )
+            scores.extend(
+                (int(item["score"]["N"]), item["userId"]["S"])
+                for item in response.get("Responses", {}).get(
+                    self.context.table_name, []
+                )
+            )
+            pending = (
+                response.get("UnprocessedKeys", {})
+                .get(self.context.table_name, {})
+                .get("Keys", [])
+            )
+            if not pending:
+                break
+        if pending:
+            return Failure(
+                UnavailableStorageError(
+                    details=StorageOperationDetails(
+                        operation="get_group_leaderboard",
+                        resource_type=LeaderboardEntry.__name__,
+                        raw_error=(
+                            f"{len(pending)} keys still unprocessed after "
+                            f"{BATCH_GET_ATTEMPTS} attempts"
+                        ),
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        # Lower scores are better (less time)
+        entries = [
+            LeaderboardEntry(rank=rank, user_id=user_id, score=score)
+            for rank, (score, user_id) in enumerate(sorted(scores), start=1)
+        ]
+        return Success(
+            GetDailyLeaderboardReply(
+                date=query.date, entries=entries, total_count=len(entries)
+            )
+        )
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        """Rebuild a date's materialized leaderboard item from the date GSI.
+
+        The item's revision is read before the GSI and recorded as the board's
+        built_revision, and the board is only written if no score of the date
+        was written since, retrying from the read otherwise. A stored user ID
+        or score that can't be packed fails the refresh with an
+        InternalStorageError, leaving the previous item in place.
+        """
+        try:
+            for _ in range(REFRESH_ATTEMPTS):
+                refreshed = self._refresh(query.date)
+                if refreshed is not None:
+                    entry_count, total_count = refreshed
+                    return Success(
+                        RefreshDailyLeaderboardReply(
+                            entry_count=entry_count, total_count=total_count
+                        )
+                    )
+        except (BotoCoreError, ClientError, ValueError, struct.error) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="refresh_daily_leaderboard",
+                    resource_type=LeaderboardEntry.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Failure(
+            UnavailableStorageError(
+                details=StorageOperationDetails(
+                    operation="refresh_daily_leaderboard",
+                    resource_type=LeaderboardEntry.__name__,
+                    raw_error=(
+                        f"Scores were written during each of {REFRESH_ATTEMPTS} "
+                        "refresh attempts"
+                    ),
+                ),
+                service_name=self.__class__.__name__,
+            )
+        )
+
+    def _refresh(self, date: str) -> Optional[Tuple[int, int]]:
+        """Rebuild a date's materialized leaderboard item once.
+
+        Items materialized before histogram counts were kept have a version
+        but no histogram_counted; their counts are completed here, from the top
+        entries if they hold every score, otherwise by counting the date's
+        partition once. Other items were counted from their first write.
+
+        Returns:
+            The number of entries and of scores, or None if a score of the
+            date was written during the refresh
+
+        Raises:
+            BotoCoreError, ClientError: If a call fails
+            ValueError, struct.error: If a ranked entry can't be packed
+        """
+        names = [
+            bucket_attribute("linear", index)
+            for index in range(len(LOWER_BOUNDS["linear"]))
+        ]
+        response = self.context.client.get_item(
+            TableName=self.context.table_name,
+            Key=materialized_leaderboard_key(date),
+            ProjectionExpression=", ".join(
+                ["revision", "version", "histogram_counted", *names]
+            ),
+            ConsistentRead=True,
+        )
+        item = response.get("Item", {})
+        revision = stored_revision(item, "revision")
+        ranked, cut_short = self._query_top(date, MAX_LEADERBOARD_LIMIT)
+
+        board: Dict[str, Any] = {
+            "type": {"S": "LEADERBOARD"},
+            "date": {"S": date},
+            "version": {"N": str(ENTRY_FORMAT_VERSION)},
+            "entries": {"B": encode_entries(ranked)},
+            "updated_at": {"N": str(int(time.time()))},
+            "built_revision": {"N": str(revision)},
+            "histogram_counted": {"BOOL": True},
+        }
+        if "histogram_counted" in item or "version" not in item:
+            total_count = len(ranked)
+            if cut_short:
+                total_count = sum(
+                    int(item.get(name, {"N": "0"})["N"]) for name in names
+                )
+        else:
+            # The top entries hold every score unless the limit cut them short
+            histograms = (
+                self._count_partition_buckets(date)
+                if cut_short
+                else count_buckets(score for _, score in ranked)
+            )
+            total_count = sum(histograms["linear"])
+            for scale, counts in histograms.items():
+                board.update(
+                    {
+                        bucket_attribute(scale, index): {"N": str(count)}
+                        for index, count in enumerate(counts)
+                    }
+                )
+        board["total_count"] = {"N": str(total_count)}
+
+        # Updated rather than replaced, so counts added since it was read are
+        # kept, and only if its scores are unchanged since
+        try:
+            self.context.client.update_item(
+                TableName=self.context.table_name,
+                Key=materialized_leaderboard_key(date),
+                UpdateExpression="SET "
+                + ", ".join(f"#{name} = :{name}" for name in board),
+                ConditionExpression=(
+                    "attribute_not_exists(#revision) OR #revision = :built_revision"
+                ),
+                ExpressionAttributeNames={
+                    "#revision": "revision",
+                    **{f"#{name}": name for name in board},
+                },
+                ExpressionAttributeValues={
+                    f":{name}": value for name, value in board.items()
+                },
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in (
+                "ConditionalCheckFailedException",
+                "TransactionConflictException",
+            ):
+                raise
+            return None
+        return len(ranked), total_count
+
+    def _query_leaderboard(
+        self, date: str, limit: int
+    ) -> Tuple[List[Tuple[str, int]], int]:
+        """Query the date GSI for the top `limit` (user ID, score) pairs.
+
+        Returns:
+            The ranked pairs and the total number of scores for the date
+        """
+        ranked, cut_short = self._query_top(date, limit)
+
+        # Count the rest of the partition only if the limit cut it short
+        total_count = len(ranked)
+        if cut_short:
+            total_count = 0
+            paginator = self.context.client.get_paginator("query")
+            for page in paginator.paginate(
+                **self._date_key_condition(date), Select="COUNT"
+            ):
+                total_count += page["Count"]
+        return ranked, total_count
+
+    def _query_top(self, date: str, limit: int) -> Tuple[List[Tuple[str, int]], bool]:
+        """Query the date GSI for the top `limit` (user ID, score) pairs.
+
+        Returns:
+            The ranked pairs and whether the date has more scores
+        """
+        # Lower scores are better (less time), so use ascending sort
+        response = self.context.client.query(
+            **self._date_key_condition(date), ScanIndexForward=True, Limit=limit
+        )
+        ranked = [
+            (item["userId"]["S"], int(item["gsi1_sk"]["N"]))
+            for item in response.get("Items", [])
+        ]
+        return ranked, "LastEvaluatedKey" in response
+
+    def _count_partition_buckets(self, date: str) -> Dict[HistogramScale, List[int]]:
+        """Count every score of a date into histogram buckets via the date GSI."""
+        paginator = self.context.client.get_paginator("query")
+        return count_buckets(
+            int(item["gsi1_sk"]["N"])
+            for page in paginator.paginate(
+                **self._date_key_condition(date), ProjectionExpression="gsi1_sk"
+            )
+            for item in page.get("Items", [])
+        )
+
+    def _date_key_condition(self, date: str) -> Dict[str, Any]:
+        """Build the parameters selecting a date's partition of the date GSI."""
+        return {
+            "TableName": self.context.table_name,
+            "IndexName": self.context.gsi_name,
+            "KeyConditionExpression": "gsi1_pk = :pk",
+            "ExpressionAttributeValues": {":pk": {"S": f"DATE#{date}"}},
+        }
@@ -0,0 +1,60 @@
+"""Score buckets shared by the score histogram implementations.
+
+Every backend buckets scores the same way, so histograms of one date agree
+whichever storage served them. Bucket bounds are whole seconds, and the last
+bucket of each scale is open-ended.
+"""
+
+import bisect
+from typing import Dict, List, Sequence, Tuple
+
+from app.storage.leaderboard.models import HistogramBucket, HistogramScale
+
+# Linear buckets are one minute wide, from 0 up to an open bucket at one hour
+LINEAR_BUCKET_SECONDS = 60
+LINEAR_BUCKET_COUNT = 61
+# Log buckets start at 10 seconds and double every 4 buckets, up to ~2.8 hours
+LOG_FIRST_BOUND = 10
+LOG_BUCKETS_PER_DOUBLING = 4
+LOG_DOUBLINGS = 10
+
+# Inclusive lower bound of every bucket, by scale
+LOWER_BOUNDS: Dict[HistogramScale, Tuple[int, ...]] = {
+    "linear": tuple(
+        bucket * LINEAR_BUCKET_SECONDS for bucket in range(LINEAR_BUCKET_COUNT)
+    ),
+    "log": (0,)
+    + tuple(
+        sorted(
+            {
+                round(LOG_FIRST_BOUND * 2 ** (i / LOG_BUCKETS_PER_DOUBLING))
+                for i in range(LOG_DOUBLINGS * LOG_BUCKETS_PER_DOUBLING + 1)
+            }
+        )
+    ),
+}
+
+
+def bucket_index(scale: HistogramScale, score: int) -> int:
+    """Get the index of the bucket holding score; negative scores go first."""
+    return max(bisect.bisect_right(LOWER_BOUNDS[scale], score) - 1, 0)
+
+
+def empty_counts(scale: HistogramScale) -> List[int]:
+    """Get a zero count for every bucket of a scale."""
+    return [0] * len(LOWER_BOUNDS[scale])
+
+
+def histogram_buckets(
+    scale: HistogramScale, counts: Sequence[int]
+) -> List[HistogramBucket]:
+    """Pair the per-bucket counts of a scale with the bounds of each bucket."""
+    bounds = LOWER_BOUNDS[scale]
+    return [
+        HistogramBucket(
+            lower=lower,
+            upper=bounds[index + 1] if index + 1 < len(bounds) else None,
+            count=count,
+        )
+        for index, (lower, count) in enumerate(zip(bounds, counts))
+    ]
@@ -5,6 +5,12 @@ from typing import Protocol
 from app.storage.leaderboard.models import (
     GetDailyLeaderboardQuery,
     GetDailyLeaderboardResult,
+    GetGroupLeaderboardQuery,
+    GetGroupLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramResult,
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardResult,
 )
 
 
@@ -25,3 +31,61 @@ class LeaderboardStorage(Protocol):
                 - InternalStorageError: If another implementation-dependent error occurs
         """
         ...
+
+    def get_group_leaderboard(
+        self, query: GetGroupLeaderboardQuery
+    ) -> GetGroupLeaderboardResult:
+        """Rank a set of users by their scores on a date.
+
+        Implementations look up each user's score by key and rank them
+        locally, so the cost scales with the number of users rather than the
+        number of scores on the date. Users without a score aren't ranked.
+
+        Args:
+            query: Date and IDs of the users to rank
+
+        Returns:
+            Result containing the ranked users if successful, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        """Rebuild the precomputed top of a date's leaderboard from its scores.
+
+        Writers call this for every date whose scores they changed, so that
+        implementations serving boards from a materialized copy stay current.
+        Implementations computing boards on every read may do nothing.
+
+        Args:
+            query: Date to rebuild the leaderboard for
+
+        Returns:
+            Result with the number of entries materialized, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def get_score_histogram(
+        self, query: GetScoreHistogramQuery
+    ) -> GetScoreHistogramResult:
+        """Get the distribution of a date's scores over the buckets of a scale.
+
+        Implementations keep the counts up to date as scores are written, or
+        derive them from already ranked scores, so a histogram costs time
+        proportional to the number of buckets rather than of scores.
+
+        Args:
+            query: Date and bucket scale of the histogram
+
+        Returns:
+            Result with a count for every bucket, or one of these errors:
+                - NotFoundStorageError: If the implementation has no counts for the date
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
@@ -2,14 +2,25 @@
 
 from returns.result import Success
 
+from app.storage.leaderboard.histogram import histogram_buckets
 from app.storage.leaderboard.interface import LeaderboardStorage
 from app.storage.leaderboard.models import (
+    MAX_LEADERBOARD_LIMIT,
     GetDailyLeaderboardQuery,
     GetDailyLeaderboardReply,
     GetDailyLeaderboardResult,
+    GetGroupLeaderboardQuery,
+    GetGroupLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramReply,
+    GetScoreHistogramResult,
     LeaderboardEntry,
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardReply,
+    RefreshDailyLeaderboardResult,
 )
 from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreKey
 
 
 class InMemoryLeaderboardStorage(LeaderboardStorage):
@@ -27,35 +38,61 @@ class InMemoryLeaderboardStorage(LeaderboardStorage):
         self, query: GetDailyLeaderboardQuery
     ) -> GetDailyLeaderboardResult:
         """Get daily leaderboard from in-memory storage."""
-        # Collect all scores for the given date
-        date_scores = []
-        for key, score_item in self.context.scores.items():
-            if key.date == query.date:
-                date_scores.append(score_item)
-
-        # Sort scores (lower is better)
-        sorted_scores = sorted(date_scores, key=lambda s: s.score)
-
-        # Store the total count before limiting
-        total_count = len(sorted_scores)
-
-        # Apply limit
-        limited_scores = sorted_scores[: query.limit]
-
-        # Format as leaderboard entries
-        entries = []
-        for rank, score_item in enumerate(limited_scores, start=1):
-            entries.append(
-                LeaderboardEntry(
-                    rank=rank,
-                    user_id=score_item.user_id,
-                    score=score_item.score,
-                )
+        # Lower scores are better (less time)
+        ranked, total_count = self.context.top_scores(query.date, query.limit)
+        entries = [
+            LeaderboardEntry(rank=rank, user_id=user_id, score=score)
+            for rank, (score, user_id) in enumerate(ranked, start=1)
+        ]
+        return Success(
+            GetDailyLeaderboardReply(
+                date=query.date, entries=entries, total_count=total_count
             )
+        )
 
-        # Return success result
+    def get_group_leaderboard(
+        self, query: GetGroupLeaderboardQuery
+    ) -> GetGroupLeaderboardResult:
+        """Rank a set of users by looking up each one's score of the date."""
+        scores = (
+            self.context.scores.get(DailyScoreKey(user_id=user_id, date=query.date))
+            for user_id in query.user_ids
+        )
+        ranked = sorted(
+            (item.score, item.user_id) for item in scores if item is not None
+        )
+        entries = [
+            LeaderboardEntry(rank=rank, user_id=user_id, score=score)
+            for rank, (score, user_id) in enumerate(ranked, start=1)
+        ]
         return Success(
             GetDailyLeaderboardReply(
-                date=query.date, entries=entries, total_count=total_count
+                date=query.date, entries=entries, total_count=len(entries)
+            )
+        )
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        """Report the leaderboard size; in-memory boards are computed on read."""
+        _, total_count = self.context.top_scores(query.date, 0)
+        return Success(
+            RefreshDailyLeaderboardReply(
+                entry_count=min(total_count, MAX_LEADERBOARD_LIMIT),
+                total_count=total_count,
+            )
+        )
+
+    def get_score_histogram(
+        self, query: GetScoreHistogramQuery
+    ) -> GetScoreHistogramResult:
+        """Get a score histogram from the counts kept up to date by writes."""
+        counts = self.context.score_histogram(query.date, query.scale)
+        return Success(
+            GetScoreHistogramReply(
+                date=query.date,
+                scale=query.scale,
+                buckets=histogram_buckets(query.scale, counts),
+                total_count=sum(counts),
             )
         )
@@ -1,6 +1,6 @@
 """Models for leaderboard storage operations."""
 
-from typing import List
+from typing import FrozenSet, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 from returns.result import Result
@@ -8,6 +8,11 @@ from returns.result import Result
 from app.core.error import StorageError
 from app.storage.models import Date, UserMetadataKey
 
+# Largest leaderboard a query may ask for, and so the size of materialized boards
+MAX_LEADERBOARD_LIMIT = 500
+# Most members a group board may have, the keys of one DynamoDB BatchGetItem
+MAX_GROUP_SIZE = 100
+
 
 class LeaderboardEntry(BaseModel):
     """A single entry in the leaderboard."""
@@ -32,7 +37,10 @@ class GetDailyLeaderboardQuery(BaseModel):
 
     date: Date = Field(..., description="Date in YYYY-MM-DD format")
     limit: int = Field(
-        default=100, ge=1, le=500, description="Maximum number of results to return"
+        default=100,
+        ge=1,
+        le=MAX_LEADERBOARD_LIMIT,
+        description="Maximum number of results to return",
     )
 
     model_config = ConfigDict(frozen=True)
@@ -53,3 +61,98 @@ class GetDailyLeaderboardReply(BaseModel):
 
 
 type GetDailyLeaderboardResult = Result[GetDailyLeaderboardReply, StorageError]
+
+
+class GetGroupLeaderboardQuery(BaseModel):
+    """Query parameters for ranking a set of users on a date."""
+
+    date: Date = Field(..., description="Date in YYYY-MM-DD format")
+    user_ids: FrozenSet[UserMetadataKey] = Field(
+        ...,
+        description="IDs of the users to rank",
+        min_length=1,
+        max_length=MAX_GROUP_SIZE,
+    )
+    group_id: Optional[str] = Field(
+        default=None,
+        description=(
+            "ID of the stored group the users are the members of, if any, so"
+            " caches can drop the board when the group is saved"
+        ),
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+# Group boards are ranked among the users with a score on the date; the total
+# count is the number of those users
+type GetGroupLeaderboardResult = Result[GetDailyLeaderboardReply, StorageError]
+
+
+class RefreshDailyLeaderboardQuery(BaseModel):
+    """Query parameters for rebuilding the materialized leaderboard of a date."""
+
+    date: Date = Field(..., description="Date in YYYY-MM-DD format")
+
+    model_config = ConfigDict(frozen=True)
+
+
+class RefreshDailyLeaderboardReply(BaseModel):
+    """Response data for refresh_daily_leaderboard operation."""
+
+    entry_count: int = Field(
+        ..., description="Number of top entries materialized for the date", ge=0
+    )
+    total_count: int = Field(
+        ..., description="Total number of entries in the leaderboard", ge=0
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type RefreshDailyLeaderboardResult = Result[RefreshDailyLeaderboardReply, StorageError]
+
+
+type HistogramScale = Literal["linear", "log"]
+
+
+class HistogramBucket(BaseModel):
+    """Number of scores of a date within one range of scores."""
+
+    lower: int = Field(..., description="Inclusive lower bound in seconds", ge=0)
+    upper: Optional[int] = Field(
+        None, description="Exclusive upper bound in seconds, None for the last bucket"
+    )
+    count: int = Field(..., description="Number of scores in the bucket", ge=0)
+
+    model_config = ConfigDict(frozen=True)
+
+
+class GetScoreHistogramQuery(BaseModel):
+    """Query parameters for getting the score distribution of a date."""
+
+    date: Date = Field(..., description="Date in YYYY-MM-DD format")
+    scale: HistogramScale = Field(
+        default="linear",
+        description="Fixed one-minute buckets, or log buckets doubling every 4",
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class GetScoreHistogramReply(BaseModel):
+    """Response data for get_score_histogram operation."""
+
+    date: Date = Field(..., description="Date of the histogram in YYYY-MM-DD format")
+    scale: HistogramScale = Field(..., description="Scale of the buckets")
+    buckets: List[HistogramBucket] = Field(
+        default_factory=list, description="Every bucket of the scale, in score order"
+    )
+    total_count: int = Field(
+        ..., description="Total number of scores for the date", ge=0
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type GetScoreHistogramResult = Result[GetScoreHistogramReply, StorageError]
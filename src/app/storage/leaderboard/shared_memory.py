@@ -0,0 +1,170 @@
+"""Shared-memory implementation of leaderboard storage."""
+
+from returns.result import Failure, Success
+
+from app.core.error import InternalStorageError, StorageOperationDetails
+from app.storage.leaderboard.histogram import LOWER_BOUNDS, histogram_buckets
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import (
+    MAX_LEADERBOARD_LIMIT,
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardReply,
+    GetDailyLeaderboardResult,
+    GetGroupLeaderboardQuery,
+    GetGroupLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramReply,
+    GetScoreHistogramResult,
+    LeaderboardEntry,
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardReply,
+    RefreshDailyLeaderboardResult,
+)
+from app.storage.memory_snapshot import SnapshotFormatError
+from app.storage.shared_memory_context import SharedMemoryStorageContext
+
+
+class SharedMemoryLeaderboardStorage(LeaderboardStorage):
+    """Shared-memory implementation of leaderboard storage.
+
+    Boards are read in place from the published snapshot, whose scores are
+    already ranked per date. Until a snapshot is published every board is
+    empty. On the writer, refresh_daily_leaderboard publishes its pending
+    changes; readers have none, so on them it only reports the board.
+    Histograms are counted by binary searching the ranked scores for each
+    bucket bound, so they cost O(buckets * log(scores)) and need no extra data.
+    Group boards look members up in a per-date index of the snapshot that each
+    reader builds the first time the date is asked for.
+    """
+
+    def __init__(self, context: SharedMemoryStorageContext) -> None:
+        """Initialize the shared-memory leaderboard storage.
+
+        Args:
+            context: Shared-memory storage context
+        """
+        self.context = context
+
+    def get_daily_leaderboard(
+        self, query: GetDailyLeaderboardQuery
+    ) -> GetDailyLeaderboardResult:
+        """Get daily leaderboard from the published snapshot."""
+        try:
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("get_daily_leaderboard", e))
+        if reader is None:
+            return Success(
+                GetDailyLeaderboardReply(date=query.date, entries=[], total_count=0)
+            )
+
+        entries = [
+            # The scores were validated before they were published
+            LeaderboardEntry.model_construct(
+                rank=rank, user_id=str(user_id), score=score
+            )
+            for rank, (user_id, score) in enumerate(
+                reader.ranked_scores(query.date, query.limit), start=1
+            )
+        ]
+        _, total_count = reader.date_ranges.get(query.date, (0, 0))
+        return Success(
+            GetDailyLeaderboardReply(
+                date=query.date, entries=entries, total_count=total_count
+            )
+        )
+
+    def get_group_leaderboard(
+        self, query: GetGroupLeaderboardQuery
+    ) -> GetGroupLeaderboardResult:
+        """Rank a set of users by their scores in the published snapshot.
+
+        Each member's score is looked up by binary search over the user
+        records and their scores, so the cost depends on the group's size
+        rather than on the number of solvers of the date.
+        """
+        try:
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("get_group_leaderboard", e))
+        if reader is None:
+            return Success(
+                GetDailyLeaderboardReply(date=query.date, entries=[], total_count=0)
+            )
+
+        scores = (
+            (reader.user_score(int(user_id), query.date), user_id)
+            for user_id in query.user_ids
+        )
+        ranked = sorted(
+            (score, user_id) for score, user_id in scores if score is not None
+        )
+        entries = [
+            LeaderboardEntry.model_construct(rank=rank, user_id=user_id, score=score)
+            for rank, (score, user_id) in enumerate(ranked, start=1)
+        ]
+        return Success(
+            GetDailyLeaderboardReply(
+                date=query.date, entries=entries, total_count=len(entries)
+            )
+        )
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        """Publish the writer's changes, once for all dates refreshed after them."""
+        try:
+            self.context.publish()
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("refresh_daily_leaderboard", e))
+        total_count = 0
+        if reader is not None:
+            _, total_count = reader.date_ranges.get(query.date, (0, 0))
+        return Success(
+            RefreshDailyLeaderboardReply(
+                entry_count=min(total_count, MAX_LEADERBOARD_LIMIT),
+                total_count=total_count,
+            )
+        )
+
+    def get_score_histogram(
+        self, query: GetScoreHistogramQuery
+    ) -> GetScoreHistogramResult:
+        """Get a score histogram from the ranked scores of the published snapshot."""
+        try:
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("get_score_histogram", e))
+        # Position of each bucket's first score in the ranked scores, ending
+        # with the score count; the first bucket also holds negative scores
+        bounds = LOWER_BOUNDS[query.scale][1:]
+        total_count = 0
+        starts = [0] * (len(bounds) + 2)
+        if reader is not None:
+            _, total_count = reader.date_ranges.get(query.date, (0, 0))
+            starts = [
+                0,
+                *(reader.count_scores_below(query.date, bound) for bound in bounds),
+                total_count,
+            ]
+        counts = [end - start for start, end in zip(starts, starts[1:])]
+        return Success(
+            GetScoreHistogramReply(
+                date=query.date,
+                scale=query.scale,
+                buckets=histogram_buckets(query.scale, counts),
+                total_count=total_count,
+            )
+        )
+
+    def _error(self, operation: str, error: Exception) -> InternalStorageError:
+        """Build the error reported when the snapshot can't be read or written."""
+        return InternalStorageError(
+            details=StorageOperationDetails(
+                operation=operation,
+                resource_type=LeaderboardEntry.__name__,
+                raw_error=str(error),
+            ),
+            service_name=self.__class__.__name__,
+        )
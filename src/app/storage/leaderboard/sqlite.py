@@ -0,0 +1,188 @@
+"""SQLite implementation of leaderboard storage."""
+
+import sqlite3
+
+from returns.result import Failure, Success
+
+from app.storage.leaderboard.histogram import empty_counts, histogram_buckets
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import (
+    MAX_LEADERBOARD_LIMIT,
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardReply,
+    GetDailyLeaderboardResult,
+    GetGroupLeaderboardQuery,
+    GetGroupLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramReply,
+    GetScoreHistogramResult,
+    LeaderboardEntry,
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardReply,
+    RefreshDailyLeaderboardResult,
+)
+from app.storage.sqlite_context import (
+    SqliteStorageContext,
+    storage_error_from_exception,
+)
+
+
+class SqliteLeaderboardStorage(LeaderboardStorage):
+    """SQLite implementation of leaderboard storage.
+
+    Boards are read in rank order straight from the covering (date, score,
+    user_id) index, so they are computed on every read without materializing.
+    Histograms are read from per-bucket counts that triggers on daily_scores
+    keep up to date.
+    """
+
+    def __init__(self, context: SqliteStorageContext) -> None:
+        """Initialize the SQLite leaderboard storage.
+
+        Args:
+            context: Shared SQLite storage context
+        """
+        self.context = context
+
+    def get_daily_leaderboard(
+        self, query: GetDailyLeaderboardQuery
+    ) -> GetDailyLeaderboardResult:
+        """Get daily leaderboard from SQLite."""
+        try:
+            connection = self.context.connection()
+            # Lower scores are better (less time), so use ascending sort
+            rows = connection.execute(
+                "SELECT user_id, score FROM daily_scores WHERE date = ?"
+                " ORDER BY score, user_id LIMIT ?",
+                (query.date, query.limit),
+            ).fetchall()
+            total_count = len(rows)
+            if total_count == query.limit:
+                total_count = self._count(query.date)
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_daily_leaderboard",
+                    resource_type=LeaderboardEntry.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        entries = [
+            LeaderboardEntry(rank=rank, user_id=user_id, score=score)
+            for rank, (user_id, score) in enumerate(rows, start=1)
+        ]
+        return Success(
+            GetDailyLeaderboardReply(
+                date=query.date, entries=entries, total_count=total_count
+            )
+        )
+
+    def get_group_leaderboard(
+        self, query: GetGroupLeaderboardQuery
+    ) -> GetGroupLeaderboardResult:
+        """Rank a set of users with one primary key lookup per user."""
+        user_ids = sorted(query.user_ids)
+        placeholders = ", ".join("(?)" for _ in user_ids)
+        try:
+            # CROSS JOIN keeps the member list as the outer loop, so each
+            # member is one (user_id, date) primary key seek rather than SQLite
+            # scanning the date's whole index range
+            rows = (
+                self.context.connection()
+                .execute(
+                    f"SELECT scores.user_id, scores.score FROM (VALUES {placeholders})"
+                    " AS members CROSS JOIN daily_scores AS scores"
+                    " ON scores.user_id = members.column1 AND scores.date = ?"
+                    " ORDER BY scores.score, scores.user_id",
+                    (*user_ids, query.date),
+                )
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_group_leaderboard",
+                    resource_type=LeaderboardEntry.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        entries = [
+            LeaderboardEntry(rank=rank, user_id=user_id, score=score)
+            for rank, (user_id, score) in enumerate(rows, start=1)
+        ]
+        return Success(
+            GetDailyLeaderboardReply(
+                date=query.date, entries=entries, total_count=len(entries)
+            )
+        )
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        """Report the leaderboard size; SQLite boards are computed on read."""
+        try:
+            total_count = self._count(query.date)
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="refresh_daily_leaderboard",
+                    resource_type=LeaderboardEntry.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(
+            RefreshDailyLeaderboardReply(
+                entry_count=min(total_count, MAX_LEADERBOARD_LIMIT),
+                total_count=total_count,
+            )
+        )
+
+    def get_score_histogram(
+        self, query: GetScoreHistogramQuery
+    ) -> GetScoreHistogramResult:
+        """Get a score histogram from the trigger-maintained bucket counts."""
+        counts = empty_counts(query.scale)
+        try:
+            rows = (
+                self.context.connection()
+                .execute(
+                    "SELECT bucket, count FROM score_histograms"
+                    " WHERE date = ? AND scale = ?",
+                    (query.date, query.scale),
+                )
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_score_histogram",
+                    resource_type=LeaderboardEntry.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        for bucket, count in rows:
+            counts[bucket] = count
+        return Success(
+            GetScoreHistogramReply(
+                date=query.date,
+                scale=query.scale,
+                buckets=histogram_buckets(query.scale, counts),
+                total_count=sum(counts),
+            )
+        )
+
+    def _count(self, date: str) -> int:
+        """Count the scores of a date using the date index."""
+        row = (
+            self.context.connection()
+            .execute("SELECT COUNT(*) FROM daily_scores WHERE date = ?", (date,))
+            .fetchone()
+        )
+        return int(row[0])
@@ -1,13 +1,166 @@
 """In-memory storage context for testing purposes."""
 
-from typing import Dict
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from app.storage.groups.models import GroupItem, GroupKey
+from app.storage.leaderboard.histogram import LOWER_BOUNDS, bucket_index, empty_counts
+from app.storage.leaderboard.models import HistogramScale
 from app.storage.models import (
     DailyScoreItem,
     DailyScoreKey,
     UserMetadataItem,
     UserMetadataKey,
 )
+from app.storage.streaks import solved_bit
+
+# Pending scores merged by insertion below this count, by a re-sort above it
+MAX_INSERTION_MERGE = 64
+
+# Changes the in-memory change feed keeps; older ones are dropped
+MAX_SCORE_CHANGES = 100_000
+
+
+class RankedScores:
+    """The scores of one date, published in rank order as immutable snapshots.
+
+    Writes hold the context's lock: they're recorded in a pending map in O(1)
+    and merged into a new ranked tuple by publish, which the context calls
+    once per date at the end of each save, so a burst of writes costs one
+    merge rather than an ordered insert each. The new tuple replaces the
+    published one in a single assignment (copy-on-write), so readers take no
+    lock and never see a partial merge. The per-bucket counts of every
+    histogram scale are published the same way.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty date."""
+        # (score, user ID) pairs in rank order, lower scores first, as of the
+        # last publish; replaced, never modified
+        self.ranked: Tuple[Tuple[int, str], ...] = ()
+        # Map from histogram scale to the number of scores in each bucket, as
+        # of the last publish; replaced, never modified
+        self.histograms: Dict[HistogramScale, Tuple[int, ...]] = {
+            scale: tuple(empty_counts(scale)) for scale in LOWER_BOUNDS
+        }
+        # Map from user ID to a score not published yet
+        self.pending: Dict[str, int] = {}
+        # Map from user ID to the published score a pending score replaces
+        self.replaced: Dict[str, int] = {}
+        # Map from histogram scale to the current number of scores per bucket
+        self.counts: Dict[HistogramScale, List[int]] = {
+            scale: empty_counts(scale) for scale in LOWER_BOUNDS
+        }
+
+    def put(self, user_id: str, score: int, previous: Optional[int]) -> None:
+        """Record a user's score, replacing their previous one if any.
+
+        The caller must hold the context's lock, and call publish afterwards.
+        """
+        if previous is not None and user_id not in self.pending:
+            self.replaced[user_id] = previous
+        self.pending[user_id] = score
+        if score != previous:
+            for scale, counts in self.counts.items():
+                if previous is not None:
+                    counts[bucket_index(scale, previous)] -= 1
+                counts[bucket_index(scale, score)] += 1
+
+    def publish(self) -> None:
+        """Publish the pending scores; the caller must hold the context's lock."""
+        if not self.pending:
+            return
+        merged = sorted((score, user_id) for user_id, score in self.pending.items())
+        if len(merged) <= MAX_INSERTION_MERGE:
+            ranked = list(self.ranked)
+            for user_id, previous in self.replaced.items():
+                del ranked[bisect.bisect_left(ranked, (previous, user_id))]
+            for entry in merged:
+                bisect.insort(ranked, entry)
+        else:
+            stale = {(previous, user_id) for user_id, previous in self.replaced.items()}
+            ranked = [entry for entry in self.ranked if entry not in stale]
+            # Timsort merges the sorted run and the new one in linear time
+            ranked.extend(merged)
+            ranked.sort()
+        self.ranked = tuple(ranked)
+        self.histograms = {
+            scale: tuple(counts) for scale, counts in self.counts.items()
+        }
+        self.pending.clear()
+        self.replaced.clear()
+
+    def top(self, limit: int) -> Tuple[List[Tuple[int, str]], int]:
+        """Return the first `limit` (score, user ID) pairs and the total count."""
+        ranked = self.ranked
+        return list(ranked[:limit]), len(ranked)
+
+    def after(
+        self, entry: Optional[Tuple[int, str]], limit: int
+    ) -> List[Tuple[int, str]]:
+        """Return up to `limit` (score, user ID) pairs ranked after entry."""
+        ranked = self.ranked
+        start = 0 if entry is None else bisect.bisect_right(ranked, entry)
+        return list(ranked[start : start + limit])
+
+    def histogram(self, scale: HistogramScale) -> List[int]:
+        """Return a copy of the number of scores in each bucket of a scale."""
+        return list(self.histograms[scale])
+
+
+class UserScores:
+    """One user's scores as parallel arrays sorted by date, and their bitmap.
+
+    Scores mostly arrive in date order, so a save is usually an append. Every
+    user gets one of these, so it's kept small: slots rather than an instance
+    dict, and the solved-day bitmap as one int, shifted so its bit 0 is the
+    user's earliest solved day rather than the first puzzle.
+    """
+
+    __slots__ = ("dates", "scores", "solved", "solved_offset")
+
+    def __init__(self) -> None:
+        """Initialize a user without scores."""
+        # Dates in ascending order, and the score of each date
+        self.dates: List[str] = []
+        self.scores: List[int] = []
+        # Solved-day bitmap, whose bit i is bit solved_offset + i of the full one
+        self.solved = 0
+        self.solved_offset = 0
+
+    def put(self, date: str, score: int) -> None:
+        """Record the score of a date, replacing the date's previous score."""
+        dates = self.dates
+        if not dates or date > dates[-1]:
+            dates.append(date)
+            self.scores.append(score)
+        else:
+            index = bisect.bisect_left(dates, date)
+            if dates[index] == date:
+                self.scores[index] = score
+                return
+            dates.insert(index, date)
+            self.scores.insert(index, score)
+        self.set_solved(date)
+
+    def set_solved(self, date: str) -> None:
+        """Set the bit of a date in the solved-day bitmap, if it has one."""
+        bit = solved_bit(date)
+        if bit is None:
+            return
+        if not self.solved:
+            self.solved_offset = bit
+        elif bit < self.solved_offset:
+            self.solved <<= self.solved_offset - bit
+            self.solved_offset = bit
+        self.solved |= 1 << (bit - self.solved_offset)
+
+    def window(self, start_date: str, end_date: str) -> Tuple[List[str], List[int]]:
+        """Copy the dates and scores from start_date to end_date, inclusive."""
+        start = bisect.bisect_left(self.dates, start_date)
+        end = bisect.bisect_right(self.dates, end_date)
+        return self.dates[start:end], self.scores[start:end]
 
 
 class InMemoryStorageContext:
@@ -16,17 +169,205 @@ class InMemoryStorageContext:
     This context maintains shared state across different in-memory storage
     implementations, simulating a real database where different storage components
     may interact with the same underlying data.
+
+    The context is safe to share between threads. Writers are serialized by
+    `lock`, and scores are also partitioned by date into RankedScores, each
+    publishing an immutable ranked snapshot, so a leaderboard read takes no
+    lock, copies the top of an already ranked tuple and never iterates over a
+    dict that a writer may be resizing. Writes must go through save_scores and
+    hold `lock` to modify `users` or `groups`; plain lookups in any dict need
+    no lock.
     """
 
     def __init__(self) -> None:
         """Initialize the in-memory storage context."""
+        self.lock = threading.Lock()
+
         # Map from user_id to UserMetadataItem
         self.users: Dict[UserMetadataKey, UserMetadataItem] = {}
 
         # Map from ScoreKey to DailyScoreItem
         self.scores: Dict[DailyScoreKey, DailyScoreItem] = {}
 
+        # Map from date to the ranked scores of that date
+        self.scores_by_date: Dict[str, RankedScores] = {}
+
+        # Map from group_id to GroupItem
+        self.groups: Dict[GroupKey, GroupItem] = {}
+
+        # Map from user_id to the user's scores sorted by date
+        self.scores_by_user: Dict[UserMetadataKey, UserScores] = {}
+
+        # Change feed of daily scores: the (user ID, date, old score, new score)
+        # of the change with sequence first_change_sequence + i is at index i.
+        # Only the latest MAX_SCORE_CHANGES or so are kept.
+        self.score_changes: List[Tuple[str, str, Optional[int], int]] = []
+        self.first_change_sequence = 1
+
+        # Last user ID an interrupted update sweep processed
+        self.sweep_cursor: Optional[UserMetadataKey] = None
+
+        # Map from user_id to the Unix time of the user's last refresh claim
+        self.refresh_claims: Dict[UserMetadataKey, float] = {}
+
+    def save_scores(self, items: Iterable[DailyScoreItem]) -> List[DailyScoreItem]:
+        """Save daily scores, replacing any existing score of the same key.
+
+        Each score created or changed is appended to the change feed.
+
+        Returns:
+            The scores created or changed
+        """
+        changed = []
+        with self.lock:
+            touched: Dict[str, RankedScores] = {}
+            for item in items:
+                key = item.key
+                previous = self.scores.get(key)
+                self.scores[key] = item
+                old_score = previous.score if previous is not None else None
+                if old_score != item.score:
+                    changed.append(item)
+                    self.score_changes.append(
+                        (item.user_id, item.date, old_score, item.score)
+                    )
+                    if len(self.score_changes) > MAX_SCORE_CHANGES:
+                        # Drop a tenth at once, so trimming is rare
+                        dropped = MAX_SCORE_CHANGES // 10 + 1
+                        del self.score_changes[:dropped]
+                        self.first_change_sequence += dropped
+                partition = self.scores_by_date.get(item.date)
+                if partition is None:
+                    partition = self.scores_by_date[item.date] = RankedScores()
+                partition.put(item.user_id, item.score, old_score)
+                touched[item.date] = partition
+                user_scores = self.scores_by_user.get(item.user_id)
+                if user_scores is None:
+                    user_scores = self.scores_by_user[item.user_id] = UserScores()
+                user_scores.put(item.date, item.score)
+            for partition in touched.values():
+                partition.publish()
+        return changed
+
+    def score_history(
+        self, user_id: UserMetadataKey, start_date: str, end_date: str
+    ) -> Tuple[List[str], List[int]]:
+        """Get a user's dates and scores in a date window, sorted by date.
+
+        Args:
+            user_id: ID of the user
+            start_date: First date to include, in YYYY-MM-DD format
+            end_date: Last date to include, in YYYY-MM-DD format
+
+        Returns:
+            The dates in ascending order, and the score of each date
+        """
+        with self.lock:
+            user_scores = self.scores_by_user.get(user_id)
+            if user_scores is None:
+                return [], []
+            return user_scores.window(start_date, end_date)
+
+    def changes_after(
+        self, after_sequence: int, limit: int
+    ) -> Tuple[int, List[Tuple[str, str, Optional[int], int]]]:
+        """Get up to `limit` changes of the feed following a sequence number.
+
+        Returns:
+            The sequence of the first change returned, which is after_sequence
+            + 1 unless that change was dropped, and the changes in sequence order
+        """
+        with self.lock:
+            start = max(after_sequence + 1 - self.first_change_sequence, 0)
+            return (
+                self.first_change_sequence + start,
+                self.score_changes[start : start + limit],
+            )
+
+    def solved_bitmap(self, user_id: UserMetadataKey) -> int:
+        """Get the bitmap of days a user has a score for."""
+        user_scores = self.scores_by_user.get(user_id)
+        if user_scores is None:
+            return 0
+        with self.lock:
+            return user_scores.solved << user_scores.solved_offset
+
+    def rebuild_solved_days(self) -> int:
+        """Rebuild every user's solved-day bitmap from the scores in one pass.
+
+        Returns:
+            The number of users with a bitmap
+        """
+        with self.lock:
+            for user_scores in self.scores_by_user.values():
+                user_scores.solved = 0
+            for key in self.scores:
+                self.scores_by_user[key.user_id].set_solved(key.date)
+            return sum(
+                1 for user_scores in self.scores_by_user.values() if user_scores.solved
+            )
+
+    def top_scores(self, date: str, limit: int) -> Tuple[List[Tuple[int, str]], int]:
+        """Get the best (score, user ID) pairs of a date and its score count.
+
+        Args:
+            date: Date in YYYY-MM-DD format
+            limit: Maximum number of pairs to return
+
+        Returns:
+            Up to `limit` pairs in rank order, lower scores first with ties
+            broken by user ID, and the total number of scores for the date
+        """
+        partition = self.scores_by_date.get(date)
+        if partition is None:
+            return [], 0
+        return partition.top(limit)
+
+    def scores_after(
+        self, date: str, entry: Optional[Tuple[int, str]], limit: int
+    ) -> List[Tuple[int, str]]:
+        """Get up to `limit` (score, user ID) pairs of a date ranked after entry.
+
+        Args:
+            date: Date in YYYY-MM-DD format
+            entry: Pair to continue after, or None to start from the best score
+            limit: Maximum number of pairs to return
+        """
+        partition = self.scores_by_date.get(date)
+        if partition is None:
+            return []
+        return partition.after(entry, limit)
+
+    def score_histogram(self, date: str, scale: HistogramScale) -> List[int]:
+        """Get the number of scores of a date in each bucket of a scale.
+
+        Args:
+            date: Date in YYYY-MM-DD format
+            scale: Histogram scale whose buckets to count
+
+        Returns:
+            One count per bucket of the scale, in bucket order
+        """
+        partition = self.scores_by_date.get(date)
+        if partition is None:
+            return empty_counts(scale)
+        return partition.histogram(scale)
+
+    def dates(self) -> List[str]:
+        """Get the dates that have scores, in ascending order."""
+        with self.lock:
+            dates = list(self.scores_by_date)
+        return sorted(dates)
+
     def clear(self) -> None:
         """Clear all data in the storage context."""
-        self.users.clear()
-        self.scores.clear()
+        with self.lock:
+            self.users.clear()
+            self.scores.clear()
+            self.scores_by_date.clear()
+            self.groups.clear()
+            self.scores_by_user.clear()
+            self.score_changes.clear()
+            self.first_change_sequence = 1
+            self.sweep_cursor = None
+            self.refresh_claims.clear()
@@ -0,0 +1,417 @@
+"""Versioned binary snapshots of the in-memory storage context.
+
+A snapshot is a little-endian file laid out as:
+
+    header       MAGIC, format version, user count, scorer count, date count,
+                 score count, group count, group member count
+    users        one USER_RECORD per user with metadata, in user ID order
+    scorers      one SCORER_RECORD per user with scores, in user ID order,
+                 locating their user scores
+    dates        one DATE_RECORD per date, in date order, locating its scores
+    scores       one SCORE_RECORD per score, grouped by date in date order and
+                 ranked by (score, user ID) within each date
+    user scores  one USER_SCORE_RECORD per score, grouped by scorer in user
+                 ID order and in date order within each scorer
+    groups       one GROUP_RECORD per group, in group ID order, locating its
+                 members
+    members      one GROUP_MEMBER_RECORD per group member, grouped by group in
+                 group ID order and in user ID order within each group
+
+Every record has a fixed size, so a snapshot can be memory-mapped and read in
+place: SnapshotReader gives direct access to a date's ranked scores and to a
+user's scores by date without loading the rest of the file, and load_snapshot
+rebuilds a whole context.
+User IDs are at most 12 digits and are stored as unsigned 64-bit integers.
+"""
+
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from app.storage.groups.models import GroupItem
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import (
+    DailyScoreItem,
+    UserMetadataItem,
+    UserMetadataKey,
+)
+
+MAGIC = b"NYTXSNAP"
+# Bumped whenever the layout changes; older snapshots are rejected
+FORMAT_VERSION = 3
+
+HEADER = struct.Struct("<8sHxxIIIIII")
+# user ID, last fetched timestamp, puzzles attempted, puzzles solved, streak
+USER_RECORD = struct.Struct("<QqIII")
+# user ID, index of the user's first user score, number of user scores
+SCORER_RECORD = struct.Struct("<QII")
+# date, index of its first score, number of scores
+DATE_RECORD = struct.Struct("<10sxxII")
+# user ID, score
+SCORE_RECORD = struct.Struct("<Qi")
+# date, score
+USER_SCORE_RECORD = struct.Struct("<10sxxi")
+# group ID, NUL-padded, index of its first member, number of members
+GROUP_RECORD = struct.Struct("<64sII")
+# user ID
+GROUP_MEMBER_RECORD = struct.Struct("<Q")
+
+type SnapshotPath = Union[str, os.PathLike[str]]
+
+
+class SnapshotFormatError(ValueError):
+    """Raised when a file isn't a snapshot this version can read."""
+
+
+def dump_snapshot(context: InMemoryStorageContext, path: SnapshotPath) -> None:
+    """Write the context's users, scores and groups to a snapshot file.
+
+    The file is written next to path and moved into place, so readers never
+    see a partially written snapshot.
+
+    Args:
+        context: Context to snapshot
+        path: Path of the snapshot file to create or replace
+    """
+    # Copy under the writer lock so concurrent saves can't resize the dicts
+    with context.lock:
+        users = dict(context.users)
+        scores = list(context.scores.values())
+        groups = dict(context.groups)
+
+    scores_by_date: Dict[str, List[Tuple[int, int]]] = {}
+    scores_by_user: Dict[int, List[Tuple[str, int]]] = {}
+    for score in scores:
+        scores_by_date.setdefault(score.date, []).append(
+            (score.score, int(score.user_id))
+        )
+        scores_by_user.setdefault(int(score.user_id), []).append(
+            (score.date, score.score)
+        )
+
+    user_ids = sorted(int(user_id) for user_id in users)
+    scorer_ids = sorted(scores_by_user)
+    group_ids = sorted(groups)
+    parts = [
+        HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            len(users),
+            len(scorer_ids),
+            len(scores_by_date),
+            len(scores),
+            len(groups),
+            sum(len(group.user_ids) for group in groups.values()),
+        )
+    ]
+    for user_id in user_ids:
+        user = users[str(user_id)]
+        parts.append(
+            USER_RECORD.pack(
+                user_id,
+                user.last_fetched_timestamp,
+                user.puzzles_attempted,
+                user.puzzles_solved,
+                user.current_streak,
+            )
+        )
+    start = 0
+    for user_id in scorer_ids:
+        count = len(scores_by_user[user_id])
+        parts.append(SCORER_RECORD.pack(user_id, start, count))
+        start += count
+
+    dates = sorted(scores_by_date)
+    start = 0
+    for date in dates:
+        count = len(scores_by_date[date])
+        parts.append(DATE_RECORD.pack(date.encode("ascii"), start, count))
+        start += count
+    for date in dates:
+        parts.extend(
+            SCORE_RECORD.pack(user_id, score)
+            for score, user_id in sorted(scores_by_date[date])
+        )
+    for user_id in scorer_ids:
+        parts.extend(
+            USER_SCORE_RECORD.pack(date.encode("ascii"), score)
+            for date, score in sorted(scores_by_user[user_id])
+        )
+    start = 0
+    for group_id in group_ids:
+        count = len(groups[group_id].user_ids)
+        parts.append(GROUP_RECORD.pack(group_id.encode("ascii"), start, count))
+        start += count
+    for group_id in group_ids:
+        parts.extend(
+            GROUP_MEMBER_RECORD.pack(user_id)
+            for user_id in sorted(int(member) for member in groups[group_id].user_ids)
+        )
+
+    temp_path = Path(f"{os.fspath(path)}.tmp")
+    temp_path.write_bytes(b"".join(parts))
+    os.replace(temp_path, path)
+
+
+class SnapshotReader:
+    """Memory-mapped, read-only view of a snapshot file."""
+
+    def __init__(self, path: SnapshotPath) -> None:
+        """Map a snapshot file and index its dates.
+
+        Args:
+            path: Path of the snapshot file
+
+        Raises:
+            SnapshotFormatError: If the file isn't a readable snapshot
+        """
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buffer) < HEADER.size:
+            raise SnapshotFormatError(f"{path} is too short to be a snapshot")
+        (
+            magic,
+            version,
+            self.user_count,
+            self.scorer_count,
+            self.date_count,
+            self.score_count,
+            self.group_count,
+            self.group_member_count,
+        ) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise SnapshotFormatError(f"{path} is not a snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotFormatError(
+                f"{path} has snapshot format {version}, expected {FORMAT_VERSION}"
+            )
+        self.users_offset = HEADER.size
+        self.scorers_offset = self.users_offset + self.user_count * USER_RECORD.size
+        self.dates_offset = self.scorers_offset + self.scorer_count * SCORER_RECORD.size
+        self.scores_offset = self.dates_offset + self.date_count * DATE_RECORD.size
+        self.user_scores_offset = (
+            self.scores_offset + self.score_count * SCORE_RECORD.size
+        )
+        # Every score is listed once by date and once by user
+        self.groups_offset = (
+            self.user_scores_offset + self.score_count * USER_SCORE_RECORD.size
+        )
+        self.group_members_offset = (
+            self.groups_offset + self.group_count * GROUP_RECORD.size
+        )
+        expected_size = (
+            self.group_members_offset
+            + self.group_member_count * GROUP_MEMBER_RECORD.size
+        )
+        if len(self.buffer) != expected_size:
+            raise SnapshotFormatError(
+                f"{path} is {len(self.buffer)} bytes, expected {expected_size}"
+            )
+
+        # Map from date to the index of its first score and its score count
+        self.date_ranges: Dict[str, Tuple[int, int]] = {
+            date.decode("ascii"): (start, count)
+            for date, start, count in DATE_RECORD.iter_unpack(
+                self.buffer[self.dates_offset : self.scores_offset]
+            )
+        }
+
+    def users(self) -> Iterator[Tuple[int, int, int, int, int]]:
+        """Iterate over the raw user records."""
+        return USER_RECORD.iter_unpack(
+            self.buffer[self.users_offset : self.scorers_offset]
+        )
+
+    def user(self, user_id: int) -> Optional[Tuple[int, int, int, int, int]]:
+        """Find a user's raw record by binary search, or None if there is none."""
+        low, high = 0, self.user_count
+        while low < high:
+            middle = (low + high) // 2
+            record: Tuple[int, int, int, int, int] = USER_RECORD.unpack_from(
+                self.buffer, self.users_offset + middle * USER_RECORD.size
+            )
+            if record[0] == user_id:
+                return record
+            if record[0] < user_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def user_scores(
+        self, user_id: int, start_date: str = "", end_date: str = "9999-12-31"
+    ) -> Tuple[List[str], List[int]]:
+        """Get a user's dates and scores in a date window, sorted by date.
+
+        Args:
+            user_id: ID of the user
+            start_date: First date to include, in YYYY-MM-DD format
+            end_date: Last date to include, in YYYY-MM-DD format
+
+        Returns:
+            The dates in ascending order, and the score of each date
+        """
+        start, count = self._scorer_range(user_id)
+        offset = self.user_scores_offset + start * USER_SCORE_RECORD.size
+        dates: List[str] = []
+        scores: List[int] = []
+        for date, score in USER_SCORE_RECORD.iter_unpack(
+            self.buffer[offset : offset + count * USER_SCORE_RECORD.size]
+        ):
+            day = date.decode("ascii")
+            if start_date <= day <= end_date:
+                dates.append(day)
+                scores.append(score)
+        return dates, scores
+
+    def user_score(self, user_id: int, date: str) -> Optional[int]:
+        """Get a user's score on a date, or None if they have none.
+
+        The user's scorer record and then the date among their scores are
+        found by binary search, so a lookup costs O(log scorers + log days).
+        """
+        start, count = self._scorer_range(user_id)
+        key = date.encode("ascii")
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            day, score = USER_SCORE_RECORD.unpack_from(
+                self.buffer,
+                self.user_scores_offset + (start + middle) * USER_SCORE_RECORD.size,
+            )
+            if day == key:
+                return int(score)
+            if day < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def ranked_scores(self, date: str, limit: int = -1) -> Iterator[Tuple[int, int]]:
+        """Iterate over the (user ID, score) pairs of a date in rank order.
+
+        Args:
+            date: Date in YYYY-MM-DD format
+            limit: Maximum number of pairs, or -1 for all of them
+        """
+        start, count = self.date_ranges.get(date, (0, 0))
+        if limit >= 0:
+            count = min(count, limit)
+        offset = self.scores_offset + start * SCORE_RECORD.size
+        return SCORE_RECORD.iter_unpack(
+            self.buffer[offset : offset + count * SCORE_RECORD.size]
+        )
+
+    def ranked_scores_after(
+        self, date: str, entry: Tuple[int, int], limit: int
+    ) -> Iterator[Tuple[int, int]]:
+        """Iterate over up to `limit` (user ID, score) pairs ranked after entry.
+
+        Args:
+            date: Date in YYYY-MM-DD format
+            entry: (score, user ID) of the last pair already read
+            limit: Maximum number of pairs
+        """
+        start, count = self.date_ranges.get(date, (0, 0))
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self.scores_offset + (start + middle) * SCORE_RECORD.size
+            user_id, score = SCORE_RECORD.unpack_from(self.buffer, offset)
+            if (score, user_id) <= entry:
+                low = middle + 1
+            else:
+                high = middle
+        offset = self.scores_offset + (start + low) * SCORE_RECORD.size
+        end = offset + min(limit, count - low) * SCORE_RECORD.size
+        return SCORE_RECORD.iter_unpack(self.buffer[offset:end])
+
+    def count_scores_below(self, date: str, bound: int) -> int:
+        """Count the scores of a date lower than bound by binary search."""
+        start, count = self.date_ranges.get(date, (0, 0))
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self.scores_offset + (start + middle) * SCORE_RECORD.size
+            _, score = SCORE_RECORD.unpack_from(self.buffer, offset)
+            if score < bound:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def groups(self) -> Iterator[Tuple[str, List[int]]]:
+        """Iterate over the groups' IDs and member user IDs, in group ID order."""
+        for group_id, start, count in GROUP_RECORD.iter_unpack(
+            self.buffer[self.groups_offset : self.group_members_offset]
+        ):
+            offset = self.group_members_offset + start * GROUP_MEMBER_RECORD.size
+            members = GROUP_MEMBER_RECORD.iter_unpack(
+                self.buffer[offset : offset + count * GROUP_MEMBER_RECORD.size]
+            )
+            yield group_id.rstrip(b"\0").decode("ascii"), [m for (m,) in members]
+
+    def _scorer_range(self, user_id: int) -> Tuple[int, int]:
+        """Find the index of a user's first user score and their score count."""
+        low, high = 0, self.scorer_count
+        while low < high:
+            middle = (low + high) // 2
+            scorer_id, start, count = SCORER_RECORD.unpack_from(
+                self.buffer, self.scorers_offset + middle * SCORER_RECORD.size
+            )
+            if scorer_id == user_id:
+                return start, count
+            if scorer_id < user_id:
+                low = middle + 1
+            else:
+                high = middle
+        return 0, 0
+
+    def close(self) -> None:
+        """Unmap the snapshot file."""
+        self.buffer.close()
+
+
+def load_snapshot(path: SnapshotPath) -> InMemoryStorageContext:
+    """Build an in-memory context from a snapshot file.
+
+    Records were validated when the snapshot was written, so models are built
+    with model_construct instead of being validated again.
+
+    Args:
+        path: Path of the snapshot file
+
+    Returns:
+        A new context holding the snapshot's users, scores and groups
+
+    Raises:
+        SnapshotFormatError: If the file isn't a readable snapshot
+    """
+    reader = SnapshotReader(path)
+    try:
+        context = InMemoryStorageContext()
+        users: Dict[UserMetadataKey, UserMetadataItem] = context.users
+        for user_id, fetched, attempted, solved, streak in reader.users():
+            key = str(user_id)
+            users[key] = UserMetadataItem.model_construct(
+                user_id=key,
+                last_fetched_timestamp=fetched,
+                puzzles_attempted=attempted,
+                puzzles_solved=solved,
+                current_streak=streak,
+            )
+        context.save_scores(
+            DailyScoreItem.model_construct(user_id=str(user_id), date=date, score=score)
+            for date in reader.date_ranges
+            for user_id, score in reader.ranked_scores(date)
+        )
+        for group_id, members in reader.groups():
+            context.groups[group_id] = GroupItem.model_construct(
+                group_id=group_id,
+                user_ids=frozenset(str(user_id) for user_id in members),
+            )
+        return context
+    finally:
+        reader.close()
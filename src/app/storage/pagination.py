@@ -0,0 +1,46 @@
+"""Opaque pagination cursors shared by the storage implementations.
+
+Each implementation chooses what a cursor records, e.g. the last key it
+returned, and passes it through these helpers so callers only ever see an
+opaque URL-safe string to hand back for the next page.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any
+
+from app.core.error import InvalidArgumentStorageError, StorageOperationDetails
+
+
+def encode_cursor(position: Any) -> str:
+    """Encode a JSON-serializable position as an opaque cursor."""
+    data = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    """Decode a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor wasn't made by encode_cursor
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Malformed cursor: {cursor!r}") from e
+
+
+def invalid_cursor_error(
+    cursor: str, operation: str, resource_type: str, service_name: str
+) -> InvalidArgumentStorageError:
+    """Build the error returned for a cursor an implementation can't resume from."""
+    return InvalidArgumentStorageError(
+        details=StorageOperationDetails(
+            operation=operation,
+            resource_type=resource_type,
+            raw_error=f"Invalid cursor: {cursor!r}",
+        ),
+        service_name=service_name,
+    )
@@ -0,0 +1,99 @@
+"""Shared-memory storage context shared by the shared-memory storage implementations.
+
+One writer process owns the data in an InMemoryStorageContext and publishes it
+as a snapshot file (see memory_snapshot) on a tmpfs such as /dev/shm. Any
+number of reader processes, e.g. uvicorn workers, map the published file
+read-only, so the kernel shares its pages between them: memory stays flat as
+workers are added and every worker serves the same boards. Publishing replaces
+the file atomically and readers remap it when they see a new one.
+
+Only one process may be the writer: a second one would publish its own copy
+over the first one's, dropping its writes. Every other process only reads.
+"""
+
+import os
+import threading
+from typing import Optional, Tuple
+
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.memory_snapshot import SnapshotReader, dump_snapshot, load_snapshot
+
+
+class SharedMemoryStorageContext:
+    """Shared-memory storage context for one published snapshot file.
+
+    Readers only use current_reader. The writer also holds a working copy,
+    loaded from the published file when the context is created; readers never
+    hold a private copy of the data.
+    """
+
+    def __init__(self, path: str, writer: bool = False) -> None:
+        """Initialize the shared-memory storage context.
+
+        Args:
+            path: Path of the published snapshot, normally under /dev/shm
+            writer: Whether this is the one process that writes and publishes
+
+        Raises:
+            SnapshotFormatError: If the writer's published file isn't a
+                readable snapshot
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.reader: Optional[SnapshotReader] = None
+        # (inode, modification time) of the file self.reader maps
+        self.reader_identity: Optional[Tuple[int, int]] = None
+        # The writer's working copy, starting from the published snapshot
+        self.writer_context: Optional[InMemoryStorageContext] = None
+        if writer:
+            self.writer_context = (
+                load_snapshot(path)
+                if os.path.exists(path)
+                else InMemoryStorageContext()
+            )
+        # Whether the writer's copy changed since it was last published
+        self.dirty = False
+
+    def current_reader(self) -> Optional[SnapshotReader]:
+        """Return a reader of the latest published snapshot, if any.
+
+        Raises:
+            SnapshotFormatError: If the published file isn't a readable snapshot
+            OSError: If the published file can't be mapped
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity != self.reader_identity:
+            with self.lock:
+                if identity != self.reader_identity:
+                    # The previous mapping is left for the garbage collector to
+                    # unmap, as other threads may still be reading from it
+                    self.reader = SnapshotReader(self.path)
+                    self.reader_identity = identity
+        return self.reader
+
+    def publish(self) -> bool:
+        """Publish the writer's copy if it changed since the last publish.
+
+        Readers have no copy, so they never publish.
+
+        Returns:
+            Whether a new snapshot was published
+
+        Raises:
+            OSError: If the snapshot couldn't be written
+        """
+        writer_context = self.writer_context
+        if writer_context is None or not self.dirty:
+            return False
+        # Cleared first so writes made while dumping mark the copy dirty again
+        self.dirty = False
+        try:
+            dump_snapshot(writer_context, self.path)
+        except OSError:
+            self.dirty = True
+            raise
+        return True
@@ -0,0 +1,333 @@
+"""SQLite storage context shared by the SQLite storage implementations."""
+
+import sqlite3
+import threading
+from typing import List, Optional
+
+from app.core.error import (
+    InternalStorageError,
+    StorageError,
+    StorageOperationDetails,
+    UnavailableStorageError,
+)
+from app.storage.leaderboard.histogram import LOWER_BOUNDS
+from app.storage.streaks import FIRST_PUZZLE_DATE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    last_fetched_timestamp INTEGER NOT NULL,
+    puzzles_attempted INTEGER NOT NULL,
+    puzzles_solved INTEGER NOT NULL,
+    current_streak INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_scores (
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (user_id, date)
+) WITHOUT ROWID;
+
+-- Covers leaderboard reads: a date's scores in rank order without table lookups
+CREATE INDEX IF NOT EXISTS daily_scores_by_date
+    ON daily_scores (date, score, user_id);
+
+-- One row per member of each group
+CREATE TABLE IF NOT EXISTS group_members (
+    group_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+) WITHOUT ROWID;
+
+-- Inclusive lower bound of every histogram bucket, filled in from LOWER_BOUNDS
+CREATE TABLE IF NOT EXISTS histogram_buckets (
+    scale TEXT NOT NULL,
+    lower INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    PRIMARY KEY (scale, lower)
+) WITHOUT ROWID;
+
+-- Number of scores of each date per histogram bucket, kept up to date by
+-- triggers on daily_scores in the same transaction as the score writes
+CREATE TABLE IF NOT EXISTS score_histograms (
+    date TEXT NOT NULL,
+    scale TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, scale, bucket)
+) WITHOUT ROWID;
+
+-- Bitmap of the days each user has a score for, split into 64-bit words:
+-- bit b of word w is set if they have a score FIRST_PUZZLE_DATE + 64w + b
+-- days. Kept up to date by triggers on daily_scores.
+CREATE TABLE IF NOT EXISTS solved_days (
+    user_id TEXT NOT NULL,
+    word INTEGER NOT NULL,
+    bits INTEGER NOT NULL,
+    PRIMARY KEY (user_id, word)
+) WITHOUT ROWID;
+
+-- Change feed of daily scores, appended to by triggers on daily_scores in the
+-- same transaction as the score writes, so sequences follow commit order.
+-- AUTOINCREMENT keeps sequences of pruned changes from being reused.
+CREATE TABLE IF NOT EXISTS score_changes (
+    sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    old_score INTEGER,
+    new_score INTEGER NOT NULL
+);
+
+-- Where the next update sweep resumes; at most the one row with id 1
+CREATE TABLE IF NOT EXISTS sweep_cursor (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    after_user_id TEXT
+);
+
+-- Unix time of each user's last on-demand refresh claim
+CREATE TABLE IF NOT EXISTS refresh_claims (
+    user_id TEXT PRIMARY KEY,
+    claimed_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Bucket of a score in one scale, found with a single seek on histogram_buckets
+BUCKET_OF_SCORE = (
+    "(SELECT bucket FROM histogram_buckets WHERE scale = '{scale}'"
+    " AND lower <= {score} ORDER BY lower DESC LIMIT 1)"
+)
+
+COUNT_SCORE = """
+    INSERT INTO score_histograms (date, scale, bucket, count)
+    VALUES (NEW.date, '{scale}', {bucket}, 1)
+    ON CONFLICT (date, scale, bucket) DO UPDATE SET count = count + 1;"""
+
+UNCOUNT_SCORE = """
+    UPDATE score_histograms SET count = count - 1
+    WHERE date = OLD.date AND scale = '{scale}' AND bucket = {bucket};"""
+
+
+def histogram_triggers() -> str:
+    """Build the triggers counting daily_scores writes into score_histograms.
+
+    Each trigger has one statement per scale, which is cheaper per row than
+    one statement grouping the buckets of every scale.
+    """
+    count = "".join(
+        COUNT_SCORE.format(
+            scale=scale, bucket=BUCKET_OF_SCORE.format(scale=scale, score="NEW.score")
+        )
+        for scale in LOWER_BOUNDS
+    )
+    uncount = "".join(
+        UNCOUNT_SCORE.format(
+            scale=scale, bucket=BUCKET_OF_SCORE.format(scale=scale, score="OLD.score")
+        )
+        for scale in LOWER_BOUNDS
+    )
+    return f"""
+CREATE TRIGGER IF NOT EXISTS daily_scores_histogram_insert
+AFTER INSERT ON daily_scores
+BEGIN{count}
+END;
+
+-- Scores rewritten unchanged, as the update sweep often does, are skipped
+CREATE TRIGGER IF NOT EXISTS daily_scores_histogram_update
+AFTER UPDATE OF score ON daily_scores WHEN OLD.score <> NEW.score
+BEGIN{uncount}{count}
+END;
+
+CREATE TRIGGER IF NOT EXISTS daily_scores_histogram_delete
+AFTER DELETE ON daily_scores
+BEGIN{uncount}
+END;
+"""
+
+
+# Counts the scores of databases created before histograms existed, once
+BACKFILL_SCORE_HISTOGRAMS = """
+INSERT INTO score_histograms (date, scale, bucket, count)
+SELECT date, scale, bucket, COUNT(*) FROM (
+    SELECT daily_scores.date, histogram_buckets.scale,
+        MAX(histogram_buckets.bucket) AS bucket
+    FROM daily_scores JOIN histogram_buckets
+        ON histogram_buckets.lower <= daily_scores.score
+    WHERE NOT EXISTS (SELECT 1 FROM score_histograms)
+    GROUP BY daily_scores.user_id, daily_scores.date, histogram_buckets.scale
+)
+GROUP BY date, scale, bucket
+"""
+
+# Bit of a date in the solved_days bitmaps
+DAY_OF_DATE = f"CAST(julianday({{date}}) - julianday('{FIRST_PUZZLE_DATE}') AS INTEGER)"
+
+# Dates with a bit: real dates (SQLite normalizes e.g. 02-30) from bit 0 on
+HAS_SOLVED_BIT = f"date({{date}}) = {{date}} AND {{date}} >= '{FIRST_PUZZLE_DATE}'"
+
+SOLVED_DAYS_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS daily_scores_solved_days_insert
+AFTER INSERT ON daily_scores WHEN {HAS_SOLVED_BIT.format(date="NEW.date")}
+BEGIN
+    INSERT INTO solved_days (user_id, word, bits)
+    VALUES (
+        NEW.user_id,
+        {DAY_OF_DATE.format(date="NEW.date")} / 64,
+        1 << ({DAY_OF_DATE.format(date="NEW.date")} % 64)
+    )
+    ON CONFLICT (user_id, word) DO UPDATE SET bits = bits | excluded.bits;
+END;
+
+CREATE TRIGGER IF NOT EXISTS daily_scores_solved_days_delete
+AFTER DELETE ON daily_scores WHEN {HAS_SOLVED_BIT.format(date="OLD.date")}
+BEGIN
+    UPDATE solved_days
+    SET bits = bits & ~(1 << ({DAY_OF_DATE.format(date="OLD.date")} % 64))
+    WHERE user_id = OLD.user_id
+        AND word = {DAY_OF_DATE.format(date="OLD.date")} / 64;
+END;
+"""
+
+SCORE_CHANGES_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS daily_scores_changes_insert
+AFTER INSERT ON daily_scores
+BEGIN
+    INSERT INTO score_changes (user_id, date, old_score, new_score)
+    VALUES (NEW.user_id, NEW.date, NULL, NEW.score);
+END;
+
+CREATE TRIGGER IF NOT EXISTS daily_scores_changes_update
+AFTER UPDATE OF score ON daily_scores WHEN OLD.score <> NEW.score
+BEGIN
+    INSERT INTO score_changes (user_id, date, old_score, new_score)
+    VALUES (NEW.user_id, NEW.date, OLD.score, NEW.score);
+END;
+"""
+
+# Records the scores of databases created before the feed existed as new, in
+# date order, once: sqlite_sequence has a row for the feed after its first change
+BACKFILL_SCORE_CHANGES = """
+INSERT INTO score_changes (user_id, date, old_score, new_score)
+SELECT user_id, date, NULL, score FROM daily_scores
+WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'score_changes')
+ORDER BY date, user_id
+"""
+
+# Builds every user's bitmap in one pass over daily_scores. SQLite has no
+# bitwise OR aggregate, but the bits of a word's days are distinct, so their
+# SUM is their OR and can't overflow even with bit 63 set.
+BUILD_SOLVED_DAYS = f"""
+INSERT INTO solved_days (user_id, word, bits)
+SELECT user_id, day / 64, SUM(1 << (day % 64)) FROM (
+    SELECT user_id, {DAY_OF_DATE.format(date="date")} AS day
+    FROM daily_scores WHERE {HAS_SOLVED_BIT.format(date="date")}
+)
+GROUP BY user_id, day / 64
+"""
+
+# Smallest value of an SQLite INTEGER
+MIN_SQLITE_INTEGER = -(2**63)
+
+# Seconds a connection waits for another writer's lock before failing
+BUSY_TIMEOUT_SECONDS = 5.0
+
+
+class SqliteStorageContext:
+    """SQLite storage context holding one connection per thread.
+
+    SQLite connections can't be shared between threads, so each thread lazily
+    opens its own connection to the database file. The database runs in WAL
+    mode, letting readers proceed while a writer commits. This mirrors how the
+    in-memory and DynamoDB contexts share state between their implementations.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize the SQLite storage context and create the schema.
+
+        Args:
+            path: Path of the database file; each thread opens its own
+                connection, so ":memory:" databases aren't supported
+        """
+        self.path = path
+        self.local = threading.local()
+        self.connections: List[sqlite3.Connection] = []
+        self.lock = threading.Lock()
+        connection = self.connection()
+        connection.executescript(
+            SCHEMA
+            + histogram_triggers()
+            + SOLVED_DAYS_TRIGGERS
+            + SCORE_CHANGES_TRIGGERS
+        )
+        with connection:
+            # The first bucket's bound is lowered so it also holds negative scores
+            connection.executemany(
+                "INSERT OR REPLACE INTO histogram_buckets (scale, lower, bucket)"
+                " VALUES (?, ?, ?)",
+                [
+                    (scale, lower if bucket else MIN_SQLITE_INTEGER, bucket)
+                    for scale, bounds in LOWER_BOUNDS.items()
+                    for bucket, lower in enumerate(bounds)
+                ],
+            )
+            connection.execute(BACKFILL_SCORE_HISTOGRAMS)
+            connection.execute(BACKFILL_SCORE_CHANGES)
+            # Builds the bitmaps of databases created before they existed
+            if (
+                connection.execute("SELECT 1 FROM solved_days LIMIT 1").fetchone()
+                is None
+            ):
+                connection.execute(BUILD_SOLVED_DAYS)
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it if needed."""
+        connection: Optional[sqlite3.Connection] = getattr(
+            self.local, "connection", None
+        )
+        if connection is None:
+            # Each connection is only used by its thread, but close() may run
+            # on another one
+            connection = sqlite3.connect(
+                self.path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            # WAL makes NORMAL durable against application crashes while
+            # skipping an fsync per commit
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        """Close every connection opened by any thread."""
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+
+def storage_error_from_exception(
+    error: sqlite3.Error, operation: str, resource_type: str, service_name: str
+) -> StorageError:
+    """Map a sqlite3 exception to the matching storage error.
+
+    Args:
+        error: Exception raised by SQLite
+        operation: Storage operation that failed
+        resource_type: Type of resource being operated on
+        service_name: Name of the storage implementation reporting the error
+
+    Returns:
+        UnavailableStorageError if the database was locked or busy,
+        InternalStorageError for anything else
+    """
+    details = StorageOperationDetails(
+        operation=operation, resource_type=resource_type, raw_error=str(error)
+    )
+    if isinstance(error, sqlite3.OperationalError) and (
+        "locked" in str(error) or "busy" in str(error)
+    ):
+        return UnavailableStorageError(details=details, service_name=service_name)
+    return InternalStorageError(details=details, service_name=service_name)
@@ -0,0 +1,147 @@
+"""Solved-day bitmaps and the streaks computed from them.
+
+A user's solves are a bitmap with one bit per day, where bit i is set if they
+have a score for the day FIRST_PUZZLE_DATE + i. Bitmaps are plain Python ints,
+whose bitwise operators work a machine word at a time, so streaks come from a
+handful of shifts and masks over the whole history rather than a walk over
+the user's scores:
+
+- the run of solves ending on a day is found from the highest unsolved day
+  below it, i.e. the bit length of the inverted, masked bitmap;
+- the longest run is found by doubling k while some k solved days in a row
+  exist (x & x >> 1 & ... & x >> (k - 1) is nonzero), then binary searching.
+"""
+
+from datetime import date
+from functools import lru_cache
+from typing import Iterable, Mapping, Optional
+
+from app.storage.users.models import GetUserStreaksReply
+
+# Date of bit 0 of every bitmap, the first New York Times crossword
+FIRST_PUZZLE_DATE = date(1942, 2, 15)
+FIRST_PUZZLE_ORDINAL = FIRST_PUZZLE_DATE.toordinal()
+
+# Bits per word of the bitmaps stored a word at a time
+WORD_BITS = 64
+# Mask reading a stored word as unsigned, since e.g. SQLite keeps bit 63 as the sign
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+def day_index(day: str) -> int:
+    """Get the bit of a YYYY-MM-DD date, negative for dates before bit 0.
+
+    Raises:
+        ValueError: If day isn't a valid date
+    """
+    return date.fromisoformat(day).toordinal() - FIRST_PUZZLE_ORDINAL
+
+
+# Scores are saved for a handful of distinct dates at a time
+@lru_cache(maxsize=4096)
+def solved_bit(day: str) -> Optional[int]:
+    """Get the bit of a stored score's date, or None if it has no bit.
+
+    Stored dates are only checked against YYYY-MM-DD, so dates that don't
+    exist are skipped along with dates before bit 0.
+    """
+    try:
+        index = day_index(day)
+    except ValueError:
+        return None
+    return index if index >= 0 else None
+
+
+def bitmap_from_bits(bits: Iterable[int]) -> int:
+    """Build the bitmap with the given bits set, in time linear in their count.
+
+    Setting each bit of a long history with | would copy the whole int every
+    time, so the bits are set in a byte buffer converted once at the end.
+    """
+    buffer = bytearray()
+    for bit in bits:
+        byte = bit >> 3
+        if byte >= len(buffer):
+            buffer.extend(bytes(byte + 1 - len(buffer)))
+        buffer[byte] |= 1 << (bit & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def bitmap_from_words(words: Mapping[int, int]) -> int:
+    """Assemble a bitmap from its nonzero words, keyed by word number."""
+    if not words:
+        return 0
+    buffer = bytearray(8 * (max(words) + 1))
+    for word, bits in words.items():
+        buffer[8 * word : 8 * word + 8] = (bits & WORD_MASK).to_bytes(8, "little")
+    return int.from_bytes(buffer, "little")
+
+
+def build_bitmap(days: Iterable[str]) -> int:
+    """Build the bitmap with the bit of each stored date set."""
+    return bitmap_from_bits(bit for bit in map(solved_bit, days) if bit is not None)
+
+
+def truncate(bitmap: int, as_of: str) -> int:
+    """Keep only the bits of days up to and including as_of."""
+    end = day_index(as_of) + 1
+    if end <= 0:
+        return 0
+    return bitmap & ((1 << end) - 1)
+
+
+def run_ending_at(bitmap: int, index: int) -> int:
+    """Count the consecutive set bits ending at bit index, inclusive."""
+    if index < 0:
+        return 0
+    mask = (1 << (index + 1)) - 1
+    gaps = ~bitmap & mask
+    # The highest unset bit at or below index ends the run
+    return index + 1 - gaps.bit_length()
+
+
+def current_streak(bitmap: int, as_of: str) -> int:
+    """Get the streak of solved days as of a date.
+
+    Like the NYT app, a streak that ended yesterday is still current until
+    the day is over, so an unsolved as_of counts the run ending the day before.
+    """
+    index = day_index(as_of)
+    streak = run_ending_at(bitmap, index)
+    if streak == 0:
+        streak = run_ending_at(bitmap, index - 1)
+    return streak
+
+
+def longest_streak(bitmap: int) -> int:
+    """Get the longest run of set bits in O(log(longest run)) word-level steps."""
+    if bitmap <= 0:
+        return 0
+    # starts has a bit at the start of every run at least `length` long
+    starts, length = bitmap, 1
+    while True:
+        doubled = starts & (starts >> length)
+        if not doubled:
+            break
+        starts, length = doubled, length * 2
+    # The longest run is in [length, 2 * length); extending by step <= length
+    # keeps starts & starts >> step equal to the starts of runs length + step long
+    step = length // 2
+    while step:
+        longer = starts & (starts >> step)
+        if longer:
+            starts, length = longer, length + step
+        step //= 2
+    return length
+
+
+def streaks_reply(user_id: str, as_of: str, bitmap: int) -> GetUserStreaksReply:
+    """Compute a user's streaks as of a day from their solved-day bitmap."""
+    solved = truncate(bitmap, as_of)
+    return GetUserStreaksReply(
+        user_id=user_id,
+        as_of=as_of,
+        current_streak=current_streak(solved, as_of),
+        longest_streak=longest_streak(solved),
+        solved_count=solved.bit_count(),
+    )
@@ -0,0 +1,319 @@
+"""Tracing wrappers for the storage protocols.
+
+Each protocol call runs in a span named after the protocol and method, e.g.
+"UserStorage.save_batch", carrying the name of the configured backend. A
+Failure marks the span as failed, except NOT_FOUND, which callers handle as
+an ordinary outcome. The factory only adds these wrappers while tracing is
+enabled, so disabled tracing costs nothing on storage calls.
+"""
+
+from typing import Callable, Dict, Mapping, TypeVar
+
+from returns.result import Failure, Result
+
+from app.core.error import ErrorCode, StorageError
+from app.core.tracing import AttributeValue, start_span
+from app.storage.groups.interface import GroupStorage
+from app.storage.groups.models import (
+    GetGroupQuery,
+    GetGroupResult,
+    SaveGroupQuery,
+    SaveGroupResult,
+)
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardResult,
+    GetGroupLeaderboardQuery,
+    GetGroupLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramResult,
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardResult,
+)
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesResult,
+    ClaimUserRefreshQuery,
+    ClaimUserRefreshResult,
+    CreateUsersIfNotExistQuery,
+    CreateUsersIfNotExistResult,
+    GetAllUserIdsQuery,
+    GetAllUserIdsResult,
+    GetHeadToHeadQuery,
+    GetHeadToHeadResult,
+    GetSweepCursorQuery,
+    GetSweepCursorResult,
+    GetUserMetadataQuery,
+    GetUserMetadataResult,
+    GetUserStreaksQuery,
+    GetUserStreaksResult,
+    ListDailyScoresQuery,
+    ListDailyScoresResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    RebuildStreaksQuery,
+    RebuildStreaksResult,
+    SaveBatchQuery,
+    SaveBatchResult,
+    SaveDailyScoreQuery,
+    SaveDailyScoreResult,
+    SaveSweepCursorQuery,
+    SaveSweepCursorResult,
+    SaveUserMetadataQuery,
+    SaveUserMetadataResult,
+)
+
+R = TypeVar("R", bound=Result[object, StorageError])
+
+
+def traced(
+    name: str, attributes: Mapping[str, AttributeValue], call: Callable[[], R]
+) -> R:
+    """Run a storage call in a span.
+
+    Args:
+        name: Name of the span, "<Protocol>.<method>"
+        attributes: Attributes of the span
+        call: The call
+
+    Returns:
+        The result of the call
+    """
+    with start_span(name, attributes) as span:
+        result = call()
+        if isinstance(result, Failure):
+            error = result.failure()
+            span.set_attribute("storage.error_code", ErrorCode(error.code).value)
+            if error.code != ErrorCode.NOT_FOUND:
+                span.set_error(error.message)
+        return result
+
+
+class TracingUserStorage(UserStorage):
+    """User storage running each call in a span."""
+
+    def __init__(self, backend: UserStorage, backend_name: str) -> None:
+        """Initialize the tracing user storage.
+
+        Args:
+            backend: Storage to trace the calls of
+            backend_name: Name of the configured backend, e.g. "dynamodb"
+        """
+        self.backend = backend
+        self.attributes: Dict[str, AttributeValue] = {"storage.backend": backend_name}
+
+    def get_user_metadata(self, query: GetUserMetadataQuery) -> GetUserMetadataResult:
+        """Get user metadata in a span."""
+        return traced(
+            "UserStorage.get_user_metadata",
+            self.attributes,
+            lambda: self.backend.get_user_metadata(query),
+        )
+
+    def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
+        """Save a daily score in a span."""
+        return traced(
+            "UserStorage.save_daily_score",
+            self.attributes,
+            lambda: self.backend.save_daily_score(query),
+        )
+
+    def save_user_metadata(
+        self, query: SaveUserMetadataQuery
+    ) -> SaveUserMetadataResult:
+        """Save user metadata in a span."""
+        return traced(
+            "UserStorage.save_user_metadata",
+            self.attributes,
+            lambda: self.backend.save_user_metadata(query),
+        )
+
+    def get_all_user_ids(self, query: GetAllUserIdsQuery) -> GetAllUserIdsResult:
+        """Get a page of user IDs in a span."""
+        return traced(
+            "UserStorage.get_all_user_ids",
+            self.attributes,
+            lambda: self.backend.get_all_user_ids(query),
+        )
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Create users in a span."""
+        return traced(
+            "UserStorage.create_users_if_not_exist",
+            self.attributes,
+            lambda: self.backend.create_users_if_not_exist(query),
+        )
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Save a batch of items in a span."""
+        return traced(
+            "UserStorage.save_batch",
+            self.attributes,
+            lambda: self.backend.save_batch(query),
+        )
+
+    def list_daily_scores(self, query: ListDailyScoresQuery) -> ListDailyScoresResult:
+        """List a page of daily scores in a span."""
+        return traced(
+            "UserStorage.list_daily_scores",
+            self.attributes,
+            lambda: self.backend.list_daily_scores(query),
+        )
+
+    def get_head_to_head(self, query: GetHeadToHeadQuery) -> GetHeadToHeadResult:
+        """Compare two users in a span."""
+        return traced(
+            "UserStorage.get_head_to_head",
+            self.attributes,
+            lambda: self.backend.get_head_to_head(query),
+        )
+
+    def get_user_streaks(self, query: GetUserStreaksQuery) -> GetUserStreaksResult:
+        """Get a user's streaks in a span."""
+        return traced(
+            "UserStorage.get_user_streaks",
+            self.attributes,
+            lambda: self.backend.get_user_streaks(query),
+        )
+
+    def rebuild_streaks(self, query: RebuildStreaksQuery) -> RebuildStreaksResult:
+        """Rebuild solved-day bitmaps in a span."""
+        return traced(
+            "UserStorage.rebuild_streaks",
+            self.attributes,
+            lambda: self.backend.rebuild_streaks(query),
+        )
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        """List a page of the score change feed in a span."""
+        return traced(
+            "UserStorage.list_score_changes",
+            self.attributes,
+            lambda: self.backend.list_score_changes(query),
+        )
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        """Abandon sequences missing from the score change feed in a span."""
+        return traced(
+            "UserStorage.abandon_score_changes",
+            self.attributes,
+            lambda: self.backend.abandon_score_changes(query),
+        )
+
+    def get_sweep_cursor(self, query: GetSweepCursorQuery) -> GetSweepCursorResult:
+        """Get the update sweep's cursor in a span."""
+        return traced(
+            "UserStorage.get_sweep_cursor",
+            self.attributes,
+            lambda: self.backend.get_sweep_cursor(query),
+        )
+
+    def save_sweep_cursor(self, query: SaveSweepCursorQuery) -> SaveSweepCursorResult:
+        """Save the update sweep's cursor in a span."""
+        return traced(
+            "UserStorage.save_sweep_cursor",
+            self.attributes,
+            lambda: self.backend.save_sweep_cursor(query),
+        )
+
+    def claim_user_refresh(
+        self, query: ClaimUserRefreshQuery
+    ) -> ClaimUserRefreshResult:
+        """Claim a user's refresh in a span."""
+        return traced(
+            "UserStorage.claim_user_refresh",
+            self.attributes,
+            lambda: self.backend.claim_user_refresh(query),
+        )
+
+
+class TracingLeaderboardStorage(LeaderboardStorage):
+    """Leaderboard storage running each call in a span."""
+
+    def __init__(self, backend: LeaderboardStorage, backend_name: str) -> None:
+        """Initialize the tracing leaderboard storage.
+
+        Args:
+            backend: Storage to trace the calls of
+            backend_name: Name of the configured backend, e.g. "dynamodb"
+        """
+        self.backend = backend
+        self.attributes: Dict[str, AttributeValue] = {"storage.backend": backend_name}
+
+    def get_daily_leaderboard(
+        self, query: GetDailyLeaderboardQuery
+    ) -> GetDailyLeaderboardResult:
+        """Get a daily leaderboard in a span."""
+        return traced(
+            "LeaderboardStorage.get_daily_leaderboard",
+            self.attributes,
+            lambda: self.backend.get_daily_leaderboard(query),
+        )
+
+    def get_group_leaderboard(
+        self, query: GetGroupLeaderboardQuery
+    ) -> GetGroupLeaderboardResult:
+        """Get a group leaderboard in a span."""
+        return traced(
+            "LeaderboardStorage.get_group_leaderboard",
+            self.attributes,
+            lambda: self.backend.get_group_leaderboard(query),
+        )
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        """Refresh a daily leaderboard in a span."""
+        return traced(
+            "LeaderboardStorage.refresh_daily_leaderboard",
+            self.attributes,
+            lambda: self.backend.refresh_daily_leaderboard(query),
+        )
+
+    def get_score_histogram(
+        self, query: GetScoreHistogramQuery
+    ) -> GetScoreHistogramResult:
+        """Get a score histogram in a span."""
+        return traced(
+            "LeaderboardStorage.get_score_histogram",
+            self.attributes,
+            lambda: self.backend.get_score_histogram(query),
+        )
+
+
+class TracingGroupStorage(GroupStorage):
+    """Group storage running each call in a span."""
+
+    def __init__(self, backend: GroupStorage, backend_name: str) -> None:
+        """Initialize the tracing group storage.
+
+        Args:
+            backend: Storage to trace the calls of
+            backend_name: Name of the configured backend, e.g. "dynamodb"
+        """
+        self.backend = backend
+        self.attributes: Dict[str, AttributeValue] = {"storage.backend": backend_name}
+
+    def get_group(self, query: GetGroupQuery) -> GetGroupResult:
+        """Get a group in a span."""
+        return traced(
+            "GroupStorage.get_group",
+            self.attributes,
+            lambda: self.backend.get_group(query),
+        )
+
+    def save_group(self, query: SaveGroupQuery) -> SaveGroupResult:
+        """Save a group in a span."""
+        return traced(
+            "GroupStorage.save_group",
+            self.attributes,
+            lambda: self.backend.save_group(query),
+        )
@@ -0,0 +1,1246 @@
+"""DynamoDB implementation of user storage."""
+
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+from returns.result import Failure, Result, Success
+
+from app.core.error import (
+    NotFoundDetails,
+    NotFoundStorageError,
+    StorageError,
+    StorageOperationDetails,
+    UnavailableStorageError,
+)
+from app.storage.change_feed import changes_reply
+from app.storage.dynamodb_context import (
+    DynamoDbStorageContext,
+    storage_error_from_exception,
+)
+from app.storage.leaderboard.dynamodb import board_write_update
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.pagination import (
+    decode_cursor,
+    encode_cursor,
+    invalid_cursor_error,
+)
+from app.storage.streaks import bitmap_from_bits, solved_bit, streaks_reply
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesReply,
+    AbandonScoreChangesResult,
+    ClaimUserRefreshQuery,
+    ClaimUserRefreshReply,
+    ClaimUserRefreshResult,
+    CreateUsersIfNotExistQuery,
+    CreateUsersIfNotExistReply,
+    CreateUsersIfNotExistResult,
+    GetAllUserIdsQuery,
+    GetAllUserIdsReply,
+    GetAllUserIdsResult,
+    GetHeadToHeadQuery,
+    GetHeadToHeadResult,
+    GetSweepCursorQuery,
+    GetSweepCursorReply,
+    GetSweepCursorResult,
+    GetUserMetadataQuery,
+    GetUserMetadataReply,
+    GetUserMetadataResult,
+    GetUserStreaksQuery,
+    GetUserStreaksResult,
+    ListDailyScoresQuery,
+    ListDailyScoresReply,
+    ListDailyScoresResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    RebuildStreaksQuery,
+    RebuildStreaksReply,
+    RebuildStreaksResult,
+    SaveBatchQuery,
+    SaveBatchReply,
+    SaveBatchResult,
+    SaveDailyScoreQuery,
+    SaveDailyScoreReply,
+    SaveDailyScoreResult,
+    SaveSweepCursorQuery,
+    SaveSweepCursorReply,
+    SaveSweepCursorResult,
+    SaveUserMetadataQuery,
+    SaveUserMetadataReply,
+    SaveUserMetadataResult,
+    ScoreChange,
+)
+from app.storage.versus import head_to_head
+
+# Maximum number of put requests in one BatchWriteItem call
+BATCH_WRITE_SIZE = 25
+# Attempts at writing the items DynamoDB returns as unprocessed
+BATCH_WRITE_ATTEMPTS = 5
+# Delay before retrying unprocessed items in seconds, doubled per attempt
+BATCH_WRITE_BACKOFF_SECONDS = 0.05
+# Maximum number of keys in one BatchGetItem call
+BATCH_GET_SIZE = 100
+
+# Partition holding the counter the change feed's sequences come from
+CHANGES_PK = "CHANGES"
+# Partitions the change feed's items are spread over by sequence, so that no
+# one partition takes every change written
+CHANGE_SHARDS = 8
+# Digits sequences are zero-padded to in sort keys, so they sort numerically
+SEQUENCE_DIGITS = 20
+# Change feed items expire through the table's expires_at TTL after this long
+CHANGE_RETENTION_SECONDS = 7 * 24 * 60 * 60
+# Changed scores written per TransactWriteItems call: two items each, plus the
+# leaderboard item of each of their dates, within the 100-item limit
+TRANSACT_CHANGES_SIZE = 33
+# Attempts at writing a score whose stored score changed since it was read
+SCORE_WRITE_ATTEMPTS = 3
+
+
+# A change feed item's sequence with its (user ID, date, old, new) change, or
+# None if the sequence was abandoned
+type ChangeEntry = Tuple[int, Optional[Tuple[str, str, Optional[int], int]]]
+
+
+def user_metadata_key(user_id: str) -> Dict[str, str]:
+    """Build the primary key of a user's metadata item."""
+    return {"PK": f"USER#{user_id}", "SK": "METADATA"}
+
+
+def daily_score_key(user_id: str, date: str) -> Dict[str, str]:
+    """Build the primary key of a user's daily score item."""
+    return {"PK": f"USER#{user_id}", "SK": f"SCORE#{date}"}
+
+
+def solved_days_key(user_id: str) -> Dict[str, str]:
+    """Build the primary key of the item holding a user's solved days."""
+    return {"PK": f"USER#{user_id}", "SK": "SOLVED_DAYS"}
+
+
+def change_shard_pk(shard: int) -> str:
+    """Build the partition key of one of the change feed's shards."""
+    return f"{CHANGES_PK}#{shard}"
+
+
+def score_change_key(sequence: int) -> Dict[str, str]:
+    """Build the primary key of the change feed item with a sequence number."""
+    return {
+        "PK": change_shard_pk(sequence % CHANGE_SHARDS),
+        "SK": f"CHANGE#{sequence:0{SEQUENCE_DIGITS}d}",
+    }
+
+
+def sequence_counter_key() -> Dict[str, str]:
+    """Build the primary key of the item holding the last reserved sequence."""
+    return {"PK": CHANGES_PK, "SK": "SEQUENCE"}
+
+
+def sweep_cursor_key() -> Dict[str, str]:
+    """Build the primary key of the item holding the update sweep's cursor."""
+    return {"PK": "SWEEP", "SK": "CURSOR"}
+
+
+def change_expiry() -> int:
+    """Get the expires_at of change feed items written now."""
+    return int(time.time()) + CHANGE_RETENTION_SECONDS
+
+
+def is_write_conflict(error: ClientError) -> bool:
+    """Whether a transaction was cancelled only by concurrent writes.
+
+    That is, a score's condition failed because it changed since it was read,
+    or another transaction was writing the same items.
+    """
+    if error.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+        return False
+    reasons = {
+        reason.get("Code") for reason in error.response.get("CancellationReasons", [])
+    }
+    return not reasons - {"None", "ConditionalCheckFailed", "TransactionConflict"}
+
+
+def score_change_to_item(
+    sequence: int, score: DailyScoreItem, old_score: Optional[int], expires_at: int
+) -> Dict[str, Any]:
+    """Convert the change a score's write made to its change feed item."""
+    item: Dict[str, Any] = {
+        **score_change_key(sequence),
+        "type": "SCORE_CHANGE",
+        "sequence": sequence,
+        "userId": score.user_id,
+        "date": score.date,
+        "new_score": score.score,
+        "expires_at": expires_at,
+    }
+    if old_score is not None:
+        item["old_score"] = old_score
+    return item
+
+
+def abandoned_change_to_item(sequence: int, expires_at: int) -> Dict[str, Any]:
+    """Build the item taking the place of an abandoned sequence's change."""
+    return {
+        **score_change_key(sequence),
+        "type": "ABANDONED_CHANGE",
+        "sequence": sequence,
+        "expires_at": expires_at,
+    }
+
+
+def user_metadata_to_item(metadata: UserMetadataItem) -> Dict[str, Any]:
+    """Convert user metadata to its table item."""
+    return {
+        **user_metadata_key(metadata.user_id),
+        "type": "USER_METADATA",
+        "userId": metadata.user_id,
+        "last_fetched_timestamp": metadata.last_fetched_timestamp,
+        "puzzles_attempted": metadata.puzzles_attempted,
+        "puzzles_solved": metadata.puzzles_solved,
+        "current_streak": metadata.current_streak,
+    }
+
+
+def user_metadata_from_item(item: Dict[str, Any]) -> UserMetadataItem:
+    """Convert a deserialized table item to user metadata."""
+    return UserMetadataItem(
+        user_id=str(item["userId"]),
+        last_fetched_timestamp=int(item.get("last_fetched_timestamp", 0)),
+        puzzles_attempted=int(item.get("puzzles_attempted", 0)),
+        puzzles_solved=int(item.get("puzzles_solved", 0)),
+        current_streak=int(item.get("current_streak", 0)),
+    )
+
+
+def daily_score_to_item(score: DailyScoreItem) -> Dict[str, Any]:
+    """Convert a daily score to its table item, including the GSI attributes."""
+    return {
+        **daily_score_key(score.user_id, score.date),
+        "type": "DAILY_SCORE",
+        "userId": score.user_id,
+        "date": score.date,
+        "score": score.score,
+        "gsi1_pk": f"DATE#{score.date}",
+        "gsi1_sk": score.score,
+    }
+
+
+class DynamoDbUserStorage(UserStorage):
+    """DynamoDB implementation of user storage."""
+
+    def __init__(self, context: DynamoDbStorageContext) -> None:
+        """Initialize the DynamoDB user storage.
+
+        Args:
+            context: Shared DynamoDB storage context
+        """
+        self.context = context
+
+    def get_user_metadata(self, query: GetUserMetadataQuery) -> GetUserMetadataResult:
+        """Get user metadata from DynamoDB."""
+        try:
+            response = self.context.client.get_item(
+                TableName=self.context.table_name,
+                Key=self.context.serialize(user_metadata_key(query.user_id)),
+            )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_user_metadata",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        if "Item" not in response:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=UserMetadataItem.__name__,
+                        resource_id=query.user_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        item = self.context.deserialize(response["Item"])
+        return Success(GetUserMetadataReply(item=user_metadata_from_item(item)))
+
+    def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
+        """Save a daily score to DynamoDB, recording it in the change feed.
+
+        The stored score is read first. A created or changed score is written
+        in one transaction with its change item, on condition that the score
+        read is still stored, so a change item exists exactly when its score
+        was written. A transaction cancelled by a concurrent write is retried
+        from the read. Scores rewritten unchanged aren't written.
+        """
+        try:
+            changed = self._write_score_change(query.item)
+            self._add_solved_days(query.item.user_id, [query.item.date])
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_daily_score",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(SaveDailyScoreReply(changed=changed))
+
+    def save_user_metadata(
+        self, query: SaveUserMetadataQuery
+    ) -> SaveUserMetadataResult:
+        """Save user metadata to DynamoDB."""
+        try:
+            self.context.client.put_item(
+                TableName=self.context.table_name,
+                Item=self.context.serialize(user_metadata_to_item(query.item)),
+            )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_user_metadata",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(SaveUserMetadataReply())
+
+    def get_all_user_ids(self, query: GetAllUserIdsQuery) -> GetAllUserIdsResult:
+        """Get all user IDs from DynamoDB, following scan pagination."""
+        user_ids = []
+        try:
+            paginator = self.context.client.get_paginator("scan")
+            for page in paginator.paginate(
+                TableName=self.context.table_name,
+                FilterExpression="begins_with(PK, :prefix) AND SK = :metadata",
+                ExpressionAttributeValues={
+                    ":prefix": {"S": "USER#"},
+                    ":metadata": {"S": "METADATA"},
+                },
+                ProjectionExpression="userId",
+            ):
+                for item in page.get("Items", []):
+                    user_id = self.context.deserialize(item).get("userId")
+                    if user_id:
+                        user_ids.append(str(user_id))
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_all_user_ids",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(GetAllUserIdsReply(user_ids=user_ids))
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Create users that don't exist yet in DynamoDB.
+
+        Conditional writes can't be batched, so each user is a conditional put;
+        the batch boundary only bounds how much work one call performs.
+        """
+        created_user_ids = []
+        existing_user_ids = []
+        for item in query.items:
+            try:
+                self.context.client.put_item(
+                    TableName=self.context.table_name,
+                    Item=self.context.serialize(user_metadata_to_item(item)),
+                    ConditionExpression="attribute_not_exists(PK)",
+                )
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code != "ConditionalCheckFailedException":
+                    return Failure(
+                        storage_error_from_exception(
+                            e,
+                            operation="create_users_if_not_exist",
+                            resource_type=UserMetadataItem.__name__,
+                            service_name=self.__class__.__name__,
+                        )
+                    )
+                existing_user_ids.append(item.key)
+                continue
+            except BotoCoreError as e:
+                return Failure(
+                    storage_error_from_exception(
+                        e,
+                        operation="create_users_if_not_exist",
+                        resource_type=UserMetadataItem.__name__,
+                        service_name=self.__class__.__name__,
+                    )
+                )
+            created_user_ids.append(item.key)
+
+        return Success(
+            CreateUsersIfNotExistReply(
+                created_user_ids=created_user_ids,
+                existing_user_ids=existing_user_ids,
+            )
+        )
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Save a batch of user metadata and daily scores with BatchWriteItem.
+
+        Items are deduplicated by key (last one wins), since DynamoDB rejects
+        batches that write the same key twice. Metadata is written 25 items at
+        a time, retrying unprocessed items with exponential backoff. The
+        current scores of the batch's keys are read with BatchGetItem, and
+        only scores created or changed are written: with sequences reserved
+        in one counter update, each is written together with its change feed
+        item in transactions of up to 33 scores, on condition that the scores read
+        are still stored. The scores of a transaction cancelled by a
+        concurrent write are written one at a time as by save_daily_score,
+        and its sequences abandoned so the feed's consumers don't wait for them.
+        The solved days of each user with scores are then updated once per
+        user.
+        """
+        metadata_items: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        scores: Dict[Tuple[str, str], DailyScoreItem] = {}
+        dates_by_user: Dict[str, List[str]] = {}
+        for metadata in query.user_metadata_items:
+            item = user_metadata_to_item(metadata)
+            metadata_items[(item["PK"], item["SK"])] = item
+        for score in query.daily_score_items:
+            score_key = daily_score_key(score.user_id, score.date)
+            scores[(score_key["PK"], score_key["SK"])] = score
+            dates_by_user.setdefault(score.user_id, []).append(score.date)
+
+        scores_result = self._get_scores(list(scores), operation="save_batch")
+        if isinstance(scores_result, Failure):
+            return Failure(scores_result.failure())
+        old_scores = scores_result.unwrap()
+        changes: List[Tuple[DailyScoreItem, Optional[int]]] = []
+        for key, score in scores.items():
+            old_score = old_scores.get(key)
+            if old_score != score.score:
+                changes.append((score, old_score))
+
+        error = self._batch_write(metadata_items.values(), operation="save_batch")
+        if error is not None:
+            return Failure(error)
+        try:
+            if changes:
+                sequence = self._reserve_sequences(len(changes))
+                for start in range(0, len(changes), TRANSACT_CHANGES_SIZE):
+                    chunk = changes[start : start + TRANSACT_CHANGES_SIZE]
+                    try:
+                        self._transact_score_changes(chunk, sequence + start)
+                    except ClientError as e:
+                        if not is_write_conflict(e):
+                            raise
+                        # A score changed since it was read; write each again
+                        # from a fresh read, and abandon the chunk's sequences
+                        for score, _ in chunk:
+                            self._write_score_change(score)
+                        self._abandon_sequences(
+                            range(sequence + start, sequence + start + len(chunk))
+                        )
+            for user_id, dates in dates_by_user.items():
+                self._add_solved_days(user_id, dates)
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_batch",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(
+            SaveBatchReply(changed_dates=sorted({score.date for score, _ in changes}))
+        )
+
+    def get_head_to_head(self, query: GetHeadToHeadQuery) -> GetHeadToHeadResult:
+        """Compare two users by merging the score items of their partitions.
+
+        Each partition's score items are sorted by their SCORE#<date> sort key,
+        so one paginated range query per user reads the window in date order.
+        """
+        try:
+            user_dates, user_scores = self._query_score_history(
+                query.user_id, query.start_date, query.end_date
+            )
+            opponent_dates, opponent_scores = self._query_score_history(
+                query.opponent_id, query.start_date, query.end_date
+            )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_head_to_head",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(
+            head_to_head(
+                query.user_id,
+                query.opponent_id,
+                user_dates,
+                user_scores,
+                opponent_dates,
+                opponent_scores,
+            )
+        )
+
+    def get_user_streaks(self, query: GetUserStreaksQuery) -> GetUserStreaksResult:
+        """Compute a user's streaks from the solved days stored in DynamoDB."""
+        try:
+            response = self.context.client.get_item(
+                TableName=self.context.table_name,
+                Key=self.context.serialize(solved_days_key(query.user_id)),
+                ProjectionExpression="days",
+            )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_user_streaks",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        days = self.context.deserialize(response.get("Item", {})).get("days", set())
+        bitmap = bitmap_from_bits(int(day) for day in days)
+        return Success(streaks_reply(query.user_id, query.as_of, bitmap))
+
+    def rebuild_streaks(self, query: RebuildStreaksQuery) -> RebuildStreaksResult:
+        """Rebuild every user's solved days from one scan of the score items.
+
+        The scan reads the keys of every score, then each user's solved days
+        are replaced with one put, batched 25 at a time.
+        """
+        bits_by_user: Dict[str, Set[int]] = {}
+        try:
+            paginator = self.context.client.get_paginator("scan")
+            for page in paginator.paginate(
+                TableName=self.context.table_name,
+                FilterExpression="begins_with(SK, :score)",
+                ExpressionAttributeValues={":score": {"S": "SCORE#"}},
+                ProjectionExpression="PK, SK",
+            ):
+                for item in page.get("Items", []):
+                    bit = solved_bit(item["SK"]["S"].removeprefix("SCORE#"))
+                    if bit is not None:
+                        user_id = item["PK"]["S"].removeprefix("USER#")
+                        bits_by_user.setdefault(user_id, set()).add(bit)
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="rebuild_streaks",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        error = self._batch_write(
+            (
+                {**solved_days_key(user_id), "type": "SOLVED_DAYS", "days": bits}
+                for user_id, bits in bits_by_user.items()
+            ),
+            operation="rebuild_streaks",
+        )
+        if error is not None:
+            return Failure(error)
+        return Success(RebuildStreaksReply(user_count=len(bits_by_user)))
+
+    def _add_solved_days(self, user_id: str, dates: Iterable[str]) -> None:
+        """Add the bits of dates to a user's solved days.
+
+        The days are a number set updated with ADD, so concurrent saves of one
+        user's scores never overwrite each other's days.
+
+        Raises:
+            BotoCoreError, ClientError: If the update fails
+        """
+        bits = {bit for bit in map(solved_bit, dates) if bit is not None}
+        if not bits:
+            return
+        self.context.client.update_item(
+            TableName=self.context.table_name,
+            Key=self.context.serialize(solved_days_key(user_id)),
+            UpdateExpression="SET #type = :type ADD days :days",
+            ExpressionAttributeNames={"#type": "type"},
+            ExpressionAttributeValues=self.context.serialize(
+                {":type": "SOLVED_DAYS", ":days": bits}
+            ),
+        )
+
+    def _write_score_change(self, score: DailyScoreItem) -> bool:
+        """Write a score with its change feed item if it's created or changed.
+
+        The stored score is read with a consistent read, and the write retried
+        from the read with a new sequence while concurrent writes cancel its
+        transaction; the sequence of a cancelled attempt is abandoned.
+
+        Returns:
+            Whether the score was created or changed
+
+        Raises:
+            BotoCoreError, ClientError: If a call fails, or every attempt was
+                cancelled
+        """
+        for attempt in range(SCORE_WRITE_ATTEMPTS):
+            response = self.context.client.get_item(
+                TableName=self.context.table_name,
+                Key=self.context.serialize(daily_score_key(score.user_id, score.date)),
+                ProjectionExpression="#score",
+                ExpressionAttributeNames={"#score": "score"},
+                ConsistentRead=True,
+            )
+            old_item = response.get("Item")
+            old_score = int(old_item["score"]["N"]) if old_item else None
+            if old_score == score.score:
+                return False
+            sequence = self._reserve_sequences(1)
+            try:
+                self._transact_score_changes([(score, old_score)], sequence)
+                return True
+            except ClientError as e:
+                if not is_write_conflict(e):
+                    raise
+                self._abandon_sequences([sequence])
+                if attempt == SCORE_WRITE_ATTEMPTS - 1:
+                    raise
+        return True
+
+    def _transact_score_changes(
+        self, changes: List[Tuple[DailyScoreItem, Optional[int]]], first_sequence: int
+    ) -> None:
+        """Write scores and their change feed items in one transaction.
+
+        Each score is written on condition that its stored score is still the
+        old score of its change, and each change on condition that its
+        sequence wasn't abandoned in the meantime. The same transaction marks
+        the materialized leaderboard of each date stale and moves its
+        histogram counts (see board_write_update), so the counts always match
+        the stored scores.
+
+        Args:
+            changes: Each score with the score stored when it was read
+            first_sequence: Sequence of the first change, reserved beforehand
+
+        Raises:
+            BotoCoreError, ClientError: If the transaction fails or is
+                cancelled, e.g. by a concurrent write (see is_write_conflict)
+        """
+        expires_at = change_expiry()
+        transact_items: List[Dict[str, Any]] = []
+        for offset, (score, old_score) in enumerate(changes):
+            put: Dict[str, Any] = {
+                "TableName": self.context.table_name,
+                "Item": self.context.serialize(daily_score_to_item(score)),
+            }
+            if old_score is None:
+                put["ConditionExpression"] = "attribute_not_exists(PK)"
+            else:
+                put["ConditionExpression"] = "#score = :old"
+                put["ExpressionAttributeNames"] = {"#score": "score"}
+                put["ExpressionAttributeValues"] = self.context.serialize(
+                    {":old": old_score}
+                )
+            change = score_change_to_item(
+                first_sequence + offset, score, old_score, expires_at
+            )
+            transact_items.append({"Put": put})
+            transact_items.append(
+                {
+                    "Put": {
+                        "TableName": self.context.table_name,
+                        "Item": self.context.serialize(change),
+                        "ConditionExpression": "attribute_not_exists(PK)",
+                    }
+                }
+            )
+        changes_by_date: Dict[str, List[Tuple[int, Optional[int]]]] = {}
+        for score, old_score in changes:
+            changes_by_date.setdefault(score.date, []).append((score.score, old_score))
+        for score_date, date_changes in changes_by_date.items():
+            transact_items.append(
+                {
+                    "Update": {
+                        "TableName": self.context.table_name,
+                        **board_write_update(score_date, date_changes),
+                    }
+                }
+            )
+        self.context.client.transact_write_items(TransactItems=transact_items)
+
+    def _reserve_sequences(self, count: int) -> int:
+        """Reserve the next `count` sequences of the change feed.
+
+        The counter is incremented atomically with ADD, so concurrent writers
+        never get the same sequence.
+
+        Returns:
+            The first sequence reserved
+
+        Raises:
+            BotoCoreError, ClientError: If the update fails
+        """
+        response = self.context.client.update_item(
+            TableName=self.context.table_name,
+            Key=self.context.serialize(sequence_counter_key()),
+            UpdateExpression="SET #type = :type ADD last_sequence :count",
+            ExpressionAttributeNames={"#type": "type"},
+            ExpressionAttributeValues=self.context.serialize(
+                {":type": "SEQUENCE", ":count": count}
+            ),
+            ReturnValues="UPDATED_NEW",
+        )
+        return int(response["Attributes"]["last_sequence"]["N"]) - count + 1
+
+    def _abandon_sequences(self, sequences: Iterable[int]) -> List[int]:
+        """Put the items marking sequences abandoned, where no change has them.
+
+        Each item is put on condition that the sequence's key is free, so it
+        never replaces a change, and a change written later fails its
+        condition instead of landing behind consumers that moved past it.
+
+        Returns:
+            The sequences abandoned by this call
+
+        Raises:
+            BotoCoreError, ClientError: If a put fails other than on its
+                condition
+        """
+        expires_at = change_expiry()
+        abandoned: List[int] = []
+        for sequence in sequences:
+            try:
+                self.context.client.put_item(
+                    TableName=self.context.table_name,
+                    Item=self.context.serialize(
+                        abandoned_change_to_item(sequence, expires_at)
+                    ),
+                    ConditionExpression="attribute_not_exists(PK)",
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != (
+                    "ConditionalCheckFailedException"
+                ):
+                    raise
+                continue
+            abandoned.append(sequence)
+        return abandoned
+
+    def _get_scores(
+        self, keys: List[Tuple[str, str]], operation: str
+    ) -> Result[Dict[Tuple[str, str], int], StorageError]:
+        """Get the stored scores of (PK, SK) score keys with BatchGetItem.
+
+        Keys are read 100 at a time, retrying unprocessed keys with
+        exponential backoff.
+
+        Returns:
+            Result with the score of each key that has one, or the error to report
+        """
+        scores: Dict[Tuple[str, str], int] = {}
+        for start in range(0, len(keys), BATCH_GET_SIZE):
+            pending: List[Dict[str, Any]] = [
+                {"PK": {"S": pk}, "SK": {"S": sk}}
+                for pk, sk in keys[start : start + BATCH_GET_SIZE]
+            ]
+            for attempt in range(BATCH_WRITE_ATTEMPTS):
+                if attempt:
+                    time.sleep(BATCH_WRITE_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                try:
+                    response = self.context.client.batch_get_item(
+                        RequestItems={
+                            self.context.table_name: {
+                                "Keys": pending,
+                                "ProjectionExpression": "PK, SK, #score",
+                                "ExpressionAttributeNames": {"#score": "score"},
+                            }
+                        }
+                    )
+                except (BotoCoreError, ClientError) as e:
+                    return Failure(
+                        storage_error_from_exception(
+                            e,
+                            operation=operation,
+                            resource_type=DailyScoreItem.__name__,
+                            service_name=self.__class__.__name__,
+                        )
+                    )
+                for item in response.get("Responses", {}).get(
+                    self.context.table_name, []
+                ):
+                    key = (item["PK"]["S"], item["SK"]["S"])
+                    scores[key] = int(item["score"]["N"])
+                pending = (
+                    response.get("UnprocessedKeys", {})
+                    .get(self.context.table_name, {})
+                    .get("Keys", [])
+                )
+                if not pending:
+                    break
+            if pending:
+                return Failure(
+                    UnavailableStorageError(
+                        details=StorageOperationDetails(
+                            operation=operation,
+                            resource_type=DailyScoreItem.__name__,
+                            raw_error=(
+                                f"{len(pending)} keys still unprocessed after "
+                                f"{BATCH_WRITE_ATTEMPTS} attempts"
+                            ),
+                        ),
+                        service_name=self.__class__.__name__,
+                    )
+                )
+        return Success(scores)
+
+    def _batch_write(
+        self, items: Iterable[Dict[str, Any]], operation: str
+    ) -> Optional[StorageError]:
+        """Put items with BatchWriteItem, 25 at a time.
+
+        Unprocessed items are retried with exponential backoff.
+
+        Returns:
+            None if every item was written, otherwise the error to report
+        """
+        requests = [
+            {"PutRequest": {"Item": self.context.serialize(item)}} for item in items
+        ]
+        for start in range(0, len(requests), BATCH_WRITE_SIZE):
+            pending: List[Dict[str, Any]] = requests[start : start + BATCH_WRITE_SIZE]
+            for attempt in range(BATCH_WRITE_ATTEMPTS):
+                if attempt:
+                    time.sleep(BATCH_WRITE_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                try:
+                    response = self.context.client.batch_write_item(
+                        RequestItems={self.context.table_name: pending}
+                    )
+                except (BotoCoreError, ClientError) as e:
+                    return storage_error_from_exception(
+                        e,
+                        operation=operation,
+                        resource_type=DailyScoreItem.__name__,
+                        service_name=self.__class__.__name__,
+                    )
+                pending = response.get("UnprocessedItems", {}).get(
+                    self.context.table_name, []
+                )
+                if not pending:
+                    break
+            if pending:
+                return UnavailableStorageError(
+                    details=StorageOperationDetails(
+                        operation=operation,
+                        resource_type=DailyScoreItem.__name__,
+                        raw_error=(
+                            f"{len(pending)} items still unprocessed after "
+                            f"{BATCH_WRITE_ATTEMPTS} attempts"
+                        ),
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+        return None
+
+    def list_daily_scores(self, query: ListDailyScoresQuery) -> ListDailyScoresResult:
+        """List a page of daily scores from DynamoDB.
+
+        A user's scores are read with range queries of their partition.
+        Otherwise each date in the range is read from the date GSI in turn, in
+        rank order. Cursors record the date being read and DynamoDB's
+        LastEvaluatedKey within it.
+        """
+        try:
+            position = decode_cursor(query.cursor) if query.cursor is not None else {}
+            start_key: Optional[Dict[str, Any]] = position.get("key")
+            current = date.fromisoformat(position.get("date", query.start_date))
+            end = date.fromisoformat(query.end_date)
+        except (ValueError, TypeError, AttributeError):
+            return Failure(
+                invalid_cursor_error(
+                    str(query.cursor),
+                    operation="list_daily_scores",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        items: List[DailyScoreItem] = []
+        try:
+            if query.user_id is not None:
+                items, start_key = self._query_user_scores(query, start_key)
+                cursor = encode_cursor({"key": start_key}) if start_key else None
+                return Success(ListDailyScoresReply(items=items, cursor=cursor))
+
+            while current <= end and len(items) < query.limit:
+                page, start_key = self._query_date_scores(
+                    current.isoformat(), query.limit - len(items), start_key
+                )
+                items.extend(page)
+                if start_key is None:
+                    current += timedelta(days=1)
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="list_daily_scores",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        cursor = None
+        if current <= end:
+            cursor = encode_cursor({"date": current.isoformat(), "key": start_key})
+        return Success(ListDailyScoresReply(items=items, cursor=cursor))
+
+    def _query_user_scores(
+        self, query: ListDailyScoresQuery, start_key: Optional[Dict[str, Any]]
+    ) -> Tuple[List[DailyScoreItem], Optional[Dict[str, Any]]]:
+        """Query a page of one user's scores in the date range.
+
+        The scores are read from the user's own partition with one SK range,
+        following DynamoDB's pages until the page is full, so dates without a
+        score cost nothing.
+
+        Returns:
+            The scores and the key to continue from, if there may be more
+        """
+        items: List[DailyScoreItem] = []
+        while len(items) < query.limit:
+            kwargs: Dict[str, Any] = {}
+            if start_key:
+                kwargs["ExclusiveStartKey"] = start_key
+            response = self.context.client.query(
+                TableName=self.context.table_name,
+                KeyConditionExpression="PK = :pk AND SK BETWEEN :start AND :end",
+                ExpressionAttributeNames={"#score": "score"},
+                ExpressionAttributeValues={
+                    ":pk": {"S": f"USER#{query.user_id}"},
+                    ":start": {"S": f"SCORE#{query.start_date}"},
+                    ":end": {"S": f"SCORE#{query.end_date}"},
+                },
+                ProjectionExpression="SK, #score",
+                Limit=query.limit - len(items),
+                **kwargs,
+            )
+            items.extend(
+                DailyScoreItem(
+                    user_id=str(query.user_id),
+                    date=raw_item["SK"]["S"].removeprefix("SCORE#"),
+                    score=int(raw_item["score"]["N"]),
+                )
+                for raw_item in response.get("Items", [])
+            )
+            start_key = response.get("LastEvaluatedKey")
+            if start_key is None:
+                break
+        return items, start_key
+
+    def _query_score_history(
+        self, user_id: str, start_date: str, end_date: str
+    ) -> Tuple[List[str], List[int]]:
+        """Query every score of a user in a date window, in date order.
+
+        Returns:
+            The dates in ascending order, and the score of each date
+
+        Raises:
+            BotoCoreError, ClientError: If a query fails
+        """
+        dates: List[str] = []
+        scores: List[int] = []
+        paginator = self.context.client.get_paginator("query")
+        for page in paginator.paginate(
+            TableName=self.context.table_name,
+            KeyConditionExpression="PK = :pk AND SK BETWEEN :start AND :end",
+            ExpressionAttributeNames={"#score": "score"},
+            ExpressionAttributeValues={
+                ":pk": {"S": f"USER#{user_id}"},
+                ":start": {"S": f"SCORE#{start_date}"},
+                ":end": {"S": f"SCORE#{end_date}"},
+            },
+            ProjectionExpression="SK, #score",
+        ):
+            for item in page.get("Items", []):
+                dates.append(item["SK"]["S"].removeprefix("SCORE#"))
+                scores.append(int(item["score"]["N"]))
+        return dates, scores
+
+    def _query_date_scores(
+        self, score_date: str, limit: int, start_key: Optional[Dict[str, Any]]
+    ) -> Tuple[List[DailyScoreItem], Optional[Dict[str, Any]]]:
+        """Query up to `limit` of a date's scores from the date GSI in rank order.
+
+        Returns:
+            The scores and the key to continue from, if there may be more
+        """
+        kwargs: Dict[str, Any] = {}
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        response = self.context.client.query(
+            TableName=self.context.table_name,
+            IndexName=self.context.gsi_name,
+            KeyConditionExpression="gsi1_pk = :pk",
+            ExpressionAttributeValues={":pk": {"S": f"DATE#{score_date}"}},
+            Limit=limit,
+            **kwargs,
+        )
+        items = [
+            DailyScoreItem(
+                user_id=item["userId"]["S"],
+                date=score_date,
+                score=int(item["gsi1_sk"]["N"]),
+            )
+            for item in response.get("Items", [])
+        ]
+        return items, response.get("LastEvaluatedKey")
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        """Read the change feed items after a checkpoint from every shard.
+
+        Each of the CHANGE_SHARDS partitions is read in sort key order, up to
+        a page of items, and the items merged in sequence order. A shard with
+        more items returns a whole page, so the first page of the merged
+        items holds no sequence past an item a shard didn't return.
+
+        Sequences are reserved before their items are written, so a change
+        can become visible after one with a later sequence while writers run
+        concurrently; ScoreChangeConsumer waits out such gaps, and abandons
+        them through abandon_score_changes. Items expire
+        CHANGE_RETENTION_SECONDS after they're written.
+        """
+        entries: List[ChangeEntry] = []
+        try:
+            for shard in range(CHANGE_SHARDS):
+                entries.extend(
+                    self._query_change_shard(shard, query.after_sequence, query.limit)
+                )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="list_score_changes",
+                    resource_type=ScoreChange.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        page = sorted(entries, key=lambda entry: entry[0])[: query.limit]
+        return Success(
+            changes_reply(
+                query.after_sequence,
+                (
+                    (sequence, *change)
+                    for sequence, change in page
+                    if change is not None
+                ),
+                (sequence for sequence, change in page if change is None),
+            )
+        )
+
+    def _query_change_shard(
+        self, shard: int, after_sequence: int, limit: int
+    ) -> List[ChangeEntry]:
+        """Read up to `limit` items of a change feed shard after a sequence.
+
+        Returns:
+            The items' entries in sequence order
+
+        Raises:
+            BotoCoreError, ClientError: If a query fails
+        """
+        entries: List[ChangeEntry] = []
+        kwargs: Dict[str, Any] = {}
+        while True:
+            response = self.context.client.query(
+                TableName=self.context.table_name,
+                KeyConditionExpression="PK = :pk AND SK BETWEEN :start AND :end",
+                ExpressionAttributeValues=self.context.serialize(
+                    {
+                        ":pk": change_shard_pk(shard),
+                        ":start": score_change_key(after_sequence + 1)["SK"],
+                        ":end": score_change_key(10**SEQUENCE_DIGITS - 1)["SK"],
+                    }
+                ),
+                Limit=limit - len(entries),
+                **kwargs,
+            )
+            for raw_item in response.get("Items", []):
+                item = self.context.deserialize(raw_item)
+                if item.get("type") == "ABANDONED_CHANGE":
+                    entries.append((int(item["sequence"]), None))
+                    continue
+                old_score = item.get("old_score")
+                entries.append(
+                    (
+                        int(item["sequence"]),
+                        (
+                            str(item["userId"]),
+                            str(item["date"]),
+                            int(old_score) if old_score is not None else None,
+                            int(item["new_score"]),
+                        ),
+                    )
+                )
+            if "LastEvaluatedKey" not in response or len(entries) == limit:
+                return entries
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        """Abandon sequences by putting items in their place, where no change is.
+
+        A sequence whose change was written in the meantime, or that was
+        already abandoned, isn't abandoned by this call; the next read of the
+        feed lists it either way.
+        """
+        try:
+            abandoned = self._abandon_sequences(query.sequences)
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="abandon_score_changes",
+                    resource_type=ScoreChange.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(AbandonScoreChangesReply(abandoned_sequences=abandoned))
+
+    def claim_user_refresh(
+        self, query: ClaimUserRefreshQuery
+    ) -> ClaimUserRefreshResult:
+        """Claim a user's refresh with one conditional update of their metadata.
+
+        The claim time is set on the metadata item only if its fetch time and
+        any earlier claim are old enough. The item as it was before, returned
+        whether or not the condition held, gives the last attempt time. A
+        save_user_metadata replaces the item and drops the claim, but it also
+        sets a newer fetch time, so the debounce still holds.
+        """
+        cutoff = {"N": str(query.now - query.debounce_seconds)}
+        try:
+            response = self.context.client.update_item(
+                TableName=self.context.table_name,
+                Key=self.context.serialize(user_metadata_key(query.user_id)),
+                UpdateExpression="SET refresh_claimed_at = :now",
+                ConditionExpression=(
+                    "attribute_exists(PK)"
+                    " AND (attribute_not_exists(last_fetched_timestamp)"
+                    " OR last_fetched_timestamp <= :cutoff)"
+                    " AND (attribute_not_exists(refresh_claimed_at)"
+                    " OR refresh_claimed_at <= :cutoff)"
+                ),
+                ExpressionAttributeValues={
+                    ":now": {"N": str(query.now)},
+                    ":cutoff": cutoff,
+                },
+                ReturnValues="ALL_OLD",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+            claimed = True
+            old_item = response.get("Attributes", {})
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code != "ConditionalCheckFailedException":
+                return Failure(
+                    storage_error_from_exception(
+                        e,
+                        operation="claim_user_refresh",
+                        resource_type=UserMetadataItem.__name__,
+                        service_name=self.__class__.__name__,
+                    )
+                )
+            claimed = False
+            old_item = e.response.get("Item", {})
+        except BotoCoreError as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="claim_user_refresh",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        if not old_item:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=UserMetadataItem.__name__,
+                        resource_id=query.user_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        last_attempt = max(
+            float(old_item.get(name, {"N": "0"})["N"])
+            for name in ("last_fetched_timestamp", "refresh_claimed_at")
+        )
+        return Success(
+            ClaimUserRefreshReply(claimed=claimed, last_attempt_timestamp=last_attempt)
+        )
+
+    def get_sweep_cursor(self, query: GetSweepCursorQuery) -> GetSweepCursorResult:
+        """Get the sweep cursor from DynamoDB."""
+        try:
+            response = self.context.client.get_item(
+                TableName=self.context.table_name,
+                Key=self.context.serialize(sweep_cursor_key()),
+            )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_sweep_cursor",
+                    resource_type="SweepCursor",
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        if "Item" not in response:
+            return Success(GetSweepCursorReply())
+        item = self.context.deserialize(response["Item"])
+        return Success(GetSweepCursorReply(after_user_id=item["afterUserId"]))
+
+    def save_sweep_cursor(self, query: SaveSweepCursorQuery) -> SaveSweepCursorResult:
+        """Save the sweep cursor to DynamoDB, deleting its item when cleared."""
+        key = self.context.serialize(sweep_cursor_key())
+        try:
+            if query.after_user_id is None:
+                self.context.client.delete_item(
+                    TableName=self.context.table_name, Key=key
+                )
+            else:
+                self.context.client.put_item(
+                    TableName=self.context.table_name,
+                    Item=self.context.serialize(
+                        {
+                            **sweep_cursor_key(),
+                            "type": "SWEEP_CURSOR",
+                            "afterUserId": query.after_user_id,
+                        }
+                    ),
+                )
+        except (BotoCoreError, ClientError) as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_sweep_cursor",
+                    resource_type="SweepCursor",
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(SaveSweepCursorReply())
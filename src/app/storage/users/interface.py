@@ -3,12 +3,34 @@
 from typing import Protocol
 
 from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesResult,
+    ClaimUserRefreshQuery,
+    ClaimUserRefreshResult,
+    CreateUsersIfNotExistQuery,
+    CreateUsersIfNotExistResult,
     GetAllUserIdsQuery,
     GetAllUserIdsResult,
+    GetHeadToHeadQuery,
+    GetHeadToHeadResult,
+    GetSweepCursorQuery,
+    GetSweepCursorResult,
     GetUserMetadataQuery,
     GetUserMetadataResult,
+    GetUserStreaksQuery,
+    GetUserStreaksResult,
+    ListDailyScoresQuery,
+    ListDailyScoresResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    RebuildStreaksQuery,
+    RebuildStreaksResult,
+    SaveBatchQuery,
+    SaveBatchResult,
     SaveDailyScoreQuery,
     SaveDailyScoreResult,
+    SaveSweepCursorQuery,
+    SaveSweepCursorResult,
     SaveUserMetadataQuery,
     SaveUserMetadataResult,
 )
@@ -38,7 +60,7 @@ class UserStorage(Protocol):
             query: Daily score information to save
 
         Returns:
-            Result indicating success, or one of these errors:
+            Result with whether the score was created or changed, or one of these errors:
                 - NotFoundStorageError: If the user ID doesn't exist and is required
                 - UnavailableStorageError: If the backing storage is temporarily unavailable
                 - InternalStorageError: If another implementation-dependent error occurs
@@ -72,3 +94,205 @@ class UserStorage(Protocol):
                 - InternalStorageError: If another implementation-dependent error occurs
         """
         ...
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Create users that don't exist yet, leaving existing users untouched.
+
+        Args:
+            query: Batch of user metadata to create
+
+        Returns:
+            Result listing created and already existing user IDs, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Save many user metadata items and daily scores at once.
+
+        Items are written with the same semantics as save_user_metadata and
+        save_daily_score, but implementations may group them into fewer round
+        trips. The batch isn't atomic: on failure some items may have been saved.
+
+        Args:
+            query: User metadata and daily scores to save
+
+        Returns:
+            Result indicating success, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def list_daily_scores(self, query: ListDailyScoresQuery) -> ListDailyScoresResult:
+        """List one page of the daily scores within a date range.
+
+        Pages are ordered by date; the order of scores within a date is up to
+        the implementation. Pass each reply's cursor back to get the next page
+        until it is None. Scores saved while paging may or may not be listed.
+
+        Args:
+            query: Date range, optional user filter, page size and cursor
+
+        Returns:
+            Result containing the page of scores if successful, or one of these errors:
+                - InvalidArgumentStorageError: If the cursor wasn't made by this implementation
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def get_head_to_head(self, query: GetHeadToHeadQuery) -> GetHeadToHeadResult:
+        """Compare two users' scores on the days both solved in a date window.
+
+        Implementations read each user's scores in the window as date-sorted
+        arrays and walk both in one linear merge, so the cost is proportional
+        to the users' days in the window whatever else is stored.
+
+        Args:
+            query: Users to compare and the date window
+
+        Returns:
+            Result containing the comparison if successful, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def get_user_streaks(self, query: GetUserStreaksQuery) -> GetUserStreaksResult:
+        """Compute a user's solve streaks as of a day from their stored scores.
+
+        Implementations keep a bitmap of each user's solved days up to date as
+        scores are saved, so streaks take a few bitwise operations however long
+        the user's history is. Users without scores have no streaks.
+
+        Args:
+            query: User and day to compute the streaks as of
+
+        Returns:
+            Result containing the streaks if successful, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def rebuild_streaks(self, query: RebuildStreaksQuery) -> RebuildStreaksResult:
+        """Rebuild the solved-day bitmap of every user from their scores.
+
+        Reads every stored score once, e.g. to build the bitmaps of scores
+        saved before they existed.
+
+        Args:
+            query: Parameters for the rebuild
+
+        Returns:
+            Result with the number of users rebuilt, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        """Read the change feed of daily scores from a checkpoint.
+
+        Every save that creates a score or changes its value appends a change
+        with the next sequence number; rewriting a score unchanged appends
+        nothing. Consumers keep the checkpoint of the last page they applied
+        and pass it back, so structures derived from the scores are updated
+        from the changes since then rather than rebuilt.
+
+        A sequence can be missing from the feed, e.g. if it was reserved by a
+        write that is still in flight or was cancelled. A sequence that was
+        abandoned is listed as such, so consumers can move past it.
+
+        Args:
+            query: Checkpoint to read after and maximum number of changes
+
+        Returns:
+            Result with the changes and abandoned sequences in sequence order
+            and the next checkpoint, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        """Mark sequences missing from the change feed as abandoned.
+
+        Consumers call this before moving past a sequence that has stayed
+        missing. A sequence is abandoned only if no change has it yet. After
+        that, no write can record a change with it, so a write that was in
+        flight records its change with a new sequence instead of one the
+        consumer has moved past.
+
+        Args:
+            query: Sequences to abandon
+
+        Returns:
+            Result with the sequences now abandoned, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def get_sweep_cursor(self, query: GetSweepCursorQuery) -> GetSweepCursorResult:
+        """Read where the next update sweep resumes.
+
+        A sweep that runs out of time saves the last user ID it processed, in
+        sorted order, and the next sweep continues after it instead of
+        starting over.
+
+        Args:
+            query: Parameters for the read
+
+        Returns:
+            Result with the saved cursor, None if no sweep was interrupted, or
+            one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def save_sweep_cursor(self, query: SaveSweepCursorQuery) -> SaveSweepCursorResult:
+        """Save where the next update sweep resumes.
+
+        Args:
+            query: Last user ID processed, or None once a sweep has finished
+
+        Returns:
+            Result indicating success, or one of these errors:
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
+
+    def claim_user_refresh(
+        self, query: ClaimUserRefreshQuery
+    ) -> ClaimUserRefreshResult:
+        """Claim an on-demand refresh of a user, at most once per debounce interval.
+
+        The user is claimed only if neither their stored fetch time nor their
+        last claim is within debounce_seconds of now, and the claim is
+        recorded in the same conditional write, so of concurrent callers in
+        any process at most one succeeds. Claims are recorded whether or not
+        the refresh then succeeds, so failed refreshes are debounced too.
+        They're always read from the storage itself, never from a cache.
+
+        Args:
+            query: User, current time and debounce interval
+
+        Returns:
+            Result with whether the user was claimed and the time of their last
+            fetch or claim, or one of these errors:
+                - NotFoundStorageError: If the user has no metadata
+                - UnavailableStorageError: If the backing storage is temporarily unavailable
+                - InternalStorageError: If another implementation-dependent error occurs
+        """
+        ...
@@ -1,25 +1,65 @@
 """In-memory implementation of user storage."""
 
+from typing import List, Optional, Tuple
+
 from returns.result import Failure, Success
 
 from app.core.error import NotFoundDetails, NotFoundStorageError
+from app.storage.change_feed import changes_reply
 from app.storage.memory_context import InMemoryStorageContext
-from app.storage.models import UserMetadataItem
+from app.storage.models import DailyScoreItem, DailyScoreKey, UserMetadataItem
+from app.storage.pagination import (
+    decode_cursor,
+    encode_cursor,
+    invalid_cursor_error,
+)
+from app.storage.streaks import streaks_reply
 from app.storage.users.interface import UserStorage
 from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesReply,
+    AbandonScoreChangesResult,
+    ClaimUserRefreshQuery,
+    ClaimUserRefreshReply,
+    ClaimUserRefreshResult,
+    CreateUsersIfNotExistQuery,
+    CreateUsersIfNotExistReply,
+    CreateUsersIfNotExistResult,
     GetAllUserIdsQuery,
     GetAllUserIdsReply,
     GetAllUserIdsResult,
+    GetHeadToHeadQuery,
+    GetHeadToHeadResult,
+    GetSweepCursorQuery,
+    GetSweepCursorReply,
+    GetSweepCursorResult,
     GetUserMetadataQuery,
     GetUserMetadataReply,
     GetUserMetadataResult,
+    GetUserStreaksQuery,
+    GetUserStreaksResult,
+    ListDailyScoresQuery,
+    ListDailyScoresReply,
+    ListDailyScoresResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    RebuildStreaksQuery,
+    RebuildStreaksReply,
+    RebuildStreaksResult,
+    SaveBatchQuery,
+    SaveBatchReply,
+    SaveBatchResult,
     SaveDailyScoreQuery,
     SaveDailyScoreReply,
     SaveDailyScoreResult,
+    SaveSweepCursorQuery,
+    SaveSweepCursorReply,
+    SaveSweepCursorResult,
     SaveUserMetadataQuery,
     SaveUserMetadataReply,
     SaveUserMetadataResult,
 )
+from app.storage.versus import head_to_head
 
 
 class InMemoryUserStorage(UserStorage):
@@ -50,17 +90,201 @@ class InMemoryUserStorage(UserStorage):
 
     def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
         """Save a daily score to in-memory storage."""
-        self.context.scores[query.item.key] = query.item
-        return Success(SaveDailyScoreReply())
+        changed = self.context.save_scores([query.item])
+        return Success(SaveDailyScoreReply(changed=bool(changed)))
 
     def save_user_metadata(
         self, query: SaveUserMetadataQuery
     ) -> SaveUserMetadataResult:
         """Save user metadata to in-memory storage."""
-        self.context.users[query.item.key] = query.item
+        with self.context.lock:
+            self.context.users[query.item.key] = query.item
         return Success(SaveUserMetadataReply())
 
     def get_all_user_ids(self, query: GetAllUserIdsQuery) -> GetAllUserIdsResult:
         """Get all user IDs from in-memory storage."""
         user_ids = list(self.context.users.keys())
         return Success(GetAllUserIdsReply(user_ids=user_ids))
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Create users that don't exist yet in in-memory storage."""
+        created_user_ids = []
+        existing_user_ids = []
+        with self.context.lock:
+            for item in query.items:
+                if item.key in self.context.users:
+                    existing_user_ids.append(item.key)
+                else:
+                    self.context.users[item.key] = item
+                    created_user_ids.append(item.key)
+        return Success(
+            CreateUsersIfNotExistReply(
+                created_user_ids=created_user_ids,
+                existing_user_ids=existing_user_ids,
+            )
+        )
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Save a batch of user metadata and daily scores to in-memory storage."""
+        with self.context.lock:
+            for metadata in query.user_metadata_items:
+                self.context.users[metadata.key] = metadata
+        changed = self.context.save_scores(query.daily_score_items)
+        return Success(
+            SaveBatchReply(changed_dates=sorted({item.date for item in changed}))
+        )
+
+    def list_daily_scores(self, query: ListDailyScoresQuery) -> ListDailyScoresResult:
+        """List a page of daily scores from in-memory storage.
+
+        Scores are listed in rank order within each date, and cursors record
+        the (date, score, user ID) of the last score listed.
+        """
+        after_date = ""
+        after: Optional[Tuple[int, str]] = None
+        if query.cursor is not None:
+            try:
+                after_date, score, user_id = decode_cursor(query.cursor)
+                after = (int(score), str(user_id))
+            except (ValueError, TypeError):
+                return Failure(
+                    invalid_cursor_error(
+                        query.cursor,
+                        operation="list_daily_scores",
+                        resource_type=DailyScoreItem.__name__,
+                        service_name=self.__class__.__name__,
+                    )
+                )
+
+        items: List[DailyScoreItem] = []
+        for date in self.context.dates():
+            if date < query.start_date or date < after_date:
+                continue
+            if date > query.end_date or len(items) == query.limit:
+                break
+            if query.user_id is not None:
+                score_item = self.context.scores.get(
+                    DailyScoreKey(user_id=query.user_id, date=date)
+                )
+                if score_item is not None and date != after_date:
+                    items.append(score_item)
+                continue
+            ranked = self.context.scores_after(
+                date, after if date == after_date else None, query.limit - len(items)
+            )
+            items.extend(
+                # The scores were validated when they were saved
+                DailyScoreItem.model_construct(user_id=user_id, date=date, score=score)
+                for score, user_id in ranked
+            )
+
+        cursor = None
+        if len(items) == query.limit:
+            last = items[-1]
+            cursor = encode_cursor([last.date, last.score, last.user_id])
+        return Success(ListDailyScoresReply(items=items, cursor=cursor))
+
+    def get_head_to_head(self, query: GetHeadToHeadQuery) -> GetHeadToHeadResult:
+        """Compare two users by merging their in-memory score histories."""
+        user_dates, user_scores = self.context.score_history(
+            query.user_id, query.start_date, query.end_date
+        )
+        opponent_dates, opponent_scores = self.context.score_history(
+            query.opponent_id, query.start_date, query.end_date
+        )
+        return Success(
+            head_to_head(
+                query.user_id,
+                query.opponent_id,
+                user_dates,
+                user_scores,
+                opponent_dates,
+                opponent_scores,
+            )
+        )
+
+    def get_user_streaks(self, query: GetUserStreaksQuery) -> GetUserStreaksResult:
+        """Compute a user's streaks from their in-memory solved-day bitmap."""
+        bitmap = self.context.solved_bitmap(query.user_id)
+        return Success(streaks_reply(query.user_id, query.as_of, bitmap))
+
+    def rebuild_streaks(self, query: RebuildStreaksQuery) -> RebuildStreaksResult:
+        """Rebuild the solved-day bitmaps from the in-memory scores."""
+        user_count = self.context.rebuild_solved_days()
+        return Success(RebuildStreaksReply(user_count=user_count))
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        """Read the in-memory change feed after a checkpoint."""
+        first_sequence, changes = self.context.changes_after(
+            query.after_sequence, query.limit
+        )
+        return Success(
+            changes_reply(
+                query.after_sequence,
+                (
+                    (sequence, *change)
+                    for sequence, change in enumerate(changes, start=first_sequence)
+                ),
+            )
+        )
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        """Abandon the sequences the in-memory feed doesn't hold.
+
+        Sequences are assigned as changes are appended, so the only missing
+        ones are changes dropped past the feed's cap.
+        """
+        with self.context.lock:
+            stored = range(
+                self.context.first_change_sequence,
+                self.context.first_change_sequence + len(self.context.score_changes),
+            )
+        return Success(
+            AbandonScoreChangesReply(
+                abandoned_sequences=[
+                    sequence for sequence in query.sequences if sequence not in stored
+                ]
+            )
+        )
+
+    def get_sweep_cursor(self, query: GetSweepCursorQuery) -> GetSweepCursorResult:
+        """Get the sweep cursor from in-memory storage."""
+        return Success(GetSweepCursorReply(after_user_id=self.context.sweep_cursor))
+
+    def save_sweep_cursor(self, query: SaveSweepCursorQuery) -> SaveSweepCursorResult:
+        """Save the sweep cursor to in-memory storage."""
+        self.context.sweep_cursor = query.after_user_id
+        return Success(SaveSweepCursorReply())
+
+    def claim_user_refresh(
+        self, query: ClaimUserRefreshQuery
+    ) -> ClaimUserRefreshResult:
+        """Claim a user's refresh in in-memory storage."""
+        with self.context.lock:
+            metadata = self.context.users.get(query.user_id)
+            if metadata is None:
+                return Failure(
+                    NotFoundStorageError(
+                        details=NotFoundDetails(
+                            resource_type=UserMetadataItem.__name__,
+                            resource_id=query.user_id,
+                        ),
+                        service_name=self.__class__.__name__,
+                    )
+                )
+            last_attempt = max(
+                metadata.last_fetched_timestamp,
+                self.context.refresh_claims.get(query.user_id, 0.0),
+            )
+            claimed = query.now - last_attempt >= query.debounce_seconds
+            if claimed:
+                self.context.refresh_claims[query.user_id] = query.now
+        return Success(
+            ClaimUserRefreshReply(claimed=claimed, last_attempt_timestamp=last_attempt)
+        )
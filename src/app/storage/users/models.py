@@ -1,12 +1,12 @@
 """Models for user storage operations."""
 
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 from returns.result import Result
 
 from app.core.error import StorageError
-from app.storage.models import DailyScoreItem, UserMetadataItem, UserMetadataKey
+from app.storage.models import DailyScoreItem, Date, UserMetadataItem, UserMetadataKey
 
 
 class GetUserMetadataQuery(BaseModel):
@@ -41,7 +41,10 @@ class SaveDailyScoreQuery(BaseModel):
 class SaveDailyScoreReply(BaseModel):
     """Response data for save_daily_score operation."""
 
-    pass
+    changed: bool = Field(
+        default=True,
+        description="Whether the score was created or changed; True if unknown",
+    )
 
 
 type SaveDailyScoreResult = Result[SaveDailyScoreReply, StorageError]
@@ -79,3 +82,355 @@ class GetAllUserIdsReply(BaseModel):
 
 
 type GetAllUserIdsResult = Result[GetAllUserIdsReply, StorageError]
+
+
+class CreateUsersIfNotExistQuery(BaseModel):
+    """Query parameters for registering a batch of users."""
+
+    items: List[UserMetadataItem] = Field(
+        description="User metadata to create for users that don't exist yet"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class CreateUsersIfNotExistReply(BaseModel):
+    """Response data for create_users_if_not_exist operation."""
+
+    created_user_ids: List[UserMetadataKey] = Field(
+        default_factory=list, description="IDs of users that were newly created"
+    )
+    existing_user_ids: List[UserMetadataKey] = Field(
+        default_factory=list, description="IDs of users that already existed"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type CreateUsersIfNotExistResult = Result[CreateUsersIfNotExistReply, StorageError]
+
+
+class SaveBatchQuery(BaseModel):
+    """Query parameters for saving a batch of user metadata and daily scores."""
+
+    user_metadata_items: List[UserMetadataItem] = Field(
+        default_factory=list, description="User metadata to save"
+    )
+    daily_score_items: List[DailyScoreItem] = Field(
+        default_factory=list, description="Daily scores to save"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class SaveBatchReply(BaseModel):
+    """Response data for save_batch operation."""
+
+    changed_dates: List[str] = Field(
+        default_factory=list,
+        description="Sorted dates with a score created or changed by the batch",
+    )
+
+
+type SaveBatchResult = Result[SaveBatchReply, StorageError]
+
+
+# Largest page list_daily_scores returns
+MAX_LIST_DAILY_SCORES_LIMIT = 1000
+
+
+class ListDailyScoresQuery(BaseModel):
+    """Query parameters for listing one page of daily scores."""
+
+    start_date: Date = Field(description="First date to include, in YYYY-MM-DD format")
+    end_date: Date = Field(description="Last date to include, in YYYY-MM-DD format")
+    user_id: Optional[UserMetadataKey] = Field(
+        default=None, description="Only list this user's scores, if set"
+    )
+    limit: int = Field(
+        default=MAX_LIST_DAILY_SCORES_LIMIT,
+        ge=1,
+        le=MAX_LIST_DAILY_SCORES_LIMIT,
+        description="Maximum number of scores in the page",
+    )
+    cursor: Optional[str] = Field(
+        default=None, description="Cursor of the previous page, to continue after it"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class ListDailyScoresReply(BaseModel):
+    """Response data for list_daily_scores operation."""
+
+    items: List[DailyScoreItem] = Field(description="Daily scores in the page")
+    cursor: Optional[str] = Field(
+        default=None, description="Cursor of the next page, or None after the last"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type ListDailyScoresResult = Result[ListDailyScoresReply, StorageError]
+
+
+# Bounds of the date window compared when a head-to-head query leaves it open
+FIRST_COMPARED_DATE = "0001-01-01"
+LAST_COMPARED_DATE = "9999-12-31"
+
+
+class GetHeadToHeadQuery(BaseModel):
+    """Query parameters for comparing two users on the days both solved."""
+
+    user_id: UserMetadataKey = Field(description="ID of the user")
+    opponent_id: UserMetadataKey = Field(description="ID of the user to compare to")
+    start_date: Date = Field(
+        default=FIRST_COMPARED_DATE,
+        description="First date to compare, in YYYY-MM-DD format",
+    )
+    end_date: Date = Field(
+        default=LAST_COMPARED_DATE,
+        description="Last date to compare, in YYYY-MM-DD format",
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class GetHeadToHeadReply(BaseModel):
+    """Response data for get_head_to_head operation.
+
+    Lower scores win, and deltas are the user's score minus the opponent's,
+    so a negative delta means the user was faster.
+    """
+
+    user_id: UserMetadataKey = Field(description="ID of the user")
+    opponent_id: UserMetadataKey = Field(description="ID of the user compared to")
+    shared_days: int = Field(description="Days both users have a score for", ge=0)
+    wins: int = Field(description="Shared days the user was faster", ge=0)
+    losses: int = Field(description="Shared days the opponent was faster", ge=0)
+    ties: int = Field(description="Shared days with equal scores", ge=0)
+    average_delta: Optional[float] = Field(
+        description="Mean delta over the shared days, None if there are none"
+    )
+    average_win_margin: Optional[float] = Field(
+        description="Mean seconds the user won by, None without wins"
+    )
+    average_loss_margin: Optional[float] = Field(
+        description="Mean seconds the user lost by, None without losses"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type GetHeadToHeadResult = Result[GetHeadToHeadReply, StorageError]
+
+
+class GetUserStreaksQuery(BaseModel):
+    """Query parameters for computing a user's solve streaks."""
+
+    user_id: UserMetadataKey = Field(description="ID of the user")
+    as_of: Date = Field(
+        description="Day to compute the streaks as of, in YYYY-MM-DD format"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class GetUserStreaksReply(BaseModel):
+    """Response data for get_user_streaks operation."""
+
+    user_id: UserMetadataKey = Field(description="ID of the user")
+    as_of: Date = Field(description="Day the streaks are computed as of")
+    current_streak: int = Field(
+        description="Consecutive days solved up to as_of, or up to the day before "
+        "if as_of isn't solved yet",
+        ge=0,
+    )
+    longest_streak: int = Field(
+        description="Most consecutive days solved up to as_of", ge=0
+    )
+    solved_count: int = Field(description="Days solved up to as_of", ge=0)
+
+    model_config = ConfigDict(frozen=True)
+
+
+type GetUserStreaksResult = Result[GetUserStreaksReply, StorageError]
+
+
+class RebuildStreaksQuery(BaseModel):
+    """Query parameters for rebuilding every user's solved-day bitmap."""
+
+    pass
+
+
+class RebuildStreaksReply(BaseModel):
+    """Response data for rebuild_streaks operation."""
+
+    user_count: int = Field(description="Number of users with a bitmap", ge=0)
+
+    model_config = ConfigDict(frozen=True)
+
+
+type RebuildStreaksResult = Result[RebuildStreaksReply, StorageError]
+
+
+# Largest page of changes list_score_changes returns
+MAX_LIST_SCORE_CHANGES_LIMIT = 1000
+
+
+class ScoreChange(BaseModel):
+    """A write that changed a daily score, as recorded in the change feed."""
+
+    sequence: int = Field(
+        ge=1, description="Position in the feed, increasing with every change"
+    )
+    user_id: UserMetadataKey = Field(description="User whose score changed")
+    date: Date = Field(description="Date of the score in YYYY-MM-DD format")
+    old_score: Optional[int] = Field(
+        default=None, description="Score before the write, or None if it was new"
+    )
+    new_score: int = Field(description="Score written")
+
+    model_config = ConfigDict(frozen=True)
+
+
+class ListScoreChangesQuery(BaseModel):
+    """Query parameters for reading the change feed from a checkpoint."""
+
+    after_sequence: int = Field(
+        default=0,
+        ge=0,
+        description="Sequence of the last change already read, or 0 for all",
+    )
+    limit: int = Field(
+        default=MAX_LIST_SCORE_CHANGES_LIMIT,
+        ge=1,
+        le=MAX_LIST_SCORE_CHANGES_LIMIT,
+        description="Maximum number of changes in the page",
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class ListScoreChangesReply(BaseModel):
+    """Response data for list_score_changes operation."""
+
+    changes: List[ScoreChange] = Field(description="Changes in sequence order")
+    abandoned_sequences: List[int] = Field(
+        default_factory=list,
+        description=(
+            "Sequences in the page that were abandoned, in order; no change will"
+            " ever have them"
+        ),
+    )
+    checkpoint: int = Field(
+        ge=0,
+        description=(
+            "Last sequence in the page, of a change or an abandoned sequence, or"
+            " after_sequence if it's empty; pass it as after_sequence to read"
+            " the next page"
+        ),
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type ListScoreChangesResult = Result[ListScoreChangesReply, StorageError]
+
+
+class AbandonScoreChangesQuery(BaseModel):
+    """Query parameters for giving up on sequences missing from the feed."""
+
+    sequences: List[int] = Field(
+        min_length=1,
+        max_length=MAX_LIST_SCORE_CHANGES_LIMIT,
+        description="Sequences a consumer found missing, in order",
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class AbandonScoreChangesReply(BaseModel):
+    """Response data for abandon_score_changes operation."""
+
+    abandoned_sequences: List[int] = Field(
+        description=(
+            "Sequences no change will ever have, in order; the others have"
+            " changes that are yet to be read"
+        )
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type AbandonScoreChangesResult = Result[AbandonScoreChangesReply, StorageError]
+
+
+class GetSweepCursorQuery(BaseModel):
+    """Query parameters for reading where the update sweep resumes."""
+
+    pass
+
+
+class GetSweepCursorReply(BaseModel):
+    """Response data for get_sweep_cursor operation."""
+
+    after_user_id: Optional[UserMetadataKey] = Field(
+        default=None,
+        description=(
+            "Last user ID, in sorted order, the interrupted sweep processed, or"
+            " None if the next sweep starts from the first user"
+        ),
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type GetSweepCursorResult = Result[GetSweepCursorReply, StorageError]
+
+
+class SaveSweepCursorQuery(BaseModel):
+    """Query parameters for saving where the update sweep resumes."""
+
+    after_user_id: Optional[UserMetadataKey] = Field(
+        default=None,
+        description="Last user ID processed, or None to start the next sweep over",
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class SaveSweepCursorReply(BaseModel):
+    """Response data for save_sweep_cursor operation."""
+
+    pass
+
+
+type SaveSweepCursorResult = Result[SaveSweepCursorReply, StorageError]
+
+
+class ClaimUserRefreshQuery(BaseModel):
+    """Query parameters for claiming an on-demand refresh of a user."""
+
+    user_id: UserMetadataKey = Field(description="ID of the user to refresh")
+    now: float = Field(description="Current Unix time, in seconds")
+    debounce_seconds: float = Field(
+        ge=0,
+        description="How long after a fetch or a claim the user can't be claimed",
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+class ClaimUserRefreshReply(BaseModel):
+    """Response data for claim_user_refresh operation."""
+
+    claimed: bool = Field(description="Whether this caller may refresh the user")
+    last_attempt_timestamp: float = Field(
+        description="Unix time of the user's last fetch or claim before this one"
+    )
+
+    model_config = ConfigDict(frozen=True)
+
+
+type ClaimUserRefreshResult = Result[ClaimUserRefreshReply, StorageError]
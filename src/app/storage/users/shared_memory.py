@@ -0,0 +1,343 @@
+"""Shared-memory implementations of user storage."""
+
+from typing import List, Optional, Tuple
+
+from returns.result import Failure, Success
+
+from app.core.error import (
+    InternalStorageError,
+    NotFoundDetails,
+    NotFoundStorageError,
+    StorageError,
+    StorageOperationDetails,
+)
+from app.storage.memory_snapshot import SnapshotFormatError
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.pagination import decode_cursor, encode_cursor, invalid_cursor_error
+from app.storage.shared_memory_context import SharedMemoryStorageContext
+from app.storage.streaks import build_bitmap, streaks_reply
+from app.storage.users.interface import UserStorage
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesResult,
+    ClaimUserRefreshQuery,
+    ClaimUserRefreshResult,
+    CreateUsersIfNotExistQuery,
+    CreateUsersIfNotExistResult,
+    GetAllUserIdsQuery,
+    GetAllUserIdsReply,
+    GetAllUserIdsResult,
+    GetHeadToHeadQuery,
+    GetHeadToHeadResult,
+    GetSweepCursorQuery,
+    GetSweepCursorResult,
+    GetUserMetadataQuery,
+    GetUserMetadataReply,
+    GetUserMetadataResult,
+    GetUserStreaksQuery,
+    GetUserStreaksResult,
+    ListDailyScoresQuery,
+    ListDailyScoresReply,
+    ListDailyScoresResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    RebuildStreaksQuery,
+    RebuildStreaksResult,
+    SaveBatchQuery,
+    SaveBatchResult,
+    SaveDailyScoreQuery,
+    SaveDailyScoreResult,
+    SaveSweepCursorQuery,
+    SaveSweepCursorResult,
+    SaveUserMetadataQuery,
+    SaveUserMetadataResult,
+)
+from app.storage.versus import head_to_head
+
+
+class SharedMemoryUserStorage(InMemoryUserStorage):
+    """User storage of the one process that owns the shared-memory segment.
+
+    Reads and writes go to the writer's in-memory working copy. Writes mark
+    the copy dirty; they reach reader processes when the leaderboard storage
+    publishes it on refresh_daily_leaderboard.
+    """
+
+    def __init__(self, context: SharedMemoryStorageContext) -> None:
+        """Initialize the shared-memory user storage.
+
+        Args:
+            context: Shared-memory storage context of the writer
+
+        Raises:
+            ValueError: If the context isn't the writer's
+        """
+        if context.writer_context is None:
+            raise ValueError("Only the writer's context has a working copy")
+        super().__init__(context.writer_context)
+        self.shared_context = context
+
+    def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
+        """Save a daily score to the working copy."""
+        result = super().save_daily_score(query)
+        self.shared_context.dirty = True
+        return result
+
+    def save_user_metadata(
+        self, query: SaveUserMetadataQuery
+    ) -> SaveUserMetadataResult:
+        """Save user metadata to the working copy."""
+        result = super().save_user_metadata(query)
+        self.shared_context.dirty = True
+        return result
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Create users that don't exist yet in the working copy."""
+        result = super().create_users_if_not_exist(query)
+        self.shared_context.dirty = True
+        return result
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Save a batch of user metadata and daily scores to the working copy."""
+        result = super().save_batch(query)
+        self.shared_context.dirty = True
+        return result
+
+
+class ReadOnlySharedMemoryUserStorage(UserStorage):
+    """User storage of the processes that only read the shared-memory segment.
+
+    Reads are served in place from the published snapshot, so they see the
+    writer's data as of its last publish and no process holds a private copy.
+    Until a snapshot is published there are no users. Writes, the change feed
+    and the sweep cursor belong to the writer, so they fail with an
+    InternalStorageError.
+    """
+
+    def __init__(self, context: SharedMemoryStorageContext) -> None:
+        """Initialize the read-only shared-memory user storage.
+
+        Args:
+            context: Shared-memory storage context
+        """
+        self.context = context
+
+    def get_user_metadata(self, query: GetUserMetadataQuery) -> GetUserMetadataResult:
+        """Get user metadata from the published snapshot."""
+        try:
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("get_user_metadata", UserMetadataItem, e))
+        record = reader.user(int(query.user_id)) if reader is not None else None
+        if record is None:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=UserMetadataItem.__name__,
+                        resource_id=query.user_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        user_id, fetched, attempted, solved, streak = record
+        return Success(
+            GetUserMetadataReply(
+                # The records were validated before they were published
+                item=UserMetadataItem.model_construct(
+                    user_id=str(user_id),
+                    last_fetched_timestamp=fetched,
+                    puzzles_attempted=attempted,
+                    puzzles_solved=solved,
+                    current_streak=streak,
+                )
+            )
+        )
+
+    def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
+        """Fail, as only the writer saves scores."""
+        return Failure(self._read_only_error("save_daily_score", DailyScoreItem))
+
+    def save_user_metadata(
+        self, query: SaveUserMetadataQuery
+    ) -> SaveUserMetadataResult:
+        """Fail, as only the writer saves metadata."""
+        return Failure(self._read_only_error("save_user_metadata", UserMetadataItem))
+
+    def get_all_user_ids(self, query: GetAllUserIdsQuery) -> GetAllUserIdsResult:
+        """Get all user IDs from the published snapshot."""
+        try:
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("get_all_user_ids", UserMetadataItem, e))
+        user_ids = [] if reader is None else [str(user[0]) for user in reader.users()]
+        return Success(GetAllUserIdsReply(user_ids=user_ids))
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Fail, as only the writer creates users."""
+        return Failure(
+            self._read_only_error("create_users_if_not_exist", UserMetadataItem)
+        )
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Fail, as only the writer saves batches."""
+        return Failure(self._read_only_error("save_batch", DailyScoreItem))
+
+    def list_daily_scores(self, query: ListDailyScoresQuery) -> ListDailyScoresResult:
+        """List a page of daily scores from the published snapshot.
+
+        Scores are listed in rank order within each date, and cursors record
+        the (date, score, user ID) of the last score listed.
+        """
+        after_date = ""
+        after: Optional[Tuple[int, int]] = None
+        if query.cursor is not None:
+            try:
+                after_date, score, user_id = decode_cursor(query.cursor)
+                after = (int(score), int(user_id))
+            except (ValueError, TypeError):
+                return Failure(
+                    invalid_cursor_error(
+                        query.cursor,
+                        operation="list_daily_scores",
+                        resource_type=DailyScoreItem.__name__,
+                        service_name=self.__class__.__name__,
+                    )
+                )
+        try:
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("list_daily_scores", DailyScoreItem, e))
+
+        items: List[DailyScoreItem] = []
+        if reader is not None and query.user_id is not None:
+            dates, scores = reader.user_scores(
+                int(query.user_id), query.start_date, query.end_date
+            )
+            items = [
+                DailyScoreItem.model_construct(
+                    user_id=query.user_id, date=date, score=score
+                )
+                for date, score in zip(dates, scores)
+                if date > after_date
+            ][: query.limit]
+        elif reader is not None:
+            for date in reader.date_ranges:
+                if date < query.start_date or date < after_date:
+                    continue
+                if date > query.end_date or len(items) == query.limit:
+                    break
+                remaining = query.limit - len(items)
+                ranked = (
+                    reader.ranked_scores_after(date, after, remaining)
+                    if after is not None and date == after_date
+                    else reader.ranked_scores(date, remaining)
+                )
+                items.extend(
+                    DailyScoreItem.model_construct(
+                        user_id=str(user_id), date=date, score=score
+                    )
+                    for user_id, score in ranked
+                )
+
+        cursor = None
+        if len(items) == query.limit:
+            last = items[-1]
+            cursor = encode_cursor([last.date, last.score, last.user_id])
+        return Success(ListDailyScoresReply(items=items, cursor=cursor))
+
+    def get_head_to_head(self, query: GetHeadToHeadQuery) -> GetHeadToHeadResult:
+        """Compare two users by merging their published score histories."""
+        try:
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("get_head_to_head", DailyScoreItem, e))
+        user_dates: List[str] = []
+        user_scores: List[int] = []
+        opponent_dates: List[str] = []
+        opponent_scores: List[int] = []
+        if reader is not None:
+            user_dates, user_scores = reader.user_scores(
+                int(query.user_id), query.start_date, query.end_date
+            )
+            opponent_dates, opponent_scores = reader.user_scores(
+                int(query.opponent_id), query.start_date, query.end_date
+            )
+        return Success(
+            head_to_head(
+                query.user_id,
+                query.opponent_id,
+                user_dates,
+                user_scores,
+                opponent_dates,
+                opponent_scores,
+            )
+        )
+
+    def get_user_streaks(self, query: GetUserStreaksQuery) -> GetUserStreaksResult:
+        """Compute a user's streaks from their published scores."""
+        try:
+            reader = self.context.current_reader()
+        except (OSError, SnapshotFormatError) as e:
+            return Failure(self._error("get_user_streaks", DailyScoreItem, e))
+        dates = [] if reader is None else reader.user_scores(int(query.user_id))[0]
+        return Success(streaks_reply(query.user_id, query.as_of, build_bitmap(dates)))
+
+    def rebuild_streaks(self, query: RebuildStreaksQuery) -> RebuildStreaksResult:
+        """Fail, as only the writer keeps solved-day bitmaps."""
+        return Failure(self._read_only_error("rebuild_streaks", DailyScoreItem))
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        """Fail, as the change feed isn't published."""
+        return Failure(self._read_only_error("list_score_changes", DailyScoreItem))
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        """Fail, as the change feed isn't published."""
+        return Failure(self._read_only_error("abandon_score_changes", DailyScoreItem))
+
+    def get_sweep_cursor(self, query: GetSweepCursorQuery) -> GetSweepCursorResult:
+        """Fail, as the sweep cursor isn't published."""
+        return Failure(self._read_only_error("get_sweep_cursor", UserMetadataItem))
+
+    def save_sweep_cursor(self, query: SaveSweepCursorQuery) -> SaveSweepCursorResult:
+        """Fail, as only the writer sweeps."""
+        return Failure(self._read_only_error("save_sweep_cursor", UserMetadataItem))
+
+    def claim_user_refresh(
+        self, query: ClaimUserRefreshQuery
+    ) -> ClaimUserRefreshResult:
+        """Fail, as only the writer refreshes users."""
+        return Failure(self._read_only_error("claim_user_refresh", UserMetadataItem))
+
+    def _error(
+        self, operation: str, resource_type: type, error: Exception
+    ) -> StorageError:
+        """Build the error reported when the snapshot can't be read."""
+        return InternalStorageError(
+            details=StorageOperationDetails(
+                operation=operation,
+                resource_type=resource_type.__name__,
+                raw_error=str(error),
+            ),
+            service_name=self.__class__.__name__,
+        )
+
+    def _read_only_error(self, operation: str, resource_type: type) -> StorageError:
+        """Build the error reported for operations only the writer supports."""
+        return InternalStorageError(
+            message="Shared-memory storage is read-only in this process.",
+            details=StorageOperationDetails(
+                operation=operation,
+                resource_type=resource_type.__name__,
+                raw_error="Only the SHARED_MEMORY_WRITER process writes",
+            ),
+            service_name=self.__class__.__name__,
+        )
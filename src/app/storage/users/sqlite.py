@@ -0,0 +1,617 @@
+"""SQLite implementation of user storage."""
+
+import sqlite3
+from typing import Any, Tuple
+
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundDetails, NotFoundStorageError
+from app.storage.change_feed import changes_reply
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.pagination import (
+    decode_cursor,
+    encode_cursor,
+    invalid_cursor_error,
+)
+from app.storage.sqlite_context import (
+    BUILD_SOLVED_DAYS,
+    SqliteStorageContext,
+    storage_error_from_exception,
+)
+from app.storage.streaks import bitmap_from_words, streaks_reply
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesReply,
+    AbandonScoreChangesResult,
+    ClaimUserRefreshQuery,
+    ClaimUserRefreshReply,
+    ClaimUserRefreshResult,
+    CreateUsersIfNotExistQuery,
+    CreateUsersIfNotExistReply,
+    CreateUsersIfNotExistResult,
+    GetAllUserIdsQuery,
+    GetAllUserIdsReply,
+    GetAllUserIdsResult,
+    GetHeadToHeadQuery,
+    GetHeadToHeadResult,
+    GetSweepCursorQuery,
+    GetSweepCursorReply,
+    GetSweepCursorResult,
+    GetUserMetadataQuery,
+    GetUserMetadataReply,
+    GetUserMetadataResult,
+    GetUserStreaksQuery,
+    GetUserStreaksResult,
+    ListDailyScoresQuery,
+    ListDailyScoresReply,
+    ListDailyScoresResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    RebuildStreaksQuery,
+    RebuildStreaksReply,
+    RebuildStreaksResult,
+    SaveBatchQuery,
+    SaveBatchReply,
+    SaveBatchResult,
+    SaveDailyScoreQuery,
+    SaveDailyScoreReply,
+    SaveDailyScoreResult,
+    SaveSweepCursorQuery,
+    SaveSweepCursorReply,
+    SaveSweepCursorResult,
+    SaveUserMetadataQuery,
+    SaveUserMetadataReply,
+    SaveUserMetadataResult,
+    ScoreChange,
+)
+from app.storage.versus import head_to_head
+
+UPSERT_USER_METADATA = """
+INSERT INTO users (
+    user_id, last_fetched_timestamp, puzzles_attempted, puzzles_solved, current_streak
+) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    last_fetched_timestamp = excluded.last_fetched_timestamp,
+    puzzles_attempted = excluded.puzzles_attempted,
+    puzzles_solved = excluded.puzzles_solved,
+    current_streak = excluded.current_streak
+"""
+
+UPSERT_DAILY_SCORE = """
+INSERT INTO daily_scores (user_id, date, score) VALUES (?, ?, ?)
+ON CONFLICT (user_id, date) DO UPDATE SET score = excluded.score
+WHERE score <> excluded.score
+"""
+
+INSERT_USER_METADATA_IF_NOT_EXISTS = """
+INSERT INTO users (
+    user_id, last_fetched_timestamp, puzzles_attempted, puzzles_solved, current_streak
+) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user_id) DO NOTHING
+"""
+
+# Pages through a date range along the covering (date, score, user_id) index
+LIST_DAILY_SCORES = """
+SELECT user_id, date, score FROM daily_scores
+WHERE date BETWEEN ? AND ? AND (date, score, user_id) > (?, ?, ?)
+ORDER BY date, score, user_id LIMIT ?
+"""
+
+# Reads one user's scores in a date window along the (user_id, date) primary key
+USER_SCORE_HISTORY = """
+SELECT date, score FROM daily_scores
+WHERE user_id = ? AND date BETWEEN ? AND ?
+ORDER BY date
+"""
+
+# Reads the change feed after a checkpoint along its integer primary key
+LIST_SCORE_CHANGES = """
+SELECT sequence, user_id, date, old_score, new_score FROM score_changes
+WHERE sequence > ? ORDER BY sequence LIMIT ?
+"""
+
+# Sequences of the change feed within a range
+SCORE_CHANGE_SEQUENCES = """
+SELECT sequence FROM score_changes WHERE sequence BETWEEN ? AND ?
+"""
+
+# Last sequence of the change feed, 0 while it's empty
+LAST_SCORE_CHANGE = "SELECT COALESCE(MAX(sequence), 0) FROM score_changes"
+
+# Dates of the changes appended after a sequence, e.g. by one transaction
+CHANGED_DATES_AFTER = """
+SELECT DISTINCT date FROM score_changes WHERE sequence > ? ORDER BY date
+"""
+
+UPSERT_SWEEP_CURSOR = """
+INSERT INTO sweep_cursor (id, after_user_id) VALUES (1, ?)
+ON CONFLICT (id) DO UPDATE SET after_user_id = excluded.after_user_id
+"""
+
+# Last fetch and refresh claim of a user, with no claim row read as never claimed
+USER_LAST_ATTEMPT = """
+SELECT users.last_fetched_timestamp, COALESCE(refresh_claims.claimed_at, 0)
+FROM users LEFT JOIN refresh_claims USING (user_id)
+WHERE users.user_id = ?
+"""
+
+# Claims a user's refresh if neither their fetch nor their last claim is later
+# than the cutoff; the conditions make the claim atomic without a read lock
+CLAIM_USER_REFRESH = """
+INSERT INTO refresh_claims (user_id, claimed_at)
+SELECT user_id, ? FROM users WHERE user_id = ? AND last_fetched_timestamp <= ?
+ON CONFLICT (user_id) DO UPDATE SET claimed_at = excluded.claimed_at
+WHERE claimed_at <= ?
+"""
+
+# Pages through one user's dates along the (user_id, date) primary key
+LIST_USER_DAILY_SCORES = """
+SELECT user_id, date, score FROM daily_scores
+WHERE user_id = ? AND date BETWEEN ? AND ? AND date > ?
+ORDER BY date LIMIT ?
+"""
+
+
+def user_metadata_to_row(metadata: UserMetadataItem) -> Tuple[str, int, int, int, int]:
+    """Convert user metadata to the parameters of a users row."""
+    return (
+        metadata.user_id,
+        metadata.last_fetched_timestamp,
+        metadata.puzzles_attempted,
+        metadata.puzzles_solved,
+        metadata.current_streak,
+    )
+
+
+def daily_score_to_row(score: DailyScoreItem) -> Tuple[str, str, int]:
+    """Convert a daily score to the parameters of a daily_scores row."""
+    return (score.user_id, score.date, score.score)
+
+
+class SqliteUserStorage(UserStorage):
+    """SQLite implementation of user storage."""
+
+    def __init__(self, context: SqliteStorageContext) -> None:
+        """Initialize the SQLite user storage.
+
+        Args:
+            context: Shared SQLite storage context
+        """
+        self.context = context
+
+    def get_user_metadata(self, query: GetUserMetadataQuery) -> GetUserMetadataResult:
+        """Get user metadata from SQLite."""
+        try:
+            row = (
+                self.context.connection()
+                .execute(
+                    "SELECT user_id, last_fetched_timestamp, puzzles_attempted,"
+                    " puzzles_solved, current_streak FROM users WHERE user_id = ?",
+                    (query.user_id,),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_user_metadata",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        if row is None:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=UserMetadataItem.__name__,
+                        resource_id=query.user_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        metadata = UserMetadataItem(
+            user_id=row[0],
+            last_fetched_timestamp=row[1],
+            puzzles_attempted=row[2],
+            puzzles_solved=row[3],
+            current_streak=row[4],
+        )
+        return Success(GetUserMetadataReply(item=metadata))
+
+    def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
+        """Save a daily score to SQLite."""
+        connection = self.context.connection()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    UPSERT_DAILY_SCORE, daily_score_to_row(query.item)
+                )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_daily_score",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        # Scores rewritten unchanged match the upsert's WHERE, so no row changes
+        return Success(SaveDailyScoreReply(changed=cursor.rowcount > 0))
+
+    def save_user_metadata(
+        self, query: SaveUserMetadataQuery
+    ) -> SaveUserMetadataResult:
+        """Save user metadata to SQLite."""
+        connection = self.context.connection()
+        try:
+            with connection:
+                connection.execute(
+                    UPSERT_USER_METADATA, user_metadata_to_row(query.item)
+                )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_user_metadata",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(SaveUserMetadataReply())
+
+    def get_all_user_ids(self, query: GetAllUserIdsQuery) -> GetAllUserIdsResult:
+        """Get all user IDs from SQLite."""
+        try:
+            rows = self.context.connection().execute("SELECT user_id FROM users")
+            user_ids = [row[0] for row in rows]
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_all_user_ids",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(GetAllUserIdsReply(user_ids=user_ids))
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Create users that don't exist yet in SQLite, in one transaction."""
+        created_user_ids = []
+        existing_user_ids = []
+        connection = self.context.connection()
+        try:
+            with connection:
+                for item in query.items:
+                    cursor = connection.execute(
+                        INSERT_USER_METADATA_IF_NOT_EXISTS, user_metadata_to_row(item)
+                    )
+                    if cursor.rowcount:
+                        created_user_ids.append(item.key)
+                    else:
+                        existing_user_ids.append(item.key)
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="create_users_if_not_exist",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(
+            CreateUsersIfNotExistReply(
+                created_user_ids=created_user_ids,
+                existing_user_ids=existing_user_ids,
+            )
+        )
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Save a batch with one executemany per table in a single transaction.
+
+        The dates changed are read back from the change feed rows its triggers
+        appended in the same transaction.
+        """
+        connection = self.context.connection()
+        try:
+            with connection:
+                (last_sequence,) = connection.execute(LAST_SCORE_CHANGE).fetchone()
+                connection.executemany(
+                    UPSERT_USER_METADATA,
+                    [user_metadata_to_row(item) for item in query.user_metadata_items],
+                )
+                connection.executemany(
+                    UPSERT_DAILY_SCORE,
+                    [daily_score_to_row(item) for item in query.daily_score_items],
+                )
+                changed_dates = [
+                    date
+                    for (date,) in connection.execute(
+                        CHANGED_DATES_AFTER, (last_sequence,)
+                    )
+                ]
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_batch",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(SaveBatchReply(changed_dates=changed_dates))
+
+    def list_daily_scores(self, query: ListDailyScoresQuery) -> ListDailyScoresResult:
+        """List a page of daily scores from SQLite.
+
+        Scores are listed in rank order within each date, and cursors record
+        the (date, score, user ID) of the last score listed.
+        """
+        # Sorts before every row, since dates are never empty
+        after: Tuple[Any, ...] = ("", 0, "")
+        if query.cursor is not None:
+            try:
+                date, score, user_id = decode_cursor(query.cursor)
+                after = (str(date), int(score), str(user_id))
+            except (ValueError, TypeError):
+                return Failure(
+                    invalid_cursor_error(
+                        query.cursor,
+                        operation="list_daily_scores",
+                        resource_type=DailyScoreItem.__name__,
+                        service_name=self.__class__.__name__,
+                    )
+                )
+
+        try:
+            connection = self.context.connection()
+            if query.user_id is not None:
+                rows = connection.execute(
+                    LIST_USER_DAILY_SCORES,
+                    (
+                        query.user_id,
+                        query.start_date,
+                        query.end_date,
+                        after[0],
+                        query.limit,
+                    ),
+                ).fetchall()
+            else:
+                rows = connection.execute(
+                    LIST_DAILY_SCORES,
+                    (query.start_date, query.end_date, *after, query.limit),
+                ).fetchall()
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="list_daily_scores",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        items = [
+            DailyScoreItem(user_id=user_id, date=date, score=score)
+            for user_id, date, score in rows
+        ]
+        cursor = None
+        if len(items) == query.limit:
+            last = items[-1]
+            cursor = encode_cursor([last.date, last.score, last.user_id])
+        return Success(ListDailyScoresReply(items=items, cursor=cursor))
+
+    def get_head_to_head(self, query: GetHeadToHeadQuery) -> GetHeadToHeadResult:
+        """Compare two users by merging their score ranges of the primary key."""
+        histories = []
+        try:
+            connection = self.context.connection()
+            for user_id in (query.user_id, query.opponent_id):
+                rows = connection.execute(
+                    USER_SCORE_HISTORY, (user_id, query.start_date, query.end_date)
+                ).fetchall()
+                histories.append(([row[0] for row in rows], [row[1] for row in rows]))
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_head_to_head",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        (user_dates, user_scores), (opponent_dates, opponent_scores) = histories
+        return Success(
+            head_to_head(
+                query.user_id,
+                query.opponent_id,
+                user_dates,
+                user_scores,
+                opponent_dates,
+                opponent_scores,
+            )
+        )
+
+    def get_user_streaks(self, query: GetUserStreaksQuery) -> GetUserStreaksResult:
+        """Compute a user's streaks from their solved_days words in SQLite."""
+        try:
+            rows = (
+                self.context.connection()
+                .execute(
+                    "SELECT word, bits FROM solved_days WHERE user_id = ?",
+                    (query.user_id,),
+                )
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_user_streaks",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        bitmap = bitmap_from_words(dict(rows))
+        return Success(streaks_reply(query.user_id, query.as_of, bitmap))
+
+    def rebuild_streaks(self, query: RebuildStreaksQuery) -> RebuildStreaksResult:
+        """Rebuild solved_days with one grouped pass over daily_scores."""
+        connection = self.context.connection()
+        try:
+            with connection:
+                connection.execute("DELETE FROM solved_days")
+                connection.execute(BUILD_SOLVED_DAYS)
+                (user_count,) = connection.execute(
+                    "SELECT COUNT(DISTINCT user_id) FROM solved_days"
+                ).fetchone()
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="rebuild_streaks",
+                    resource_type=DailyScoreItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(RebuildStreaksReply(user_count=user_count))
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        """Read the score_changes table after a checkpoint."""
+        try:
+            rows = (
+                self.context.connection()
+                .execute(LIST_SCORE_CHANGES, (query.after_sequence, query.limit))
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="list_score_changes",
+                    resource_type=ScoreChange.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(changes_reply(query.after_sequence, rows))
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        """Abandon the sequences the score_changes table doesn't hold.
+
+        Sequences are assigned as rows are inserted, within the transaction
+        writing their scores, so the only missing ones are rows pruned from
+        the feed.
+        """
+        try:
+            rows = (
+                self.context.connection()
+                .execute(
+                    SCORE_CHANGE_SEQUENCES, (min(query.sequences), max(query.sequences))
+                )
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="abandon_score_changes",
+                    resource_type=ScoreChange.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+        stored = {sequence for (sequence,) in rows}
+        return Success(
+            AbandonScoreChangesReply(
+                abandoned_sequences=[
+                    sequence for sequence in query.sequences if sequence not in stored
+                ]
+            )
+        )
+
+    def get_sweep_cursor(self, query: GetSweepCursorQuery) -> GetSweepCursorResult:
+        """Get the sweep cursor from SQLite."""
+        try:
+            row = (
+                self.context.connection()
+                .execute("SELECT after_user_id FROM sweep_cursor WHERE id = 1")
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="get_sweep_cursor",
+                    resource_type="SweepCursor",
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(GetSweepCursorReply(after_user_id=row[0] if row else None))
+
+    def save_sweep_cursor(self, query: SaveSweepCursorQuery) -> SaveSweepCursorResult:
+        """Save the sweep cursor to SQLite."""
+        connection = self.context.connection()
+        try:
+            with connection:
+                connection.execute(UPSERT_SWEEP_CURSOR, (query.after_user_id,))
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="save_sweep_cursor",
+                    resource_type="SweepCursor",
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(SaveSweepCursorReply())
+
+    def claim_user_refresh(
+        self, query: ClaimUserRefreshQuery
+    ) -> ClaimUserRefreshResult:
+        """Claim a user's refresh in SQLite with one conditional upsert."""
+        cutoff = query.now - query.debounce_seconds
+        connection = self.context.connection()
+        try:
+            with connection:
+                row = connection.execute(USER_LAST_ATTEMPT, (query.user_id,)).fetchone()
+                claimed = row is not None and (
+                    connection.execute(
+                        CLAIM_USER_REFRESH, (query.now, query.user_id, cutoff, cutoff)
+                    ).rowcount
+                    == 1
+                )
+        except sqlite3.Error as e:
+            return Failure(
+                storage_error_from_exception(
+                    e,
+                    operation="claim_user_refresh",
+                    resource_type=UserMetadataItem.__name__,
+                    service_name=self.__class__.__name__,
+                )
+            )
+
+        if row is None:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type=UserMetadataItem.__name__,
+                        resource_id=query.user_id,
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return Success(
+            ClaimUserRefreshReply(
+                claimed=claimed, last_attempt_timestamp=max(row[0], row[1])
+            )
+        )
@@ -0,0 +1,254 @@
+"""Write-behind buffering wrapper around any user storage."""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+from returns.result import Failure, Success
+
+from app.storage.models import (
+    DailyScoreItem,
+    DailyScoreKey,
+    UserMetadataItem,
+    UserMetadataKey,
+)
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesResult,
+    ClaimUserRefreshQuery,
+    ClaimUserRefreshResult,
+    CreateUsersIfNotExistQuery,
+    CreateUsersIfNotExistResult,
+    GetAllUserIdsQuery,
+    GetAllUserIdsReply,
+    GetAllUserIdsResult,
+    GetHeadToHeadQuery,
+    GetHeadToHeadResult,
+    GetSweepCursorQuery,
+    GetSweepCursorResult,
+    GetUserMetadataQuery,
+    GetUserMetadataReply,
+    GetUserMetadataResult,
+    GetUserStreaksQuery,
+    GetUserStreaksResult,
+    ListDailyScoresQuery,
+    ListDailyScoresResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    RebuildStreaksQuery,
+    RebuildStreaksResult,
+    SaveBatchQuery,
+    SaveBatchReply,
+    SaveBatchResult,
+    SaveDailyScoreQuery,
+    SaveDailyScoreReply,
+    SaveDailyScoreResult,
+    SaveSweepCursorQuery,
+    SaveSweepCursorResult,
+    SaveUserMetadataQuery,
+    SaveUserMetadataReply,
+    SaveUserMetadataResult,
+)
+
+
+class WriteBehindUserStorage(UserStorage):
+    """User storage that buffers writes and saves them to a backend in batches.
+
+    Saves are held in memory, keyed by their storage key so repeated writes to
+    the same user or daily score coalesce (last write wins), and are written to
+    the backend with one save_batch call once max_pending items are buffered,
+    the oldest buffered write is max_age_seconds old, or flush is called.
+    Callers must flush at the end of a run; unflushed writes are lost.
+
+    A save that triggers a failed flush returns the flush's StorageError, and
+    the failed items stay buffered (unless overwritten since) to be retried by
+    the next flush. Reads of buffered metadata are answered from the buffer.
+
+    Buffered saves can't tell whether a score changed, so the dates the
+    backend reports changed by each flush are collected in changed_dates.
+    """
+
+    def __init__(
+        self,
+        backend: UserStorage,
+        max_pending: int = 500,
+        max_age_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the write-behind storage.
+
+        Args:
+            backend: Storage the buffered writes are flushed to
+            max_pending: Number of buffered items that triggers a flush
+            max_age_seconds: Age of the oldest buffered write that triggers a flush
+            clock: Monotonic clock in seconds, replaceable in tests
+        """
+        self.backend = backend
+        self.max_pending = max_pending
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self.pending_metadata: Dict[UserMetadataKey, UserMetadataItem] = {}
+        self.pending_scores: Dict[DailyScoreKey, DailyScoreItem] = {}
+        self.oldest_write: Optional[float] = None
+        self.changed_dates: Set[str] = set()
+        self.lock = threading.Lock()
+
+    @property
+    def pending_count(self) -> int:
+        """Number of buffered items awaiting a flush."""
+        return len(self.pending_metadata) + len(self.pending_scores)
+
+    def get_user_metadata(self, query: GetUserMetadataQuery) -> GetUserMetadataResult:
+        """Get user metadata from the buffer, falling back to the backend."""
+        metadata = self.pending_metadata.get(query.user_id)
+        if metadata is not None:
+            return Success(GetUserMetadataReply(item=metadata))
+        return self.backend.get_user_metadata(query)
+
+    def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
+        """Buffer a daily score, flushing if a threshold is reached.
+
+        The stored score isn't read, so the score is reported as changed;
+        changed_dates holds the dates flushes actually changed.
+        """
+        with self.lock:
+            self.pending_scores[query.item.key] = query.item
+            self._mark_write()
+        return self._flush_if_due().map(lambda _: SaveDailyScoreReply())
+
+    def save_user_metadata(
+        self, query: SaveUserMetadataQuery
+    ) -> SaveUserMetadataResult:
+        """Buffer user metadata, flushing if a threshold is reached."""
+        with self.lock:
+            self.pending_metadata[query.item.key] = query.item
+            self._mark_write()
+        return self._flush_if_due().map(lambda _: SaveUserMetadataReply())
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        """Buffer a batch of writes, flushing if a threshold is reached."""
+        with self.lock:
+            for metadata in query.user_metadata_items:
+                self.pending_metadata[metadata.key] = metadata
+            for score in query.daily_score_items:
+                self.pending_scores[score.key] = score
+            self._mark_write()
+        return self._flush_if_due()
+
+    def get_all_user_ids(self, query: GetAllUserIdsQuery) -> GetAllUserIdsResult:
+        """Get all user IDs from the backend, including buffered users."""
+        result = self.backend.get_all_user_ids(query)
+        if isinstance(result, Failure) or not self.pending_metadata:
+            return result
+        user_ids = result.unwrap().user_ids
+        known = set(user_ids)
+        buffered = [key for key in self.pending_metadata if key not in known]
+        return Success(GetAllUserIdsReply(user_ids=user_ids + buffered))
+
+    def list_daily_scores(self, query: ListDailyScoresQuery) -> ListDailyScoresResult:
+        """List daily scores from the backend; buffered scores aren't listed."""
+        return self.backend.list_daily_scores(query)
+
+    def create_users_if_not_exist(
+        self, query: CreateUsersIfNotExistQuery
+    ) -> CreateUsersIfNotExistResult:
+        """Flush buffered writes so they count as existing, then create users."""
+        flush_result = self.flush()
+        if isinstance(flush_result, Failure):
+            return Failure(flush_result.failure())
+        return self.backend.create_users_if_not_exist(query)
+
+    def get_head_to_head(self, query: GetHeadToHeadQuery) -> GetHeadToHeadResult:
+        """Compare users in the backend; buffered scores aren't counted."""
+        return self.backend.get_head_to_head(query)
+
+    def get_user_streaks(self, query: GetUserStreaksQuery) -> GetUserStreaksResult:
+        """Get a user's streaks from the backend; buffered scores aren't counted."""
+        return self.backend.get_user_streaks(query)
+
+    def rebuild_streaks(self, query: RebuildStreaksQuery) -> RebuildStreaksResult:
+        """Flush buffered writes so their scores count, then rebuild streaks."""
+        flush_result = self.flush()
+        if isinstance(flush_result, Failure):
+            return Failure(flush_result.failure())
+        return self.backend.rebuild_streaks(query)
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        """Read the backend's change feed; buffered writes aren't in it yet."""
+        return self.backend.list_score_changes(query)
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        """Abandon sequences in the backend's change feed."""
+        return self.backend.abandon_score_changes(query)
+
+    def get_sweep_cursor(self, query: GetSweepCursorQuery) -> GetSweepCursorResult:
+        """Get the sweep cursor from the backend; it's never buffered."""
+        return self.backend.get_sweep_cursor(query)
+
+    def save_sweep_cursor(self, query: SaveSweepCursorQuery) -> SaveSweepCursorResult:
+        """Flush buffered writes so the cursor never gets ahead of them."""
+        flush_result = self.flush()
+        if isinstance(flush_result, Failure):
+            return Failure(flush_result.failure())
+        return self.backend.save_sweep_cursor(query)
+
+    def claim_user_refresh(
+        self, query: ClaimUserRefreshQuery
+    ) -> ClaimUserRefreshResult:
+        """Claim a user's refresh in the backend; claims aren't buffered."""
+        return self.backend.claim_user_refresh(query)
+
+    def flush(self) -> SaveBatchResult:
+        """Write every buffered item to the backend in one batch.
+
+        Returns:
+            Result with the dates the batch changed, also added to
+            changed_dates, or the backend's StorageError
+        """
+        with self.lock:
+            metadata = self.pending_metadata
+            scores = self.pending_scores
+            self.pending_metadata = {}
+            self.pending_scores = {}
+            self.oldest_write = None
+        if not metadata and not scores:
+            return Success(SaveBatchReply())
+
+        result = self.backend.save_batch(
+            SaveBatchQuery(
+                user_metadata_items=list(metadata.values()),
+                daily_score_items=list(scores.values()),
+            )
+        )
+        if isinstance(result, Failure):
+            # Keep the failed items for the next flush, unless overwritten since
+            with self.lock:
+                for key, item in metadata.items():
+                    self.pending_metadata.setdefault(key, item)
+                for score_key, score in scores.items():
+                    self.pending_scores.setdefault(score_key, score)
+                self._mark_write()
+        else:
+            with self.lock:
+                self.changed_dates.update(result.unwrap().changed_dates)
+        return result
+
+    def _mark_write(self) -> None:
+        """Start the age clock if this is the first buffered write."""
+        if self.oldest_write is None:
+            self.oldest_write = self.clock()
+
+    def _flush_if_due(self) -> SaveBatchResult:
+        """Flush if the buffer is full or its oldest write is too old."""
+        oldest_write = self.oldest_write
+        if self.pending_count >= self.max_pending or (
+            oldest_write is not None
+            and self.clock() - oldest_write >= self.max_age_seconds
+        ):
+            return self.flush()
+        return Success(SaveBatchReply())
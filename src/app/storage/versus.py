@@ -0,0 +1,74 @@
+"""Head-to-head comparison of two users' date-sorted score arrays.
+
+Every backend reads each user's scores in a date window as a pair of parallel
+arrays, dates in ascending order and the score of each date, then hands both
+pairs to head_to_head. Walking the arrays with one index each finds the shared
+days in a single linear merge, without building a dict of either history.
+"""
+
+from typing import Optional, Sequence
+
+from app.storage.users.models import GetHeadToHeadReply
+
+
+def mean(total: int, count: int) -> Optional[float]:
+    """Get total / count, or None if count is zero."""
+    return total / count if count else None
+
+
+def head_to_head(
+    user_id: str,
+    opponent_id: str,
+    user_dates: Sequence[str],
+    user_scores: Sequence[int],
+    opponent_dates: Sequence[str],
+    opponent_scores: Sequence[int],
+) -> GetHeadToHeadReply:
+    """Compare two users on the days both have a score for.
+
+    Args:
+        user_id: ID of the user
+        opponent_id: ID of the user compared to
+        user_dates: The user's dates in ascending order
+        user_scores: The user's score of each date in user_dates
+        opponent_dates: The opponent's dates in ascending order
+        opponent_scores: The opponent's score of each date in opponent_dates
+
+    Returns:
+        Win, loss and tie counts, and the average deltas, where lower scores win
+    """
+    wins = losses = ties = 0
+    total_delta = win_margins = loss_margins = 0
+    i, j = 0, 0
+    while i < len(user_dates) and j < len(opponent_dates):
+        user_date, opponent_date = user_dates[i], opponent_dates[j]
+        if user_date < opponent_date:
+            i += 1
+        elif opponent_date < user_date:
+            j += 1
+        else:
+            delta = user_scores[i] - opponent_scores[j]
+            total_delta += delta
+            if delta < 0:
+                wins += 1
+                win_margins -= delta
+            elif delta > 0:
+                losses += 1
+                loss_margins += delta
+            else:
+                ties += 1
+            i += 1
+            j += 1
+
+    shared_days = wins + losses + ties
+    return GetHeadToHeadReply(
+        user_id=user_id,
+        opponent_id=opponent_id,
+        shared_days=shared_days,
+        wins=wins,
+        losses=losses,
+        ties=ties,
+        average_delta=mean(total_delta, shared_days),
+        average_win_margin=mean(win_margins, wins),
+        average_loss_margin=mean(loss_margins, losses),
+    )
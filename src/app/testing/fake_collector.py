@@ -0,0 +1,123 @@
+"""Local stand-in for an OpenTelemetry collector's OTLP/HTTP traces endpoint.
+
+Accepts OTLP/JSON export requests on POST /v1/traces and keeps the spans
+they carry, so traces can be checked without running a collector.
+
+Use it in-process through an httpx mock transport:
+
+    collector = FakeCollector()
+    exporter = OtlpHttpSpanExporter(
+        "http://collector/v1/traces",
+        "nytxwordboard",
+        client=httpx.Client(transport=collector.mock_transport()),
+    )
+
+or serve it over HTTP and select it with the otlp trace exporter:
+
+    uv run uvicorn --factory app.testing.fake_collector:create_app --port 4318
+    export TRACE_EXPORTER=otlp TRACE_OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, MutableMapping, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+type Scope = MutableMapping[str, Any]
+type Message = MutableMapping[str, Any]
+type Receive = Callable[[], Awaitable[Message]]
+type Send = Callable[[Message], Awaitable[None]]
+
+TRACES_PATH = "/v1/traces"
+
+
+class FakeCollector:
+    """ASGI app and httpx transport receiving OTLP/JSON trace exports."""
+
+    def __init__(self) -> None:
+        """Initialize a collector that hasn't received any spans."""
+        # Received spans in OTLP/JSON form, each with its resource's service.name
+        self.spans: List[Dict[str, Any]] = []
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    def receive(self, path: str, body: bytes) -> Tuple[int, bytes]:
+        """Store the spans of an export request.
+
+        Args:
+            path: Request path, e.g. /v1/traces
+            body: OTLP/JSON ExportTraceServiceRequest
+
+        Returns:
+            Tuple of (status code, JSON body)
+        """
+        if path != TRACES_PATH:
+            return 404, b'{"message":"Not Found"}'
+        try:
+            request = json.loads(body)
+            spans = [
+                {**span, "service.name": service_name(resource_spans)}
+                for resource_spans in request["resourceSpans"]
+                for scope_spans in resource_spans["scopeSpans"]
+                for span in scope_spans["spans"]
+            ]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Rejected malformed export request: %s", e)
+            return 400, b'{"message":"Malformed export request"}'
+        with self.lock:
+            self.request_count += 1
+            self.spans.extend(spans)
+        return 200, b"{}"
+
+    def span_names(self) -> List[str]:
+        """Names of the received spans, in the order they arrived."""
+        with self.lock:
+            return [span["name"] for span in self.spans]
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer an httpx request without any networking."""
+        status, body = self.receive(request.url.path, request.read())
+        return httpx.Response(
+            status, content=body, headers={"content-type": "application/json"}
+        )
+
+    def mock_transport(self) -> httpx.MockTransport:
+        """Create a sync httpx transport that routes every request here."""
+        return httpx.MockTransport(self.handle_request)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the collector over ASGI, e.g. with uvicorn."""
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        status, response = self.receive(scope["path"], body)
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(response)).encode()),
+        ]
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": response})
+
+
+def service_name(resource_spans: Dict[str, Any]) -> str:
+    """Get the service.name resource attribute of an export, or ""."""
+    for attribute in resource_spans.get("resource", {}).get("attributes", []):
+        if attribute["key"] == "service.name":
+            return str(attribute["value"].get("stringValue", ""))
+    return ""
+
+
+def create_app() -> FakeCollector:
+    """Create a fake collector."""
+    return FakeCollector()
@@ -0,0 +1,265 @@
+"""Local stand-in for the NYT stats-and-streaks API.
+
+Generates realistic, deterministic payloads for any number of synthetic users and
+injects configurable latency, rate limiting and server errors, so the update
+sweep can be load tested without touching the real endpoint.
+
+Use it in-process through an httpx mock transport:
+
+    api = FakeNytApi(FakeNytApiConfig(latency_ms=50))
+    async with httpx.AsyncClient(transport=api.mock_transport()) as client:
+        await process_users(user_ids, storage, client)
+
+or serve it over HTTP and select it through NYT_API_URL_TEMPLATE:
+
+    FAKE_NYT_LATENCY_MS=50 uv run uvicorn --factory app.testing.fake_nyt_api:create_app --port 8001
+    export NYT_API_URL_TEMPLATE=http://127.0.0.1:8001/svc/crosswords/v3/{}/stats-and-streaks.json
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Literal, MutableMapping, Tuple
+
+import httpx
+from pydantic import BaseModel, ConfigDict, Field
+
+type Scope = MutableMapping[str, Any]
+type Message = MutableMapping[str, Any]
+type Receive = Callable[[], Awaitable[Message]]
+type Send = Callable[[Message], Awaitable[None]]
+
+# Matches the path of NYT_API_URL_TEMPLATE once formatted with a user ID
+STATS_PATH_PATTERN = re.compile(r"/svc/crosswords/v3/(\d+)/stats-and-streaks\.json$")
+
+DAYS_OF_WEEK = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+
+# Typical solve times in seconds per day of the week, Monday first
+TYPICAL_SOLVE_SECONDS = [360, 480, 660, 900, 1080, 1500, 2400]
+
+
+class FakeNytApiConfig(BaseModel):
+    """Behavior of the fake NYT API."""
+
+    user_count: int | None = Field(
+        default=None,
+        ge=0,
+        description="Users 1..user_count exist and others get a 404; None means all",
+    )
+    solved_days: int = Field(
+        default=365,
+        ge=0,
+        description="Length of each user's solve history, which drives payload size",
+    )
+    latency_distribution: Literal["constant", "uniform", "lognormal"] = Field(
+        default="constant", description="Distribution of injected response latency"
+    )
+    latency_ms: float = Field(
+        default=0.0,
+        ge=0,
+        description="Constant latency, mean of uniform latency or median of lognormal",
+    )
+    latency_sigma: float = Field(
+        default=0.5, ge=0, description="Shape of the lognormal latency tail"
+    )
+    rate_limit_rate: float = Field(
+        default=0.0, ge=0, le=1, description="Fraction of requests answered with 429"
+    )
+    server_error_rate: float = Field(
+        default=0.0, ge=0, le=1, description="Fraction of requests answered with 5xx"
+    )
+    end_date: date = Field(
+        default=date(2025, 1, 1), description="Most recent date in generated histories"
+    )
+    seed: int = Field(default=0, description="Seed for payloads and injected faults")
+
+    model_config = ConfigDict(frozen=True)
+
+    @classmethod
+    def from_environ(cls) -> "FakeNytApiConfig":
+        """Build a config from FAKE_NYT_* environment variables."""
+        values = {
+            field: os.environ[f"FAKE_NYT_{field.upper()}"]
+            for field in cls.model_fields
+            if f"FAKE_NYT_{field.upper()}" in os.environ
+        }
+        return cls.model_validate(values)
+
+
+@lru_cache(maxsize=8)
+def history_dates(end_date: date, days: int) -> Tuple[Tuple[str, int], ...]:
+    """ISO strings and weekdays of the `days` dates ending at end_date, oldest first.
+
+    Cached so payload generation doesn't spend the load test formatting dates.
+    """
+    dates = [end_date - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    return tuple((d.isoformat(), d.weekday()) for d in dates)
+
+
+def generate_stats_payload(config: FakeNytApiConfig, user_id: int) -> Dict[str, Any]:
+    """Generate the stats-and-streaks payload of a synthetic user.
+
+    Payloads are deterministic per (seed, user_id), so repeated sweeps see the
+    same data, and have the same shape as the real API's response.
+
+    Args:
+        config: Fake API configuration
+        user_id: Synthetic user ID
+
+    Returns:
+        The parsed JSON payload the real API would return
+    """
+    rng = random.Random(f"{config.seed}:{user_id}")
+    skill = rng.lognormvariate(0, 0.35)
+    solve_rate = rng.uniform(0.6, 1.0)
+
+    history = history_dates(config.end_date, config.solved_days)
+    roll = rng.random
+    solved = [i for i in range(len(history)) if roll() < solve_rate]
+
+    # The current streak is the run of solved days ending at end_date
+    current_streak = 0
+    for expected, i in enumerate(reversed(solved), start=1):
+        if i != len(history) - expected:
+            break
+        current_streak += 1
+
+    latest_by_weekday: Dict[int, str] = {}
+    for i in reversed(solved):
+        iso, weekday = history[i]
+        latest_by_weekday.setdefault(weekday, iso)
+        if len(latest_by_weekday) == len(DAYS_OF_WEEK):
+            break
+
+    stats_by_day: List[Dict[str, Any]] = []
+    for weekday, day_name in enumerate(DAYS_OF_WEEK):
+        latest = latest_by_weekday.get(weekday, "")
+        typical = TYPICAL_SOLVE_SECONDS[weekday] * skill
+        stats_by_day.append(
+            {
+                "day_of_week": day_name,
+                "latest_date": latest,
+                "latest_time": int(rng.gauss(typical, typical * 0.2)) if latest else 0,
+                "best_date": latest,
+                "best_time": int(typical * 0.6) if latest else 0,
+                "average_time": int(typical) if latest else 0,
+                "this_weeks_time": 0,
+            }
+        )
+
+    dates_solved = [history[i][0] for i in solved]
+    return {
+        "status": "OK",
+        "results": {
+            "stats": {
+                "puzzles_attempted": int(len(dates_solved) / solve_rate),
+                "puzzles_solved": len(dates_solved),
+                "solve_rate": round(solve_rate, 3),
+                "stats_by_day": stats_by_day,
+            },
+            "streaks": {
+                "current_streak": current_streak,
+                "longest_streak": current_streak,
+                "date_start": dates_solved[0] if dates_solved else "",
+                "date_end": dates_solved[-1] if dates_solved else "",
+                "dates_solved": dates_solved,
+            },
+        },
+    }
+
+
+class FakeNytApi:
+    """ASGI app and httpx transport serving synthetic NYT stats."""
+
+    def __init__(self, config: FakeNytApiConfig) -> None:
+        """Initialize the fake API.
+
+        Args:
+            config: Fake API configuration
+        """
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.request_count = 0
+
+    def _latency_seconds(self) -> float:
+        """Sample the latency of one response."""
+        latency_ms = self.config.latency_ms
+        if self.config.latency_distribution == "uniform":
+            latency_ms = self.rng.uniform(0, 2 * latency_ms)
+        elif self.config.latency_distribution == "lognormal" and latency_ms > 0:
+            latency_ms *= self.rng.lognormvariate(0, self.config.latency_sigma)
+        return latency_ms / 1000
+
+    async def respond(self, path: str) -> Tuple[int, bytes]:
+        """Produce the status code and body for a request path.
+
+        Args:
+            path: Request path, e.g. /svc/crosswords/v3/42/stats-and-streaks.json
+
+        Returns:
+            Tuple of (status code, JSON body)
+        """
+        self.request_count += 1
+        latency = self._latency_seconds()
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+        match = STATS_PATH_PATTERN.search(path)
+        if not match:
+            return 404, b'{"status":"ERROR","errors":["Not Found"]}'
+
+        roll = self.rng.random()
+        if roll < self.config.rate_limit_rate:
+            return 429, b'{"status":"ERROR","errors":["Too Many Requests"]}'
+        if roll < self.config.rate_limit_rate + self.config.server_error_rate:
+            status = self.rng.choice([500, 502, 503])
+            return status, b'{"status":"ERROR","errors":["Server Error"]}'
+
+        user_id = int(match.group(1))
+        if self.config.user_count is not None and user_id > self.config.user_count:
+            return 404, b'{"status":"ERROR","errors":["Not Found"]}'
+
+        payload = generate_stats_payload(self.config, user_id)
+        return 200, json.dumps(payload).encode()
+
+    async def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Answer an httpx request without any networking."""
+        status, body = await self.respond(request.url.path)
+        return httpx.Response(
+            status, content=body, headers={"content-type": "application/json"}
+        )
+
+    def mock_transport(self) -> httpx.MockTransport:
+        """Create an httpx transport that routes every request to this fake."""
+        return httpx.MockTransport(self.handle_request)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the fake over ASGI, e.g. with uvicorn."""
+        if scope["type"] != "http":
+            return
+        status, body = await self.respond(scope["path"])
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_app() -> FakeNytApi:
+    """Create a fake API configured from FAKE_NYT_* environment variables."""
+    return FakeNytApi(FakeNytApiConfig.from_environ())
@@ -0,0 +1,94 @@
+"""Synthetic datasets for benchmarks and load tests."""
+
+import random
+from datetime import date, timedelta
+from itertools import batched
+from typing import Iterator, List
+
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.users.interface import UserStorage
+from app.storage.users.models import SaveBatchQuery
+from app.testing.fake_nyt_api import TYPICAL_SOLVE_SECONDS
+
+
+def synthetic_dates(days: int, end_date: date = date(2025, 1, 1)) -> List[str]:
+    """The `days` dates ending at end_date in YYYY-MM-DD format, oldest first."""
+    return [
+        (end_date - timedelta(days=offset)).isoformat()
+        for offset in range(days - 1, -1, -1)
+    ]
+
+
+def synthetic_users(user_count: int) -> Iterator[UserMetadataItem]:
+    """Metadata for users 1..user_count."""
+    for user_id in range(1, user_count + 1):
+        yield UserMetadataItem(
+            user_id=str(user_id),
+            last_fetched_timestamp=1735689600,
+            puzzles_attempted=400,
+            puzzles_solved=350,
+            current_streak=user_id % 30,
+        )
+
+
+def synthetic_scores(
+    user_count: int,
+    days: int,
+    end_date: date = date(2025, 1, 1),
+    solve_rate: float = 0.8,
+    seed: int = 0,
+) -> Iterator[DailyScoreItem]:
+    """Daily scores of users 1..user_count over `days` days.
+
+    Each user solves a day with probability solve_rate, in a lognormally
+    distributed time around the typical solve time of that day of the week.
+
+    Args:
+        user_count: Number of synthetic users
+        days: Number of days ending at end_date
+        end_date: Most recent date with scores
+        solve_rate: Probability that a user solved a given day
+        seed: Seed making the dataset reproducible
+    """
+    rng = random.Random(seed)
+    for iso_date in synthetic_dates(days, end_date):
+        typical = TYPICAL_SOLVE_SECONDS[date.fromisoformat(iso_date).weekday()]
+        for user_id in range(1, user_count + 1):
+            if rng.random() < solve_rate:
+                yield DailyScoreItem(
+                    user_id=str(user_id),
+                    date=iso_date,
+                    score=max(1, int(typical * rng.lognormvariate(0, 0.4))),
+                )
+
+
+def seed_storage(
+    storage: UserStorage,
+    user_count: int,
+    days: int,
+    end_date: date = date(2025, 1, 1),
+    seed: int = 0,
+    batch_size: int = 10_000,
+) -> int:
+    """Populate storage with synthetic users and their daily scores.
+
+    Args:
+        storage: Storage to populate
+        user_count: Number of synthetic users
+        days: Number of days of scores ending at end_date
+        end_date: Most recent date with scores
+        seed: Seed making the dataset reproducible
+        batch_size: Number of items saved per save_batch call
+
+    Returns:
+        Number of scores saved
+    """
+    for users in batched(synthetic_users(user_count), batch_size):
+        storage.save_batch(SaveBatchQuery(user_metadata_items=list(users)))
+    saved = 0
+    for scores in batched(
+        synthetic_scores(user_count, days, end_date, seed=seed), batch_size
+    ):
+        storage.save_batch(SaveBatchQuery(daily_score_items=list(scores)))
+        saved += len(scores)
+    return saved
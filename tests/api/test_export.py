@@ -0,0 +1,157 @@
+"""Tests for the score export API routes."""
+
+import json
+from typing import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from returns.result import Failure
+
+from app.api.main import app
+from app.core.error import StorageOperationDetails, UnavailableStorageError
+from app.storage.factory import get_user_storage
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import (
+    MAX_LIST_DAILY_SCORES_LIMIT,
+    ListDailyScoresQuery,
+    ListDailyScoresResult,
+    SaveBatchQuery,
+)
+
+
+@pytest.fixture
+def user_storage() -> InMemoryUserStorage:
+    """Create in-memory user storage holding scores over three dates."""
+    storage = InMemoryUserStorage(InMemoryStorageContext())
+    storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=300),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="1", date="2023-01-02", score=200),
+                DailyScoreItem(user_id="2", date="2023-01-03", score=400),
+            ]
+        )
+    )
+    return storage
+
+
+@pytest.fixture
+def client(user_storage: InMemoryUserStorage) -> Generator[TestClient, None, None]:
+    """Create a test client whose routes read from the in-memory storage."""
+    app.dependency_overrides[get_user_storage] = lambda: user_storage
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_export_scores_ndjson(client: TestClient) -> None:
+    """Test that scores in the range are streamed as NDJSON in date order."""
+    response = client.get(
+        "/api/export/scores",
+        params={"start_date": "2023-01-01", "end_date": "2023-01-02"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"user_id": "2", "date": "2023-01-01", "score": 100},
+        {"user_id": "1", "date": "2023-01-01", "score": 300},
+        {"user_id": "1", "date": "2023-01-02", "score": 200},
+    ]
+
+
+def test_export_scores_csv_for_user(client: TestClient) -> None:
+    """Test that the user filter and CSV format are applied."""
+    response = client.get(
+        "/api/export/scores",
+        params={
+            "start_date": "2023-01-01",
+            "end_date": "2023-01-31",
+            "user_id": "2",
+            "format": "csv",
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text == ("user_id,date,score\n2,2023-01-01,100\n2,2023-01-03,400\n")
+
+
+def test_export_scores_streams_every_page(
+    client: TestClient, user_storage: InMemoryUserStorage
+) -> None:
+    """Test that exports larger than a storage page are streamed in full."""
+    count = MAX_LIST_DAILY_SCORES_LIMIT * 2 + 1
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id=str(user_id), date="2023-02-01", score=user_id)
+                for user_id in range(1, count + 1)
+            ]
+        )
+    )
+
+    response = client.get(
+        "/api/export/scores",
+        params={"start_date": "2023-02-01", "end_date": "2023-02-01"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    lines = response.text.splitlines()
+    assert len(lines) == count
+    assert json.loads(lines[-1])["score"] == count
+
+
+def test_export_scores_rejects_reversed_range(client: TestClient) -> None:
+    """Test that a start date after the end date is rejected."""
+    response = client.get(
+        "/api/export/scores",
+        params={"start_date": "2023-01-02", "end_date": "2023-01-01"},
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("start_date", ["2023-02-30", "2023-13-01"])
+def test_export_scores_rejects_impossible_dates(
+    client: TestClient, start_date: str
+) -> None:
+    """Test that well-formed but impossible dates are rejected."""
+    response = client.get(
+        "/api/export/scores",
+        params={"start_date": start_date, "end_date": "2023-12-31"},
+    )
+
+    assert response.status_code == 400
+
+
+def test_export_scores_storage_unavailable(client: TestClient) -> None:
+    """Test that unavailable storage is reported as a 503 before streaming."""
+
+    class UnavailableUserStorage:
+        def list_daily_scores(
+            self, query: ListDailyScoresQuery
+        ) -> ListDailyScoresResult:
+            return Failure(
+                UnavailableStorageError(
+                    details=StorageOperationDetails(
+                        operation="list_daily_scores",
+                        resource_type="DailyScoreItem",
+                        raw_error="throttled",
+                    ),
+                    service_name="UnavailableUserStorage",
+                )
+            )
+
+    app.dependency_overrides[get_user_storage] = UnavailableUserStorage
+
+    response = client.get(
+        "/api/export/scores",
+        params={"start_date": "2023-01-01", "end_date": "2023-01-02"},
+    )
+
+    assert response.status_code == 503
@@ -0,0 +1,84 @@
+"""Tests for the group API routes."""
+
+from typing import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.main import app
+from app.storage.factory import get_group_storage, get_leaderboard_storage
+from app.storage.groups.memory import InMemoryGroupStorage
+from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import SaveBatchQuery
+
+
+@pytest.fixture
+def memory_context() -> InMemoryStorageContext:
+    """Create a fresh in-memory storage context for each test."""
+    return InMemoryStorageContext()
+
+
+@pytest.fixture
+def client(memory_context: InMemoryStorageContext) -> Generator[TestClient, None, None]:
+    """Create a test client whose routes use the in-memory context."""
+    group_storage = InMemoryGroupStorage(memory_context)
+    leaderboard_storage = InMemoryLeaderboardStorage(memory_context)
+    app.dependency_overrides[get_group_storage] = lambda: group_storage
+    app.dependency_overrides[get_leaderboard_storage] = lambda: leaderboard_storage
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_get_group_leaderboard_for_date(
+    client: TestClient, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that a saved group's members are ranked for the date."""
+    InMemoryUserStorage(memory_context).save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=300),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="3", date="2023-01-01", score=200),
+            ]
+        )
+    )
+
+    saved = client.put("/api/groups/friends", json={"user_ids": ["1", "3", "4"]})
+    response = client.get("/api/groups/friends/leaderboard/2023-01-01")
+
+    assert saved.status_code == 200
+    assert response.status_code == 200
+    assert response.json() == {
+        "date": "2023-01-01",
+        "entries": [
+            {"rank": 1, "user_id": "3", "score": 200},
+            {"rank": 2, "user_id": "1", "score": 300},
+        ],
+        "total_count": 2,
+    }
+
+
+def test_get_group_leaderboard_unknown_group(client: TestClient) -> None:
+    """Test that boards of groups never saved are reported as a 404."""
+    response = client.get("/api/groups/nobody/leaderboard/2023-01-01")
+
+    assert response.status_code == 404
+
+
+def test_save_group_rejects_invalid_members(client: TestClient) -> None:
+    """Test that groups must have between 1 and 100 valid user IDs."""
+    empty = client.put("/api/groups/friends", json={"user_ids": []})
+    too_many = client.put(
+        "/api/groups/friends",
+        json={"user_ids": [str(user_id) for user_id in range(1, 102)]},
+    )
+    malformed = client.put("/api/groups/friends", json={"user_ids": ["abc"]})
+
+    assert [empty.status_code, too_many.status_code, malformed.status_code] == [
+        422,
+        422,
+        422,
+    ]
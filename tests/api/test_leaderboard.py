@@ -0,0 +1,154 @@
+"""Tests for the leaderboard API routes."""
+
+from typing import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from returns.result import Failure
+
+from app.api.main import app
+from app.core.error import (
+    NotFoundDetails,
+    NotFoundStorageError,
+    StorageOperationDetails,
+    UnavailableStorageError,
+)
+from app.storage.factory import get_leaderboard_storage
+from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardResult,
+    GetScoreHistogramQuery,
+    GetScoreHistogramResult,
+)
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import SaveDailyScoreQuery
+
+
+@pytest.fixture
+def memory_context() -> InMemoryStorageContext:
+    """Create a fresh in-memory storage context for each test."""
+    return InMemoryStorageContext()
+
+
+@pytest.fixture
+def client(memory_context: InMemoryStorageContext) -> Generator[TestClient, None, None]:
+    """Create a test client whose routes read from the in-memory context."""
+    storage = InMemoryLeaderboardStorage(memory_context)
+    app.dependency_overrides[get_leaderboard_storage] = lambda: storage
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_get_leaderboard_for_date(
+    client: TestClient, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that the route returns the ranked leaderboard from storage."""
+    user_storage = InMemoryUserStorage(memory_context)
+    for user_id, score in [("1", 300), ("2", 100), ("3", 200)]:
+        user_storage.save_daily_score(
+            SaveDailyScoreQuery(
+                item=DailyScoreItem(user_id=user_id, date="2023-01-01", score=score)
+            )
+        )
+
+    response = client.get("/api/leaderboard/2023-01-01", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "date": "2023-01-01",
+        "entries": [
+            {"rank": 1, "user_id": "2", "score": 100},
+            {"rank": 2, "user_id": "3", "score": 200},
+        ],
+        "total_count": 3,
+    }
+
+
+def test_get_leaderboard_rejects_bad_date(client: TestClient) -> None:
+    """Test that malformed dates are rejected before reaching storage."""
+    response = client.get("/api/leaderboard/01-01-2023")
+
+    assert response.status_code == 422
+
+
+def test_get_leaderboard_storage_unavailable(client: TestClient) -> None:
+    """Test that unavailable storage is reported as a 503."""
+
+    class UnavailableLeaderboardStorage:
+        def get_daily_leaderboard(
+            self, query: GetDailyLeaderboardQuery
+        ) -> GetDailyLeaderboardResult:
+            return Failure(
+                UnavailableStorageError(
+                    details=StorageOperationDetails(
+                        operation="get_daily_leaderboard",
+                        resource_type="LeaderboardEntry",
+                        raw_error="throttled",
+                    ),
+                    service_name="UnavailableLeaderboardStorage",
+                )
+            )
+
+    app.dependency_overrides[get_leaderboard_storage] = UnavailableLeaderboardStorage
+
+    response = client.get("/api/leaderboard/2023-01-01")
+
+    assert response.status_code == 503
+
+
+def test_get_score_histogram_for_date(
+    client: TestClient, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that the histogram route returns every bucket of the scale."""
+    user_storage = InMemoryUserStorage(memory_context)
+    for user_id, score in [("1", 30), ("2", 45), ("3", 3700)]:
+        user_storage.save_daily_score(
+            SaveDailyScoreQuery(
+                item=DailyScoreItem(user_id=user_id, date="2023-01-01", score=score)
+            )
+        )
+
+    response = client.get("/api/leaderboard/2023-01-01/histogram")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["scale"] == "linear"
+    assert body["total_count"] == 3
+    assert body["buckets"][0] == {"lower": 0, "upper": 60, "count": 2}
+    assert body["buckets"][-1] == {"lower": 3600, "upper": None, "count": 1}
+
+
+def test_get_score_histogram_not_found(client: TestClient) -> None:
+    """Test that dates the storage has no counts for are reported as a 404."""
+
+    class UncountedLeaderboardStorage:
+        def get_score_histogram(
+            self, query: GetScoreHistogramQuery
+        ) -> GetScoreHistogramResult:
+            return Failure(
+                NotFoundStorageError(
+                    details=NotFoundDetails(
+                        resource_type="GetScoreHistogramReply",
+                        resource_id=query.date,
+                    ),
+                    service_name="UncountedLeaderboardStorage",
+                )
+            )
+
+    app.dependency_overrides[get_leaderboard_storage] = UncountedLeaderboardStorage
+
+    response = client.get("/api/leaderboard/2023-01-01/histogram")
+
+    assert response.status_code == 404
+
+
+def test_get_score_histogram_rejects_unknown_scale(client: TestClient) -> None:
+    """Test that only the supported bucket scales are accepted."""
+    response = client.get(
+        "/api/leaderboard/2023-01-01/histogram", params={"scale": "cubic"}
+    )
+
+    assert response.status_code == 422
@@ -0,0 +1,94 @@
+"""Tests for the request tracing middleware."""
+
+from typing import Generator, List, Sequence
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.main import app
+from app.core.tracing import Span, Tracer, set_tracer
+from app.storage.factory import get_leaderboard_storage
+from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.tracing import TracingLeaderboardStorage
+
+
+class ListSpanExporter:
+    """Exporter keeping every span it is given."""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def tracer() -> Generator[Tracer, None, None]:
+    """Enable tracing into a list for the duration of a test."""
+    tracer = Tracer(ListSpanExporter())
+    previous = set_tracer(tracer)
+    yield tracer
+    tracer.shutdown()
+    set_tracer(previous)
+
+
+@pytest.fixture
+def client(tracer: Tracer) -> Generator[TestClient, None, None]:
+    """Create a test client whose leaderboard reads are traced."""
+    storage = TracingLeaderboardStorage(
+        InMemoryLeaderboardStorage(InMemoryStorageContext()), "memory"
+    )
+    app.dependency_overrides[get_leaderboard_storage] = lambda: storage
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def exported_spans(tracer: Tracer) -> List[Span]:
+    """Flush the tracer and get the spans it exported."""
+    tracer.flush()
+    assert isinstance(tracer.exporter, ListSpanExporter)
+    return tracer.exporter.spans
+
+
+def test_request_span_is_named_after_the_route(
+    client: TestClient, tracer: Tracer
+) -> None:
+    """Test that a request's span names its route and parents its storage calls."""
+    response = client.get("/api/leaderboard/2023-01-01")
+
+    assert response.status_code == 200
+    storage_span, request_span = exported_spans(tracer)
+    assert request_span.name == "GET /api/leaderboard/{date}"
+    assert request_span.attributes["http.status_code"] == 200
+    assert request_span.attributes["http.target"] == "/api/leaderboard/2023-01-01"
+    assert request_span.error is None
+    # The sync route runs in the threadpool, and the span follows it there
+    assert storage_span.name == "LeaderboardStorage.get_daily_leaderboard"
+    assert storage_span.parent_id == request_span.span_id
+    assert storage_span.trace_id == request_span.trace_id
+
+
+def test_request_span_continues_the_callers_trace(
+    client: TestClient, tracer: Tracer
+) -> None:
+    """Test that a traceparent header makes the request part of the caller's trace."""
+    client.get(
+        "/health",
+        headers={
+            "traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        },
+    )
+
+    (span,) = exported_spans(tracer)
+    assert span.name == "GET /health"
+    assert span.trace_id == "0af7651916cd43dd8448eb211c80319c"
+    assert span.parent_id == "b7ad6b7169203331"
+
+
+def test_requests_are_not_traced_when_tracing_is_disabled() -> None:
+    """Test that the middleware passes requests through without a tracer."""
+    response = TestClient(app).get("/health")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
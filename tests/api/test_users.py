@@ -0,0 +1,290 @@
+"""Tests for the user API routes."""
+
+import time
+from typing import AsyncGenerator, Generator, List
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.main import app
+from app.api.routes.users import (
+    RefreshLimiter,
+    get_nyt_client,
+    get_refresh_limiter,
+)
+from app.core.config import Settings, get_settings
+from app.storage.factory import get_leaderboard_storage, get_user_storage
+from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
+from app.storage.leaderboard.models import (
+    RefreshDailyLeaderboardQuery,
+    RefreshDailyLeaderboardResult,
+)
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import (
+    CreateUsersIfNotExistQuery,
+    GetUserMetadataQuery,
+    SaveBatchQuery,
+)
+from app.testing.fake_nyt_api import FakeNytApi, FakeNytApiConfig
+
+
+@pytest.fixture
+def client() -> Generator[TestClient, None, None]:
+    """Create a test client whose user storage holds two users' scores."""
+    storage = InMemoryUserStorage(InMemoryStorageContext())
+    storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date=day, score=100)
+                for day in ["2023-01-01", "2023-01-02", "2023-01-04", "2023-01-05"]
+            ]
+            + [
+                DailyScoreItem(user_id="2", date="2023-01-01", score=80),
+                DailyScoreItem(user_id="2", date="2023-01-04", score=130),
+            ]
+        )
+    )
+    app.dependency_overrides[get_user_storage] = lambda: storage
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_get_user_streaks(client: TestClient) -> None:
+    """Test that streaks are computed as of the requested day."""
+    response = client.get("/api/users/1/streaks", params={"as_of": "2023-01-06"})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "user_id": "1",
+        "as_of": "2023-01-06",
+        "current_streak": 2,
+        "longest_streak": 2,
+        "solved_count": 4,
+    }
+
+
+def test_get_user_streaks_rejects_invalid_dates(client: TestClient) -> None:
+    """Test that days that don't exist are rejected before reaching storage."""
+    response = client.get("/api/users/1/streaks", params={"as_of": "2023-02-30"})
+
+    assert response.status_code == 422
+
+
+def test_get_head_to_head(client: TestClient) -> None:
+    """Test that two users are compared on their shared days."""
+    response = client.get("/api/users/1/versus/2")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "user_id": "1",
+        "opponent_id": "2",
+        "shared_days": 2,
+        "wins": 1,
+        "losses": 1,
+        "ties": 0,
+        "average_delta": -5.0,
+        "average_win_margin": 30.0,
+        "average_loss_margin": 20.0,
+    }
+
+
+def test_get_head_to_head_in_window(client: TestClient) -> None:
+    """Test that the date window limits the days compared."""
+    response = client.get(
+        "/api/users/1/versus/2",
+        params={"start_date": "2023-01-02", "end_date": "2023-01-31"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["shared_days"] == 1
+
+
+def test_get_head_to_head_rejects_reversed_window(client: TestClient) -> None:
+    """Test that a window ending before it starts is rejected."""
+    response = client.get(
+        "/api/users/1/versus/2",
+        params={"start_date": "2023-02-01", "end_date": "2023-01-01"},
+    )
+
+    assert response.status_code == 400
+
+
+class RecordingLeaderboardStorage(InMemoryLeaderboardStorage):
+    """In-memory leaderboard storage that records the dates it refreshes."""
+
+    def __init__(self, context: InMemoryStorageContext) -> None:
+        super().__init__(context)
+        self.refreshed_dates: List[str] = []
+
+    def refresh_daily_leaderboard(
+        self, query: RefreshDailyLeaderboardQuery
+    ) -> RefreshDailyLeaderboardResult:
+        self.refreshed_dates.append(query.date)
+        return super().refresh_daily_leaderboard(query)
+
+
+@pytest.fixture
+def memory_context() -> InMemoryStorageContext:
+    """Create a storage context holding users 1 and 4, never fetched, and 2."""
+    context = InMemoryStorageContext()
+    InMemoryUserStorage(context).create_users_if_not_exist(
+        CreateUsersIfNotExistQuery(
+            items=[
+                UserMetadataItem(
+                    user_id=user_id,
+                    last_fetched_timestamp=last_fetched_timestamp,
+                    puzzles_attempted=0,
+                    puzzles_solved=0,
+                    current_streak=0,
+                )
+                for user_id, last_fetched_timestamp in [
+                    ("1", 0),
+                    ("2", int(time.time())),
+                    ("4", 0),
+                ]
+            ]
+        )
+    )
+    return context
+
+
+@pytest.fixture
+def leaderboard_storage(
+    memory_context: InMemoryStorageContext,
+) -> RecordingLeaderboardStorage:
+    """Create a leaderboard storage sharing the users' context."""
+    return RecordingLeaderboardStorage(memory_context)
+
+
+@pytest.fixture
+def refresh_client(
+    memory_context: InMemoryStorageContext,
+    leaderboard_storage: RecordingLeaderboardStorage,
+) -> Generator[TestClient, None, None]:
+    """Create a test client refreshing users from a fake NYT API of users 1-3."""
+    storage = InMemoryUserStorage(memory_context)
+    settings = Settings()
+    settings.REFRESH_DEBOUNCE_SECONDS = 60
+    limiter = RefreshLimiter(max_concurrency=2)
+
+    async def nyt_client() -> AsyncGenerator[httpx.AsyncClient, None]:
+        api = FakeNytApi(FakeNytApiConfig(user_count=3, solved_days=30))
+        async with httpx.AsyncClient(transport=api.mock_transport()) as client:
+            yield client
+
+    app.dependency_overrides[get_user_storage] = lambda: storage
+    app.dependency_overrides[get_leaderboard_storage] = lambda: leaderboard_storage
+    app.dependency_overrides[get_nyt_client] = nyt_client
+    app.dependency_overrides[get_refresh_limiter] = lambda: limiter
+    app.dependency_overrides[get_settings] = lambda: settings
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_refresh_user_saves_scores_and_rebuilds_boards(
+    refresh_client: TestClient,
+    memory_context: InMemoryStorageContext,
+    leaderboard_storage: RecordingLeaderboardStorage,
+) -> None:
+    """Test that a refresh saves the user's stats and refreshes changed boards."""
+    response = refresh_client.post("/api/users/1/refresh")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user_id"] == "1"
+    assert body["scores_updated"] == len(body["dates_updated"]) > 0
+    assert body["dates_updated"] == sorted(
+        key.date for key in memory_context.scores if key.user_id == "1"
+    )
+    assert leaderboard_storage.refreshed_dates == body["dates_updated"]
+    metadata = InMemoryUserStorage(memory_context).get_user_metadata(
+        GetUserMetadataQuery(user_id="1")
+    )
+    assert metadata.unwrap().item.last_fetched_timestamp > 0
+
+
+def test_refresh_user_skips_unchanged_boards(
+    refresh_client: TestClient,
+    memory_context: InMemoryStorageContext,
+    leaderboard_storage: RecordingLeaderboardStorage,
+) -> None:
+    """Test that boards are only rebuilt for dates whose scores changed."""
+    assert refresh_client.post("/api/users/1/refresh").status_code == 200
+    memory_context.users["1"] = memory_context.users["1"].model_copy(
+        update={"last_fetched_timestamp": 0}
+    )
+    memory_context.refresh_claims.clear()
+    leaderboard_storage.refreshed_dates.clear()
+
+    response = refresh_client.post("/api/users/1/refresh")
+
+    assert response.status_code == 200
+    assert response.json()["scores_updated"] > 0
+    assert response.json()["dates_updated"] == []
+    assert leaderboard_storage.refreshed_dates == []
+
+
+def test_refresh_user_is_debounced(refresh_client: TestClient) -> None:
+    """Test that users fetched within the debounce interval aren't fetched again."""
+    assert refresh_client.post("/api/users/1/refresh").status_code == 200
+
+    response = refresh_client.post("/api/users/1/refresh")
+
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 60
+    assert refresh_client.post("/api/users/2/refresh").status_code == 429
+
+
+def test_refresh_user_not_found(refresh_client: TestClient) -> None:
+    """Test that only stored users can be refreshed."""
+    response = refresh_client.post("/api/users/3/refresh")
+
+    assert response.status_code == 404
+
+
+def test_refresh_user_reports_failed_fetches(
+    refresh_client: TestClient, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that a user the NYT API doesn't know is reported as a bad gateway."""
+    response = refresh_client.post("/api/users/4/refresh")
+
+    assert response.status_code == 502
+    assert memory_context.users["4"].last_fetched_timestamp == 0
+
+
+def test_refresh_user_debounces_failed_fetches(refresh_client: TestClient) -> None:
+    """Test that a failed refresh isn't retried within the interval by any process."""
+    assert refresh_client.post("/api/users/4/refresh").status_code == 502
+    # Another process has a limiter of its own, but shares the stored claims
+    app.dependency_overrides[get_refresh_limiter] = lambda: RefreshLimiter(
+        max_concurrency=2
+    )
+
+    response = refresh_client.post("/api/users/4/refresh")
+
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 60
+
+
+def test_refresh_limiter_caps_concurrent_refreshes() -> None:
+    """Test that a user is refreshed once at a time, within the global cap."""
+    limiter = RefreshLimiter(max_concurrency=2)
+
+    with limiter.slot("1"):
+        with pytest.raises(HTTPException) as duplicate:
+            with limiter.slot("1"):
+                pass
+        with limiter.slot("2"):
+            with pytest.raises(HTTPException) as saturated:
+                with limiter.slot("3"):
+                    pass
+
+    assert duplicate.value.status_code == 429
+    assert saturated.value.status_code == 503
+    assert limiter.running == set()
+    with limiter.slot("3"):
+        assert limiter.running == {"3"}
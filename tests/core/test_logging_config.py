@@ -0,0 +1,95 @@
+"""Tests for the structured logging setup."""
+
+import json
+import logging
+
+from app.core.logging_config import (
+    JsonFormatter,
+    SamplingFilter,
+    parse_module_levels,
+)
+
+
+def make_record(
+    msg: str, *args: object, level: int = logging.INFO, sample: bool = True
+) -> logging.LogRecord:
+    """Create a log record as a logger named "test" would."""
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    if sample:
+        record.sample = True
+    return record
+
+
+def test_sampling_filter_keeps_burst_then_one_in_rate() -> None:
+    """Test that each template passes its burst and then one in rate records."""
+    sampling_filter = SamplingFilter(rate=10, burst=3)
+
+    kept = [
+        sampling_filter.filter(make_record("Processing user %s", user_id))
+        for user_id in range(33)
+    ]
+
+    assert kept[:3] == [True] * 3
+    assert sum(kept) == 6
+    assert sampling_filter.suppressed == 27
+    # Other templates have their own burst
+    assert sampling_filter.filter(make_record("Fetching stats for user %s", 1))
+
+
+def test_sampling_filter_always_keeps_warnings() -> None:
+    """Test that warnings and errors are never sampled out."""
+    sampling_filter = SamplingFilter(rate=1000, burst=0)
+
+    assert all(
+        sampling_filter.filter(
+            make_record("User %s not found (404)", user_id, level=logging.WARNING)
+        )
+        for user_id in range(100)
+    )
+    assert sampling_filter.suppressed == 0
+
+
+def test_sampling_filter_keeps_records_not_opted_in() -> None:
+    """Test that once-per-run records are never sampled out."""
+    sampling_filter = SamplingFilter(rate=1000, burst=0)
+
+    assert all(
+        sampling_filter.filter(make_record("Completed processing", sample=False))
+        for _ in range(100)
+    )
+    assert sampling_filter.suppressed == 0
+
+
+def test_sampling_filter_reset_starts_a_new_burst() -> None:
+    """Test that each invocation gets its own burst of every template."""
+    sampling_filter = SamplingFilter(rate=100, burst=2)
+    for user_id in range(5):
+        sampling_filter.filter(make_record("Processing user %s", user_id))
+
+    sampling_filter.reset()
+
+    assert sampling_filter.suppressed == 0
+    assert sampling_filter.filter(make_record("Processing user %s", 6))
+
+
+def test_json_formatter_includes_message_and_extra_fields() -> None:
+    """Test that records render as one JSON object with their extra fields."""
+    record = make_record("Processed %d users", 3)
+    record.suppressed_log_records = 7
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+    assert entry["message"] == "Processed 3 users"
+    assert entry["suppressed_log_records"] == 7
+    assert entry["timestamp"].endswith("Z")
+    assert "sample" not in json.loads(JsonFormatter().format(make_record("x")))
+
+
+def test_parse_module_levels() -> None:
+    """Test parsing of per-module level overrides."""
+    assert parse_module_levels(
+        "app.core.external_api=debug, botocore = WARNING,,invalid"
+    ) == {"app.core.external_api": "DEBUG", "botocore": "WARNING"}
+    assert parse_module_levels("") == {}
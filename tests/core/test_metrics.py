@@ -0,0 +1,50 @@
+"""Tests for the update sweep metrics."""
+
+import json
+
+import pytest
+
+from app.core.metrics import Histogram, SweepMetrics
+
+
+def test_histogram_buckets_values_and_keeps_exact_statistics() -> None:
+    """Test that close values share a bucket while min, max and sum stay exact."""
+    histogram = Histogram("Milliseconds")
+    for value in [10.0, 10.5, 100.0, 0.0]:
+        histogram.observe(value)
+
+    emf = histogram.to_emf()
+
+    assert emf["Counts"] == [1, 2, 1]
+    assert emf["Values"][0] == 0.0
+    assert emf["Values"][1] == pytest.approx(10.25, rel=0.1)
+    assert emf["Values"][2] == 100.0
+    assert (emf["Min"], emf["Max"], emf["Sum"], emf["Count"]) == (0.0, 100.0, 120.5, 4)
+
+
+def test_sweep_metrics_emit_one_emf_record(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that histograms and counters are emitted as a single EMF JSON line."""
+    metrics = SweepMetrics()
+    metrics.observe("ResponseBytes", 2048, unit="Bytes")
+    with metrics.timer("FetchLatency"):
+        pass
+    metrics.increment("FetchRetries")
+    metrics.increment("FetchRetries", 2)
+
+    metrics.emit(dimensions={"Environment": "test"}, timestamp_ms=1735689600000)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+    assert record["_aws"]["Timestamp"] == 1735689600000
+    assert directive["Dimensions"] == [["Environment"]]
+    assert directive["Metrics"] == [
+        {"Name": "ResponseBytes", "Unit": "Bytes"},
+        {"Name": "FetchLatency", "Unit": "Milliseconds"},
+        {"Name": "FetchRetries", "Unit": "Count"},
+    ]
+    assert record["Environment"] == "test"
+    assert record["ResponseBytes"]["Values"] == [2048]
+    assert record["FetchLatency"]["Count"] == 1
+    assert record["FetchRetries"] == 3
@@ -0,0 +1,130 @@
+"""Tests for on-demand profiling of handler invocations."""
+
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from app.core import profiling
+from app.core.config import Settings
+from app.core.profiling import profile_invocation, profiled
+
+
+def make_settings(tmp_path: Path, **overrides: Any) -> Settings:
+    """Create settings writing profiles under tmp_path."""
+    settings = Settings()
+    settings.PROFILE_CPU = ""
+    settings.PROFILE_MEMORY = False
+    settings.PROFILE_SAMPLE_RATE = 1
+    settings.PROFILE_SAMPLING_INTERVAL_MS = 1
+    settings.PROFILE_OUTPUT_DIR = str(tmp_path / "profiles")
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return settings
+
+
+def busy_work(seconds: float) -> int:
+    """Spin for a while so profilers have something to see."""
+    deadline = time.monotonic() + seconds
+    total = 0
+    while time.monotonic() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def test_deterministic_profile_is_written_per_request(tmp_path: Path) -> None:
+    """Test that cProfile stats are written under the request ID."""
+    settings = make_settings(tmp_path, PROFILE_CPU="deterministic")
+
+    with profile_invocation("request-1", settings):
+        busy_work(0.01)
+
+    stats = pstats.Stats(str(tmp_path / "profiles" / "request-1.prof"))
+    functions = {name for _, _, name in stats.stats}  # type: ignore[attr-defined]
+    assert "busy_work" in functions
+
+
+def test_sampling_profile_writes_folded_stacks(tmp_path: Path) -> None:
+    """Test that sampled stacks of the profiled thread are written folded."""
+    settings = make_settings(tmp_path, PROFILE_CPU="sampling")
+
+    with profile_invocation("request-2", settings):
+        busy_work(0.1)
+
+    lines = (tmp_path / "profiles" / "request-2.folded").read_text().splitlines()
+    assert lines
+    _, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("test_profiling:busy_work" in line for line in lines)
+    assert all(";" in line for line in lines)
+
+
+def test_memory_profile_writes_snapshot_and_report(tmp_path: Path) -> None:
+    """Test that allocations are traced and written as snapshot and report."""
+    settings = make_settings(tmp_path, PROFILE_MEMORY=True)
+    retained: List[bytes] = []
+
+    with profile_invocation("request-3", settings):
+        retained.extend(bytes(1024) for _ in range(1000))
+
+    assert not tracemalloc.is_tracing()
+    snapshot = tracemalloc.Snapshot.load(
+        str(tmp_path / "profiles" / "request-3.tracemalloc")
+    )
+    assert sum(stat.size for stat in snapshot.statistics("filename")) > 1_000_000
+    report = (tmp_path / "profiles" / "request-3.alloc.txt").read_text()
+    assert "test_profiling.py" in report
+
+
+def test_only_one_in_sample_rate_invocations_is_profiled(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that invocations not drawn by the sample rate write nothing."""
+    settings = make_settings(
+        tmp_path, PROFILE_CPU="deterministic", PROFILE_SAMPLE_RATE=10
+    )
+    draws = iter([3, 0])
+    monkeypatch.setattr("random.randrange", lambda n: next(draws))
+
+    for name in ["skipped", "profiled"]:
+        with profile_invocation(name, settings):
+            pass
+
+    assert sorted(p.name for p in (tmp_path / "profiles").iterdir()) == [
+        "profiled.prof"
+    ]
+
+
+def test_profiling_is_off_by_default(tmp_path: Path) -> None:
+    """Test that nothing is written without a profiler selected."""
+    with profile_invocation("request-4", make_settings(tmp_path)):
+        pass
+
+    assert not (tmp_path / "profiles").exists()
+
+
+def test_profiled_handler_names_artifacts_by_lambda_request_id(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a wrapped handler is profiled, even when it raises."""
+    settings = make_settings(tmp_path, PROFILE_CPU="deterministic")
+    monkeypatch.setattr(profiling, "get_settings", lambda: settings)
+
+    @profiled
+    def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        if event.get("fail"):
+            raise RuntimeError("handler failed")
+        return {"statusCode": 200}
+
+    assert handler({}, SimpleNamespace(aws_request_id="abc")) == {"statusCode": 200}
+    with pytest.raises(RuntimeError):
+        handler({"fail": True}, SimpleNamespace(aws_request_id="def"))
+
+    assert sorted(p.name for p in (tmp_path / "profiles").iterdir()) == [
+        "abc.prof",
+        "def.prof",
+    ]
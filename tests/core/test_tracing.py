@@ -0,0 +1,248 @@
+"""Tests for tracing spans and their export."""
+
+import asyncio
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Generator, List, Sequence
+
+import httpx
+import pytest
+
+from app.core.tracing import (
+    NOOP_SPAN,
+    FileSpanExporter,
+    OtlpHttpSpanExporter,
+    Span,
+    Tracer,
+    current_span,
+    get_tracer,
+    parse_traceparent,
+    set_tracer,
+    start_span,
+)
+from app.handlers.update_handler import process_users
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.users.memory import InMemoryUserStorage
+from app.testing.fake_collector import FakeCollector
+from app.testing.fake_nyt_api import FakeNytApi, FakeNytApiConfig
+
+
+class ListSpanExporter:
+    """Exporter keeping every span it is given."""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+
+class FailingSpanExporter:
+    """Exporter failing every export."""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        raise ConnectionError("collector down")
+
+
+@pytest.fixture
+def exporter() -> Generator[ListSpanExporter, None, None]:
+    """Enable tracing into a list for the duration of a test."""
+    exporter = ListSpanExporter()
+    tracer = Tracer(exporter)
+    previous = set_tracer(tracer)
+    yield exporter
+    tracer.shutdown()
+    set_tracer(previous)
+
+
+def spans_by_name(exporter: ListSpanExporter) -> Dict[str, Span]:
+    """Flush the tracer in use and index the exported spans by name."""
+    get_tracer().flush()
+    return {span.name: span for span in exporter.spans}
+
+
+def test_nested_spans_share_the_trace_of_their_parent(
+    exporter: ListSpanExporter,
+) -> None:
+    """Test that a span started inside another becomes its child."""
+    with start_span("outer", {"a": 1}) as outer:
+        with start_span("inner") as inner:
+            assert current_span() is inner
+        assert current_span() is outer
+    assert current_span() is None
+
+    spans = spans_by_name(exporter)
+    assert spans["inner"].trace_id == spans["outer"].trace_id
+    assert spans["inner"].parent_id == spans["outer"].span_id
+    assert spans["outer"].parent_id is None
+    assert spans["outer"].attributes == {"a": 1}
+    assert spans["outer"].start_ns <= spans["inner"].start_ns
+    assert spans["inner"].end_ns <= spans["outer"].end_ns
+
+
+def test_exceptions_mark_the_span_as_failed(exporter: ListSpanExporter) -> None:
+    """Test that an exception escaping a span is recorded as its error."""
+    with pytest.raises(ValueError):
+        with start_span("failing"):
+            raise ValueError("bad input")
+
+    span = spans_by_name(exporter)["failing"]
+    assert span.error == "ValueError: bad input"
+    assert span.to_otlp()["status"] == {"code": 2, "message": "ValueError: bad input"}
+
+
+async def test_spans_propagate_into_gathered_tasks(
+    exporter: ListSpanExporter,
+) -> None:
+    """Test that tasks started under a span are parented to it, not each other."""
+
+    async def child(name: str) -> None:
+        with start_span(name):
+            await asyncio.sleep(0)
+
+    with start_span("parent"):
+        await asyncio.gather(child("a"), child("b"))
+
+    spans = spans_by_name(exporter)
+    assert spans["a"].parent_id == spans["parent"].span_id
+    assert spans["b"].parent_id == spans["parent"].span_id
+
+
+async def test_sweep_spans_nest_fetches_under_process_users(
+    exporter: ListSpanExporter,
+) -> None:
+    """Test that each NYT fetch of a sweep is a child of the sweep's span."""
+    api = FakeNytApi(FakeNytApiConfig(user_count=2, solved_days=5))
+    async with httpx.AsyncClient(transport=api.mock_transport()) as client:
+        await process_users(
+            ["1", "2", "3"], InMemoryUserStorage(InMemoryStorageContext()), client
+        )
+
+    get_tracer().flush()
+    (sweep,) = [s for s in exporter.spans if s.name == "update.process_users"]
+    fetches = [s for s in exporter.spans if s.name == "nyt.fetch_user_stats"]
+    assert sorted(s.attributes["nyt.user_id"] for s in fetches) == ["1", "2", "3"]
+    assert {s.parent_id for s in fetches} == {sweep.span_id}
+    statuses = {
+        s.attributes["nyt.user_id"]: s.attributes["http.status_code"] for s in fetches
+    }
+    assert statuses == {"1": 200, "2": 200, "3": 404}
+    assert [s.error for s in fetches if s.attributes["nyt.user_id"] == "3"] == [
+        "HTTP 404"
+    ]
+
+
+def test_disabled_tracing_hands_out_the_noop_span() -> None:
+    """Test that without an exporter nothing is recorded or made current."""
+    tracer = Tracer()
+
+    with tracer.start_span("ignored") as span:
+        span.set_attribute("key", "value")
+        span.set_error("ignored")
+        assert current_span() is None
+
+    assert span is NOOP_SPAN
+    assert NOOP_SPAN.attributes == {} and NOOP_SPAN.error is None
+    assert tracer.thread is None
+
+
+def test_remote_parent_continues_the_callers_trace(
+    exporter: ListSpanExporter,
+) -> None:
+    """Test that a parsed traceparent header becomes a root span's parent."""
+    remote = parse_traceparent(
+        "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    )
+    assert remote == ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331")
+    assert parse_traceparent("garbage") is None
+
+    with start_span("request", remote_parent=remote):
+        pass
+
+    span = spans_by_name(exporter)["request"]
+    assert (span.trace_id, span.parent_id) == remote
+
+
+def test_spans_are_exported_in_batches() -> None:
+    """Test that a full batch is exported without waiting for the delay."""
+    exporter = ListSpanExporter()
+    tracer = Tracer(exporter, max_batch=2, max_delay_seconds=60)
+    exported = threading.Event()
+    export = exporter.export
+
+    def export_and_signal(spans: Sequence[Span]) -> None:
+        export(spans)
+        exported.set()
+
+    exporter.export = export_and_signal  # type: ignore[method-assign]
+    for name in ["first", "second"]:
+        with tracer.start_span(name):
+            pass
+
+    assert exported.wait(5)
+    assert [span.name for span in exporter.spans] == ["first", "second"]
+    tracer.shutdown()
+
+
+def test_export_failures_are_logged_not_raised(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test that a failing exporter drops the batch without breaking tracing."""
+    tracer = Tracer(FailingSpanExporter())
+
+    with tracer.start_span("lost"):
+        pass
+    tracer.flush()
+    tracer.shutdown()
+
+    assert "Dropped 1 spans that failed to export: collector down" in caplog.text
+
+
+def test_file_exporter_appends_otlp_json_lines(tmp_path: Path) -> None:
+    """Test that each batch becomes one OTLP/JSON line of the file."""
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(FileSpanExporter(str(path), "test-service"))
+
+    with tracer.start_span("write", {"count": 3, "ratio": 0.5, "ok": True}):
+        pass
+    tracer.flush()
+    tracer.shutdown()
+
+    (line,) = path.read_text().splitlines()
+    request = json.loads(line)
+    resource_spans = request["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": "test-service"}}
+    ]
+    (span,) = resource_spans["scopeSpans"][0]["spans"]
+    assert span["name"] == "write"
+    assert span["status"] == {"code": 1}
+    assert span["attributes"] == [
+        {"key": "count", "value": {"intValue": "3"}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "ok", "value": {"boolValue": True}},
+    ]
+    assert int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+
+
+def test_otlp_exporter_posts_to_the_collector() -> None:
+    """Test that spans reach an OTLP/HTTP collector with their parent links."""
+    collector = FakeCollector()
+    client = httpx.Client(transport=collector.mock_transport())
+    tracer = Tracer(
+        OtlpHttpSpanExporter("http://collector/v1/traces", "test-service", client)
+    )
+
+    with tracer.start_span("parent"):
+        with tracer.start_span("child"):
+            pass
+    tracer.flush()
+    tracer.shutdown()
+
+    assert collector.request_count == 1
+    assert collector.span_names() == ["child", "parent"]
+    child, parent = collector.spans
+    assert child["parentSpanId"] == parent["spanId"]
+    assert "parentSpanId" not in parent
+    assert child["service.name"] == "test-service"
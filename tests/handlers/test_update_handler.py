@@ -0,0 +1,221 @@
+"""Tests for the update sweep against the fake NYT API."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import AsyncGenerator
+
+import httpx
+import pytest
+
+from app.core import external_api
+from app.core.metrics import SweepMetrics
+from app.handlers.update_handler import process_users, sweep_deadline, sweep_order
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.users.memory import InMemoryUserStorage
+from app.testing.fake_nyt_api import (
+    FakeNytApi,
+    FakeNytApiConfig,
+    generate_stats_payload,
+)
+
+
+@pytest.fixture
+def memory_context() -> InMemoryStorageContext:
+    """Create a fresh in-memory storage context for each test."""
+    return InMemoryStorageContext()
+
+
+@pytest.fixture
+def user_storage(memory_context: InMemoryStorageContext) -> InMemoryUserStorage:
+    """Create an in-memory user storage instance with the shared context."""
+    return InMemoryUserStorage(memory_context)
+
+
+def make_client(config: FakeNytApiConfig) -> httpx.AsyncClient:
+    """Create an HTTP client served by a fake NYT API."""
+    return httpx.AsyncClient(transport=FakeNytApi(config).mock_transport())
+
+
+@pytest.fixture
+async def client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """Create an HTTP client served by a fake API where users 1-3 exist."""
+    async with make_client(FakeNytApiConfig(user_count=3, solved_days=30)) as c:
+        yield c
+
+
+async def test_process_users_saves_metadata_and_scores(
+    user_storage: InMemoryUserStorage,
+    memory_context: InMemoryStorageContext,
+    client: httpx.AsyncClient,
+) -> None:
+    """Test that a sweep stores each user's metadata and latest daily scores."""
+    results = await process_users(["1", "2", "3"], user_storage, client)
+
+    assert results["total_users"] == 3
+    assert results["successful_users"] == 3
+    assert set(memory_context.users) == {"1", "2", "3"}
+
+    # Every day of the week with a solve yields one score
+    payload = generate_stats_payload(FakeNytApiConfig(solved_days=30), 1)
+    solved_days = payload["results"]["stats"]["stats_by_day"]
+    expected_dates = {day["latest_date"] for day in solved_days if day["latest_date"]}
+    saved_dates = {key.date for key in memory_context.scores if key.user_id == "1"}
+    assert saved_dates == expected_dates
+    assert results["total_scores_updated"] == len(memory_context.scores)
+    assert results["dates_updated"] == sorted(
+        {key.date for key in memory_context.scores}
+    )
+
+
+async def test_process_users_reports_unknown_users(
+    user_storage: InMemoryUserStorage, client: httpx.AsyncClient
+) -> None:
+    """Test that users the API doesn't know are reported as failures."""
+    results = await process_users(["1", "4"], user_storage, client)
+
+    assert results["successful_users"] == 1
+    assert results["failed_users"] == 1
+    failed = [r for r in results["user_results"] if not r["success"]]
+    assert failed[0]["userId"] == "4"
+    assert failed[0]["error"] == "Failed to fetch user data from API"
+
+
+async def test_process_users_survives_server_errors(
+    user_storage: InMemoryUserStorage, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that injected 429s and 5xxs fail users without aborting the sweep."""
+    config = FakeNytApiConfig(rate_limit_rate=0.5, server_error_rate=0.5)
+    async with make_client(config) as client:
+        results = await process_users(["1", "2", "3"], user_storage, client)
+
+    assert results["failed_users"] == 3
+    assert memory_context.users == {}
+
+
+async def test_process_users_records_stage_metrics(
+    user_storage: InMemoryUserStorage, client: httpx.AsyncClient
+) -> None:
+    """Test that a sweep aggregates per-stage timings and error counts."""
+    metrics = SweepMetrics()
+    results = await process_users(["1", "2", "4"], user_storage, client, metrics)
+
+    record = metrics.to_emf()
+    assert record["FetchLatency"]["Count"] == 3
+    assert record["ResponseBytes"]["Count"] == 2
+    assert record["ParseTime"]["Count"] == 2
+    assert record["ExtractTime"]["Count"] == 2
+    assert record["WriteLatency"]["Count"] == 2 + results["total_scores_updated"]
+    assert record["ScoresWritten"] == results["total_scores_updated"]
+    assert record["UsersSucceeded"] == 2
+    assert record["UsersFailed"] == 1
+    assert record["Errors.HTTP404"] == 1
+
+
+async def test_process_users_retries_transient_errors(
+    user_storage: InMemoryUserStorage, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that 429s and 5xxs are retried and counted when retries are enabled."""
+    monkeypatch.setattr(external_api.settings, "NYT_API_MAX_RETRIES", 10)
+    monkeypatch.setattr(external_api, "RETRY_BACKOFF_SECONDS", 0)
+    metrics = SweepMetrics()
+    config = FakeNytApiConfig(rate_limit_rate=0.3, server_error_rate=0.3)
+    async with make_client(config) as client:
+        results = await process_users(["1", "2", "3"], user_storage, client, metrics)
+
+    assert results["successful_users"] == 3
+    assert metrics.counters["FetchRetries"] > 0
+    assert (
+        metrics.histograms["FetchLatency"].count == 3 + metrics.counters["FetchRetries"]
+    )
+
+
+async def test_process_users_stops_dispatching_at_deadline(
+    user_storage: InMemoryUserStorage, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that users after the deadline are left for the next run."""
+    user_ids = ["1", "2", "3", "4", "5", "6"]
+    metrics = SweepMetrics()
+    config = FakeNytApiConfig(latency_ms=100, solved_days=7)
+    async with make_client(config) as client:
+        results = await process_users(
+            user_ids,
+            user_storage,
+            client,
+            metrics,
+            concurrency=2,
+            deadline=time.monotonic() + 0.15,
+        )
+
+    # Two users finish, the next two are abandoned mid-fetch, then time's up
+    assert results["total_users"] == 4
+    assert not results["complete"]
+    assert results["last_user_id"] == "2"
+    assert [r["deadline_exceeded"] for r in results["user_results"]] == [
+        False,
+        False,
+        True,
+        True,
+    ]
+    assert metrics.counters["Errors.DeadlineExceeded"] == 2
+    assert set(memory_context.users) == {"1", "2"}
+
+
+async def test_process_users_cursor_stops_before_abandoned_user(
+    user_storage: InMemoryUserStorage,
+) -> None:
+    """Test that users finished after an abandoned one are swept again."""
+    user_ids = ["1", "2", "3"]
+    api = FakeNytApi(FakeNytApiConfig(solved_days=7))
+
+    async def handle_request(request: httpx.Request) -> httpx.Response:
+        """Answer user 1 too slowly and everyone else at once."""
+        if "/1/" in request.url.path:
+            await asyncio.sleep(1)
+        return await api.handle_request(request)
+
+    transport = httpx.MockTransport(handle_request)
+    async with httpx.AsyncClient(transport=transport) as client:
+        results = await process_users(
+            user_ids,
+            user_storage,
+            client,
+            concurrency=3,
+            deadline=time.monotonic() + 0.2,
+        )
+
+    assert not results["complete"]
+    assert results["last_user_id"] is None
+    assert [r["success"] for r in results["user_results"]] == [False, True, True]
+
+
+async def test_process_users_without_deadline_is_complete(
+    user_storage: InMemoryUserStorage, client: httpx.AsyncClient
+) -> None:
+    """Test that bounded concurrency still processes every user."""
+    results = await process_users(["1", "2", "3"], user_storage, client, concurrency=2)
+
+    assert results["complete"]
+    assert results["total_users"] == 3
+    assert results["last_user_id"] == "3"
+
+
+def test_sweep_order_resumes_after_cursor() -> None:
+    """Test that sweeps go in ID order, after the cursor, wrapping at the end."""
+    user_ids = ["c", "a", "d", "b"]
+
+    assert sweep_order(user_ids, None) == ["a", "b", "c", "d"]
+    assert sweep_order(user_ids, "b") == ["c", "d"]
+    assert sweep_order(user_ids, "bb") == ["c", "d"]
+    assert sweep_order(user_ids, "d") == ["a", "b", "c", "d"]
+
+
+def test_sweep_deadline_leaves_margin() -> None:
+    """Test that the deadline is the Lambda's less the margin, if known."""
+    context = SimpleNamespace(get_remaining_time_in_millis=lambda: 30_000)
+
+    deadline = sweep_deadline(context, margin_seconds=10)
+
+    assert deadline is not None
+    assert 19 < deadline - time.monotonic() <= 20
+    assert sweep_deadline(None, margin_seconds=10) is None
@@ -0,0 +1,102 @@
+"""Tests for DynamoDB group storage implementation."""
+
+from typing import Any, Generator
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundStorageError
+from app.storage.dynamodb_context import DynamoDbStorageContext
+from app.storage.groups.dynamodb import DynamoDbGroupStorage
+from app.storage.groups.models import GetGroupQuery, GroupItem, SaveGroupQuery
+
+TABLE_NAME = "LeaderboardTable-Test"
+GROUP_KEY = {"PK": {"S": "GROUP#friends"}, "SK": {"S": "MEMBERS"}}
+
+
+@pytest.fixture
+def dynamodb_client() -> Any:
+    """Create a DynamoDB client that never talks to AWS."""
+    return boto3.client(
+        "dynamodb",
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+
+
+@pytest.fixture
+def stubber(dynamodb_client: Any) -> Generator[Stubber, None, None]:
+    """Stub the client and check every queued response was consumed."""
+    with Stubber(dynamodb_client) as stub:
+        yield stub
+        stub.assert_no_pending_responses()
+
+
+@pytest.fixture
+def group_storage(dynamodb_client: Any) -> DynamoDbGroupStorage:
+    """Create a DynamoDB group storage instance backed by the stubbed client."""
+    context = DynamoDbStorageContext(
+        client=dynamodb_client, table_name=TABLE_NAME, gsi_name="DateLeaderboardIndex"
+    )
+    return DynamoDbGroupStorage(context)
+
+
+def test_save_group_puts_members_as_string_set(
+    group_storage: DynamoDbGroupStorage, stubber: Stubber
+) -> None:
+    """Test that a group is saved as one item with a string set of members."""
+    stubber.add_response(
+        "put_item",
+        {},
+        {
+            "TableName": TABLE_NAME,
+            "Item": {
+                **GROUP_KEY,
+                "type": {"S": "GROUP"},
+                "groupId": {"S": "friends"},
+                "userIds": {"SS": ["1"]},
+            },
+        },
+    )
+
+    result = group_storage.save_group(
+        SaveGroupQuery(item=GroupItem(group_id="friends", user_ids=frozenset({"1"})))
+    )
+
+    assert isinstance(result, Success)
+
+
+def test_get_group(group_storage: DynamoDbGroupStorage, stubber: Stubber) -> None:
+    """Test that a group is read back from its item."""
+    stubber.add_response(
+        "get_item",
+        {
+            "Item": {
+                **GROUP_KEY,
+                "groupId": {"S": "friends"},
+                "userIds": {"SS": ["1", "2"]},
+            }
+        },
+        {"TableName": TABLE_NAME, "Key": GROUP_KEY},
+    )
+
+    result = group_storage.get_group(GetGroupQuery(group_id="friends"))
+
+    assert result.unwrap().item == GroupItem(
+        group_id="friends", user_ids=frozenset({"1", "2"})
+    )
+
+
+def test_get_group_not_found(
+    group_storage: DynamoDbGroupStorage, stubber: Stubber
+) -> None:
+    """Test that a missing item is reported as NotFoundStorageError."""
+    stubber.add_response("get_item", {})
+
+    result = group_storage.get_group(GetGroupQuery(group_id="friends"))
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), NotFoundStorageError)
@@ -0,0 +1,42 @@
+"""Tests for in-memory group storage implementation."""
+
+import pytest
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundStorageError
+from app.storage.groups.memory import InMemoryGroupStorage
+from app.storage.groups.models import GetGroupQuery, GroupItem, SaveGroupQuery
+from app.storage.memory_context import InMemoryStorageContext
+
+
+@pytest.fixture
+def group_storage() -> InMemoryGroupStorage:
+    """Create an in-memory group storage instance on a fresh context."""
+    return InMemoryGroupStorage(InMemoryStorageContext())
+
+
+def test_get_group_not_found(group_storage: InMemoryGroupStorage) -> None:
+    """Test that getting an unknown group fails with NotFoundStorageError."""
+    result = group_storage.get_group(GetGroupQuery(group_id="friends"))
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), NotFoundStorageError)
+
+
+def test_save_group_replaces_members(group_storage: InMemoryGroupStorage) -> None:
+    """Test that saving a group again replaces its members."""
+    group_storage.save_group(
+        SaveGroupQuery(
+            item=GroupItem(group_id="friends", user_ids=frozenset({"1", "2"}))
+        )
+    )
+    group_storage.save_group(
+        SaveGroupQuery(
+            item=GroupItem(group_id="friends", user_ids=frozenset({"2", "3"}))
+        )
+    )
+
+    result = group_storage.get_group(GetGroupQuery(group_id="friends"))
+
+    assert isinstance(result, Success)
+    assert result.unwrap().item.user_ids == {"2", "3"}
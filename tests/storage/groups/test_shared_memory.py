@@ -0,0 +1,29 @@
+"""Tests for shared-memory group storage implementation."""
+
+from pathlib import Path
+
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundStorageError
+from app.storage.groups.models import GetGroupQuery, GroupItem, SaveGroupQuery
+from app.storage.groups.shared_memory import SharedMemoryGroupStorage
+from app.storage.shared_memory_context import SharedMemoryStorageContext
+
+
+def test_groups_are_shared_between_contexts(tmp_path: Path) -> None:
+    """Test that a group saved through one context is read through another."""
+    path = str(tmp_path / "leaderboard.snap")
+    writer = SharedMemoryGroupStorage(SharedMemoryStorageContext(path))
+    reader = SharedMemoryGroupStorage(SharedMemoryStorageContext(path))
+    query = GetGroupQuery(group_id="friends")
+
+    missing = reader.get_group(query)
+    assert isinstance(missing, Failure)
+    assert isinstance(missing.failure(), NotFoundStorageError)
+
+    group = GroupItem(group_id="friends", user_ids=frozenset({"1", "2"}))
+    writer.save_group(SaveGroupQuery(item=group))
+
+    result = reader.get_group(query)
+    assert isinstance(result, Success)
+    assert result.unwrap().item == group
@@ -0,0 +1,52 @@
+"""Tests for SQLite group storage implementation."""
+
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundStorageError
+from app.storage.groups.models import GetGroupQuery, GroupItem, SaveGroupQuery
+from app.storage.groups.sqlite import SqliteGroupStorage
+from app.storage.sqlite_context import SqliteStorageContext
+
+
+@pytest.fixture
+def group_storage(tmp_path: Path) -> Generator[SqliteGroupStorage, None, None]:
+    """Create a SQLite group storage instance on a fresh database file."""
+    context = SqliteStorageContext(str(tmp_path / "groups.db"))
+    yield SqliteGroupStorage(context)
+    context.close()
+
+
+def test_get_group_not_found(group_storage: SqliteGroupStorage) -> None:
+    """Test that getting an unknown group fails with NotFoundStorageError."""
+    result = group_storage.get_group(GetGroupQuery(group_id="friends"))
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), NotFoundStorageError)
+
+
+def test_save_group_replaces_members(group_storage: SqliteGroupStorage) -> None:
+    """Test that saving a group again replaces its members."""
+    group_storage.save_group(
+        SaveGroupQuery(
+            item=GroupItem(group_id="friends", user_ids=frozenset({"1", "2"}))
+        )
+    )
+    group_storage.save_group(
+        SaveGroupQuery(
+            item=GroupItem(group_id="friends", user_ids=frozenset({"2", "3"}))
+        )
+    )
+    group_storage.save_group(
+        SaveGroupQuery(item=GroupItem(group_id="family", user_ids=frozenset({"4"})))
+    )
+
+    result = group_storage.get_group(GetGroupQuery(group_id="friends"))
+
+    assert isinstance(result, Success)
+    assert result.unwrap().item == GroupItem(
+        group_id="friends", user_ids=frozenset({"2", "3"})
+    )
@@ -0,0 +1,539 @@
+"""Tests for DynamoDB leaderboard storage implementation."""
+
+from typing import Any, Dict, Generator, List, Tuple
+
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+from returns.result import Failure, Success
+
+from app.core.error import (
+    InternalStorageError,
+    NotFoundStorageError,
+    StorageOperationDetails,
+)
+from app.storage.dynamodb_context import DynamoDbStorageContext
+from app.storage.leaderboard import dynamodb as leaderboard_dynamodb
+from app.storage.leaderboard.dynamodb import (
+    ENTRY_FORMAT_VERSION,
+    DynamoDbLeaderboardStorage,
+    board_write_update,
+    bucket_attribute,
+    count_buckets,
+    encode_entries,
+)
+from app.storage.leaderboard.histogram import LOWER_BOUNDS
+from app.storage.leaderboard.models import (
+    MAX_LEADERBOARD_LIMIT,
+    GetDailyLeaderboardQuery,
+    GetGroupLeaderboardQuery,
+    GetScoreHistogramQuery,
+    RefreshDailyLeaderboardQuery,
+)
+from app.storage.models import DailyScoreItem
+from app.storage.users.dynamodb import DynamoDbUserStorage
+from app.storage.users.models import SaveBatchQuery
+
+TABLE_NAME = "LeaderboardTable-Test"
+GSI_NAME = "DateLeaderboardIndex"
+MATERIALIZED_KEY = {"PK": {"S": "LEADERBOARD#2023-01-01"}, "SK": {"S": "TOP"}}
+
+
+@pytest.fixture
+def dynamodb_client() -> Any:
+    """Create a DynamoDB client that never talks to AWS."""
+    return boto3.client(
+        "dynamodb",
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+
+
+@pytest.fixture
+def stubber(dynamodb_client: Any) -> Generator[Stubber, None, None]:
+    """Stub the client and check every queued response was consumed."""
+    with Stubber(dynamodb_client) as stub:
+        yield stub
+        stub.assert_no_pending_responses()
+
+
+@pytest.fixture
+def leaderboard_storage(dynamodb_client: Any) -> DynamoDbLeaderboardStorage:
+    """Create a DynamoDB leaderboard storage backed by the stubbed client."""
+    context = DynamoDbStorageContext(
+        client=dynamodb_client, table_name=TABLE_NAME, gsi_name=GSI_NAME
+    )
+    return DynamoDbLeaderboardStorage(context)
+
+
+def materialized_item(entries: List[Tuple[str, int]], total_count: int) -> Any:
+    """Build the materialized leaderboard item of 2023-01-01."""
+    return {
+        **MATERIALIZED_KEY,
+        "version": {"N": str(ENTRY_FORMAT_VERSION)},
+        "entries": {"B": encode_entries(entries)},
+        "total_count": {"N": str(total_count)},
+    }
+
+
+def gsi_items(entries: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """Build GSI query items for ranked (user ID, score) pairs."""
+    return [
+        {"userId": {"S": user_id}, "gsi1_sk": {"N": str(score)}}
+        for user_id, score in entries
+    ]
+
+
+def gsi_query_params(limit: int) -> Dict[str, Any]:
+    """Expected parameters of the GSI query for 2023-01-01."""
+    return {
+        "TableName": TABLE_NAME,
+        "IndexName": GSI_NAME,
+        "KeyConditionExpression": "gsi1_pk = :pk",
+        "ExpressionAttributeValues": {":pk": {"S": "DATE#2023-01-01"}},
+        "ScanIndexForward": True,
+        "Limit": limit,
+    }
+
+
+def linear_count_names() -> List[str]:
+    """Names of the item's counts of every linear bucket."""
+    return [bucket_attribute("linear", i) for i in range(len(LOWER_BOUNDS["linear"]))]
+
+
+def stub_read_board(stubber: Stubber, item: Dict[str, Any]) -> None:
+    """Stub the read of the item state a refresh starts from."""
+    stubber.add_response(
+        "get_item",
+        {"Item": item} if item else {},
+        {
+            "TableName": TABLE_NAME,
+            "Key": MATERIALIZED_KEY,
+            "ProjectionExpression": ", ".join(
+                ["revision", "version", "histogram_counted", *linear_count_names()]
+            ),
+            "ConsistentRead": True,
+        },
+    )
+
+
+def board_update_params(board: Dict[str, Any]) -> Dict[str, Any]:
+    """Expected parameters of the update writing a refreshed board."""
+    return {
+        "TableName": TABLE_NAME,
+        "Key": MATERIALIZED_KEY,
+        "UpdateExpression": "SET " + ", ".join(f"#{name} = :{name}" for name in board),
+        "ConditionExpression": (
+            "attribute_not_exists(#revision) OR #revision = :built_revision"
+        ),
+        "ExpressionAttributeNames": {
+            "#revision": "revision",
+            **{f"#{name}": name for name in board},
+        },
+        "ExpressionAttributeValues": {
+            f":{name}": value for name, value in board.items()
+        },
+    }
+
+
+def test_get_daily_leaderboard_from_materialized_item(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that a materialized board is served from a single GetItem."""
+    entries = [("2", 100), ("3", 200), ("1", 300)]
+    stubber.add_response(
+        "get_item",
+        {"Item": materialized_item(entries, total_count=3)},
+        {"TableName": TABLE_NAME, "Key": MATERIALIZED_KEY},
+    )
+
+    result = leaderboard_storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2023-01-01", limit=2)
+    )
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert [(e.rank, e.user_id, e.score) for e in reply.entries] == [
+        (1, "2", 100),
+        (2, "3", 200),
+    ]
+    assert reply.total_count == 3
+
+
+def test_get_daily_leaderboard_falls_back_to_gsi_when_missing(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that dates without a materialized item are queried from the GSI."""
+    stubber.add_response("get_item", {})
+    stubber.add_response(
+        "query", {"Items": gsi_items([("2", 100), ("1", 300)])}, gsi_query_params(10)
+    )
+
+    result = leaderboard_storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2023-01-01", limit=10)
+    )
+
+    reply = result.unwrap()
+    assert [e.user_id for e in reply.entries] == ["2", "1"]
+    assert reply.total_count == 2
+
+
+def test_get_daily_leaderboard_falls_back_when_board_is_too_short(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that a board holding fewer entries than requested and existing is stale."""
+    stubber.add_response(
+        "get_item", {"Item": materialized_item([("2", 100)], total_count=2)}
+    )
+    stubber.add_response(
+        "query", {"Items": gsi_items([("2", 100), ("1", 300)])}, gsi_query_params(5)
+    )
+
+    result = leaderboard_storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2023-01-01", limit=5)
+    )
+
+    assert len(result.unwrap().entries) == 2
+
+
+def test_get_daily_leaderboard_after_import_ranks_imported_scores(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that scores written without a refresh make the board stale."""
+    user_storage = DynamoDbUserStorage(leaderboard_storage.context)
+    stubber.add_response("batch_get_item", {})
+    stubber.add_response("update_item", {"Attributes": {"last_sequence": {"N": "1"}}})
+    stubber.add_response("transact_write_items", {})
+    stubber.add_response("update_item", {})
+    stubber.add_response(
+        "get_item",
+        {
+            "Item": {
+                **materialized_item([("2", 100)], total_count=1),
+                "revision": {"N": "1"},
+            }
+        },
+    )
+    stubber.add_response(
+        "query", {"Items": gsi_items([("1", 50), ("2", 100)])}, gsi_query_params(10)
+    )
+
+    imported = user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[DailyScoreItem(user_id="1", date="2023-01-01", score=50)]
+        )
+    )
+    result = leaderboard_storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2023-01-01", limit=10)
+    )
+
+    assert isinstance(imported, Success)
+    reply = result.unwrap()
+    assert [(e.user_id, e.score) for e in reply.entries] == [("1", 50), ("2", 100)]
+    assert reply.total_count == 2
+
+
+def test_board_write_update_moves_changed_scores_between_buckets() -> None:
+    """Test that a changed score leaves its old buckets and enters its new ones."""
+    update = board_write_update("2023-01-01", [(90, 400), (30, None)])
+
+    values = update["ExpressionAttributeValues"]
+    deltas = {
+        name: int(values[value]["N"])
+        for name, value in (
+            term.split() for term in update["UpdateExpression"].split(", ")[1:]
+        )
+    }
+    assert update["UpdateExpression"].startswith("ADD revision :one")
+    assert deltas[bucket_attribute("linear", 0)] == 1
+    assert deltas[bucket_attribute("linear", 1)] == 1
+    assert deltas[bucket_attribute("linear", 6)] == -1
+    # One score added per scale; the changed one only moved
+    assert sum(deltas.values()) == len(LOWER_BOUNDS)
+
+
+def test_refresh_daily_leaderboard_writes_packed_top_entries(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that refreshing materializes the GSI's top entries and total count."""
+    entries = [("2", 100), ("1", 300)]
+    stub_read_board(stubber, {"revision": {"N": "4"}})
+    stubber.add_response(
+        "query",
+        {"Items": gsi_items(entries)},
+        gsi_query_params(MAX_LEADERBOARD_LIMIT),
+    )
+    stubber.add_response(
+        "update_item",
+        {},
+        board_update_params(
+            {
+                "type": {"S": "LEADERBOARD"},
+                "date": {"S": "2023-01-01"},
+                "version": {"N": str(ENTRY_FORMAT_VERSION)},
+                "entries": {"B": encode_entries(entries)},
+                "updated_at": ANY,
+                "built_revision": {"N": "4"},
+                "histogram_counted": {"BOOL": True},
+                "total_count": {"N": "2"},
+            }
+        ),
+    )
+
+    result = leaderboard_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2023-01-01")
+    )
+
+    reply = result.unwrap()
+    assert (reply.entry_count, reply.total_count) == (2, 2)
+
+
+def test_refresh_daily_leaderboard_totals_counts_when_cut_short(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that boards longer than the limit are totalled without a scan."""
+    stub_read_board(
+        stubber,
+        {
+            "revision": {"N": "9"},
+            "version": {"N": str(ENTRY_FORMAT_VERSION)},
+            "histogram_counted": {"BOOL": True},
+            bucket_attribute("linear", 1): {"N": "700"},
+            bucket_attribute("linear", 5): {"N": "300"},
+        },
+    )
+    stubber.add_response(
+        "query",
+        {
+            "Items": gsi_items([("2", 100)]),
+            "LastEvaluatedKey": {"PK": {"S": "USER#2"}, "SK": {"S": "DATE#x"}},
+        },
+        gsi_query_params(MAX_LEADERBOARD_LIMIT),
+    )
+    stubber.add_response("update_item", {})
+
+    result = leaderboard_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2023-01-01")
+    )
+
+    reply = result.unwrap()
+    assert (reply.entry_count, reply.total_count) == (1, 1000)
+
+
+def test_refresh_daily_leaderboard_counts_legacy_items_once(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that boards materialized before counts were kept get counted."""
+    stub_read_board(stubber, {"version": {"N": str(ENTRY_FORMAT_VERSION)}})
+    stubber.add_response(
+        "query",
+        {
+            "Items": gsi_items([("2", 100)]),
+            "LastEvaluatedKey": {"PK": {"S": "USER#2"}, "SK": {"S": "DATE#x"}},
+        },
+        gsi_query_params(MAX_LEADERBOARD_LIMIT),
+    )
+    stubber.add_response(
+        "query",
+        {"Items": gsi_items([("2", 100), ("1", 4000)])},
+        {
+            "TableName": TABLE_NAME,
+            "IndexName": GSI_NAME,
+            "KeyConditionExpression": "gsi1_pk = :pk",
+            "ExpressionAttributeValues": {":pk": {"S": "DATE#2023-01-01"}},
+            "ProjectionExpression": "gsi1_sk",
+        },
+    )
+    counts = {
+        bucket_attribute(scale, index): {"N": str(count)}
+        for scale, scale_counts in count_buckets([100, 4000]).items()
+        for index, count in enumerate(scale_counts)
+    }
+    stubber.add_response(
+        "update_item",
+        {},
+        board_update_params(
+            {
+                "type": {"S": "LEADERBOARD"},
+                "date": {"S": "2023-01-01"},
+                "version": {"N": str(ENTRY_FORMAT_VERSION)},
+                "entries": {"B": encode_entries([("2", 100)])},
+                "updated_at": ANY,
+                "built_revision": {"N": "0"},
+                "histogram_counted": {"BOOL": True},
+                **counts,
+                "total_count": {"N": "2"},
+            }
+        ),
+    )
+
+    result = leaderboard_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2023-01-01")
+    )
+
+    reply = result.unwrap()
+    assert (reply.entry_count, reply.total_count) == (1, 2)
+
+
+def test_refresh_daily_leaderboard_retries_when_scores_change(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that a board whose scores were written meanwhile is rebuilt."""
+    stub_read_board(stubber, {"revision": {"N": "1"}})
+    stubber.add_response(
+        "query",
+        {"Items": gsi_items([("2", 100)])},
+        gsi_query_params(MAX_LEADERBOARD_LIMIT),
+    )
+    stubber.add_client_error(
+        "update_item", service_error_code="ConditionalCheckFailedException"
+    )
+    stub_read_board(stubber, {"revision": {"N": "2"}})
+    stubber.add_response(
+        "query",
+        {"Items": gsi_items([("1", 50), ("2", 100)])},
+        gsi_query_params(MAX_LEADERBOARD_LIMIT),
+    )
+    stubber.add_response("update_item", {})
+
+    result = leaderboard_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2023-01-01")
+    )
+
+    assert result.unwrap().entry_count == 2
+
+
+@pytest.mark.parametrize("user_id", ["abc", str(2**64)])
+def test_refresh_daily_leaderboard_rejects_unpackable_user_ids(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber, user_id: str
+) -> None:
+    """Test that a user ID that doesn't fit a packed entry fails the refresh."""
+    stub_read_board(stubber, {})
+    stubber.add_response(
+        "query",
+        {"Items": gsi_items([(user_id, 100)])},
+        gsi_query_params(MAX_LEADERBOARD_LIMIT),
+    )
+
+    result = leaderboard_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2023-01-01")
+    )
+
+    assert isinstance(result, Failure)
+    error = result.failure()
+    assert isinstance(error, InternalStorageError)
+    assert isinstance(error.details, StorageOperationDetails)
+    assert error.details.operation == "refresh_daily_leaderboard"
+    stubber.assert_no_pending_responses()
+
+
+def test_get_score_histogram_from_counts(
+    leaderboard_storage: DynamoDbLeaderboardStorage, stubber: Stubber
+) -> None:
+    """Test that histograms are read from the item's bucket counts."""
+    stubber.add_response(
+        "get_item",
+        {
+            "Item": {
+                bucket_attribute("linear", 0): {"N": "1"},
+                bucket_attribute("linear", 1): {"N": "1"},
+            }
+        },
+        {
+            "TableName": TABLE_NAME,
+            "Key": MATERIALIZED_KEY,
+            "ProjectionExpression": ", ".join(
+                ["version", "histogram_counted", *linear_count_names()]
+            ),
+        },
+    )
+
+    result = leaderboard_storage.get_score_histogram(
+        GetScoreHistogramQuery(date="2023-01-01")
+    )
+
+    reply = result.unwrap()
+    assert reply.total_count == 2
+    assert [(b.lower, b.count) for b in reply.buckets if b.count] == [(0, 1), (60, 1)]
+
+
+@pytest.mark.parametrize(
+    "item",
+    [{}, {"version": {"N": str(ENTRY_FORMAT_VERSION)}}],
+    ids=["missing", "not-counted"],
+)
+def test_get_score_histogram_not_found_without_counts(
+    leaderboard_storage: DynamoDbLeaderboardStorage,
+    stubber: Stubber,
+    item: Dict[str, Any],
+) -> None:
+    """Test that dates without complete counts are not found, without a scan."""
+    stubber.add_response("get_item", {"Item": item} if item else {})
+
+    result = leaderboard_storage.get_score_histogram(
+        GetScoreHistogramQuery(date="2023-01-01", scale="log")
+    )
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), NotFoundStorageError)
+    stubber.assert_no_pending_responses()
+
+
+def score_key(user_id: str) -> Dict[str, Any]:
+    """Build the key of a user's 2023-01-01 score item."""
+    return {"PK": {"S": f"USER#{user_id}"}, "SK": {"S": "SCORE#2023-01-01"}}
+
+
+def batch_get_params(user_ids: List[str]) -> Dict[str, Any]:
+    """Expected parameters of a BatchGetItem of 2023-01-01 scores."""
+    return {
+        "RequestItems": {
+            TABLE_NAME: {
+                "Keys": [score_key(user_id) for user_id in user_ids],
+                "ProjectionExpression": "userId, #score",
+                "ExpressionAttributeNames": {"#score": "score"},
+            }
+        }
+    }
+
+
+def score_items(entries: List[Tuple[str, int]]) -> Dict[str, Any]:
+    """Build a BatchGetItem response holding score items."""
+    return {
+        "Responses": {
+            TABLE_NAME: [
+                {"userId": {"S": user_id}, "score": {"N": str(score)}}
+                for user_id, score in entries
+            ]
+        }
+    }
+
+
+def test_get_group_leaderboard_batch_gets_member_scores(
+    leaderboard_storage: DynamoDbLeaderboardStorage,
+    stubber: Stubber,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that members are read by key and unprocessed keys are retried."""
+    monkeypatch.setattr(leaderboard_dynamodb, "BATCH_GET_BACKOFF_SECONDS", 0)
+    stubber.add_response(
+        "batch_get_item",
+        {
+            **score_items([("3", 300)]),
+            "UnprocessedKeys": {TABLE_NAME: {"Keys": [score_key("1")]}},
+        },
+        batch_get_params(["1", "2", "3"]),
+    )
+    stubber.add_response("batch_get_item", score_items([("1", 100)]))
+
+    result = leaderboard_storage.get_group_leaderboard(
+        GetGroupLeaderboardQuery(date="2023-01-01", user_ids=frozenset({"1", "2", "3"}))
+    )
+
+    reply = result.unwrap()
+    assert [(e.rank, e.user_id, e.score) for e in reply.entries] == [
+        (1, "1", 100),
+        (2, "3", 300),
+    ]
+    assert reply.total_count == 2
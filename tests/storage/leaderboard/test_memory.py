@@ -6,7 +6,12 @@ import pytest
 from returns.result import Success
 
 from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
-from app.storage.leaderboard.models import GetDailyLeaderboardQuery
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetGroupLeaderboardQuery,
+    GetScoreHistogramQuery,
+    LeaderboardEntry,
+)
 from app.storage.memory_context import InMemoryStorageContext
 from app.storage.models import DailyScoreItem
 from app.storage.users.memory import InMemoryUserStorage
@@ -172,3 +177,93 @@ def test_get_daily_leaderboard_multiple_dates(
     assert reply2.entries[0].score == 150
     assert reply2.entries[1].user_id == "3"
     assert reply2.entries[1].score == 250
+
+
+def test_get_group_leaderboard_ranks_members_only(
+    user_storage: InMemoryUserStorage,
+    leaderboard_storage: InMemoryLeaderboardStorage,
+) -> None:
+    """Test that group boards rank the members with a score on the date."""
+    for user_id, date, score in [
+        ("1", "2023-01-01", 300),
+        ("2", "2023-01-01", 100),
+        ("3", "2023-01-01", 50),
+        ("4", "2023-01-02", 10),
+    ]:
+        user_storage.save_daily_score(
+            SaveDailyScoreQuery(
+                item=DailyScoreItem(user_id=user_id, date=date, score=score)
+            )
+        )
+
+    result = leaderboard_storage.get_group_leaderboard(
+        GetGroupLeaderboardQuery(date="2023-01-01", user_ids=frozenset({"1", "2", "4"}))
+    )
+
+    reply = result.unwrap()
+    assert reply.entries == [
+        LeaderboardEntry(rank=1, user_id="2", score=100),
+        LeaderboardEntry(rank=2, user_id="1", score=300),
+    ]
+    assert reply.total_count == 2
+
+
+def test_get_score_histogram_follows_overwrites(
+    user_storage: InMemoryUserStorage,
+    leaderboard_storage: InMemoryLeaderboardStorage,
+) -> None:
+    """Test that histogram counts move when a user's score is overwritten."""
+    for user_id, score in [("1", 30), ("2", 90), ("3", 4000), ("1", 150)]:
+        user_storage.save_daily_score(
+            SaveDailyScoreQuery(
+                item=DailyScoreItem(user_id=user_id, date="2023-01-01", score=score)
+            )
+        )
+
+    reply = leaderboard_storage.get_score_histogram(
+        GetScoreHistogramQuery(date="2023-01-01")
+    ).unwrap()
+
+    assert reply.total_count == 3
+    assert len(reply.buckets) == 61
+    assert [(b.lower, b.upper, b.count) for b in reply.buckets if b.count] == [
+        (60, 120, 1),
+        (120, 180, 1),
+        (3600, None, 1),
+    ]
+
+
+def test_get_score_histogram_log_scale(
+    user_storage: InMemoryUserStorage,
+    leaderboard_storage: InMemoryLeaderboardStorage,
+) -> None:
+    """Test that log buckets widen as scores grow."""
+    for user_id, score in [("1", 5), ("2", 100), ("3", 105), ("4", 2000)]:
+        user_storage.save_daily_score(
+            SaveDailyScoreQuery(
+                item=DailyScoreItem(user_id=user_id, date="2023-01-01", score=score)
+            )
+        )
+
+    reply = leaderboard_storage.get_score_histogram(
+        GetScoreHistogramQuery(date="2023-01-01", scale="log")
+    ).unwrap()
+
+    assert [(b.lower, b.upper, b.count) for b in reply.buckets if b.count] == [
+        (0, 10, 1),
+        (95, 113, 2),
+        (1810, 2153, 1),
+    ]
+    assert reply.buckets[-1].upper is None
+
+
+def test_get_score_histogram_empty_date(
+    leaderboard_storage: InMemoryLeaderboardStorage,
+) -> None:
+    """Test that a date without scores has every bucket empty."""
+    reply = leaderboard_storage.get_score_histogram(
+        GetScoreHistogramQuery(date="2023-01-01")
+    ).unwrap()
+
+    assert reply.total_count == 0
+    assert all(bucket.count == 0 for bucket in reply.buckets)
@@ -0,0 +1,240 @@
+"""Tests for shared-memory leaderboard storage implementation."""
+
+import multiprocessing
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+from returns.result import Failure, Success
+
+from app.core.error import InternalStorageError
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardReply,
+    GetGroupLeaderboardQuery,
+    GetScoreHistogramQuery,
+    LeaderboardEntry,
+    RefreshDailyLeaderboardQuery,
+)
+from app.storage.leaderboard.shared_memory import SharedMemoryLeaderboardStorage
+from app.storage.models import DailyScoreItem
+from app.storage.shared_memory_context import SharedMemoryStorageContext
+from app.storage.users.models import SaveBatchQuery, SaveDailyScoreQuery
+from app.storage.users.shared_memory import SharedMemoryUserStorage
+
+
+@pytest.fixture
+def segment_path(tmp_path: Path) -> str:
+    """Path of the published snapshot."""
+    return str(tmp_path / "leaderboard.snap")
+
+
+@pytest.fixture
+def user_storage(segment_path: str) -> SharedMemoryUserStorage:
+    """Create the writer's user storage."""
+    return SharedMemoryUserStorage(
+        SharedMemoryStorageContext(segment_path, writer=True)
+    )
+
+
+@pytest.fixture
+def writer_storage(
+    user_storage: SharedMemoryUserStorage,
+) -> SharedMemoryLeaderboardStorage:
+    """Create the writer's leaderboard storage, sharing its context."""
+    return SharedMemoryLeaderboardStorage(user_storage.shared_context)
+
+
+@pytest.fixture
+def reader_storage(segment_path: str) -> SharedMemoryLeaderboardStorage:
+    """Create a reader's leaderboard storage with a context of its own."""
+    return SharedMemoryLeaderboardStorage(SharedMemoryStorageContext(segment_path))
+
+
+def save_scores(
+    storage: SharedMemoryUserStorage, scores: List[Tuple[str, int]]
+) -> None:
+    """Save (user ID, score) pairs for 2025-01-01."""
+    storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id=user_id, date="2025-01-01", score=score)
+                for user_id, score in scores
+            ]
+        )
+    )
+
+
+def read_board(path: str) -> GetDailyLeaderboardReply:
+    """Read the 2025-01-01 board from a new context, e.g. in another process."""
+    storage = SharedMemoryLeaderboardStorage(SharedMemoryStorageContext(path))
+    return storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2025-01-01")
+    ).unwrap()
+
+
+def test_get_daily_leaderboard_before_publishing(
+    reader_storage: SharedMemoryLeaderboardStorage,
+) -> None:
+    """Test that boards are empty until a snapshot is published."""
+    result = reader_storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2025-01-01")
+    )
+
+    assert result == Success(
+        GetDailyLeaderboardReply(date="2025-01-01", entries=[], total_count=0)
+    )
+
+
+def test_refresh_publishes_to_readers(
+    user_storage: SharedMemoryUserStorage,
+    writer_storage: SharedMemoryLeaderboardStorage,
+    reader_storage: SharedMemoryLeaderboardStorage,
+) -> None:
+    """Test that readers see the writer's scores once they are published."""
+    save_scores(user_storage, [("1", 90), ("2", 45), ("3", 120)])
+    query = GetDailyLeaderboardQuery(date="2025-01-01", limit=2)
+
+    assert reader_storage.get_daily_leaderboard(query).unwrap().entries == []
+
+    refresh = writer_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2025-01-01")
+    )
+
+    assert refresh.unwrap().total_count == 3
+    reply = reader_storage.get_daily_leaderboard(query).unwrap()
+    assert reply.entries == [
+        LeaderboardEntry(rank=1, user_id="2", score=45),
+        LeaderboardEntry(rank=2, user_id="1", score=90),
+    ]
+    assert reply.total_count == 3
+
+
+def test_get_group_leaderboard_from_published_snapshot(
+    user_storage: SharedMemoryUserStorage,
+    writer_storage: SharedMemoryLeaderboardStorage,
+    reader_storage: SharedMemoryLeaderboardStorage,
+) -> None:
+    """Test that readers rank group members from the published snapshot."""
+    query = GetGroupLeaderboardQuery(
+        date="2025-01-01", user_ids=frozenset({"1", "3", "4"})
+    )
+    assert reader_storage.get_group_leaderboard(query).unwrap().entries == []
+
+    save_scores(user_storage, [("1", 90), ("2", 45), ("3", 60)])
+    writer_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2025-01-01")
+    )
+
+    reply = reader_storage.get_group_leaderboard(query).unwrap()
+    assert reply.entries == [
+        LeaderboardEntry(rank=1, user_id="3", score=60),
+        LeaderboardEntry(rank=2, user_id="1", score=90),
+    ]
+    assert reply.total_count == 2
+
+
+def test_get_score_histogram_from_published_snapshot(
+    user_storage: SharedMemoryUserStorage,
+    writer_storage: SharedMemoryLeaderboardStorage,
+    reader_storage: SharedMemoryLeaderboardStorage,
+) -> None:
+    """Test that readers count the published scores into buckets."""
+    query = GetScoreHistogramQuery(date="2025-01-01")
+    assert reader_storage.get_score_histogram(query).unwrap().total_count == 0
+
+    save_scores(user_storage, [("1", 59), ("2", 60), ("3", 119), ("4", 5000)])
+    writer_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2025-01-01")
+    )
+
+    reply = reader_storage.get_score_histogram(query).unwrap()
+    assert reply.total_count == 4
+    assert [(b.lower, b.count) for b in reply.buckets if b.count] == [
+        (0, 1),
+        (60, 2),
+        (3600, 1),
+    ]
+
+
+def test_readers_remap_republished_snapshots(
+    user_storage: SharedMemoryUserStorage,
+    writer_storage: SharedMemoryLeaderboardStorage,
+    reader_storage: SharedMemoryLeaderboardStorage,
+) -> None:
+    """Test that readers pick up a snapshot published after their first read."""
+    refresh_query = RefreshDailyLeaderboardQuery(date="2025-01-01")
+    query = GetDailyLeaderboardQuery(date="2025-01-01")
+    save_scores(user_storage, [("1", 90)])
+    writer_storage.refresh_daily_leaderboard(refresh_query)
+    assert reader_storage.get_daily_leaderboard(query).unwrap().total_count == 1
+
+    user_storage.save_daily_score(
+        SaveDailyScoreQuery(
+            item=DailyScoreItem(user_id="2", date="2025-01-01", score=30)
+        )
+    )
+    writer_storage.refresh_daily_leaderboard(refresh_query)
+
+    reply = reader_storage.get_daily_leaderboard(query).unwrap()
+    assert [entry.user_id for entry in reply.entries] == ["2", "1"]
+
+
+def test_publish_only_after_changes(user_storage: SharedMemoryUserStorage) -> None:
+    """Test that the writer's copy is only republished after it changes."""
+    context = user_storage.shared_context
+    save_scores(user_storage, [("1", 90)])
+
+    assert context.dirty
+    assert context.publish()
+    assert not context.publish()
+
+
+def test_writer_starts_from_published_snapshot(
+    user_storage: SharedMemoryUserStorage,
+    writer_storage: SharedMemoryLeaderboardStorage,
+    segment_path: str,
+) -> None:
+    """Test that a restarted writer resumes from the published snapshot."""
+    save_scores(user_storage, [("1", 90)])
+    writer_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2025-01-01")
+    )
+
+    restarted = SharedMemoryUserStorage(
+        SharedMemoryStorageContext(segment_path, writer=True)
+    )
+
+    assert len(restarted.context.scores) == 1
+
+
+def test_get_daily_leaderboard_unreadable_snapshot(
+    reader_storage: SharedMemoryLeaderboardStorage, segment_path: str
+) -> None:
+    """Test that a corrupt snapshot is reported as an internal error."""
+    Path(segment_path).write_bytes(b"not a snapshot")
+
+    result = reader_storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2025-01-01")
+    )
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), InternalStorageError)
+
+
+def test_reader_in_another_process(
+    user_storage: SharedMemoryUserStorage,
+    writer_storage: SharedMemoryLeaderboardStorage,
+    segment_path: str,
+) -> None:
+    """Test that another process serves the same board from the snapshot."""
+    save_scores(user_storage, [("1", 90), ("2", 45)])
+    writer_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2025-01-01")
+    )
+
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        reply = pool.apply(read_board, (segment_path,))
+
+    assert reply == read_board(segment_path)
+    assert reply.total_count == 2
@@ -0,0 +1,181 @@
+"""Tests for SQLite leaderboard storage implementation."""
+
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from returns.result import Success
+
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetGroupLeaderboardQuery,
+    GetScoreHistogramQuery,
+    RefreshDailyLeaderboardQuery,
+)
+from app.storage.leaderboard.sqlite import SqliteLeaderboardStorage
+from app.storage.models import DailyScoreItem
+from app.storage.sqlite_context import SqliteStorageContext
+from app.storage.users.models import SaveBatchQuery
+from app.storage.users.sqlite import SqliteUserStorage
+
+
+@pytest.fixture
+def sqlite_context(tmp_path: Path) -> Generator[SqliteStorageContext, None, None]:
+    """Create a SQLite storage context on a fresh database file."""
+    context = SqliteStorageContext(str(tmp_path / "leaderboard.db"))
+    yield context
+    context.close()
+
+
+@pytest.fixture
+def leaderboard_storage(
+    sqlite_context: SqliteStorageContext,
+) -> SqliteLeaderboardStorage:
+    """Create a SQLite leaderboard storage instance with the shared context."""
+    return SqliteLeaderboardStorage(sqlite_context)
+
+
+@pytest.fixture
+def seeded(sqlite_context: SqliteStorageContext) -> None:
+    """Save three scores on 2023-01-01 and one on 2023-01-02."""
+    SqliteUserStorage(sqlite_context).save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=300),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="3", date="2023-01-01", score=200),
+                DailyScoreItem(user_id="1", date="2023-01-02", score=50),
+            ]
+        )
+    )
+
+
+def test_get_daily_leaderboard_empty(
+    leaderboard_storage: SqliteLeaderboardStorage,
+) -> None:
+    """Test that a date without scores has an empty leaderboard."""
+    result = leaderboard_storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2023-01-01")
+    )
+
+    assert isinstance(result, Success)
+    assert result.unwrap().entries == []
+    assert result.unwrap().total_count == 0
+
+
+@pytest.mark.usefixtures("seeded")
+def test_get_daily_leaderboard_ranks_and_limits(
+    leaderboard_storage: SqliteLeaderboardStorage,
+) -> None:
+    """Test that entries are ranked by ascending score and counted before the limit."""
+    result = leaderboard_storage.get_daily_leaderboard(
+        GetDailyLeaderboardQuery(date="2023-01-01", limit=2)
+    )
+
+    reply = result.unwrap()
+    assert [(e.rank, e.user_id, e.score) for e in reply.entries] == [
+        (1, "2", 100),
+        (2, "3", 200),
+    ]
+    assert reply.total_count == 3
+
+
+@pytest.mark.usefixtures("seeded")
+def test_refresh_daily_leaderboard_reports_counts(
+    leaderboard_storage: SqliteLeaderboardStorage,
+) -> None:
+    """Test that refreshing reports the board size of the date."""
+    result = leaderboard_storage.refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2023-01-02")
+    )
+
+    reply = result.unwrap()
+    assert (reply.entry_count, reply.total_count) == (1, 1)
+
+
+@pytest.mark.usefixtures("seeded")
+def test_get_group_leaderboard_ranks_members_only(
+    leaderboard_storage: SqliteLeaderboardStorage,
+) -> None:
+    """Test that group boards rank the members with a score on the date."""
+    result = leaderboard_storage.get_group_leaderboard(
+        GetGroupLeaderboardQuery(date="2023-01-02", user_ids=frozenset({"1", "3", "9"}))
+    )
+
+    reply = result.unwrap()
+    assert [(e.rank, e.user_id, e.score) for e in reply.entries] == [(1, "1", 50)]
+    assert reply.total_count == 1
+
+    reply = leaderboard_storage.get_group_leaderboard(
+        GetGroupLeaderboardQuery(date="2023-01-01", user_ids=frozenset({"1", "3"}))
+    ).unwrap()
+    assert [(e.rank, e.user_id, e.score) for e in reply.entries] == [
+        (1, "3", 200),
+        (2, "1", 300),
+    ]
+
+
+@pytest.mark.usefixtures("seeded")
+def test_get_score_histogram_follows_overwrites(
+    sqlite_context: SqliteStorageContext,
+    leaderboard_storage: SqliteLeaderboardStorage,
+) -> None:
+    """Test that the triggers move a user's count when their score changes."""
+    SqliteUserStorage(sqlite_context).save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=4000),
+            ]
+        )
+    )
+
+    reply = leaderboard_storage.get_score_histogram(
+        GetScoreHistogramQuery(date="2023-01-01")
+    ).unwrap()
+
+    assert reply.total_count == 3
+    assert [(b.lower, b.count) for b in reply.buckets if b.count] == [
+        (60, 1),
+        (180, 1),
+        (3600, 1),
+    ]
+
+
+@pytest.mark.usefixtures("seeded")
+def test_score_histograms_are_backfilled(
+    tmp_path: Path,
+    sqlite_context: SqliteStorageContext,
+) -> None:
+    """Test that databases without histogram counts are counted on open."""
+    with sqlite_context.connection() as connection:
+        connection.execute("DELETE FROM score_histograms")
+    sqlite_context.close()
+
+    context = SqliteStorageContext(str(tmp_path / "leaderboard.db"))
+    reply = (
+        SqliteLeaderboardStorage(context)
+        .get_score_histogram(GetScoreHistogramQuery(date="2023-01-01", scale="log"))
+        .unwrap()
+    )
+    context.close()
+
+    assert [(b.lower, b.count) for b in reply.buckets if b.count] == [
+        (95, 1),
+        (190, 1),
+        (269, 1),
+    ]
+
+
+def test_leaderboard_query_uses_covering_index(
+    sqlite_context: SqliteStorageContext,
+) -> None:
+    """Test that leaderboard reads are answered from the covering date index."""
+    plan = sqlite_context.connection().execute(
+        "EXPLAIN QUERY PLAN SELECT user_id, score FROM daily_scores WHERE date = ?"
+        " ORDER BY score, user_id LIMIT ?",
+        ("2023-01-01", 10),
+    )
+
+    details = " ".join(row[3] for row in plan)
+    assert "COVERING INDEX daily_scores_by_date" in details
+    assert "TEMP B-TREE" not in details
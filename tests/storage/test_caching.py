@@ -0,0 +1,302 @@
+"""Tests for the read-through caching storage wrappers."""
+
+from typing import Callable, Optional
+
+import pytest
+from returns.result import Success
+
+from app.storage.caching import (
+    CachingGroupStorage,
+    CachingLeaderboardStorage,
+    CachingUserStorage,
+    StorageCache,
+)
+from app.storage.groups.memory import InMemoryGroupStorage
+from app.storage.groups.models import GetGroupQuery, GroupItem, SaveGroupQuery
+from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetGroupLeaderboardQuery,
+    GetScoreHistogramQuery,
+)
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import (
+    GetUserMetadataQuery,
+    GetUserMetadataResult,
+    SaveBatchQuery,
+    SaveDailyScoreQuery,
+    SaveUserMetadataQuery,
+)
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """Create a clock that only moves when told to."""
+    return FakeClock()
+
+
+@pytest.fixture
+def memory_context() -> InMemoryStorageContext:
+    """Create a fresh in-memory storage context for each test."""
+    return InMemoryStorageContext()
+
+
+@pytest.fixture
+def cache(clock: FakeClock) -> StorageCache:
+    """Create a small cache driven by the fake clock."""
+    return StorageCache(max_entries=2, clock=clock)
+
+
+@pytest.fixture
+def user_storage(
+    memory_context: InMemoryStorageContext, cache: StorageCache
+) -> CachingUserStorage:
+    """Create a caching user storage over in-memory storage."""
+    return CachingUserStorage(
+        InMemoryUserStorage(memory_context), cache, metadata_ttl=300
+    )
+
+
+@pytest.fixture
+def leaderboard_storage(
+    memory_context: InMemoryStorageContext, cache: StorageCache
+) -> CachingLeaderboardStorage:
+    """Create a caching leaderboard storage sharing the user storage's cache."""
+    return CachingLeaderboardStorage(
+        InMemoryLeaderboardStorage(memory_context), cache, leaderboard_ttl=60
+    )
+
+
+def make_metadata(user_id: str, current_streak: int = 0) -> UserMetadataItem:
+    """Create user metadata with the given streak."""
+    return UserMetadataItem(
+        user_id=user_id,
+        last_fetched_timestamp=0,
+        puzzles_attempted=0,
+        puzzles_solved=0,
+        current_streak=current_streak,
+    )
+
+
+def test_cache_evicts_least_recently_used(
+    cache: StorageCache, clock: FakeClock
+) -> None:
+    """Test that the least recently used entry is evicted when full."""
+    cache.put("a", 1, ttl=10, tag="t")
+    cache.put("b", 2, ttl=10, tag="t")
+    assert cache.get("a") == 1
+    cache.put("c", 3, ttl=10, tag="t")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (3, 1, 1, 2)
+
+
+def test_cache_expires_entries(cache: StorageCache, clock: FakeClock) -> None:
+    """Test that entries are dropped once their TTL has passed."""
+    cache.put("a", 1, ttl=10, tag="t")
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.stats().expirations == 1
+    assert cache.stats().size == 0
+
+
+def test_cache_invalidates_by_tag(cache: StorageCache) -> None:
+    """Test that invalidating a tag drops exactly the entries stored under it."""
+    cache.put("a", 1, ttl=10, tag="x")
+    cache.put("b", 2, ttl=10, tag="y")
+
+    cache.invalidate("x")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats().invalidations == 1
+
+
+def test_cache_invalidates_entries_by_any_of_their_tags(cache: StorageCache) -> None:
+    """Test that an entry stored under two tags is dropped by either."""
+    cache.put("a", 1, 10, "x", "y")
+    cache.put("b", 2, 10, "y")
+
+    cache.invalidate("x")
+    assert (cache.get("a"), cache.get("b")) == (None, 2)
+    cache.invalidate("y")
+
+    assert cache.get("b") is None
+    assert cache.stats().invalidations == 2
+    assert cache.keys_by_tag == {}
+
+
+def test_cache_drops_puts_of_values_loaded_before_an_invalidation(
+    cache: StorageCache,
+) -> None:
+    """Test that a put is skipped if a tag was invalidated after the load began."""
+    generation = cache.generation("x", "y")
+    cache.invalidate("y")
+    cache.put("a", 1, 10, "x", "y", generation=generation)
+    cache.put("b", 2, 10, "x", generation=cache.generation("x"))
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+class RacingUserStorage(InMemoryUserStorage):
+    """In-memory user storage running a concurrent write in the middle of reads."""
+
+    during_read: Optional[Callable[[], object]] = None
+
+    def get_user_metadata(self, query: GetUserMetadataQuery) -> GetUserMetadataResult:
+        result = super().get_user_metadata(query)
+        if self.during_read is not None:
+            self.during_read()
+        return result
+
+
+def test_reads_racing_a_write_are_not_cached(
+    memory_context: InMemoryStorageContext, cache: StorageCache
+) -> None:
+    """Test that a read loaded before a concurrent write doesn't re-cache its value."""
+    backend = RacingUserStorage(memory_context)
+    user_storage = CachingUserStorage(backend, cache, metadata_ttl=300)
+    memory_context.users["1"] = make_metadata("1", 1)
+    backend.during_read = lambda: user_storage.save_user_metadata(
+        SaveUserMetadataQuery(item=make_metadata("1", 2))
+    )
+    query = GetUserMetadataQuery(user_id="1")
+
+    assert user_storage.get_user_metadata(query).unwrap().item.current_streak == 1
+    backend.during_read = None
+
+    assert user_storage.get_user_metadata(query).unwrap().item.current_streak == 2
+
+
+def test_user_metadata_is_cached_until_written(
+    user_storage: CachingUserStorage,
+    memory_context: InMemoryStorageContext,
+    cache: StorageCache,
+) -> None:
+    """Test that metadata reads are cached and writes invalidate them."""
+    memory_context.users["1"] = make_metadata("1", 1)
+    query = GetUserMetadataQuery(user_id="1")
+    assert user_storage.get_user_metadata(query).unwrap().item.current_streak == 1
+
+    # A write behind the cache's back isn't seen until invalidation
+    memory_context.users["1"] = make_metadata("1", 2)
+    assert user_storage.get_user_metadata(query).unwrap().item.current_streak == 1
+
+    user_storage.save_user_metadata(SaveUserMetadataQuery(item=make_metadata("1", 3)))
+    assert user_storage.get_user_metadata(query).unwrap().item.current_streak == 3
+    assert cache.stats().hits == 1
+
+
+def test_failed_reads_are_not_cached(
+    user_storage: CachingUserStorage, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that a NotFound result doesn't hide a user created later."""
+    query = GetUserMetadataQuery(user_id="1")
+    assert not isinstance(user_storage.get_user_metadata(query), Success)
+
+    memory_context.users["1"] = make_metadata("1")
+    assert isinstance(user_storage.get_user_metadata(query), Success)
+
+
+def test_score_writes_invalidate_leaderboards_of_their_date(
+    user_storage: CachingUserStorage,
+    leaderboard_storage: CachingLeaderboardStorage,
+    cache: StorageCache,
+) -> None:
+    """Test that saving scores evicts cached leaderboards of the same date only."""
+    first = GetDailyLeaderboardQuery(date="2023-01-01")
+    second = GetDailyLeaderboardQuery(date="2023-01-02")
+    assert leaderboard_storage.get_daily_leaderboard(first).unwrap().total_count == 0
+    assert leaderboard_storage.get_daily_leaderboard(second).unwrap().total_count == 0
+
+    user_storage.save_daily_score(
+        SaveDailyScoreQuery(
+            item=DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+        )
+    )
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="2", date="2023-01-01", score=200)
+            ]
+        )
+    )
+
+    assert leaderboard_storage.get_daily_leaderboard(first).unwrap().total_count == 2
+    assert leaderboard_storage.get_daily_leaderboard(second).unwrap().total_count == 0
+    assert cache.stats().invalidations == 1
+
+
+def test_score_writes_invalidate_histograms_of_their_date(
+    user_storage: CachingUserStorage,
+    leaderboard_storage: CachingLeaderboardStorage,
+) -> None:
+    """Test that cached histograms are evicted along with the boards of a date."""
+    query = GetScoreHistogramQuery(date="2023-01-01")
+    assert leaderboard_storage.get_score_histogram(query).unwrap().total_count == 0
+
+    user_storage.save_daily_score(
+        SaveDailyScoreQuery(
+            item=DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+        )
+    )
+
+    assert leaderboard_storage.get_score_histogram(query).unwrap().total_count == 1
+
+
+def test_group_saves_invalidate_the_group_and_its_boards(
+    leaderboard_storage: CachingLeaderboardStorage,
+    memory_context: InMemoryStorageContext,
+    cache: StorageCache,
+) -> None:
+    """Test that saving a group evicts the cached group and its boards."""
+    group_storage = CachingGroupStorage(
+        InMemoryGroupStorage(memory_context), cache, group_ttl=60
+    )
+    group = GroupItem(group_id="friends", user_ids=frozenset({"1"}))
+    group_storage.save_group(SaveGroupQuery(item=group))
+    memory_context.save_scores(
+        [DailyScoreItem(user_id="1", date="2023-01-01", score=100)]
+    )
+    members = group_storage.get_group(GetGroupQuery(group_id="friends"))
+    query = GetGroupLeaderboardQuery(
+        date="2023-01-01", user_ids=members.unwrap().item.user_ids, group_id="friends"
+    )
+    assert (
+        leaderboard_storage.get_group_leaderboard(query).unwrap().entries[0].score
+        == 100
+    )
+
+    # A write behind the cache's back isn't seen until invalidation
+    memory_context.save_scores(
+        [DailyScoreItem(user_id="1", date="2023-01-01", score=50)]
+    )
+    assert (
+        leaderboard_storage.get_group_leaderboard(query).unwrap().entries[0].score
+        == 100
+    )
+
+    group_storage.save_group(SaveGroupQuery(item=group))
+
+    assert cache.stats().size == 0
+    assert (
+        leaderboard_storage.get_group_leaderboard(query).unwrap().entries[0].score == 50
+    )
@@ -0,0 +1,252 @@
+"""Tests for incremental consumers of the score change feed."""
+
+from typing import Dict, List, Optional, Sequence, Set
+
+import pytest
+from returns.result import Failure, Success
+
+from app.core.error import StorageOperationDetails, UnavailableStorageError
+from app.storage import memory_context
+from app.storage.change_feed import ScoreChangeConsumer
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    AbandonScoreChangesReply,
+    AbandonScoreChangesResult,
+    ListScoreChangesQuery,
+    ListScoreChangesResult,
+    SaveBatchQuery,
+    ScoreChange,
+)
+
+
+class FlakyUserStorage(InMemoryUserStorage):
+    """In-memory user storage failing one feed read after a given checkpoint."""
+
+    fail_after: Optional[int] = None
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        if query.after_sequence == self.fail_after:
+            self.fail_after = None
+            return Failure(
+                UnavailableStorageError(
+                    details=StorageOperationDetails(
+                        operation="list_score_changes",
+                        resource_type="ScoreChange",
+                        raw_error="Throttled",
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return super().list_score_changes(query)
+
+
+class LaggingUserStorage(InMemoryUserStorage):
+    """In-memory user storage hiding some changes, as if not yet written.
+
+    A hidden change is abandoned by abandon_score_changes, unless it's late,
+    i.e. its write lands before the sequence is abandoned.
+    """
+
+    def __init__(self, context: InMemoryStorageContext) -> None:
+        super().__init__(context)
+        self.hidden: Set[int] = set()
+        self.late: Set[int] = set()
+        self.abandoned: Set[int] = set()
+
+    def list_score_changes(
+        self, query: ListScoreChangesQuery
+    ) -> ListScoreChangesResult:
+        reply = super().list_score_changes(query).unwrap()
+        missing = self.hidden | self.abandoned
+        visible = [c for c in reply.changes if c.sequence not in missing]
+        abandoned = sorted(
+            sequence
+            for sequence in self.abandoned
+            if query.after_sequence < sequence <= reply.checkpoint
+        )
+        return Success(
+            reply.model_copy(
+                update={"changes": visible, "abandoned_sequences": abandoned}
+            )
+        )
+
+    def abandon_score_changes(
+        self, query: AbandonScoreChangesQuery
+    ) -> AbandonScoreChangesResult:
+        abandoned = [
+            sequence
+            for sequence in query.sequences
+            if sequence in self.hidden and sequence not in self.late
+        ]
+        self.abandoned.update(abandoned)
+        return Success(AbandonScoreChangesReply(abandoned_sequences=abandoned))
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def save_scores(storage: InMemoryUserStorage, *scores: int) -> None:
+    """Save one score per user on 2023-01-01, user IDs counting from 1."""
+    storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id=str(user_id), date="2023-01-01", score=score)
+                for user_id, score in enumerate(scores, start=1)
+            ]
+        )
+    )
+
+
+def test_consumer_applies_only_new_changes() -> None:
+    """Test that a rollup kept by a consumer follows the scores incrementally."""
+    storage = InMemoryUserStorage(InMemoryStorageContext())
+    totals: Dict[str, int] = {}
+    pages: List[int] = []
+
+    def apply(changes: Sequence[ScoreChange]) -> None:
+        pages.append(len(changes))
+        for change in changes:
+            totals[change.date] = (
+                totals.get(change.date, 0) + change.new_score - (change.old_score or 0)
+            )
+
+    consumer = ScoreChangeConsumer(storage, apply, page_size=2)
+    save_scores(storage, 100, 200, 300)
+
+    assert consumer.poll() == Success(3)
+    assert (totals, consumer.checkpoint, pages) == ({"2023-01-01": 600}, 3, [2, 1])
+
+    save_scores(storage, 100, 150)
+    assert consumer.poll() == Success(1)
+    assert consumer.poll() == Success(0)
+    assert totals == {"2023-01-01": 550}
+    assert consumer.checkpoint == 4
+
+
+def test_failed_read_keeps_checkpoint_of_applied_pages() -> None:
+    """Test that a consumer resumes after the last page it applied."""
+    storage = FlakyUserStorage(InMemoryStorageContext())
+    applied: List[int] = []
+    consumer = ScoreChangeConsumer(
+        storage,
+        lambda changes: applied.extend(change.sequence for change in changes),
+        page_size=2,
+    )
+    save_scores(storage, 100, 200, 300)
+
+    storage.fail_after = 2
+    assert isinstance(consumer.poll(), Failure)
+    assert consumer.checkpoint == 2
+    assert consumer.poll() == Success(1)
+    assert applied == [1, 2, 3]
+
+
+def test_consumer_waits_for_late_changes() -> None:
+    """Test that changes after a missing sequence wait until it's visible."""
+    storage = LaggingUserStorage(InMemoryStorageContext())
+    storage.hidden = {2}
+    applied: List[int] = []
+    clock = FakeClock()
+    consumer = ScoreChangeConsumer(
+        storage,
+        lambda changes: applied.extend(change.sequence for change in changes),
+        gap_grace_seconds=10,
+        clock=clock,
+    )
+    save_scores(storage, 100, 200, 300)
+
+    assert consumer.poll() == Success(1)
+    clock.now = 5
+    assert consumer.poll() == Success(0)
+    assert consumer.checkpoint == 1
+
+    storage.hidden = set()
+    assert consumer.poll() == Success(2)
+    assert applied == [1, 2, 3]
+
+
+def test_consumer_abandons_changes_missing_past_grace_period() -> None:
+    """Test that a sequence that never appears is abandoned and skipped."""
+    storage = LaggingUserStorage(InMemoryStorageContext())
+    storage.hidden = {2}
+    applied: List[int] = []
+    clock = FakeClock()
+    consumer = ScoreChangeConsumer(
+        storage,
+        lambda changes: applied.extend(change.sequence for change in changes),
+        gap_grace_seconds=10,
+        clock=clock,
+    )
+    save_scores(storage, 100, 200, 300)
+
+    assert consumer.poll() == Success(1)
+    clock.now = 10
+    assert consumer.poll() == Success(1)
+    assert (applied, consumer.checkpoint) == ([1, 3], 3)
+    assert storage.abandoned == {2}
+
+    # Later consumers move past the abandoned sequence without waiting
+    replayed: List[int] = []
+    replay = ScoreChangeConsumer(
+        storage,
+        lambda changes: replayed.extend(change.sequence for change in changes),
+        clock=FakeClock(),
+    )
+    assert replay.poll() == Success(2)
+    assert (replayed, replay.checkpoint) == ([1, 3], 3)
+
+
+def test_consumer_reads_late_change_it_failed_to_abandon() -> None:
+    """Test that a change written before its sequence is abandoned isn't skipped."""
+    storage = LaggingUserStorage(InMemoryStorageContext())
+    storage.hidden = {2}
+    storage.late = {2}
+    applied: List[int] = []
+    clock = FakeClock()
+    consumer = ScoreChangeConsumer(
+        storage,
+        lambda changes: applied.extend(change.sequence for change in changes),
+        gap_grace_seconds=10,
+        clock=clock,
+    )
+    save_scores(storage, 100, 200, 300)
+
+    assert consumer.poll() == Success(1)
+    clock.now = 10
+    assert consumer.poll() == Success(0)
+    assert consumer.checkpoint == 1
+
+    storage.hidden = set()
+    assert consumer.poll() == Success(2)
+    assert applied == [1, 2, 3]
+
+
+def test_memory_feed_keeps_only_latest_changes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the in-memory feed drops its oldest changes past its cap."""
+    monkeypatch.setattr(memory_context, "MAX_SCORE_CHANGES", 10)
+    storage = InMemoryUserStorage(InMemoryStorageContext())
+    save_scores(storage, *range(100, 112))
+
+    reply = storage.list_score_changes(ListScoreChangesQuery()).unwrap()
+
+    assert len(storage.context.score_changes) <= 10
+    assert [change.sequence for change in reply.changes] == list(range(3, 13))
+    assert [change.new_score for change in reply.changes] == list(range(102, 112))
+    abandoned = storage.abandon_score_changes(
+        AbandonScoreChangesQuery(sequences=[1, 2, 3])
+    )
+    assert abandoned.unwrap().abandoned_sequences == [1, 2]
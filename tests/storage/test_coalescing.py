@@ -0,0 +1,135 @@
+"""Tests for single-flight coalescing of storage reads."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import pytest
+from returns.result import Success
+
+from app.storage.coalescing import CoalescingLeaderboardStorage, SingleFlight
+from app.storage.leaderboard.interface import LeaderboardStorage
+from app.storage.leaderboard.memory import InMemoryLeaderboardStorage
+from app.storage.leaderboard.models import (
+    GetDailyLeaderboardQuery,
+    GetDailyLeaderboardResult,
+)
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import SaveBatchQuery
+
+
+def wait_until(condition: Callable[[], bool]) -> None:
+    """Wait up to a few seconds for condition to hold."""
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, "condition never held"
+        time.sleep(0.001)
+
+
+class GatedLeaderboardStorage(InMemoryLeaderboardStorage):
+    """In-memory leaderboard storage whose board reads block until released."""
+
+    def __init__(self, context: InMemoryStorageContext) -> None:
+        super().__init__(context)
+        self.release = threading.Event()
+        self.calls: List[GetDailyLeaderboardQuery] = []
+
+    def get_daily_leaderboard(
+        self, query: GetDailyLeaderboardQuery
+    ) -> GetDailyLeaderboardResult:
+        self.calls.append(query)
+        self.release.wait()
+        return super().get_daily_leaderboard(query)
+
+
+@pytest.fixture
+def backend() -> GatedLeaderboardStorage:
+    """Create gated storage holding a few scores of one date."""
+    context = InMemoryStorageContext()
+    InMemoryUserStorage(context).save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id=str(user_id), date="2023-01-01", score=user_id)
+                for user_id in range(1, 4)
+            ]
+        )
+    )
+    return GatedLeaderboardStorage(context)
+
+
+def test_concurrent_identical_reads_share_one_backend_call(
+    backend: GatedLeaderboardStorage,
+) -> None:
+    """Test that a burst of identical queries issues one backend read."""
+    storage = CoalescingLeaderboardStorage(backend)
+    query = GetDailyLeaderboardQuery(date="2023-01-01", limit=10)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(storage.get_daily_leaderboard, query) for _ in range(8)]
+        wait_until(lambda: storage.daily_leaderboards.shared == 7)
+        backend.release.set()
+        results = [future.result() for future in futures]
+
+    assert backend.calls == [query]
+    assert all(isinstance(result, Success) for result in results)
+    assert len({id(result) for result in results}) == 1
+    assert results[0].unwrap().total_count == 3
+
+
+def test_different_queries_are_not_shared(backend: GatedLeaderboardStorage) -> None:
+    """Test that reads of different dates or limits run separately."""
+    storage: LeaderboardStorage = CoalescingLeaderboardStorage(backend)
+    queries = [
+        GetDailyLeaderboardQuery(date="2023-01-01", limit=10),
+        GetDailyLeaderboardQuery(date="2023-01-01", limit=20),
+        GetDailyLeaderboardQuery(date="2023-01-02", limit=10),
+    ]
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(storage.get_daily_leaderboard, q) for q in queries]
+        wait_until(lambda: len(backend.calls) == 3)
+        backend.release.set()
+        for future in futures:
+            future.result()
+
+    assert sorted(backend.calls, key=repr) == sorted(queries, key=repr)
+
+
+def test_completed_reads_are_not_reused(backend: GatedLeaderboardStorage) -> None:
+    """Test that a read after the previous one landed goes to the backend."""
+    storage = CoalescingLeaderboardStorage(backend)
+    backend.release.set()
+    query = GetDailyLeaderboardQuery(date="2023-01-01", limit=10)
+
+    storage.get_daily_leaderboard(query)
+    storage.get_daily_leaderboard(query)
+
+    assert backend.calls == [query, query]
+    assert storage.daily_leaderboards.flights == {}
+
+
+def test_exceptions_are_raised_in_every_caller() -> None:
+    """Test that waiting callers see the error of the call they joined."""
+    flight: SingleFlight[int] = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail() -> int:
+        started.set()
+        release.wait()
+        raise RuntimeError("backend exploded")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        started.wait()
+        follower = pool.submit(flight.do, "key", lambda: 0)
+        wait_until(lambda: flight.shared == 1)
+        release.set()
+
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="backend exploded"):
+                future.result()
+
+    assert flight.do("key", lambda: 1) == 1
@@ -0,0 +1,116 @@
+"""Tests for the shared in-memory storage context."""
+
+import threading
+
+from app.storage.memory_context import MAX_INSERTION_MERGE, InMemoryStorageContext
+from app.storage.models import DailyScoreItem
+
+
+def test_top_scores_ranks_by_score_then_user_id() -> None:
+    """Test that a date's scores are ranked by score with ties by user ID."""
+    context = InMemoryStorageContext()
+    context.save_scores(
+        [
+            DailyScoreItem(user_id="3", date="2025-01-01", score=90),
+            DailyScoreItem(user_id="2", date="2025-01-01", score=90),
+            DailyScoreItem(user_id="1", date="2025-01-01", score=120),
+            DailyScoreItem(user_id="4", date="2025-01-02", score=10),
+        ]
+    )
+
+    assert context.top_scores("2025-01-01", 10) == (
+        [(90, "2"), (90, "3"), (120, "1")],
+        3,
+    )
+    assert context.top_scores("2025-01-01", 1) == ([(90, "2")], 3)
+    assert context.top_scores("2025-01-03", 10) == ([], 0)
+
+
+def test_top_scores_replaces_overwritten_scores() -> None:
+    """Test that saving a score again replaces the user's rank, merged or not."""
+    context = InMemoryStorageContext()
+    context.save_scores([DailyScoreItem(user_id="1", date="2025-01-01", score=50)])
+    context.save_scores([DailyScoreItem(user_id="2", date="2025-01-01", score=60)])
+    context.top_scores("2025-01-01", 10)
+
+    context.save_scores([DailyScoreItem(user_id="1", date="2025-01-01", score=70)])
+    context.save_scores([DailyScoreItem(user_id="2", date="2025-01-01", score=80)])
+    context.save_scores([DailyScoreItem(user_id="2", date="2025-01-01", score=40)])
+
+    assert context.top_scores("2025-01-01", 10) == ([(40, "2"), (70, "1")], 2)
+
+
+def test_writes_publish_new_snapshots() -> None:
+    """Test that a write replaces a date's ranked snapshot rather than editing it."""
+    context = InMemoryStorageContext()
+    context.save_scores([DailyScoreItem(user_id="1", date="2025-01-01", score=50)])
+    partition = context.scores_by_date["2025-01-01"]
+    published = partition.ranked
+
+    context.save_scores(
+        [
+            DailyScoreItem(user_id="1", date="2025-01-01", score=70),
+            DailyScoreItem(user_id="2", date="2025-01-01", score=60),
+        ]
+    )
+
+    assert published == ((50, "1"),)
+    assert partition.ranked == ((60, "2"), (70, "1"))
+    assert partition.pending == {}
+
+
+def test_top_scores_merges_large_batches() -> None:
+    """Test that batches too large for insertion are merged in rank order."""
+    context = InMemoryStorageContext()
+    count = MAX_INSERTION_MERGE * 2
+    context.save_scores(
+        DailyScoreItem(user_id=str(user_id), date="2025-01-01", score=user_id % 7)
+        for user_id in range(1, count + 1)
+    )
+    context.top_scores("2025-01-01", 1)
+    context.save_scores(
+        DailyScoreItem(user_id=str(user_id), date="2025-01-01", score=user_id % 5)
+        for user_id in range(count + 1, 2 * count + 1)
+    )
+
+    ranked, total_count = context.top_scores("2025-01-01", 2 * count)
+
+    assert total_count == 2 * count
+    assert ranked == sorted(ranked)
+    assert len(ranked) == 2 * count
+
+
+def test_concurrent_reads_and_writes() -> None:
+    """Test that leaderboard reads stay consistent while other threads write."""
+    context = InMemoryStorageContext()
+    writers = 4
+    scores_per_writer = 500
+    errors = []
+    done = threading.Event()
+
+    def write(writer: int) -> None:
+        for i in range(scores_per_writer):
+            user_id = str(writer * scores_per_writer + i + 1)
+            context.save_scores(
+                [DailyScoreItem(user_id=user_id, date="2025-01-01", score=i % 97)]
+            )
+
+    def read() -> None:
+        while not done.is_set():
+            ranked, total_count = context.top_scores("2025-01-01", 50)
+            if ranked != sorted(ranked) or len(ranked) > total_count:
+                errors.append((ranked, total_count))
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    for thread in readers + threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert context.top_scores("2025-01-01", 0)[1] == writers * scores_per_writer
+    assert len(context.scores) == writers * scores_per_writer
@@ -0,0 +1,173 @@
+"""Tests for binary snapshots of the in-memory storage context."""
+
+from pathlib import Path
+
+import pytest
+
+from app.storage.groups.models import GroupItem
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.memory_snapshot import (
+    FORMAT_VERSION,
+    HEADER,
+    SnapshotFormatError,
+    SnapshotReader,
+    dump_snapshot,
+    load_snapshot,
+)
+from app.storage.models import DailyScoreItem, UserMetadataItem
+
+
+@pytest.fixture
+def memory_context() -> InMemoryStorageContext:
+    """Create a context with users and scores over two dates."""
+    context = InMemoryStorageContext()
+    for user_id, streak in [("1", 3), ("20", 0), ("300", 7)]:
+        context.users[user_id] = UserMetadataItem(
+            user_id=user_id,
+            last_fetched_timestamp=1_700_000_000,
+            puzzles_attempted=10,
+            puzzles_solved=8,
+            current_streak=streak,
+        )
+    for user_id, date, score in [
+        ("1", "2025-01-01", 90),
+        ("20", "2025-01-01", 45),
+        ("300", "2025-01-01", 90),
+        ("300", "2025-01-02", 30),
+    ]:
+        context.save_scores([DailyScoreItem(user_id=user_id, date=date, score=score)])
+    context.groups["friends"] = GroupItem(
+        group_id="friends", user_ids=frozenset({"1", "300", "4000"})
+    )
+    return context
+
+
+def test_roundtrip(memory_context: InMemoryStorageContext, tmp_path: Path) -> None:
+    """Test that loading a snapshot restores the same users and scores."""
+    path = tmp_path / "context.snap"
+    dump_snapshot(memory_context, path)
+
+    loaded = load_snapshot(path)
+
+    assert loaded.users == memory_context.users
+    assert loaded.scores == memory_context.scores
+    assert loaded.groups == memory_context.groups
+    assert not (tmp_path / "context.snap.tmp").exists()
+
+
+def test_roundtrip_empty_context(tmp_path: Path) -> None:
+    """Test that an empty context survives a snapshot."""
+    path = tmp_path / "empty.snap"
+    dump_snapshot(InMemoryStorageContext(), path)
+
+    loaded = load_snapshot(path)
+
+    assert loaded.users == {}
+    assert loaded.scores == {}
+
+
+def test_reader_ranked_scores(
+    memory_context: InMemoryStorageContext, tmp_path: Path
+) -> None:
+    """Test that a date's scores are read in rank order, ties by user ID."""
+    path = tmp_path / "context.snap"
+    dump_snapshot(memory_context, path)
+
+    reader = SnapshotReader(path)
+    try:
+        assert reader.date_ranges == {"2025-01-01": (0, 3), "2025-01-02": (3, 1)}
+        assert list(reader.ranked_scores("2025-01-01")) == [
+            (20, 45),
+            (1, 90),
+            (300, 90),
+        ]
+        assert list(reader.ranked_scores("2025-01-01", limit=1)) == [(20, 45)]
+        assert list(reader.ranked_scores("2025-01-02")) == [(300, 30)]
+        assert list(reader.ranked_scores("2024-12-31")) == []
+    finally:
+        reader.close()
+
+
+def test_reader_user_scores(
+    memory_context: InMemoryStorageContext, tmp_path: Path
+) -> None:
+    """Test that users and their scores are looked up by user ID."""
+    path = tmp_path / "context.snap"
+    dump_snapshot(memory_context, path)
+
+    reader = SnapshotReader(path)
+    try:
+        record = reader.user(300)
+        assert record is not None
+        assert record[:5] == (300, 1_700_000_000, 10, 8, 7)
+        assert reader.user(2) is None
+        assert reader.user_scores(300) == (["2025-01-01", "2025-01-02"], [90, 30])
+        assert reader.user_scores(300, start_date="2025-01-02") == (
+            ["2025-01-02"],
+            [30],
+        )
+        assert reader.user_scores(2) == ([], [])
+        assert list(reader.ranked_scores_after("2025-01-01", (45, 20), 5)) == [
+            (1, 90),
+            (300, 90),
+        ]
+        assert list(reader.ranked_scores_after("2025-01-01", (90, 1), 5)) == [(300, 90)]
+    finally:
+        reader.close()
+
+
+def test_reader_user_score(
+    memory_context: InMemoryStorageContext, tmp_path: Path
+) -> None:
+    """Test that a score is looked up by user and date, metadata or not."""
+    memory_context.save_scores(
+        [DailyScoreItem(user_id="4000", date="2025-01-02", score=75)]
+    )
+    path = tmp_path / "context.snap"
+    dump_snapshot(memory_context, path)
+
+    reader = SnapshotReader(path)
+    try:
+        assert reader.user_score(300, "2025-01-02") == 30
+        assert reader.user_score(300, "2025-01-03") is None
+        assert reader.user_score(4000, "2025-01-02") == 75
+        assert reader.user(4000) is None
+        assert reader.user_score(2, "2025-01-01") is None
+        assert list(reader.groups()) == [("friends", [1, 300, 4000])]
+    finally:
+        reader.close()
+
+
+def test_rejects_other_files(tmp_path: Path) -> None:
+    """Test that files without the snapshot magic are rejected."""
+    path = tmp_path / "other.snap"
+    path.write_bytes(b"x" * HEADER.size)
+
+    with pytest.raises(SnapshotFormatError, match="not a snapshot"):
+        load_snapshot(path)
+
+
+def test_rejects_other_versions(
+    memory_context: InMemoryStorageContext, tmp_path: Path
+) -> None:
+    """Test that snapshots in another format version are rejected."""
+    path = tmp_path / "context.snap"
+    dump_snapshot(memory_context, path)
+    data = bytearray(path.read_bytes())
+    data[8] += 1
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(SnapshotFormatError, match=f"format {FORMAT_VERSION + 1}"):
+        load_snapshot(path)
+
+
+def test_rejects_truncated_snapshots(
+    memory_context: InMemoryStorageContext, tmp_path: Path
+) -> None:
+    """Test that snapshots missing records are rejected."""
+    path = tmp_path / "context.snap"
+    dump_snapshot(memory_context, path)
+    path.write_bytes(path.read_bytes()[:-1])
+
+    with pytest.raises(SnapshotFormatError, match="expected"):
+        load_snapshot(path)
@@ -0,0 +1,85 @@
+"""Tests for solved-day bitmaps and streaks."""
+
+import random
+from datetime import date, timedelta
+from typing import List
+
+from app.storage.streaks import (
+    FIRST_PUZZLE_DATE,
+    build_bitmap,
+    current_streak,
+    day_index,
+    longest_streak,
+    streaks_reply,
+)
+
+
+def days_from(start: str, count: int) -> List[str]:
+    """Get count consecutive YYYY-MM-DD dates from start."""
+    first = date.fromisoformat(start)
+    return [(first + timedelta(days=offset)).isoformat() for offset in range(count)]
+
+
+def test_build_bitmap_skips_dates_without_a_bit() -> None:
+    """Test that dates before the first puzzle or that don't exist are skipped."""
+    bitmap = build_bitmap(
+        ["1942-02-14", str(FIRST_PUZZLE_DATE), "1942-02-17", "2023-02-30"]
+    )
+
+    assert bitmap == 0b101
+
+
+def test_current_streak_counts_until_the_day_is_over() -> None:
+    """Test that a streak reaching yesterday is current until today is solved."""
+    bitmap = build_bitmap(days_from("2023-01-01", 3))
+
+    assert current_streak(bitmap, "2023-01-03") == 3
+    assert current_streak(bitmap, "2023-01-04") == 3
+    assert current_streak(bitmap, "2023-01-05") == 0
+    assert current_streak(bitmap, "2023-01-02") == 2
+
+
+def test_streaks_reply_ignores_days_after_as_of() -> None:
+    """Test that historical streaks only count days up to as_of."""
+    bitmap = build_bitmap(days_from("2023-01-01", 10) + days_from("2023-02-01", 3))
+
+    reply = streaks_reply("1", "2023-01-05", bitmap)
+
+    assert (reply.current_streak, reply.longest_streak, reply.solved_count) == (
+        5,
+        5,
+        5,
+    )
+
+
+def test_streaks_match_a_day_by_day_walk() -> None:
+    """Test the bit operations against walking over every day."""
+    rng = random.Random(42)
+    for _ in range(200):
+        solved = {
+            day
+            for day in range(rng.randrange(1, 400))
+            if rng.random() < rng.choice([0.3, 0.8, 0.97])
+        }
+        bitmap = sum(1 << day for day in solved)
+        as_of = rng.randrange(0, 400)
+
+        runs, run = [0], 0
+        for day in range(as_of + 1):
+            run = run + 1 if day in solved else 0
+            runs.append(run)
+        expected_current = runs[-1] or runs[-2]
+        as_of_date = (FIRST_PUZZLE_DATE + timedelta(days=as_of)).isoformat()
+
+        reply = streaks_reply("1", as_of_date, bitmap)
+        assert day_index(as_of_date) == as_of
+        assert reply.current_streak == expected_current
+        assert reply.longest_streak == max(runs)
+        assert reply.solved_count == sum(1 for day in solved if day <= as_of)
+
+
+def test_longest_streak_of_a_long_history() -> None:
+    """Test that runs longer than a machine word are measured exactly."""
+    bitmap = build_bitmap(days_from("1990-01-01", 5000) + days_from("2010-01-01", 7))
+
+    assert longest_streak(bitmap) == 5000
@@ -0,0 +1,113 @@
+"""Tests for the tracing storage wrappers."""
+
+from typing import Generator, List, Sequence
+
+import pytest
+from returns.result import Failure, Success
+
+from app.core.error import StorageOperationDetails, UnavailableStorageError
+from app.core.tracing import Span, Tracer, get_tracer, set_tracer
+from app.storage.groups.memory import InMemoryGroupStorage
+from app.storage.groups.models import GetGroupQuery
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem
+from app.storage.tracing import TracingGroupStorage, TracingUserStorage
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import (
+    GetUserMetadataQuery,
+    SaveDailyScoreQuery,
+    SaveDailyScoreResult,
+)
+
+
+class ListSpanExporter:
+    """Exporter keeping every span it is given."""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+
+class UnavailableUserStorage(InMemoryUserStorage):
+    """In-memory user storage whose score writes are throttled."""
+
+    def save_daily_score(self, query: SaveDailyScoreQuery) -> SaveDailyScoreResult:
+        return Failure(
+            UnavailableStorageError(
+                details=StorageOperationDetails(
+                    operation="save_daily_score",
+                    resource_type="DailyScore",
+                    raw_error="Throttled",
+                ),
+                service_name="UnavailableUserStorage",
+            )
+        )
+
+
+@pytest.fixture
+def exporter() -> Generator[ListSpanExporter, None, None]:
+    """Enable tracing into a list for the duration of a test."""
+    exporter = ListSpanExporter()
+    tracer = Tracer(exporter)
+    previous = set_tracer(tracer)
+    yield exporter
+    tracer.flush()
+    tracer.shutdown()
+    set_tracer(previous)
+
+
+def exported_spans(exporter: ListSpanExporter) -> List[Span]:
+    """Flush the tracer and get the spans it exported."""
+    get_tracer().flush()
+    return exporter.spans
+
+
+def test_each_call_runs_in_a_span(exporter: ListSpanExporter) -> None:
+    """Test that a successful call is recorded under its protocol and method."""
+    storage = TracingUserStorage(
+        InMemoryUserStorage(InMemoryStorageContext()), "memory"
+    )
+    item = DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+
+    assert isinstance(storage.save_daily_score(SaveDailyScoreQuery(item=item)), Success)
+
+    (span,) = exported_spans(exporter)
+    assert span.name == "UserStorage.save_daily_score"
+    assert span.attributes == {"storage.backend": "memory"}
+    assert span.error is None
+
+
+def test_failures_mark_the_span_as_failed(exporter: ListSpanExporter) -> None:
+    """Test that a Failure other than NOT_FOUND is recorded as the span's error."""
+    storage = TracingUserStorage(
+        UnavailableUserStorage(InMemoryStorageContext()), "memory"
+    )
+    item = DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+
+    assert isinstance(storage.save_daily_score(SaveDailyScoreQuery(item=item)), Failure)
+
+    (span,) = exported_spans(exporter)
+    assert span.attributes["storage.error_code"] == "UNAVAILABLE"
+    assert span.error is not None
+
+
+def test_not_found_is_not_an_error(exporter: ListSpanExporter) -> None:
+    """Test that lookups of missing items are recorded without an error."""
+    context = InMemoryStorageContext()
+    users = TracingUserStorage(InMemoryUserStorage(context), "memory")
+    groups = TracingGroupStorage(InMemoryGroupStorage(context), "memory")
+
+    assert isinstance(
+        users.get_user_metadata(GetUserMetadataQuery(user_id="1")), Failure
+    )
+    assert isinstance(groups.get_group(GetGroupQuery(group_id="missing")), Failure)
+
+    spans = exported_spans(exporter)
+    assert [span.name for span in spans] == [
+        "UserStorage.get_user_metadata",
+        "GroupStorage.get_group",
+    ]
+    assert all(span.attributes["storage.error_code"] == "NOT_FOUND" for span in spans)
+    assert all(span.error is None for span in spans)
@@ -0,0 +1,58 @@
+"""Tests for head-to-head comparisons."""
+
+import random
+
+from app.storage.versus import head_to_head
+
+
+def test_head_to_head_counts_only_shared_days() -> None:
+    """Test that days only one user solved are skipped by the merge."""
+    reply = head_to_head(
+        "1",
+        "2",
+        ["2023-01-01", "2023-01-02", "2023-01-04", "2023-01-05"],
+        [100, 200, 300, 400],
+        ["2023-01-02", "2023-01-03", "2023-01-04", "2023-01-05"],
+        [260, 50, 300, 340],
+    )
+
+    assert (reply.shared_days, reply.wins, reply.losses, reply.ties) == (3, 1, 1, 1)
+    assert reply.average_delta == (-60 + 0 + 60) / 3
+    assert reply.average_win_margin == 60
+    assert reply.average_loss_margin == 60
+
+
+def test_head_to_head_without_shared_days() -> None:
+    """Test that averages are None when there is nothing to compare."""
+    reply = head_to_head("1", "2", ["2023-01-01"], [100], [], [])
+
+    assert reply.shared_days == 0
+    assert reply.average_delta is None
+    assert reply.average_win_margin is None
+    assert reply.average_loss_margin is None
+
+
+def test_head_to_head_matches_a_dict_join() -> None:
+    """Test the merge against joining both histories through dicts."""
+    rng = random.Random(7)
+    dates = [
+        f"2023-{month:02}-{day:02}" for month in range(1, 13) for day in range(1, 29)
+    ]
+    for _ in range(100):
+        user = {d: rng.randrange(60, 600) for d in dates if rng.random() < 0.6}
+        opponent = {d: rng.randrange(60, 600) for d in dates if rng.random() < 0.6}
+
+        reply = head_to_head(
+            "1",
+            "2",
+            sorted(user),
+            [user[d] for d in sorted(user)],
+            sorted(opponent),
+            [opponent[d] for d in sorted(opponent)],
+        )
+
+        deltas = [user[d] - opponent[d] for d in user if d in opponent]
+        assert reply.shared_days == len(deltas)
+        assert reply.wins == sum(1 for delta in deltas if delta < 0)
+        assert reply.losses == sum(1 for delta in deltas if delta > 0)
+        assert reply.average_delta == sum(deltas) / len(deltas)
@@ -0,0 +1,1060 @@
+"""Tests for DynamoDB user storage implementation."""
+
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+from returns.result import Failure, Success
+
+from app.core.error import (
+    NotFoundStorageError,
+    StorageOperationDetails,
+    UnavailableStorageError,
+)
+from app.storage.dynamodb_context import DynamoDbStorageContext
+from app.storage.leaderboard.dynamodb import board_write_update
+from app.storage.leaderboard.histogram import bucket_index
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.streaks import day_index
+from app.storage.users import dynamodb as users_dynamodb
+from app.storage.users.dynamodb import (
+    DynamoDbUserStorage,
+    abandoned_change_to_item,
+    daily_score_to_item,
+    score_change_key,
+    score_change_to_item,
+    user_metadata_to_item,
+)
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    ClaimUserRefreshQuery,
+    CreateUsersIfNotExistQuery,
+    GetAllUserIdsQuery,
+    GetHeadToHeadQuery,
+    GetSweepCursorQuery,
+    GetUserMetadataQuery,
+    GetUserStreaksQuery,
+    ListDailyScoresQuery,
+    ListScoreChangesQuery,
+    RebuildStreaksQuery,
+    SaveBatchQuery,
+    SaveDailyScoreQuery,
+    SaveSweepCursorQuery,
+)
+
+TABLE_NAME = "LeaderboardTable-Test"
+# expires_at of change feed items written by the tests
+EXPIRES_AT = 1_700_000_000
+
+
+@pytest.fixture(autouse=True)
+def fixed_change_expiry(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Make change feed items expire at a fixed time."""
+    monkeypatch.setattr(users_dynamodb, "change_expiry", lambda: EXPIRES_AT)
+
+
+@pytest.fixture
+def dynamodb_client() -> Any:
+    """Create a DynamoDB client that never talks to AWS."""
+    return boto3.client(
+        "dynamodb",
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+
+
+@pytest.fixture
+def stubber(dynamodb_client: Any) -> Generator[Stubber, None, None]:
+    """Stub the client and check every queued response was consumed."""
+    with Stubber(dynamodb_client) as stub:
+        yield stub
+        stub.assert_no_pending_responses()
+
+
+@pytest.fixture
+def user_storage(dynamodb_client: Any) -> DynamoDbUserStorage:
+    """Create a DynamoDB user storage instance backed by the stubbed client."""
+    context = DynamoDbStorageContext(
+        client=dynamodb_client, table_name=TABLE_NAME, gsi_name="DateLeaderboardIndex"
+    )
+    return DynamoDbUserStorage(context)
+
+
+def stub_reserve_sequences(stubber: Stubber, count: int, last_sequence: int) -> None:
+    """Stub the counter update reserving change feed sequences."""
+    stubber.add_response(
+        "update_item",
+        {"Attributes": {"last_sequence": {"N": str(last_sequence)}}},
+        {
+            "TableName": TABLE_NAME,
+            "Key": {"PK": {"S": "CHANGES"}, "SK": {"S": "SEQUENCE"}},
+            "UpdateExpression": "SET #type = :type ADD last_sequence :count",
+            "ExpressionAttributeNames": {"#type": "type"},
+            "ExpressionAttributeValues": {
+                ":type": {"S": "SEQUENCE"},
+                ":count": {"N": str(count)},
+            },
+            "ReturnValues": "UPDATED_NEW",
+        },
+    )
+
+
+def score_transaction(
+    storage: DynamoDbUserStorage,
+    changes: List[Tuple[DailyScoreItem, Optional[int]]],
+    first_sequence: int,
+) -> Dict[str, Any]:
+    """Build the TransactWriteItems parameters writing scores and their changes."""
+    transact_items: List[Dict[str, Any]] = []
+    for offset, (score, old_score) in enumerate(changes):
+        put: Dict[str, Any] = {
+            "TableName": TABLE_NAME,
+            "Item": storage.context.serialize(daily_score_to_item(score)),
+        }
+        if old_score is None:
+            put["ConditionExpression"] = "attribute_not_exists(PK)"
+        else:
+            put["ConditionExpression"] = "#score = :old"
+            put["ExpressionAttributeNames"] = {"#score": "score"}
+            put["ExpressionAttributeValues"] = {":old": {"N": str(old_score)}}
+        change = score_change_to_item(
+            first_sequence + offset, score, old_score, EXPIRES_AT
+        )
+        transact_items.append({"Put": put})
+        transact_items.append(
+            {
+                "Put": {
+                    "TableName": TABLE_NAME,
+                    "Item": storage.context.serialize(change),
+                    "ConditionExpression": "attribute_not_exists(PK)",
+                }
+            }
+        )
+    changes_by_date: Dict[str, List[Tuple[int, Optional[int]]]] = {}
+    for score, old_score in changes:
+        changes_by_date.setdefault(score.date, []).append((score.score, old_score))
+    for date, date_changes in changes_by_date.items():
+        transact_items.append(
+            {
+                "Update": {
+                    "TableName": TABLE_NAME,
+                    **board_write_update(date, date_changes),
+                }
+            }
+        )
+    return {"TransactItems": transact_items}
+
+
+def stub_write_conflict(stubber: Stubber) -> None:
+    """Stub a transaction cancelled because a score changed since it was read."""
+    stubber.add_client_error(
+        "transact_write_items",
+        service_error_code="TransactionCanceledException",
+        modeled_fields={
+            "CancellationReasons": [
+                {"Code": "ConditionalCheckFailed"},
+                {"Code": "None"},
+            ]
+        },
+    )
+
+
+def stub_abandon_sequence(
+    storage: DynamoDbUserStorage, stubber: Stubber, sequence: int
+) -> None:
+    """Stub the put of the item marking a sequence abandoned."""
+    stubber.add_response(
+        "put_item",
+        {},
+        {
+            "TableName": TABLE_NAME,
+            "Item": storage.context.serialize(
+                abandoned_change_to_item(sequence, EXPIRES_AT)
+            ),
+            "ConditionExpression": "attribute_not_exists(PK)",
+        },
+    )
+
+
+def make_metadata(user_id: str) -> UserMetadataItem:
+    """Create placeholder metadata for a newly discovered user."""
+    return UserMetadataItem(
+        user_id=user_id,
+        last_fetched_timestamp=0,
+        puzzles_attempted=0,
+        puzzles_solved=0,
+        current_streak=0,
+    )
+
+
+def test_get_user_metadata_not_found(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that a missing metadata item returns a NotFoundError."""
+    stubber.add_response(
+        "get_item",
+        {},
+        {
+            "TableName": TABLE_NAME,
+            "Key": {"PK": {"S": "USER#123"}, "SK": {"S": "METADATA"}},
+        },
+    )
+
+    result = user_storage.get_user_metadata(GetUserMetadataQuery(user_id="123"))
+
+    assert isinstance(result, Failure)
+    error = result.failure()
+    assert isinstance(error, NotFoundStorageError)
+    assert error.details.resource_id == "123"
+
+
+def test_get_user_metadata_success(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that a metadata item is converted to the storage model."""
+    stubber.add_response(
+        "get_item",
+        {
+            "Item": {
+                "PK": {"S": "USER#42"},
+                "SK": {"S": "METADATA"},
+                "userId": {"S": "42"},
+                "last_fetched_timestamp": {"N": "1630000000"},
+                "puzzles_attempted": {"N": "10"},
+                "puzzles_solved": {"N": "8"},
+                "current_streak": {"N": "3"},
+            }
+        },
+    )
+
+    result = user_storage.get_user_metadata(GetUserMetadataQuery(user_id="42"))
+
+    assert isinstance(result, Success)
+    assert result.unwrap().item == UserMetadataItem(
+        user_id="42",
+        last_fetched_timestamp=1630000000,
+        puzzles_attempted=10,
+        puzzles_solved=8,
+        current_streak=3,
+    )
+
+
+def test_save_daily_score(user_storage: DynamoDbUserStorage, stubber: Stubber) -> None:
+    """Test that a new score is written with its change item in one transaction."""
+    score_key = {"PK": {"S": "USER#456"}, "SK": {"S": "SCORE#2023-01-01"}}
+    stubber.add_response(
+        "get_item",
+        {},
+        {
+            "TableName": TABLE_NAME,
+            "Key": score_key,
+            "ProjectionExpression": "#score",
+            "ExpressionAttributeNames": {"#score": "score"},
+            "ConsistentRead": True,
+        },
+    )
+    stub_reserve_sequences(stubber, count=1, last_sequence=7)
+    stubber.add_response(
+        "transact_write_items",
+        {},
+        {
+            "TransactItems": [
+                {
+                    "Put": {
+                        "TableName": TABLE_NAME,
+                        "Item": {
+                            **score_key,
+                            "type": {"S": "DAILY_SCORE"},
+                            "userId": {"S": "456"},
+                            "date": {"S": "2023-01-01"},
+                            "score": {"N": "120"},
+                            "gsi1_pk": {"S": "DATE#2023-01-01"},
+                            "gsi1_sk": {"N": "120"},
+                        },
+                        "ConditionExpression": "attribute_not_exists(PK)",
+                    }
+                },
+                {
+                    "Put": {
+                        "TableName": TABLE_NAME,
+                        "Item": {
+                            "PK": {"S": "CHANGES#7"},
+                            "SK": {"S": "CHANGE#00000000000000000007"},
+                            "type": {"S": "SCORE_CHANGE"},
+                            "sequence": {"N": "7"},
+                            "userId": {"S": "456"},
+                            "date": {"S": "2023-01-01"},
+                            "new_score": {"N": "120"},
+                            "expires_at": {"N": str(EXPIRES_AT)},
+                        },
+                        "ConditionExpression": "attribute_not_exists(PK)",
+                    }
+                },
+                {
+                    "Update": {
+                        "TableName": TABLE_NAME,
+                        "Key": {
+                            "PK": {"S": "LEADERBOARD#2023-01-01"},
+                            "SK": {"S": "TOP"},
+                        },
+                        "UpdateExpression": (
+                            "ADD revision :one, count_linear_2 :c0, "
+                            f"count_log_{bucket_index('log', 120)} :c1"
+                        ),
+                        "ExpressionAttributeValues": {
+                            ":one": {"N": "1"},
+                            ":c0": {"N": "1"},
+                            ":c1": {"N": "1"},
+                        },
+                    }
+                },
+            ]
+        },
+    )
+    stubber.add_response(
+        "update_item",
+        {},
+        {
+            "TableName": TABLE_NAME,
+            "Key": {"PK": {"S": "USER#456"}, "SK": {"S": "SOLVED_DAYS"}},
+            "UpdateExpression": "SET #type = :type ADD days :days",
+            "ExpressionAttributeNames": {"#type": "type"},
+            "ExpressionAttributeValues": {
+                ":type": {"S": "SOLVED_DAYS"},
+                ":days": {"NS": [str(day_index("2023-01-01"))]},
+            },
+        },
+    )
+
+    item = DailyScoreItem(user_id="456", date="2023-01-01", score=120)
+    result = user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+
+    assert isinstance(result, Success)
+    assert result.unwrap().changed
+
+
+def test_save_daily_score_unchanged_is_not_recorded(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that rewriting a score unchanged writes nothing to the feed."""
+    stubber.add_response("get_item", {"Item": {"score": {"N": "120"}}})
+    stubber.add_response("update_item", {})
+
+    item = DailyScoreItem(user_id="456", date="2023-01-01", score=120)
+    result = user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+
+    assert isinstance(result, Success)
+    assert not result.unwrap().changed
+
+
+def test_save_daily_score_retries_after_concurrent_write(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that a score changed since it was read is read and written again."""
+    item = DailyScoreItem(user_id="456", date="2023-01-01", score=120)
+    stubber.add_response("get_item", {})
+    stub_reserve_sequences(stubber, count=1, last_sequence=7)
+    stub_write_conflict(stubber)
+    stub_abandon_sequence(user_storage, stubber, 7)
+    stubber.add_response("get_item", {"Item": {"score": {"N": "150"}}})
+    stub_reserve_sequences(stubber, count=1, last_sequence=8)
+    stubber.add_response(
+        "transact_write_items",
+        {},
+        score_transaction(user_storage, [(item, 150)], first_sequence=8),
+    )
+    stubber.add_response("update_item", {})
+
+    result = user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+
+    assert isinstance(result, Success)
+
+
+def test_save_daily_score_throttled(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that throttling is reported as the storage being unavailable."""
+    stubber.add_client_error(
+        "get_item", service_error_code="ProvisionedThroughputExceededException"
+    )
+
+    item = DailyScoreItem(user_id="456", date="2023-01-01", score=120)
+    result = user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+
+    assert isinstance(result, Failure)
+    error = result.failure()
+    assert isinstance(error, UnavailableStorageError)
+    assert isinstance(error.details, StorageOperationDetails)
+    assert error.details.operation == "save_daily_score"
+
+
+def test_get_all_user_ids_paginates(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that user IDs are collected across every scan page."""
+    stubber.add_response(
+        "scan",
+        {
+            "Items": [{"userId": {"S": "1"}}, {"userId": {"S": "2"}}],
+            "LastEvaluatedKey": {"PK": {"S": "USER#2"}, "SK": {"S": "METADATA"}},
+        },
+    )
+    stubber.add_response("scan", {"Items": [{"userId": {"S": "3"}}]})
+
+    result = user_storage.get_all_user_ids(GetAllUserIdsQuery())
+
+    assert isinstance(result, Success)
+    assert result.unwrap().user_ids == ["1", "2", "3"]
+
+
+def test_create_users_if_not_exist(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that existing users are reported rather than overwritten."""
+    stubber.add_response("put_item", {})
+    stubber.add_client_error(
+        "put_item", service_error_code="ConditionalCheckFailedException"
+    )
+
+    query = CreateUsersIfNotExistQuery(items=[make_metadata("1"), make_metadata("2")])
+    result = user_storage.create_users_if_not_exist(query)
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert reply.created_user_ids == ["1"]
+    assert reply.existing_user_ids == ["2"]
+
+
+def test_save_batch_chunks_and_retries_unprocessed(
+    user_storage: DynamoDbUserStorage,
+    stubber: Stubber,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that metadata is retried when unprocessed and scores are chunked."""
+    monkeypatch.setattr(users_dynamodb, "BATCH_WRITE_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(users_dynamodb, "TRANSACT_CHANGES_SIZE", 20)
+    scores = [
+        DailyScoreItem(user_id=str(user_id), date="2023-01-01", score=100)
+        for user_id in range(1, 31)
+    ]
+    metadata = {
+        "PutRequest": {
+            "Item": user_storage.context.serialize(
+                user_metadata_to_item(make_metadata("1"))
+            )
+        }
+    }
+    stubber.add_response("batch_get_item", {})
+    stubber.add_response(
+        "batch_write_item", {"UnprocessedItems": {TABLE_NAME: [metadata]}}
+    )
+    stubber.add_response(
+        "batch_write_item", {}, {"RequestItems": {TABLE_NAME: [metadata]}}
+    )
+    stub_reserve_sequences(stubber, count=len(scores), last_sequence=len(scores))
+    changes: List[Tuple[DailyScoreItem, Optional[int]]] = [
+        (score, None) for score in scores
+    ]
+    stubber.add_response(
+        "transact_write_items",
+        {},
+        score_transaction(user_storage, changes[:20], first_sequence=1),
+    )
+    stubber.add_response(
+        "transact_write_items",
+        {},
+        score_transaction(user_storage, changes[20:], first_sequence=21),
+    )
+    for _ in scores:
+        stubber.add_response("update_item", {})
+
+    result = user_storage.save_batch(
+        SaveBatchQuery(
+            user_metadata_items=[make_metadata("1")], daily_score_items=scores
+        )
+    )
+
+    assert isinstance(result, Success)
+
+
+def test_save_batch_gives_up_on_unprocessed_items(
+    user_storage: DynamoDbUserStorage,
+    stubber: Stubber,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that items left unprocessed after every attempt are reported."""
+    monkeypatch.setattr(users_dynamodb, "BATCH_WRITE_BACKOFF_SECONDS", 0)
+    unprocessed = {
+        "PutRequest": {
+            "Item": user_storage.context.serialize(
+                user_metadata_to_item(make_metadata("1"))
+            )
+        }
+    }
+    for _ in range(users_dynamodb.BATCH_WRITE_ATTEMPTS):
+        stubber.add_response(
+            "batch_write_item", {"UnprocessedItems": {TABLE_NAME: [unprocessed]}}
+        )
+
+    result = user_storage.save_batch(
+        SaveBatchQuery(user_metadata_items=[make_metadata("1")])
+    )
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), UnavailableStorageError)
+
+
+def gsi_item(user_id: str, score: int) -> Dict[str, Any]:
+    """Build a date GSI item as returned by Query."""
+    return {"userId": {"S": user_id}, "gsi1_sk": {"N": str(score)}}
+
+
+def test_list_daily_scores_walks_dates(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that the date GSI is read date by date, resuming from cursors."""
+    last_key = {"gsi1_pk": {"S": "DATE#2023-01-01"}, "gsi1_sk": {"N": "40"}}
+    stubber.add_response(
+        "query",
+        {"Items": [gsi_item("2", 40)], "LastEvaluatedKey": last_key},
+        {
+            "TableName": TABLE_NAME,
+            "IndexName": "DateLeaderboardIndex",
+            "KeyConditionExpression": "gsi1_pk = :pk",
+            "ExpressionAttributeValues": {":pk": {"S": "DATE#2023-01-01"}},
+            "Limit": 2,
+        },
+    )
+    stubber.add_response(
+        "query",
+        {"Items": [gsi_item("1", 50)]},
+        {
+            "TableName": TABLE_NAME,
+            "IndexName": "DateLeaderboardIndex",
+            "KeyConditionExpression": "gsi1_pk = :pk",
+            "ExpressionAttributeValues": {":pk": {"S": "DATE#2023-01-01"}},
+            "Limit": 1,
+            "ExclusiveStartKey": last_key,
+        },
+    )
+    stubber.add_response("query", {"Items": [gsi_item("3", 30)]})
+    query = ListDailyScoresQuery(
+        start_date="2023-01-01", end_date="2023-01-02", limit=2
+    )
+
+    first = user_storage.list_daily_scores(query).unwrap()
+    second = user_storage.list_daily_scores(
+        query.model_copy(update={"cursor": first.cursor})
+    ).unwrap()
+
+    assert [(item.user_id, item.date) for item in first.items] == [
+        ("2", "2023-01-01"),
+        ("1", "2023-01-01"),
+    ]
+    assert [(item.user_id, item.date, item.score) for item in second.items] == [
+        ("3", "2023-01-02", 30)
+    ]
+    assert second.cursor is None
+
+
+def user_scores_params(limit: int, **kwargs: Any) -> Dict[str, Any]:
+    """Build the expected parameters of a query of user 1's January scores."""
+    return {
+        "TableName": TABLE_NAME,
+        "KeyConditionExpression": "PK = :pk AND SK BETWEEN :start AND :end",
+        "ExpressionAttributeNames": {"#score": "score"},
+        "ExpressionAttributeValues": {
+            ":pk": {"S": "USER#1"},
+            ":start": {"S": "SCORE#2023-01-01"},
+            ":end": {"S": "SCORE#2023-01-31"},
+        },
+        "ProjectionExpression": "SK, #score",
+        "Limit": limit,
+        **kwargs,
+    }
+
+
+def score_row(date: str, score: int) -> Dict[str, Any]:
+    """Build a projected score item of a user's partition."""
+    return {"SK": {"S": f"SCORE#{date}"}, "score": {"N": str(score)}}
+
+
+def test_list_daily_scores_for_user(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that a user's scores are read from their partition page by page."""
+    last_key = {"PK": {"S": "USER#1"}, "SK": {"S": "SCORE#2023-01-02"}}
+    stubber.add_response(
+        "query",
+        {"Items": [score_row("2023-01-02", 30)], "LastEvaluatedKey": last_key},
+        user_scores_params(3),
+    )
+    stubber.add_response(
+        "query",
+        {"Items": [score_row("2023-01-20", 40), score_row("2023-01-31", 50)]},
+        user_scores_params(2, ExclusiveStartKey=last_key),
+    )
+    query = ListDailyScoresQuery(
+        start_date="2023-01-01", end_date="2023-01-31", user_id="1", limit=3
+    )
+
+    reply = user_storage.list_daily_scores(query).unwrap()
+
+    assert [(item.user_id, item.date, item.score) for item in reply.items] == [
+        ("1", "2023-01-02", 30),
+        ("1", "2023-01-20", 40),
+        ("1", "2023-01-31", 50),
+    ]
+    assert reply.cursor is None
+
+
+def test_save_batch_adds_solved_days_once_per_user(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that each user's new days are added with one update."""
+    stubber.add_response("batch_get_item", {})
+    stub_reserve_sequences(stubber, count=2, last_sequence=2)
+    stubber.add_response("transact_write_items", {})
+    stubber.add_response(
+        "update_item",
+        {},
+        {
+            "TableName": TABLE_NAME,
+            "Key": {"PK": {"S": "USER#1"}, "SK": {"S": "SOLVED_DAYS"}},
+            "UpdateExpression": "SET #type = :type ADD days :days",
+            "ExpressionAttributeNames": {"#type": "type"},
+            "ExpressionAttributeValues": {
+                ":type": {"S": "SOLVED_DAYS"},
+                ":days": {
+                    "NS": [
+                        str(day_index("2023-01-01")),
+                        str(day_index("2023-01-02")),
+                    ]
+                },
+            },
+        },
+    )
+
+    result = user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="1", date="2023-01-02", score=200),
+            ]
+        )
+    )
+
+    assert isinstance(result, Success)
+
+
+def test_get_user_streaks(user_storage: DynamoDbUserStorage, stubber: Stubber) -> None:
+    """Test that streaks are computed from the user's solved days item."""
+    days = ["2023-01-01", "2023-01-02", "2023-01-03", "2023-01-05", "2023-01-06"]
+    stubber.add_response(
+        "get_item",
+        {"Item": {"days": {"NS": [str(day_index(day)) for day in days]}}},
+        {
+            "TableName": TABLE_NAME,
+            "Key": {"PK": {"S": "USER#1"}, "SK": {"S": "SOLVED_DAYS"}},
+            "ProjectionExpression": "days",
+        },
+    )
+
+    result = user_storage.get_user_streaks(
+        GetUserStreaksQuery(user_id="1", as_of="2023-01-07")
+    )
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert (reply.current_streak, reply.longest_streak, reply.solved_count) == (
+        2,
+        3,
+        5,
+    )
+
+
+def test_get_user_streaks_without_scores(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that users without a solved days item have no streaks."""
+    stubber.add_response("get_item", {})
+
+    result = user_storage.get_user_streaks(
+        GetUserStreaksQuery(user_id="1", as_of="2023-01-07")
+    )
+
+    assert isinstance(result, Success)
+    assert result.unwrap().longest_streak == 0
+
+
+def test_rebuild_streaks_scans_scores_once(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that one scan of the scores is written back as one set per user."""
+    stubber.add_response(
+        "scan",
+        {
+            "Items": [
+                {"PK": {"S": "USER#1"}, "SK": {"S": "SCORE#2023-01-01"}},
+                {"PK": {"S": "USER#1"}, "SK": {"S": "SCORE#2023-01-02"}},
+            ],
+            "LastEvaluatedKey": {
+                "PK": {"S": "USER#1"},
+                "SK": {"S": "SCORE#2023-01-02"},
+            },
+        },
+        {
+            "TableName": TABLE_NAME,
+            "FilterExpression": "begins_with(SK, :score)",
+            "ExpressionAttributeValues": {":score": {"S": "SCORE#"}},
+            "ProjectionExpression": "PK, SK",
+        },
+    )
+    stubber.add_response(
+        "scan",
+        {"Items": [{"PK": {"S": "USER#2"}, "SK": {"S": "SCORE#2023-01-01"}}]},
+    )
+    stubber.add_response(
+        "batch_write_item",
+        {},
+        {
+            "RequestItems": {
+                TABLE_NAME: [
+                    {
+                        "PutRequest": {
+                            "Item": {
+                                "PK": {"S": f"USER#{user_id}"},
+                                "SK": {"S": "SOLVED_DAYS"},
+                                "type": {"S": "SOLVED_DAYS"},
+                                "days": {"NS": [str(day_index(day)) for day in days]},
+                            }
+                        }
+                    }
+                    for user_id, days in [
+                        ("1", ["2023-01-01", "2023-01-02"]),
+                        ("2", ["2023-01-01"]),
+                    ]
+                ]
+            }
+        },
+    )
+
+    result = user_storage.rebuild_streaks(RebuildStreaksQuery())
+
+    assert isinstance(result, Success)
+    assert result.unwrap().user_count == 2
+
+
+def history_item(date: str, score: int) -> Dict[str, Any]:
+    """Build a score item as projected by the head-to-head query."""
+    return {"SK": {"S": f"SCORE#{date}"}, "score": {"N": str(score)}}
+
+
+def test_get_head_to_head_queries_each_partition(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that each user's window is one paginated range query."""
+    expected: Dict[str, Any] = {
+        "TableName": TABLE_NAME,
+        "KeyConditionExpression": "PK = :pk AND SK BETWEEN :start AND :end",
+        "ExpressionAttributeNames": {"#score": "score"},
+        "ExpressionAttributeValues": {
+            ":pk": {"S": "USER#1"},
+            ":start": {"S": "SCORE#2023-01-01"},
+            ":end": {"S": "SCORE#2023-01-31"},
+        },
+        "ProjectionExpression": "SK, #score",
+    }
+    last_key = {"PK": {"S": "USER#1"}, "SK": {"S": "SCORE#2023-01-01"}}
+    stubber.add_response(
+        "query",
+        {"Items": [history_item("2023-01-01", 100)], "LastEvaluatedKey": last_key},
+        expected,
+    )
+    stubber.add_response(
+        "query",
+        {"Items": [history_item("2023-01-02", 200)]},
+        {**expected, "ExclusiveStartKey": last_key},
+    )
+    stubber.add_response(
+        "query",
+        {"Items": [history_item("2023-01-02", 250), history_item("2023-01-03", 50)]},
+        {
+            **expected,
+            "ExpressionAttributeValues": {
+                **expected["ExpressionAttributeValues"],
+                ":pk": {"S": "USER#2"},
+            },
+        },
+    )
+
+    result = user_storage.get_head_to_head(
+        GetHeadToHeadQuery(
+            user_id="1", opponent_id="2", start_date="2023-01-01", end_date="2023-01-31"
+        )
+    )
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert (reply.shared_days, reply.wins, reply.average_win_margin) == (1, 1, 50)
+
+
+def test_save_batch_records_changed_scores(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that only created or changed scores are added to the change feed."""
+    unchanged = DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+    changed = DailyScoreItem(user_id="1", date="2023-01-02", score=200)
+    created = DailyScoreItem(user_id="2", date="2023-01-01", score=300)
+    stubber.add_response(
+        "batch_get_item",
+        {
+            "Responses": {
+                TABLE_NAME: [
+                    {
+                        "PK": {"S": "USER#1"},
+                        "SK": {"S": "SCORE#2023-01-01"},
+                        "score": {"N": "100"},
+                    },
+                    {
+                        "PK": {"S": "USER#1"},
+                        "SK": {"S": "SCORE#2023-01-02"},
+                        "score": {"N": "250"},
+                    },
+                ]
+            }
+        },
+    )
+    stub_reserve_sequences(stubber, count=2, last_sequence=11)
+    stubber.add_response(
+        "transact_write_items",
+        {},
+        score_transaction(
+            user_storage, [(changed, 250), (created, None)], first_sequence=10
+        ),
+    )
+    stubber.add_response("update_item", {})
+    stubber.add_response("update_item", {})
+
+    result = user_storage.save_batch(
+        SaveBatchQuery(daily_score_items=[unchanged, changed, created])
+    )
+
+    assert result.unwrap().changed_dates == ["2023-01-01", "2023-01-02"]
+
+
+def test_list_score_changes_merges_shards(
+    user_storage: DynamoDbUserStorage,
+    stubber: Stubber,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that every shard is read after the checkpoint and merged in order."""
+    monkeypatch.setattr(users_dynamodb, "CHANGE_SHARDS", 2)
+    items = {
+        sequence: user_storage.context.serialize(item)
+        for sequence, item in [
+            (
+                5,
+                score_change_to_item(
+                    5,
+                    DailyScoreItem(user_id="1", date="2023-01-01", score=90),
+                    100,
+                    EXPIRES_AT,
+                ),
+            ),
+            (6, abandoned_change_to_item(6, EXPIRES_AT)),
+            (
+                7,
+                score_change_to_item(
+                    7,
+                    DailyScoreItem(user_id="2", date="2023-01-01", score=80),
+                    None,
+                    EXPIRES_AT,
+                ),
+            ),
+            (
+                9,
+                score_change_to_item(
+                    9,
+                    DailyScoreItem(user_id="3", date="2023-01-01", score=70),
+                    None,
+                    EXPIRES_AT,
+                ),
+            ),
+        ]
+    }
+
+    def expected(shard: int, limit: int) -> Dict[str, Any]:
+        return {
+            "TableName": TABLE_NAME,
+            "KeyConditionExpression": "PK = :pk AND SK BETWEEN :start AND :end",
+            "ExpressionAttributeValues": {
+                ":pk": {"S": f"CHANGES#{shard}"},
+                ":start": {"S": "CHANGE#00000000000000000005"},
+                ":end": {"S": "CHANGE#" + "9" * 20},
+            },
+            "Limit": limit,
+        }
+
+    stubber.add_response("query", {"Items": [items[6]]}, expected(0, 3))
+    last_key = user_storage.context.serialize(score_change_key(5))
+    stubber.add_response(
+        "query",
+        {"Items": [items[5]], "LastEvaluatedKey": last_key},
+        expected(1, 3),
+    )
+    stubber.add_response(
+        "query",
+        {"Items": [items[7], items[9]]},
+        {**expected(1, 2), "ExclusiveStartKey": last_key},
+    )
+
+    result = user_storage.list_score_changes(
+        ListScoreChangesQuery(after_sequence=4, limit=3)
+    )
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert [
+        (change.sequence, change.user_id, change.old_score, change.new_score)
+        for change in reply.changes
+    ] == [(5, "1", 100, 90), (7, "2", None, 80)]
+    assert reply.abandoned_sequences == [6]
+    assert reply.checkpoint == 7
+
+
+def test_abandon_score_changes_skips_written_sequences(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that only sequences with no item yet are abandoned."""
+    stub_abandon_sequence(user_storage, stubber, 3)
+    stubber.add_client_error(
+        "put_item", service_error_code="ConditionalCheckFailedException"
+    )
+    stub_abandon_sequence(user_storage, stubber, 5)
+
+    result = user_storage.abandon_score_changes(
+        AbandonScoreChangesQuery(sequences=[3, 4, 5])
+    )
+
+    assert isinstance(result, Success)
+    assert result.unwrap().abandoned_sequences == [3, 5]
+
+
+def test_sweep_cursor_item(user_storage: DynamoDbUserStorage, stubber: Stubber) -> None:
+    """Test that the cursor is put, read back, and deleted once cleared."""
+    key = {"PK": {"S": "SWEEP"}, "SK": {"S": "CURSOR"}}
+    item = {**key, "type": {"S": "SWEEP_CURSOR"}, "afterUserId": {"S": "42"}}
+    stubber.add_response("put_item", {}, {"TableName": TABLE_NAME, "Item": item})
+    stubber.add_response(
+        "get_item", {"Item": item}, {"TableName": TABLE_NAME, "Key": key}
+    )
+    stubber.add_response("delete_item", {}, {"TableName": TABLE_NAME, "Key": key})
+    stubber.add_response("get_item", {}, {"TableName": TABLE_NAME, "Key": key})
+
+    assert isinstance(
+        user_storage.save_sweep_cursor(SaveSweepCursorQuery(after_user_id="42")),
+        Success,
+    )
+    cursor = user_storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap()
+    assert cursor.after_user_id == "42"
+    assert isinstance(
+        user_storage.save_sweep_cursor(SaveSweepCursorQuery(after_user_id=None)),
+        Success,
+    )
+    cursor = user_storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap()
+    assert cursor.after_user_id is None
+
+
+def claim_params(now: str, cutoff: str) -> Dict[str, Any]:
+    """Build the expected parameters of a claim of user 1's refresh."""
+    return {
+        "TableName": TABLE_NAME,
+        "Key": {"PK": {"S": "USER#1"}, "SK": {"S": "METADATA"}},
+        "UpdateExpression": "SET refresh_claimed_at = :now",
+        "ConditionExpression": (
+            "attribute_exists(PK)"
+            " AND (attribute_not_exists(last_fetched_timestamp)"
+            " OR last_fetched_timestamp <= :cutoff)"
+            " AND (attribute_not_exists(refresh_claimed_at)"
+            " OR refresh_claimed_at <= :cutoff)"
+        ),
+        "ExpressionAttributeValues": {":now": {"N": now}, ":cutoff": {"N": cutoff}},
+        "ReturnValues": "ALL_OLD",
+        "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+    }
+
+
+def test_claim_user_refresh_is_a_conditional_update(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that claims are conditional writes reporting the last attempt."""
+    metadata = user_storage.context.serialize(
+        user_metadata_to_item(
+            UserMetadataItem(
+                user_id="1",
+                last_fetched_timestamp=1000,
+                puzzles_attempted=0,
+                puzzles_solved=0,
+                current_streak=0,
+            )
+        )
+    )
+    stubber.add_response(
+        "update_item", {"Attributes": metadata}, claim_params("1060.0", "1000.0")
+    )
+    stubber.add_client_error(
+        "update_item",
+        service_error_code="ConditionalCheckFailedException",
+        expected_params=claim_params("1100.0", "1040.0"),
+        modeled_fields={"Item": {**metadata, "refresh_claimed_at": {"N": "1060.0"}}},
+    )
+    stubber.add_client_error(
+        "update_item", service_error_code="ConditionalCheckFailedException"
+    )
+
+    def claim(now: float) -> ClaimUserRefreshQuery:
+        return ClaimUserRefreshQuery(user_id="1", now=now, debounce_seconds=60)
+
+    claimed = user_storage.claim_user_refresh(claim(1060)).unwrap()
+    assert (claimed.claimed, claimed.last_attempt_timestamp) == (True, 1000)
+    rejected = user_storage.claim_user_refresh(claim(1100)).unwrap()
+    assert (rejected.claimed, rejected.last_attempt_timestamp) == (False, 1060)
+    missing = user_storage.claim_user_refresh(claim(1200))
+    assert isinstance(missing, Failure)
+    assert isinstance(missing.failure(), NotFoundStorageError)
+
+
+def test_save_batch_rewrites_scores_of_cancelled_transactions(
+    user_storage: DynamoDbUserStorage, stubber: Stubber
+) -> None:
+    """Test that a batch transaction cancelled by a concurrent write is redone.
+
+    The cancelled transaction's sequences are abandoned, except where a
+    consumer abandoned them first.
+    """
+    first = DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+    second = DailyScoreItem(user_id="2", date="2023-01-01", score=80)
+    stubber.add_response("batch_get_item", {})
+    stub_reserve_sequences(stubber, count=2, last_sequence=2)
+    stub_write_conflict(stubber)
+    stubber.add_response("get_item", {"Item": {"score": {"N": "90"}}})
+    stub_reserve_sequences(stubber, count=1, last_sequence=3)
+    stubber.add_response(
+        "transact_write_items",
+        {},
+        score_transaction(user_storage, [(first, 90)], first_sequence=3),
+    )
+    stubber.add_response("get_item", {"Item": {"score": {"N": "80"}}})
+    stub_abandon_sequence(user_storage, stubber, 1)
+    stubber.add_client_error(
+        "put_item", service_error_code="ConditionalCheckFailedException"
+    )
+    stubber.add_response("update_item", {})
+    stubber.add_response("update_item", {})
+
+    result = user_storage.save_batch(SaveBatchQuery(daily_score_items=[first, second]))
+
+    assert isinstance(result, Success)
@@ -1,18 +1,28 @@
 """Tests for in-memory user storage implementation."""
 
-from typing import Generator
+from typing import Generator, List, Tuple
 
 import pytest
 from returns.result import Failure, Success
 
-from app.core.error import NotFoundStorageError
+from app.core.error import InvalidArgumentStorageError, NotFoundStorageError
 from app.storage.memory_context import InMemoryStorageContext
 from app.storage.models import DailyScoreItem, DailyScoreKey, UserMetadataItem
 from app.storage.users.memory import InMemoryUserStorage
 from app.storage.users.models import (
+    ClaimUserRefreshQuery,
+    CreateUsersIfNotExistQuery,
     GetAllUserIdsQuery,
+    GetHeadToHeadQuery,
+    GetSweepCursorQuery,
     GetUserMetadataQuery,
+    GetUserStreaksQuery,
+    ListDailyScoresQuery,
+    ListScoreChangesQuery,
+    RebuildStreaksQuery,
+    SaveBatchQuery,
     SaveDailyScoreQuery,
+    SaveSweepCursorQuery,
     SaveUserMetadataQuery,
 )
 
@@ -135,6 +145,10 @@ def test_save_daily_score(
     assert saved_score.user_id == user_id
     assert saved_score.date == date
     assert saved_score.score == score
+    assert result.unwrap().changed
+
+    # Saving the same score again changes nothing
+    assert not user_storage.save_daily_score(query).unwrap().changed
 
 
 def test_get_all_user_ids_empty(user_storage: InMemoryUserStorage) -> None:
@@ -170,3 +184,300 @@ def test_get_all_user_ids_with_data(
     assert isinstance(result, Success)
     reply = result.unwrap()
     assert set(reply.user_ids) == set(user_ids)
+
+
+def test_create_users_if_not_exist(
+    user_storage: InMemoryUserStorage, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that creating users only adds the ones that don't exist yet."""
+    # Prepare test data - user "1" already exists with real stats
+    existing = UserMetadataItem(
+        user_id="1",
+        last_fetched_timestamp=1630000000,
+        puzzles_attempted=10,
+        puzzles_solved=8,
+        current_streak=3,
+    )
+    memory_context.users["1"] = existing
+    new_items = [
+        UserMetadataItem(
+            user_id=user_id,
+            last_fetched_timestamp=0,
+            puzzles_attempted=0,
+            puzzles_solved=0,
+            current_streak=0,
+        )
+        for user_id in ["1", "2", "3"]
+    ]
+
+    # Execute the query
+    query = CreateUsersIfNotExistQuery(items=new_items)
+    result = user_storage.create_users_if_not_exist(query)
+
+    # Verify the result
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert reply.created_user_ids == ["2", "3"]
+    assert reply.existing_user_ids == ["1"]
+
+    # Verify the existing user wasn't overwritten
+    assert memory_context.users["1"] == existing
+    assert set(memory_context.users) == {"1", "2", "3"}
+
+
+def test_save_batch(
+    user_storage: InMemoryUserStorage, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that a batch saves both metadata and daily scores."""
+    metadata = UserMetadataItem(
+        user_id="1",
+        last_fetched_timestamp=0,
+        puzzles_attempted=0,
+        puzzles_solved=0,
+        current_streak=0,
+    )
+    score = DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+
+    result = user_storage.save_batch(
+        SaveBatchQuery(user_metadata_items=[metadata], daily_score_items=[score])
+    )
+
+    assert result.unwrap().changed_dates == ["2023-01-01"]
+    assert memory_context.users == {"1": metadata}
+    assert memory_context.scores == {score.key: score}
+    rewritten = user_storage.save_batch(SaveBatchQuery(daily_score_items=[score]))
+    assert rewritten.unwrap().changed_dates == []
+
+
+def test_list_daily_scores_pages_through_range(
+    user_storage: InMemoryUserStorage,
+) -> None:
+    """Test that pages follow each other in date then rank order."""
+    scores = [
+        DailyScoreItem(user_id=user_id, date=date, score=score)
+        for user_id, date, score in [
+            ("1", "2023-01-01", 50),
+            ("2", "2023-01-01", 40),
+            ("1", "2023-01-02", 30),
+            ("2", "2023-01-02", 60),
+            ("1", "2023-01-03", 10),
+            ("1", "2023-01-04", 20),
+        ]
+    ]
+    user_storage.save_batch(SaveBatchQuery(daily_score_items=scores))
+
+    listed: List[Tuple[str, str]] = []
+    cursor = None
+    while True:
+        reply = user_storage.list_daily_scores(
+            ListDailyScoresQuery(
+                start_date="2023-01-01", end_date="2023-01-03", limit=2, cursor=cursor
+            )
+        ).unwrap()
+        listed.extend((item.user_id, item.date) for item in reply.items)
+        cursor = reply.cursor
+        if cursor is None:
+            break
+
+    assert listed == [
+        ("2", "2023-01-01"),
+        ("1", "2023-01-01"),
+        ("1", "2023-01-02"),
+        ("2", "2023-01-02"),
+        ("1", "2023-01-03"),
+    ]
+
+
+def test_list_daily_scores_for_user(user_storage: InMemoryUserStorage) -> None:
+    """Test that the user filter lists only that user's scores by date."""
+    scores = [
+        DailyScoreItem(user_id="1", date="2023-01-01", score=50),
+        DailyScoreItem(user_id="2", date="2023-01-01", score=40),
+        DailyScoreItem(user_id="1", date="2023-01-02", score=30),
+    ]
+    user_storage.save_batch(SaveBatchQuery(daily_score_items=scores))
+    query = ListDailyScoresQuery(
+        start_date="2023-01-01", end_date="2023-01-02", user_id="1", limit=1
+    )
+
+    first = user_storage.list_daily_scores(query).unwrap()
+    second = user_storage.list_daily_scores(
+        query.model_copy(update={"cursor": first.cursor})
+    ).unwrap()
+
+    assert first.items == [scores[0]]
+    assert second.items == [scores[2]]
+
+
+def test_list_daily_scores_invalid_cursor(user_storage: InMemoryUserStorage) -> None:
+    """Test that malformed cursors are rejected as invalid arguments."""
+    result = user_storage.list_daily_scores(
+        ListDailyScoresQuery(
+            start_date="2023-01-01", end_date="2023-01-02", cursor="not-a-cursor"
+        )
+    )
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), InvalidArgumentStorageError)
+
+
+def test_get_user_streaks_follows_saved_scores(
+    user_storage: InMemoryUserStorage,
+) -> None:
+    """Test that streaks reflect scores saved one by one and in batches."""
+    for day in ["2023-01-01", "2023-01-02", "2023-01-04"]:
+        user_storage.save_daily_score(
+            SaveDailyScoreQuery(item=DailyScoreItem(user_id="1", date=day, score=100))
+        )
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-03", score=100),
+                DailyScoreItem(user_id="1", date="2023-01-05", score=100),
+            ]
+        )
+    )
+
+    result = user_storage.get_user_streaks(
+        GetUserStreaksQuery(user_id="1", as_of="2023-01-06")
+    )
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert (reply.current_streak, reply.longest_streak, reply.solved_count) == (
+        5,
+        5,
+        5,
+    )
+
+
+def test_rebuild_streaks(
+    user_storage: InMemoryUserStorage, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that rebuilding recomputes every user's bitmap from their scores."""
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="2", date="2023-01-02", score=100),
+            ]
+        )
+    )
+    for user_scores in memory_context.scores_by_user.values():
+        user_scores.solved = 0
+
+    result = user_storage.rebuild_streaks(RebuildStreaksQuery())
+
+    assert isinstance(result, Success)
+    assert result.unwrap().user_count == 2
+    streaks = user_storage.get_user_streaks(
+        GetUserStreaksQuery(user_id="2", as_of="2023-01-02")
+    )
+    assert streaks.unwrap().longest_streak == 2
+
+
+def test_get_head_to_head_merges_histories_in_window(
+    user_storage: InMemoryUserStorage,
+) -> None:
+    """Test that only shared days inside the window are compared."""
+    # Saved out of date order, so some saves insert into the middle
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-03", score=300),
+                DailyScoreItem(user_id="1", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="1", date="2023-01-02", score=150),
+                DailyScoreItem(user_id="2", date="2023-01-02", score=200),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=50),
+                DailyScoreItem(user_id="2", date="2023-01-03", score=250),
+                DailyScoreItem(user_id="1", date="2023-01-02", score=250),
+            ]
+        )
+    )
+
+    result = user_storage.get_head_to_head(
+        GetHeadToHeadQuery(
+            user_id="1", opponent_id="2", start_date="2023-01-02", end_date="2023-01-03"
+        )
+    )
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert (reply.shared_days, reply.wins, reply.losses) == (2, 0, 2)
+    assert reply.average_delta == 50
+
+
+def test_list_score_changes_from_checkpoint(user_storage: InMemoryUserStorage) -> None:
+    """Test that created and changed scores are fed in order, skipping no-ops."""
+    item = DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+    user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+    user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                item.model_copy(update={"score": 90}),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=80),
+            ]
+        )
+    )
+
+    first = user_storage.list_score_changes(ListScoreChangesQuery(limit=2)).unwrap()
+    rest = user_storage.list_score_changes(
+        ListScoreChangesQuery(after_sequence=first.checkpoint)
+    ).unwrap()
+
+    assert [
+        (change.sequence, change.user_id, change.old_score, change.new_score)
+        for change in first.changes + rest.changes
+    ] == [(1, "1", None, 100), (2, "1", 100, 90), (3, "2", None, 80)]
+    assert (first.checkpoint, rest.checkpoint) == (2, 3)
+    caught_up = user_storage.list_score_changes(
+        ListScoreChangesQuery(after_sequence=rest.checkpoint)
+    ).unwrap()
+    assert caught_up.changes == []
+    assert caught_up.checkpoint == 3
+
+
+def test_sweep_cursor_round_trips(user_storage: InMemoryUserStorage) -> None:
+    """Test that the sweep cursor starts unset and can be saved and cleared."""
+    assert (
+        user_storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap().after_user_id
+        is None
+    )
+
+    user_storage.save_sweep_cursor(SaveSweepCursorQuery(after_user_id="42"))
+    cursor = user_storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap()
+    assert cursor.after_user_id == "42"
+
+    user_storage.save_sweep_cursor(SaveSweepCursorQuery(after_user_id=None))
+    cursor = user_storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap()
+    assert cursor.after_user_id is None
+
+
+def test_claim_user_refresh_once_per_interval(
+    user_storage: InMemoryUserStorage, memory_context: InMemoryStorageContext
+) -> None:
+    """Test that a user is claimed once per interval after their last fetch."""
+    memory_context.users["1"] = UserMetadataItem(
+        user_id="1",
+        last_fetched_timestamp=1000,
+        puzzles_attempted=0,
+        puzzles_solved=0,
+        current_streak=0,
+    )
+
+    def claim(now: float) -> Tuple[bool, float]:
+        reply = user_storage.claim_user_refresh(
+            ClaimUserRefreshQuery(user_id="1", now=now, debounce_seconds=60)
+        ).unwrap()
+        return reply.claimed, reply.last_attempt_timestamp
+
+    assert claim(1059) == (False, 1000)
+    assert claim(1060) == (True, 1000)
+    assert claim(1100) == (False, 1060)
+    missing = user_storage.claim_user_refresh(
+        ClaimUserRefreshQuery(user_id="2", now=1100, debounce_seconds=60)
+    )
+    assert isinstance(missing, Failure)
+    assert isinstance(missing.failure(), NotFoundStorageError)
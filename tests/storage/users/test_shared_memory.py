@@ -0,0 +1,163 @@
+"""Tests for shared-memory user storage implementations."""
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pytest
+from returns.result import Failure
+
+from app.core.error import InternalStorageError, NotFoundStorageError
+from app.storage.leaderboard.models import RefreshDailyLeaderboardQuery
+from app.storage.leaderboard.shared_memory import SharedMemoryLeaderboardStorage
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.shared_memory_context import SharedMemoryStorageContext
+from app.storage.users.models import (
+    GetAllUserIdsQuery,
+    GetHeadToHeadQuery,
+    GetUserMetadataQuery,
+    GetUserStreaksQuery,
+    ListDailyScoresQuery,
+    SaveBatchQuery,
+    SaveDailyScoreQuery,
+)
+from app.storage.users.shared_memory import (
+    ReadOnlySharedMemoryUserStorage,
+    SharedMemoryUserStorage,
+)
+
+
+@pytest.fixture
+def segment_path(tmp_path: Path) -> str:
+    """Path of the published snapshot."""
+    return str(tmp_path / "users.snap")
+
+
+@pytest.fixture
+def writer(segment_path: str) -> SharedMemoryUserStorage:
+    """Create the writer's user storage holding two users' scores."""
+    storage = SharedMemoryUserStorage(
+        SharedMemoryStorageContext(segment_path, writer=True)
+    )
+    storage.save_batch(
+        SaveBatchQuery(
+            user_metadata_items=[
+                UserMetadataItem(
+                    user_id=user_id,
+                    last_fetched_timestamp=1_700_000_000,
+                    puzzles_attempted=3,
+                    puzzles_solved=2,
+                    current_streak=2,
+                )
+                for user_id in ["1", "2"]
+            ],
+            daily_score_items=[
+                DailyScoreItem(user_id=user_id, date=date, score=score)
+                for user_id, date, score in [
+                    ("1", "2025-01-01", 90),
+                    ("1", "2025-01-02", 60),
+                    ("2", "2025-01-01", 45),
+                    ("2", "2025-01-02", 80),
+                ]
+            ],
+        )
+    )
+    return storage
+
+
+def publish(writer: SharedMemoryUserStorage) -> None:
+    """Publish the writer's copy to readers."""
+    SharedMemoryLeaderboardStorage(writer.shared_context).refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2025-01-01")
+    )
+
+
+@pytest.fixture
+def reader(segment_path: str) -> ReadOnlySharedMemoryUserStorage:
+    """Create a reader's user storage with a context of its own."""
+    return ReadOnlySharedMemoryUserStorage(SharedMemoryStorageContext(segment_path))
+
+
+def test_reader_has_no_working_copy(segment_path: str) -> None:
+    """Test that only the writer's context loads the data."""
+    context = SharedMemoryStorageContext(segment_path)
+
+    assert context.writer_context is None
+    with pytest.raises(ValueError):
+        SharedMemoryUserStorage(context)
+
+
+def test_reader_serves_published_users_and_scores(
+    writer: SharedMemoryUserStorage, reader: ReadOnlySharedMemoryUserStorage
+) -> None:
+    """Test that reads come from the published snapshot, once published."""
+    query = GetUserMetadataQuery(user_id="1")
+    missing = reader.get_user_metadata(query)
+    assert isinstance(missing, Failure)
+    assert isinstance(missing.failure(), NotFoundStorageError)
+
+    publish(writer)
+
+    assert reader.get_user_metadata(query).unwrap().item.puzzles_solved == 2
+    assert sorted(reader.get_all_user_ids(GetAllUserIdsQuery()).unwrap().user_ids) == [
+        "1",
+        "2",
+    ]
+    versus = reader.get_head_to_head(
+        GetHeadToHeadQuery(user_id="1", opponent_id="2")
+    ).unwrap()
+    assert (versus.wins, versus.losses) == (1, 1)
+    streaks = reader.get_user_streaks(
+        GetUserStreaksQuery(user_id="1", as_of="2025-01-02")
+    ).unwrap()
+    assert streaks.current_streak == 2
+
+
+def test_reader_lists_scores_page_by_page(
+    writer: SharedMemoryUserStorage, reader: ReadOnlySharedMemoryUserStorage
+) -> None:
+    """Test that listed pages resume after their cursor."""
+    publish(writer)
+    query = ListDailyScoresQuery(start_date="2025-01-01", end_date="2025-01-02")
+
+    listed: List[Tuple[str, str]] = []
+    cursor: Optional[str] = None
+    while True:
+        page = reader.list_daily_scores(
+            query.model_copy(update={"limit": 3, "cursor": cursor})
+        ).unwrap()
+        listed.extend((item.date, item.user_id) for item in page.items)
+        cursor = page.cursor
+        if cursor is None:
+            break
+
+    assert listed == [
+        ("2025-01-01", "2"),
+        ("2025-01-01", "1"),
+        ("2025-01-02", "1"),
+        ("2025-01-02", "2"),
+    ]
+    user_page = reader.list_daily_scores(query.model_copy(update={"user_id": "2"}))
+    assert [item.score for item in user_page.unwrap().items] == [45, 80]
+
+
+def test_reader_writes_fail_and_never_publish(
+    writer: SharedMemoryUserStorage,
+    reader: ReadOnlySharedMemoryUserStorage,
+    segment_path: str,
+) -> None:
+    """Test that readers can't write or replace the writer's snapshot."""
+    publish(writer)
+    published = Path(segment_path).read_bytes()
+
+    result = reader.save_daily_score(
+        SaveDailyScoreQuery(
+            item=DailyScoreItem(user_id="1", date="2025-01-03", score=10)
+        )
+    )
+    SharedMemoryLeaderboardStorage(reader.context).refresh_daily_leaderboard(
+        RefreshDailyLeaderboardQuery(date="2025-01-03")
+    )
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), InternalStorageError)
+    assert Path(segment_path).read_bytes() == published
@@ -0,0 +1,483 @@
+"""Tests for SQLite user storage implementation."""
+
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from returns.result import Failure, Success
+
+from app.core.error import NotFoundStorageError
+from app.storage.models import DailyScoreItem, UserMetadataItem
+from app.storage.sqlite_context import SqliteStorageContext
+from app.storage.users.models import (
+    AbandonScoreChangesQuery,
+    ClaimUserRefreshQuery,
+    CreateUsersIfNotExistQuery,
+    GetAllUserIdsQuery,
+    GetHeadToHeadQuery,
+    GetSweepCursorQuery,
+    GetUserMetadataQuery,
+    GetUserStreaksQuery,
+    ListDailyScoresQuery,
+    ListScoreChangesQuery,
+    RebuildStreaksQuery,
+    SaveBatchQuery,
+    SaveDailyScoreQuery,
+    SaveSweepCursorQuery,
+    SaveUserMetadataQuery,
+)
+from app.storage.users.sqlite import USER_SCORE_HISTORY, SqliteUserStorage
+
+
+@pytest.fixture
+def sqlite_context(tmp_path: Path) -> Generator[SqliteStorageContext, None, None]:
+    """Create a SQLite storage context on a fresh database file."""
+    context = SqliteStorageContext(str(tmp_path / "leaderboard.db"))
+    yield context
+    context.close()
+
+
+@pytest.fixture
+def user_storage(sqlite_context: SqliteStorageContext) -> SqliteUserStorage:
+    """Create a SQLite user storage instance with the shared context."""
+    return SqliteUserStorage(sqlite_context)
+
+
+def make_metadata(user_id: str, current_streak: int = 0) -> UserMetadataItem:
+    """Create user metadata with the given streak."""
+    return UserMetadataItem(
+        user_id=user_id,
+        last_fetched_timestamp=1630000000,
+        puzzles_attempted=10,
+        puzzles_solved=8,
+        current_streak=current_streak,
+    )
+
+
+def count_scores(context: SqliteStorageContext) -> int:
+    """Count the rows of the daily_scores table."""
+    row = context.connection().execute("SELECT COUNT(*) FROM daily_scores").fetchone()
+    return int(row[0])
+
+
+def test_get_user_metadata_not_found(user_storage: SqliteUserStorage) -> None:
+    """Test that getting non-existent user metadata returns a NotFoundError."""
+    result = user_storage.get_user_metadata(GetUserMetadataQuery(user_id="123"))
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), NotFoundStorageError)
+
+
+def test_save_user_metadata_upserts(user_storage: SqliteUserStorage) -> None:
+    """Test that saving metadata twice keeps the latest values."""
+    user_storage.save_user_metadata(SaveUserMetadataQuery(item=make_metadata("1", 1)))
+    result = user_storage.save_user_metadata(
+        SaveUserMetadataQuery(item=make_metadata("1", 2))
+    )
+
+    assert isinstance(result, Success)
+    metadata = user_storage.get_user_metadata(GetUserMetadataQuery(user_id="1"))
+    assert metadata.unwrap().item == make_metadata("1", 2)
+
+
+def test_save_daily_score_upserts(
+    user_storage: SqliteUserStorage, sqlite_context: SqliteStorageContext
+) -> None:
+    """Test that a user's score for a date is replaced rather than duplicated."""
+    changed = []
+    for score in [300, 200, 200]:
+        item = DailyScoreItem(user_id="1", date="2023-01-01", score=score)
+        result = user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+        assert isinstance(result, Success)
+        changed.append(result.unwrap().changed)
+
+    assert changed == [True, True, False]
+    rows = sqlite_context.connection().execute("SELECT score FROM daily_scores")
+    assert [row[0] for row in rows] == [200]
+
+
+def test_get_all_user_ids_and_create_users(user_storage: SqliteUserStorage) -> None:
+    """Test that existing users are reported rather than overwritten."""
+    user_storage.save_user_metadata(SaveUserMetadataQuery(item=make_metadata("1", 5)))
+
+    result = user_storage.create_users_if_not_exist(
+        CreateUsersIfNotExistQuery(items=[make_metadata("1"), make_metadata("2")])
+    )
+
+    reply = result.unwrap()
+    assert reply.created_user_ids == ["2"]
+    assert reply.existing_user_ids == ["1"]
+    metadata = user_storage.get_user_metadata(GetUserMetadataQuery(user_id="1"))
+    assert metadata.unwrap().item.current_streak == 5
+    user_ids = user_storage.get_all_user_ids(GetAllUserIdsQuery()).unwrap().user_ids
+    assert sorted(user_ids) == ["1", "2"]
+
+
+def test_save_batch(
+    user_storage: SqliteUserStorage, sqlite_context: SqliteStorageContext
+) -> None:
+    """Test that a batch saves metadata and scores in one transaction."""
+    scores = [
+        DailyScoreItem(user_id=str(user_id), date="2023-01-01", score=100)
+        for user_id in range(1, 101)
+    ]
+
+    result = user_storage.save_batch(
+        SaveBatchQuery(
+            user_metadata_items=[make_metadata("1")], daily_score_items=scores
+        )
+    )
+
+    assert isinstance(result, Success)
+    assert count_scores(sqlite_context) == 100
+    assert isinstance(
+        user_storage.get_user_metadata(GetUserMetadataQuery(user_id="1")), Success
+    )
+
+
+def test_save_batch_reports_changed_dates(user_storage: SqliteUserStorage) -> None:
+    """Test that only dates with a created or changed score are reported."""
+    scores = [
+        DailyScoreItem(user_id="1", date="2023-01-01", score=100),
+        DailyScoreItem(user_id="1", date="2023-01-02", score=200),
+    ]
+    first = user_storage.save_batch(SaveBatchQuery(daily_score_items=scores))
+    second = user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                scores[0],
+                DailyScoreItem(user_id="1", date="2023-01-02", score=150),
+            ]
+        )
+    )
+
+    assert first.unwrap().changed_dates == ["2023-01-01", "2023-01-02"]
+    assert second.unwrap().changed_dates == ["2023-01-02"]
+
+
+def test_threads_use_their_own_connections(
+    user_storage: SqliteUserStorage, sqlite_context: SqliteStorageContext
+) -> None:
+    """Test that concurrent writers each get a connection and all writes land."""
+
+    def write(thread_index: int) -> None:
+        for day in range(1, 11):
+            item = DailyScoreItem(
+                user_id=str(thread_index + 1), date=f"2023-01-{day:02d}", score=day
+            )
+            assert isinstance(
+                user_storage.save_daily_score(SaveDailyScoreQuery(item=item)), Success
+            )
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert count_scores(sqlite_context) == 40
+    assert len(sqlite_context.connections) == 5
+
+
+def test_list_daily_scores(user_storage: SqliteUserStorage) -> None:
+    """Test that pages follow each other in date then rank order, with filters."""
+    scores = [
+        DailyScoreItem(user_id=user_id, date=date, score=score)
+        for user_id, date, score in [
+            ("1", "2023-01-01", 50),
+            ("2", "2023-01-01", 40),
+            ("1", "2023-01-02", 30),
+            ("2", "2023-01-03", 60),
+        ]
+    ]
+    user_storage.save_batch(SaveBatchQuery(daily_score_items=scores))
+    query = ListDailyScoresQuery(
+        start_date="2023-01-01", end_date="2023-01-02", limit=2
+    )
+
+    first = user_storage.list_daily_scores(query).unwrap()
+    second = user_storage.list_daily_scores(
+        query.model_copy(update={"cursor": first.cursor})
+    ).unwrap()
+    by_user = user_storage.list_daily_scores(
+        query.model_copy(update={"user_id": "1"})
+    ).unwrap()
+
+    assert first.items == [scores[1], scores[0]]
+    assert second.items == [scores[2]]
+    assert second.cursor is None
+    assert by_user.items == [scores[0], scores[2]]
+
+
+def test_get_user_streaks_follows_saved_scores(user_storage: SqliteUserStorage) -> None:
+    """Test that triggers keep the bitmap in step with saved scores."""
+    # 64 days from the first puzzle, then a run crossing into the third word,
+    # so bit 63 of the first words is set
+    days = [
+        (date(1942, 2, 15) + timedelta(days=offset)).isoformat()
+        for offset in [*range(64), *range(100, 140)]
+    ]
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date=day, score=100) for day in days
+            ]
+        )
+    )
+    # Rewriting a score doesn't change the solved days
+    user_storage.save_daily_score(
+        SaveDailyScoreQuery(item=DailyScoreItem(user_id="1", date=days[0], score=90))
+    )
+
+    result = user_storage.get_user_streaks(
+        GetUserStreaksQuery(user_id="1", as_of=days[-1])
+    )
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert (reply.current_streak, reply.longest_streak, reply.solved_count) == (
+        40,
+        64,
+        104,
+    )
+
+
+def test_deleted_scores_clear_their_day(
+    user_storage: SqliteUserStorage, sqlite_context: SqliteStorageContext
+) -> None:
+    """Test that deleting a score clears its bit."""
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="1", date="2023-01-02", score=100),
+            ]
+        )
+    )
+    connection = sqlite_context.connection()
+    with connection:
+        connection.execute("DELETE FROM daily_scores WHERE date = '2023-01-02'")
+
+    result = user_storage.get_user_streaks(
+        GetUserStreaksQuery(user_id="1", as_of="2023-01-02")
+    )
+
+    assert result.unwrap().solved_count == 1
+
+
+def test_rebuild_streaks_matches_triggers(
+    user_storage: SqliteUserStorage, sqlite_context: SqliteStorageContext
+) -> None:
+    """Test that one grouped pass rebuilds the bitmaps the triggers maintain."""
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(
+                    user_id=str(user_id),
+                    date=(date(1942, 2, 15) + timedelta(days=day)).isoformat(),
+                    score=100,
+                )
+                for user_id in range(1, 4)
+                for day in range(0, 300, user_id)
+            ]
+        )
+    )
+    before = (
+        sqlite_context.connection()
+        .execute("SELECT * FROM solved_days ORDER BY user_id, word")
+        .fetchall()
+    )
+
+    result = user_storage.rebuild_streaks(RebuildStreaksQuery())
+
+    assert isinstance(result, Success)
+    assert result.unwrap().user_count == 3
+    after = (
+        sqlite_context.connection()
+        .execute("SELECT * FROM solved_days ORDER BY user_id, word")
+        .fetchall()
+    )
+    assert after == before
+
+
+def test_solved_days_are_backfilled(
+    tmp_path: Path,
+    user_storage: SqliteUserStorage,
+    sqlite_context: SqliteStorageContext,
+) -> None:
+    """Test that databases without solved days are rebuilt on open."""
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="1", date="2023-01-02", score=100),
+            ]
+        )
+    )
+    with sqlite_context.connection() as connection:
+        connection.execute("DELETE FROM solved_days")
+    sqlite_context.close()
+
+    context = SqliteStorageContext(str(tmp_path / "leaderboard.db"))
+    reply = (
+        SqliteUserStorage(context)
+        .get_user_streaks(GetUserStreaksQuery(user_id="1", as_of="2023-01-02"))
+        .unwrap()
+    )
+    context.close()
+
+    assert reply.current_streak == 2
+
+
+def test_get_head_to_head(user_storage: SqliteUserStorage) -> None:
+    """Test that shared days in the window are compared from both histories."""
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-01", score=100),
+                DailyScoreItem(user_id="1", date="2023-01-02", score=150),
+                DailyScoreItem(user_id="1", date="2023-01-03", score=300),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=50),
+                DailyScoreItem(user_id="2", date="2023-01-03", score=250),
+                DailyScoreItem(user_id="3", date="2023-01-02", score=10),
+            ]
+        )
+    )
+
+    result = user_storage.get_head_to_head(
+        GetHeadToHeadQuery(user_id="1", opponent_id="2", end_date="2023-01-02")
+    )
+
+    assert isinstance(result, Success)
+    reply = result.unwrap()
+    assert (reply.shared_days, reply.losses, reply.average_delta) == (1, 1, 50)
+
+
+def test_score_history_query_uses_primary_key(
+    sqlite_context: SqliteStorageContext,
+) -> None:
+    """Test that a user's window is read as a range of the primary key."""
+    plan = (
+        sqlite_context.connection()
+        .execute(
+            "EXPLAIN QUERY PLAN " + USER_SCORE_HISTORY,
+            ("1", "2023-01-01", "2023-12-31"),
+        )
+        .fetchall()
+    )
+
+    assert "USING PRIMARY KEY (user_id=? AND date>? AND date<?)" in str(plan)
+
+
+def test_list_score_changes_from_checkpoint(user_storage: SqliteUserStorage) -> None:
+    """Test that inserts and changed updates are fed in order, skipping no-ops."""
+    item = DailyScoreItem(user_id="1", date="2023-01-01", score=100)
+    user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+    user_storage.save_daily_score(SaveDailyScoreQuery(item=item))
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                item.model_copy(update={"score": 90}),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=80),
+            ]
+        )
+    )
+
+    first = user_storage.list_score_changes(ListScoreChangesQuery(limit=2)).unwrap()
+    rest = user_storage.list_score_changes(
+        ListScoreChangesQuery(after_sequence=first.checkpoint)
+    ).unwrap()
+
+    assert [
+        (change.sequence, change.user_id, change.old_score, change.new_score)
+        for change in first.changes + rest.changes
+    ] == [(1, "1", None, 100), (2, "1", 100, 90), (3, "2", None, 80)]
+    assert (first.checkpoint, rest.checkpoint) == (2, 3)
+    abandoned = user_storage.abandon_score_changes(
+        AbandonScoreChangesQuery(sequences=[3, 4])
+    )
+    assert abandoned.unwrap().abandoned_sequences == [4]
+
+
+def test_score_changes_are_backfilled(
+    tmp_path: Path,
+    user_storage: SqliteUserStorage,
+    sqlite_context: SqliteStorageContext,
+) -> None:
+    """Test that databases without a change feed record their scores on open."""
+    user_storage.save_batch(
+        SaveBatchQuery(
+            daily_score_items=[
+                DailyScoreItem(user_id="1", date="2023-01-02", score=100),
+                DailyScoreItem(user_id="2", date="2023-01-01", score=200),
+            ]
+        )
+    )
+    with sqlite_context.connection() as connection:
+        connection.execute("DELETE FROM score_changes")
+        connection.execute("DELETE FROM sqlite_sequence")
+    sqlite_context.close()
+
+    SqliteStorageContext(str(tmp_path / "leaderboard.db")).close()
+    # Opening it again doesn't record them twice
+    context = SqliteStorageContext(str(tmp_path / "leaderboard.db"))
+    reply = (
+        SqliteUserStorage(context).list_score_changes(ListScoreChangesQuery()).unwrap()
+    )
+    context.close()
+
+    assert [(change.date, change.user_id) for change in reply.changes] == [
+        ("2023-01-01", "2"),
+        ("2023-01-02", "1"),
+    ]
+
+
+def test_sweep_cursor_persists_across_contexts(
+    sqlite_context: SqliteStorageContext,
+) -> None:
+    """Test that a saved sweep cursor is read back by a later connection."""
+    user_storage = SqliteUserStorage(sqlite_context)
+    assert (
+        user_storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap().after_user_id
+        is None
+    )
+    user_storage.save_sweep_cursor(SaveSweepCursorQuery(after_user_id="41"))
+    user_storage.save_sweep_cursor(SaveSweepCursorQuery(after_user_id="42"))
+
+    reopened = SqliteUserStorage(SqliteStorageContext(sqlite_context.path))
+    cursor = reopened.get_sweep_cursor(GetSweepCursorQuery()).unwrap()
+    assert cursor.after_user_id == "42"
+
+    reopened.save_sweep_cursor(SaveSweepCursorQuery(after_user_id=None))
+    cursor = user_storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap()
+    assert cursor.after_user_id is None
+
+
+def test_claim_user_refresh_across_contexts(
+    sqlite_context: SqliteStorageContext,
+) -> None:
+    """Test that a claim holds for every connection until the interval passes."""
+    user_storage = SqliteUserStorage(sqlite_context)
+    reopened = SqliteUserStorage(SqliteStorageContext(sqlite_context.path))
+    user_storage.save_user_metadata(SaveUserMetadataQuery(item=make_metadata("1")))
+
+    def claim(storage: SqliteUserStorage, now: float) -> bool:
+        query = ClaimUserRefreshQuery(user_id="1", now=now, debounce_seconds=60)
+        return storage.claim_user_refresh(query).unwrap().claimed
+
+    assert not claim(user_storage, 1630000030)
+    assert claim(user_storage, 1630000060)
+    assert not claim(reopened, 1630000100)
+    reply = reopened.claim_user_refresh(
+        ClaimUserRefreshQuery(user_id="1", now=1630000100, debounce_seconds=60)
+    ).unwrap()
+    assert reply.last_attempt_timestamp == 1630000060
+    assert claim(reopened, 1630000120)
+
+    missing = user_storage.claim_user_refresh(
+        ClaimUserRefreshQuery(user_id="2", now=1630000200, debounce_seconds=60)
+    )
+    assert isinstance(missing, Failure)
+    assert isinstance(missing.failure(), NotFoundStorageError)
@@ -0,0 +1,262 @@
+"""Tests for the write-behind user storage wrapper."""
+
+from typing import List
+
+import pytest
+from returns.result import Failure, Success
+
+from app.core.error import (
+    StorageOperationDetails,
+    UnavailableStorageError,
+)
+from app.storage.memory_context import InMemoryStorageContext
+from app.storage.models import DailyScoreItem, DailyScoreKey, UserMetadataItem
+from app.storage.users.memory import InMemoryUserStorage
+from app.storage.users.models import (
+    CreateUsersIfNotExistQuery,
+    GetAllUserIdsQuery,
+    GetSweepCursorQuery,
+    GetUserMetadataQuery,
+    GetUserStreaksQuery,
+    RebuildStreaksQuery,
+    SaveBatchQuery,
+    SaveBatchResult,
+    SaveDailyScoreQuery,
+    SaveSweepCursorQuery,
+    SaveUserMetadataQuery,
+)
+from app.storage.users.write_behind import WriteBehindUserStorage
+
+
+class RecordingUserStorage(InMemoryUserStorage):
+    """In-memory storage that records batches and can be made to fail."""
+
+    def __init__(self, context: InMemoryStorageContext) -> None:
+        super().__init__(context)
+        self.batches: List[SaveBatchQuery] = []
+        self.fail = False
+
+    def save_batch(self, query: SaveBatchQuery) -> SaveBatchResult:
+        self.batches.append(query)
+        if self.fail:
+            return Failure(
+                UnavailableStorageError(
+                    details=StorageOperationDetails(
+                        operation="save_batch",
+                        resource_type=DailyScoreItem.__name__,
+                        raw_error="throttled",
+                    ),
+                    service_name=self.__class__.__name__,
+                )
+            )
+        return super().save_batch(query)
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def memory_context() -> InMemoryStorageContext:
+    """Create a fresh in-memory storage context for each test."""
+    return InMemoryStorageContext()
+
+
+@pytest.fixture
+def backend(memory_context: InMemoryStorageContext) -> RecordingUserStorage:
+    """Create a recording in-memory backend."""
+    return RecordingUserStorage(memory_context)
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """Create a clock that only moves when told to."""
+    return FakeClock()
+
+
+def make_metadata(user_id: str, current_streak: int = 0) -> UserMetadataItem:
+    """Create user metadata with the given streak."""
+    return UserMetadataItem(
+        user_id=user_id,
+        last_fetched_timestamp=0,
+        puzzles_attempted=0,
+        puzzles_solved=0,
+        current_streak=current_streak,
+    )
+
+
+def save_score(storage: WriteBehindUserStorage, user_id: str, score: int) -> None:
+    """Save a score for 2023-01-01 and check it was accepted."""
+    item = DailyScoreItem(user_id=user_id, date="2023-01-01", score=score)
+    assert isinstance(storage.save_daily_score(SaveDailyScoreQuery(item=item)), Success)
+
+
+def test_writes_coalesce_until_flush(
+    backend: RecordingUserStorage,
+    memory_context: InMemoryStorageContext,
+    clock: FakeClock,
+) -> None:
+    """Test that repeated writes to a key coalesce into one buffered item."""
+    storage = WriteBehindUserStorage(backend, max_pending=10, clock=clock)
+    save_score(storage, "1", 300)
+    save_score(storage, "1", 200)
+    save_score(storage, "2", 100)
+
+    assert storage.pending_count == 2
+    assert memory_context.scores == {}
+
+    assert isinstance(storage.flush(), Success)
+    assert len(backend.batches) == 1
+    assert (
+        memory_context.scores[DailyScoreKey(user_id="1", date="2023-01-01")].score
+        == 200
+    )
+    assert storage.pending_count == 0
+
+
+def test_flushes_collect_changed_dates(
+    backend: RecordingUserStorage, clock: FakeClock
+) -> None:
+    """Test that only dates whose stored scores changed are collected."""
+    storage = WriteBehindUserStorage(backend, max_pending=10, clock=clock)
+    save_score(storage, "1", 300)
+    assert isinstance(storage.flush(), Success)
+    save_score(storage, "1", 300)
+    unchanged = storage.flush()
+
+    assert unchanged.unwrap().changed_dates == []
+    assert storage.changed_dates == {"2023-01-01"}
+
+
+def test_flushes_when_full(
+    backend: RecordingUserStorage,
+    memory_context: InMemoryStorageContext,
+    clock: FakeClock,
+) -> None:
+    """Test that reaching max_pending items flushes them as one batch."""
+    storage = WriteBehindUserStorage(backend, max_pending=3, clock=clock)
+    for user_id in ["1", "2", "3", "4"]:
+        save_score(storage, user_id, 100)
+
+    assert len(backend.batches) == 1
+    assert len(backend.batches[0].daily_score_items) == 3
+    assert storage.pending_count == 1
+
+
+def test_flushes_when_oldest_write_is_too_old(
+    backend: RecordingUserStorage, clock: FakeClock
+) -> None:
+    """Test that a write after max_age_seconds flushes the buffer."""
+    storage = WriteBehindUserStorage(
+        backend, max_pending=100, max_age_seconds=5, clock=clock
+    )
+    save_score(storage, "1", 100)
+    clock.now = 4.9
+    save_score(storage, "2", 100)
+    assert backend.batches == []
+
+    clock.now = 5.0
+    save_score(storage, "3", 100)
+    assert len(backend.batches) == 1
+    assert storage.pending_count == 0
+
+
+def test_failed_flush_returns_error_and_keeps_items(
+    backend: RecordingUserStorage,
+    memory_context: InMemoryStorageContext,
+    clock: FakeClock,
+) -> None:
+    """Test that flush errors surface and the items are retried by the next flush."""
+    storage = WriteBehindUserStorage(backend, max_pending=2, clock=clock)
+    backend.fail = True
+    save_score(storage, "1", 100)
+
+    item = DailyScoreItem(user_id="2", date="2023-01-01", score=100)
+    result = storage.save_daily_score(SaveDailyScoreQuery(item=item))
+
+    assert isinstance(result, Failure)
+    assert isinstance(result.failure(), UnavailableStorageError)
+    assert storage.pending_count == 2
+
+    backend.fail = False
+    assert isinstance(storage.flush(), Success)
+    assert len(memory_context.scores) == 2
+
+
+def test_reads_see_buffered_metadata(
+    backend: RecordingUserStorage,
+    memory_context: InMemoryStorageContext,
+    clock: FakeClock,
+) -> None:
+    """Test that buffered users are visible to reads before they are flushed."""
+    memory_context.users["1"] = make_metadata("1")
+    storage = WriteBehindUserStorage(backend, max_pending=10, clock=clock)
+    storage.save_user_metadata(SaveUserMetadataQuery(item=make_metadata("1", 5)))
+    storage.save_user_metadata(SaveUserMetadataQuery(item=make_metadata("2")))
+
+    metadata = storage.get_user_metadata(GetUserMetadataQuery(user_id="1"))
+    assert metadata.unwrap().item.current_streak == 5
+    user_ids = storage.get_all_user_ids(GetAllUserIdsQuery()).unwrap().user_ids
+    assert sorted(user_ids) == ["1", "2"]
+
+
+def test_create_users_flushes_first(
+    backend: RecordingUserStorage, clock: FakeClock
+) -> None:
+    """Test that buffered users count as existing when creating users."""
+    storage = WriteBehindUserStorage(backend, max_pending=10, clock=clock)
+    storage.save_user_metadata(SaveUserMetadataQuery(item=make_metadata("1")))
+
+    result = storage.create_users_if_not_exist(
+        CreateUsersIfNotExistQuery(items=[make_metadata("1"), make_metadata("2")])
+    )
+
+    reply = result.unwrap()
+    assert reply.existing_user_ids == ["1"]
+    assert reply.created_user_ids == ["2"]
+
+
+def test_rebuild_streaks_flushes_first(
+    backend: RecordingUserStorage, clock: FakeClock
+) -> None:
+    """Test that buffered scores count towards rebuilt streaks."""
+    storage = WriteBehindUserStorage(backend, max_pending=10, clock=clock)
+    save_score(storage, "1", 100)
+
+    result = storage.rebuild_streaks(RebuildStreaksQuery())
+
+    assert result.unwrap().user_count == 1
+    assert len(backend.batches) == 1
+    streaks = storage.get_user_streaks(
+        GetUserStreaksQuery(user_id="1", as_of="2023-01-01")
+    )
+    assert streaks.unwrap().current_streak == 1
+
+
+def test_save_sweep_cursor_flushes_first(
+    backend: RecordingUserStorage, clock: FakeClock
+) -> None:
+    """Test that the cursor is only saved once the writes before it are."""
+    storage = WriteBehindUserStorage(backend, max_pending=10, clock=clock)
+    save_score(storage, "1", 100)
+    backend.fail = True
+
+    result = storage.save_sweep_cursor(SaveSweepCursorQuery(after_user_id="1"))
+
+    assert isinstance(result, Failure)
+    assert (
+        storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap().after_user_id is None
+    )
+
+    backend.fail = False
+    result = storage.save_sweep_cursor(SaveSweepCursorQuery(after_user_id="1"))
+
+    assert isinstance(result, Success)
+    assert storage.pending_count == 0
+    assert storage.get_sweep_cursor(GetSweepCursorQuery()).unwrap().after_user_id == "1"